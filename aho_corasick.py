@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Automaton Aho-Corasick để tìm và thay thế nhiều thuật ngữ trong một lần quét
+
+Dùng cho các bảng ánh xạ tên thực phẩm (Việt -> Anh cho USDA, tên thường gọi -> tên trong
+database cho Gemini Vision). Thay cho vòng lặp "for term in dict: if term in query" có chi phí
+O(số thuật ngữ × độ dài truy vấn) và chỉ dịch được một thuật ngữ.
+"""
+import unicodedata
+from collections import deque
+from typing import Dict, List, Mapping, Tuple
+
+# (vị trí bắt đầu, vị trí kết thúc, thuật ngữ gốc, giá trị thay thế)
+TermMatch = Tuple[int, int, str, str]
+
+def normalize_term(text: str) -> str:
+    """Chuẩn hóa NFC + chữ thường để thuật ngữ và truy vấn so khớp được với nhau"""
+    return unicodedata.normalize("NFC", text).lower()
+
+class AhoCorasickTranslator:
+    """
+    Automaton Aho-Corasick build một lần từ bảng thuật ngữ
+
+    Chỉ nhận các khớp nằm trọn trong ranh giới từ ("cá" không khớp trong "cách").
+    """
+
+    def __init__(self, mapping: Mapping[str, str]):
+        """
+        Args:
+            mapping: Bảng thuật ngữ -> giá trị thay thế
+        """
+        self.mapping: Dict[str, str] = {normalize_term(k): v for k, v in mapping.items() if k}
+
+        # Trie: mỗi node là dict ký tự -> node id; fail link và danh sách thuật ngữ kết thúc tại node
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+
+        for term in self.mapping:
+            node = 0
+            for ch in term:
+                next_node = self._goto[node].get(ch)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][ch] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = next_node
+            self._output[node].append(term)
+
+        self._build_fail_links()
+
+    def _build_fail_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                candidate = self._goto[fail].get(ch, 0)
+                self._fail[child] = candidate if candidate != child else 0
+                # Gộp output theo fail link để mỗi vị trí chỉ cần đọc một danh sách
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def __len__(self) -> int:
+        return len(self.mapping)
+
+    def find_all(self, text: str) -> List[TermMatch]:
+        """
+        Tìm tất cả thuật ngữ xuất hiện trong text (có thể chồng lấn nhau)
+
+        Args:
+            text: Văn bản cần quét
+
+        Returns:
+            Danh sách (start, end, term, replacement) theo thứ tự vị trí kết thúc
+        """
+        text = normalize_term(text)
+        matches: List[TermMatch] = []
+        node = 0
+        for index, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+
+            for term in self._output[node]:
+                start = index - len(term) + 1
+                end = index + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if end < len(text) and text[end].isalnum():
+                    continue
+                matches.append((start, end, term, self.mapping[term]))
+        return matches
+
+    def find_longest(self, text: str) -> List[TermMatch]:
+        """
+        Chọn các khớp không chồng lấn theo quy tắc leftmost-longest
+
+        Args:
+            text: Văn bản cần quét
+
+        Returns:
+            Danh sách khớp được chọn, theo thứ tự từ trái sang phải
+        """
+        best_at_start: Dict[int, TermMatch] = {}
+        for match in self.find_all(text):
+            current = best_at_start.get(match[0])
+            if current is None or match[1] > current[1]:
+                best_at_start[match[0]] = match
+
+        selected: List[TermMatch] = []
+        position = 0
+        for start in sorted(best_at_start):
+            if start >= position:
+                selected.append(best_at_start[start])
+                position = best_at_start[start][1]
+        return selected
+
+    def translate(self, text: str) -> str:
+        """
+        Thay thế mọi thuật ngữ trong text bằng giá trị tương ứng trong một lần quét
+
+        Args:
+            text: Văn bản cần dịch
+
+        Returns:
+            Văn bản đã thay thế (chữ thường); phần không khớp được giữ nguyên
+        """
+        normalized = normalize_term(text)
+        parts: List[str] = []
+        position = 0
+        for start, end, _, replacement in self.find_longest(normalized):
+            parts.append(normalized[position:start])
+            parts.append(replacement)
+            position = end
+        parts.append(normalized[position:])
+        return "".join(parts)
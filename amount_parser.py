@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Bộ phân tích khối lượng nguyên liệu ("2 quả", "1 muỗng canh", "1/2 quả", "200g") sang gram
+
+Cú pháp: [số lượng] [đơn vị], trong đó số lượng có thể là số thập phân (0.5, 0,5), phân số
+(1/2, ½), hỗn số (1 1/2), khoảng (2-3) hoặc chữ (một, hai, nửa). Các pattern được biên dịch
+một lần; kết quả được nhớ bằng LRU cache vì cùng một chuỗi lặp lại liên tục giữa các món.
+"""
+import re
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple, Union
+
+Amount = Union[str, int, float, None]
+
+# Nhóm đơn vị -> tên gọi (khớp theo cụm dài nhất trước)
+UNIT_ALIASES = {
+    "g": ["g", "gr", "gram", "grams", "gam"],
+    "kg": ["kg", "kilo", "kilogram", "ký"],
+    "ml": ["ml", "milliliter", "millilitre", "mililít"],
+    "l": ["l", "lít", "liter", "litre"],
+    "tbsp": ["tbsp", "tablespoon", "muỗng canh", "thìa canh", "muỗng to", "muỗng", "thìa"],
+    "tsp": ["tsp", "teaspoon", "muỗng cà phê", "thìa cà phê", "muỗng nhỏ", "thìa nhỏ"],
+    "cup": ["cup", "cups", "ly", "cốc"],
+    "bowl": ["tô", "bát", "chén", "bowl"],
+    "fruit": ["quả", "trái", "củ"],
+    "loaf": ["ổ", "chiếc", "cái"],
+    "slice": ["lát", "slice", "slices"],
+    "piece": ["miếng", "piece", "pieces"],
+}
+
+# Đơn vị đo trực tiếp: gram cho đơn vị khối lượng, ml cho đơn vị thể tích
+MASS_UNITS = {"g": 1.0, "kg": 1000.0}
+VOLUME_UNITS = {"ml": 1.0, "l": 1000.0, "tbsp": 15.0, "tsp": 5.0}
+
+# Khối lượng một đơn vị đếm theo loại nguyên liệu: (từ khóa, gram), phần tử cuối là mặc định
+COUNT_UNIT_WEIGHTS = {
+    "fruit": ([(("trứng", "egg"), 60), (("cà rốt", "carrot"), 80), (("hành", "onion"), 50),
+               (("chanh", "lime", "lemon"), 50), (("khoai tây", "potato"), 150)], 100),
+    "loaf": ([(("bánh mì", "bread"), 150)], 100),
+    "bowl": ([], 200),
+    "cup": ([(("gạo", "rice"), 180), (("rau", "vegetable"), 80)], 150),
+    "slice": ([(("thịt", "meat"), 30), (("bánh mì", "bread"), 25)], 20),
+    "piece": ([], 50),
+}
+
+# Khối lượng riêng (g/ml) cho nguyên liệu lỏng; mặc định 1ml ≈ 1g
+DENSITIES = [
+    (("dầu", "oil"), 0.92),
+    (("mật ong", "honey"), 1.4),
+    (("nước mắm", "fish sauce"), 1.2),
+    (("nước tương", "xì dầu", "soy sauce"), 1.15),
+    (("đường", "sugar"), 0.85),
+    (("muối", "salt"), 1.2),
+    (("sữa", "milk"), 1.03),
+]
+
+NUMBER_WORDS = {
+    "nửa": 0.5, "một": 1, "hai": 2, "ba": 3, "bốn": 4, "năm": 5,
+    "sáu": 6, "bảy": 7, "tám": 8, "chín": 9, "mười": 10,
+}
+
+_UNICODE_FRACTIONS = {"½": 0.5, "⅓": 1 / 3, "⅔": 2 / 3, "¼": 0.25, "¾": 0.75}
+
+_NUMBER = r"\d+(?:[.,]\d+)?"
+_QUANTITY_RE = re.compile(
+    rf"(?P<whole>\d+)\s+(?P<mixed_num>\d+)\s*/\s*(?P<mixed_den>\d+)"      # 1 1/2
+    rf"|(?P<num>\d+)\s*/\s*(?P<den>\d+)"                                 # 1/2
+    rf"|(?P<low>{_NUMBER})\s*(?:-|–|~|đến)\s*(?P<high>{_NUMBER})"        # 2-3
+    rf"|(?P<number>{_NUMBER})"                                           # 200, 0,5
+    rf"|(?P<fraction>[{''.join(_UNICODE_FRACTIONS)}])"                   # ½
+    rf"|(?<![^\W\d_])(?P<word>{'|'.join(sorted(NUMBER_WORDS, key=len, reverse=True))})(?![^\W\d_])"
+)
+
+_UNIT_OF_ALIAS = {alias: unit for unit, aliases in UNIT_ALIASES.items() for alias in aliases}
+_UNIT_RE = re.compile(
+    r"(?<![^\W\d_])(" + "|".join(re.escape(a) for a in sorted(_UNIT_OF_ALIAS, key=len, reverse=True)) + r")(?![^\W\d_])"
+)
+
+def _to_float(text: str) -> float:
+    return float(text.replace(",", "."))
+
+def parse_quantity(text: str) -> Tuple[Optional[float], int]:
+    """
+    Tìm số lượng đầu tiên trong chuỗi
+
+    Args:
+        text: Chuỗi khối lượng đã chuẩn hóa chữ thường
+
+    Returns:
+        Tuple (số lượng hoặc None, vị trí kết thúc của số lượng)
+    """
+    match = _QUANTITY_RE.search(text)
+    if not match:
+        return None, 0
+
+    groups = match.groupdict()
+    if groups["whole"]:
+        value = int(groups["whole"]) + int(groups["mixed_num"]) / max(int(groups["mixed_den"]), 1)
+    elif groups["num"]:
+        value = int(groups["num"]) / max(int(groups["den"]), 1)
+    elif groups["low"]:
+        value = (_to_float(groups["low"]) + _to_float(groups["high"])) / 2
+    elif groups["number"]:
+        value = _to_float(groups["number"])
+    elif groups["fraction"]:
+        value = _UNICODE_FRACTIONS[groups["fraction"]]
+    else:
+        value = float(NUMBER_WORDS[groups["word"]])
+    return value, match.end()
+
+def _weight_for(table: Tuple[list, float], ingredient_name: str) -> float:
+    rules, default = table
+    for keywords, grams in rules:
+        if any(keyword in ingredient_name for keyword in keywords):
+            return grams
+    return default
+
+def _density_for(ingredient_name: str) -> float:
+    for keywords, density in DENSITIES:
+        if any(keyword in ingredient_name for keyword in keywords):
+            return density
+    return 1.0
+
+@lru_cache(maxsize=4096)
+def _parse_amount_text(amount_str: str, ingredient_name: str) -> float:
+    quantity, end = parse_quantity(amount_str)
+    unit_match = _UNIT_RE.search(amount_str, end) or _UNIT_RE.search(amount_str)
+    unit = _UNIT_OF_ALIAS[unit_match.group(1)] if unit_match else None
+
+    if quantity is None:
+        quantity = 1.0
+
+    if unit in MASS_UNITS:
+        return quantity * MASS_UNITS[unit]
+    if unit in VOLUME_UNITS:
+        return quantity * VOLUME_UNITS[unit] * _density_for(ingredient_name)
+    if unit in COUNT_UNIT_WEIGHTS:
+        return quantity * _weight_for(COUNT_UNIT_WEIGHTS[unit], ingredient_name)
+
+    # Không có đơn vị: số lớn thường là gram, số nhỏ thường là số phần (≈100g mỗi phần)
+    return quantity if quantity > 10 else quantity * 100
+
+def parse_amount(amount: Amount, ingredient_name: str = "") -> float:
+    """
+    Quy đổi khối lượng nguyên liệu sang gram
+
+    Args:
+        amount: Chuỗi như "2 quả", "1 muỗng canh", "1/2 quả", "200g" hoặc số gram
+        ingredient_name: Tên nguyên liệu để ước tính đơn vị đếm và khối lượng riêng
+
+    Returns:
+        Khối lượng ước tính (gram)
+    """
+    if isinstance(amount, (int, float)) and not isinstance(amount, bool):
+        return float(amount)
+    if not amount:
+        return 100.0
+    return _parse_amount_text(str(amount).lower().strip(), (ingredient_name or "").lower().strip())
+
+def parse_many(items: Iterable[Tuple[Amount, str]]) -> List[float]:
+    """
+    Quy đổi nhiều khối lượng cùng lúc
+
+    Args:
+        items: Các cặp (khối lượng, tên nguyên liệu)
+
+    Returns:
+        Danh sách gram theo thứ tự đầu vào
+    """
+    return [parse_amount(amount, name) for amount, name in items]
+
+def cache_info():
+    """Thống kê LRU cache của parser (hits/misses/currsize)"""
+    return _parse_amount_text.cache_info()
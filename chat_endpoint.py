@@ -6,6 +6,11 @@ import re
 from datetime import datetime, timezone, timedelta
 from openai import OpenAI
 from firebase_config import firebase_config
+from config import config
+from groq_integration import groq_breaker, wait_for_groq_quota, record_groq_rate_limit
+from circuit_breaker import CircuitOpenError
+from rate_limiting import PRIORITY_INTERACTIVE
+from llm_router import DEFAULT_MODEL, llm_router
 
 # Thiết lập timezone Việt Nam (UTC+7)
 VIETNAM_TZ = timezone(timedelta(hours=7))
@@ -88,7 +93,8 @@ if not groq_api_key:
 
 client = OpenAI(
     api_key=groq_api_key,
-    base_url="https://api.groq.com/openai/v1"
+    base_url="https://api.groq.com/openai/v1",
+    timeout=config.GROQ_TIMEOUT
 )
 
 class ChatHistoryManager:
@@ -99,7 +105,7 @@ class ChatHistoryManager:
         self.db = firebase_config.get_db()
         self.collection_name = "chat_history"
     
-    def save_chat(self, user_id, user_message, ai_reply, augmented=False):
+    def save_chat(self, user_id, user_message, ai_reply, augmented=False, model=DEFAULT_MODEL):
         """
         Lưu một cuộc hội thoại chat vào Firestore
         
@@ -108,6 +114,7 @@ class ChatHistoryManager:
             user_message: Tin nhắn của người dùng
             ai_reply: Phản hồi của AI
             augmented: Đánh dấu nếu phản hồi đã được tăng cường bằng RAG
+            model: Model đã tạo phản hồi
             
         Returns:
             chat_id: ID của cuộc hội thoại đã lưu
@@ -122,7 +129,7 @@ class ChatHistoryManager:
                 "user_message": user_message,
                 "ai_reply": ai_reply,
                 "timestamp": datetime.now(VIETNAM_TZ).isoformat(),
-                "model": "llama3-8b-8192",
+                "model": model,
                 "augmented": augmented  # Đánh dấu nếu sử dụng RAG
             }
             
@@ -542,61 +549,28 @@ def analyze_user_nutrition(user_profile, food_logs, meal_plan):
 def get_usda_nutrition_data(food_name):
     """
     Lấy dữ liệu dinh dưỡng từ USDA API (sync version)
+
+    Dùng chung usda_api: cache tìm kiếm, TokenBucket giới hạn request và
+    connection pool "usda" của http_clients.
     """
     try:
-        import requests
-
-        api_key = os.getenv("USDA_API_KEY", "GJRAy2mRHxo2FiejluDsPDBhzPvUL3J8xhihsKh2")
-        url = "https://api.nal.usda.gov/fdc/v1/foods/search"
-
-        params = {
-            "query": food_name,
-            "pageSize": 3,
-            "api_key": api_key,
-            "dataType": ["Foundation", "SR Legacy"]
-        }
-
-        response = requests.get(url, params=params, timeout=10)
-
-        if response.status_code == 200:
-            data = response.json()
-            foods = data.get("foods", [])
-
-            if foods:
-                food = foods[0]  # Take first result
-                nutrients = food.get("foodNutrients", [])
-
-                # Extract key nutrients
-                nutrition_info = {
-                    "name": food.get("description", "Unknown food"),
-                    "fdc_id": food.get("fdcId"),
-                    "calories": 0,
-                    "protein": 0,
-                    "carbs": 0,
-                    "fat": 0,
-                    "fiber": 0,
-                    "sodium": 0
-                }
-
-                nutrient_map = {
-                    "Energy": "calories",
-                    "Protein": "protein",
-                    "Total lipid (fat)": "fat",
-                    "Carbohydrate, by difference": "carbs",
-                    "Fiber, total dietary": "fiber",
-                    "Sodium, Na": "sodium"
-                }
-
-                for nutrient in nutrients:
-                    name = nutrient.get("nutrient", {}).get("name", "")
-                    amount = nutrient.get("amount", 0)
-
-                    for usda_name, key in nutrient_map.items():
-                        if usda_name in name:
-                            nutrition_info[key] = amount
-                            break
-
-                return nutrition_info
+        from usda_integration import usda_api
+
+        # search_foods tự dịch thuật ngữ tiếng Việt (gạo -> rice, thịt bò -> beef)
+        foods = usda_api.search_foods(food_name, vietnamese=True, max_results=3)
+
+        if foods:
+            food = foods[0]  # Take first result
+            nutrients = food.get("nutrition", {})
+
+            return {
+                "name": food.get("name") or "Unknown food",
+                "fdc_id": food.get("id"),
+                "calories": nutrients.get("calories", 0),
+                "protein": nutrients.get("protein", 0),
+                "carbs": nutrients.get("carbs", 0),
+                "fat": nutrients.get("fat", 0)
+            }
 
     except Exception as e:
         print(f"Error getting USDA data for {food_name}: {e}")
@@ -621,8 +595,20 @@ def get_intelligent_food_recommendations_sync(user_message, user_profile, food_l
             found_food = keyword
             break
 
-    # Nếu tìm thấy thực phẩm, lấy dữ liệu USDA
+    # Nếu tìm thấy thực phẩm, ưu tiên dữ liệu tĩnh trong máy trước khi gọi USDA
+    local_data = None
     if found_food:
+        from nutrition_index import fuzzy_lookup, PER_100G
+        local_data = fuzzy_lookup(found_food, basis=PER_100G)
+        if local_data:
+            recommendations.append(f"📊 DỮ LIỆU DINH DƯỠNG - {local_data['name']}:")
+            recommendations.append(f"• Calories: {local_data['calories']:.1f} kcal/100g")
+            recommendations.append(f"• Protein: {local_data['protein']:.1f}g")
+            recommendations.append(f"• Carbs: {local_data['carbs']:.1f}g")
+            recommendations.append(f"• Fat: {local_data['fat']:.1f}g")
+            recommendations.append(f"• Nguồn: {local_data['source']}")
+
+    if found_food and not local_data:
         usda_data = get_usda_nutrition_data(found_food)
         if usda_data:
             recommendations.append(f"📊 USDA DATA - {usda_data['name']}:")
@@ -918,27 +904,43 @@ Câu hỏi: "{user_message}"
         # Chờ thêm một chút trước khi gọi API để đảm bảo tất cả dữ liệu đã được xử lý
         time.sleep(0.5)
         
+        # Chat được ưu tiên hơn sinh thực đơn khi cùng chờ quota Groq (dùng chung giữa các worker)
+        if not wait_for_groq_quota(PRIORITY_INTERACTIVE):
+            return jsonify({"error": "Hệ thống đang quá tải, vui lòng thử lại sau ít phút."}), 429
+        
         # Gọi Groq API với system prompt và user message
-        completion = client.chat.completions.create(
-            model="llama3-8b-8192",
-            messages=[
-                {
-                    "role": "system",
-                    "content": get_enhanced_nutrition_system_prompt(use_rag)
-                },
-                {
-                    "role": "user", 
-                    "content": augmented_prompt
-                }
-            ],
-            temperature=0.7,
-        )
+        try:
+            completion = groq_breaker.call(llm_router.call, "chat", lambda model: client.chat.completions.with_raw_response.create(
+                model=model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": get_enhanced_nutrition_system_prompt(use_rag)
+                    },
+                    {
+                        "role": "user", 
+                        "content": augmented_prompt
+                    }
+                ],
+                temperature=0.7,
+            ))
+        except CircuitOpenError as e:
+            response = jsonify({"error": "Trợ lý AI tạm thời không phản hồi, vui lòng thử lại sau ít phút."})
+            response.headers["Retry-After"] = str(int(e.retry_in) + 1)
+            return response, 503
+        except Exception as e:
+            retry_after = record_groq_rate_limit(e)
+            if retry_after is not None:
+                response = jsonify({"error": "Hệ thống đang quá tải, vui lòng thử lại sau ít phút."})
+                response.headers["Retry-After"] = str(int(retry_after))
+                return response, 429
+            raise
         
         # Trích xuất phản hồi từ AI
         ai_reply = completion.choices[0].message.content
         
         # Lưu lịch sử chat vào Firebase
-        chat_id = chat_history.save_chat(user_id, user_message, ai_reply, augmented=use_rag)
+        chat_id = chat_history.save_chat(user_id, user_message, ai_reply, augmented=use_rag, model=completion.model)
         
         # Trả về kết quả dạng JSON
         return jsonify({
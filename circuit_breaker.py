@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Circuit breaker và hedged request cho các provider AI bên ngoài (Groq, Gemini)
+
+Khi provider lỗi hoặc chậm liên tục, breaker chuyển sang "open" và từ chối ngay các lời gọi tiếp theo
+(CircuitOpenError) để caller dùng dữ liệu dự phòng thay vì chờ tới timeout. Sau recovery_timeout,
+breaker "half_open" cho một số lời gọi thử; thành công thì đóng lại, thất bại thì mở tiếp.
+
+Hedged request (chỉ cho lời gọi idempotent): nếu lời gọi đầu chưa xong sau khoảng p90 độ trễ gần đây,
+gửi thêm một bản sao và lấy kết quả về trước. Lời gọi thua không hủy được (HTTP đồng bộ) nên chạy tiếp
+trong thread nền và bị bỏ qua (kết quả của nó không được tính vào breaker).
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from metrics import upstream_request_duration
+
+T = TypeVar("T")
+
+# Giá trị mặc định của slow_call_threshold theo từng lời gọi: dùng ngưỡng của breaker
+_BREAKER_DEFAULT = object()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Breaker đang mở: provider bị bỏ qua tạm thời"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit '{name}' is open, retry in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_executor_lock = threading.Lock()
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+    return _hedge_executor
+
+class CircuitBreaker:
+    """Circuit breaker closed/open/half_open cho một provider (thread-safe)"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 slow_call_threshold: float = None, half_open_max_calls: int = 1,
+                 is_failure: Callable[[Exception], bool] = None, window: int = 50,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            name: Tên provider
+            failure_threshold: Số lần lỗi (hoặc chậm) liên tiếp để mở breaker
+            recovery_timeout: Số giây mở trước khi cho lời gọi thử (half_open)
+            slow_call_threshold: Lời gọi thành công nhưng lâu hơn ngưỡng này (giây) cũng tính là lỗi
+            half_open_max_calls: Số lời gọi thử đồng thời khi half_open
+            is_failure: Exception nào tính là lỗi của provider (mặc định mọi exception)
+            window: Số độ trễ gần nhất giữ lại để tính percentile
+            clock: Hàm thời gian (thay được trong test)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.slow_call_threshold = slow_call_threshold
+        self.half_open_max_calls = half_open_max_calls
+        self.is_failure = is_failure or (lambda error: True)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._latencies = deque(maxlen=window)
+        self._counters = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "hedged": 0}
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(self._clock())
+
+    @property
+    def is_open(self) -> bool:
+        """Breaker đang từ chối lời gọi (không tính lời gọi thử khi half_open)"""
+        return self.state == OPEN
+
+    def allow_request(self) -> bool:
+        """Giữ chỗ cho một lời gọi; False nếu breaker đang mở hoặc đã đủ lời gọi thử"""
+        with self._lock:
+            state = self._current_state(self._clock())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def _open(self, now: float) -> None:
+        if self._state != OPEN:
+            print(f"⚡ Circuit '{self.name}' opened after {self._consecutive_failures} failures")
+        self._state = OPEN
+        self._opened_at = now
+        self._half_open_calls = 0
+
+    def record_success(self, duration: float, slow_call_threshold=_BREAKER_DEFAULT) -> None:
+        """
+        Ghi nhận lời gọi thành công (lời gọi quá chậm tính là lỗi)
+
+        Args:
+            duration: Thời gian lời gọi (giây)
+            slow_call_threshold: Ngưỡng chậm cho lời gọi này (mặc định của breaker; None: không xét chậm)
+        """
+        if slow_call_threshold is _BREAKER_DEFAULT:
+            slow_call_threshold = self.slow_call_threshold
+        with self._lock:
+            now = self._clock()
+            self._counters["calls"] += 1
+            self._latencies.append(duration)
+            if slow_call_threshold is not None and duration > slow_call_threshold:
+                self._counters["slow_calls"] += 1
+                self._register_failure(now)
+                return
+            if self._state != CLOSED:
+                print(f"✅ Circuit '{self.name}' closed")
+            self._state = CLOSED
+            self._consecutive_failures = 0
+
+    def record_failure(self, error: Exception = None) -> None:
+        """Ghi nhận lời gọi lỗi (lỗi không thuộc provider, vd 429, chỉ trả lại chỗ half_open)"""
+        with self._lock:
+            now = self._clock()
+            self._counters["calls"] += 1
+            if error is not None and not self.is_failure(error):
+                if self._state == HALF_OPEN:
+                    self._half_open_calls = max(0, self._half_open_calls - 1)
+                return
+            self._counters["failures"] += 1
+            self._register_failure(now)
+
+    def _register_failure(self, now: float) -> None:
+        self._consecutive_failures += 1
+        if self._current_state(now) == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            self._open(now)
+
+    def call(self, fn: Callable[..., T], *args, slow_call_threshold=_BREAKER_DEFAULT, **kwargs) -> T:
+        """
+        Gọi fn qua breaker
+
+        Args:
+            fn: Hàm thực hiện lời gọi (*args, **kwargs được truyền cho fn)
+            slow_call_threshold: Ngưỡng chậm riêng cho lời gọi này (mặc định của breaker; None: không xét
+                chậm, vd lời gọi stream mà thời gian phụ thuộc độ dài phản hồi)
+
+        Raises:
+            CircuitOpenError: Breaker đang mở
+        """
+        return self._call(fn, args, kwargs, slow_call_threshold)
+
+    def _call(self, fn: Callable[..., T], args: tuple, kwargs: dict, slow_call_threshold=_BREAKER_DEFAULT,
+              abandoned: threading.Event = None) -> T:
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_in)
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            upstream_request_duration.observe(time.perf_counter() - started, self.name, "error")
+            if abandoned is None or not abandoned.is_set():
+                self.record_failure(e)
+            raise
+        duration = time.perf_counter() - started
+        upstream_request_duration.observe(duration, self.name, "success")
+        # Bản sao hedge đã bị bỏ (bản khác về trước) không được tính vào breaker
+        if abandoned is None or not abandoned.is_set():
+            self.record_success(duration, slow_call_threshold)
+        return result
+
+    def hedged_call(self, fn: Callable[[], T], hedge_after: float = None, attempts: int = 2,
+                    min_hedge_after: float = 1.0, permit_hedge: Callable[[], bool] = None) -> T:
+        """
+        Gọi fn (idempotent) qua breaker, gửi thêm bản sao nếu lời gọi đầu chậm
+
+        Args:
+            fn: Hàm không tham số thực hiện lời gọi
+            hedge_after: Số giây chờ trước khi gửi bản sao (mặc định p90 độ trễ gần đây)
+            attempts: Tổng số lời gọi tối đa (kể cả bản sao)
+            min_hedge_after: Độ trễ tối thiểu trước khi gửi bản sao
+            permit_hedge: Gọi ngay trước khi gửi mỗi bản sao (vd lấy token quota); trả False thì
+                không gửi thêm bản sao nào
+
+        Returns:
+            Kết quả của lời gọi xong (thành công) đầu tiên
+
+        Raises:
+            CircuitOpenError: Breaker đang mở
+            Exception: Lỗi của lời gọi cuối cùng nếu mọi lời gọi đều lỗi
+        """
+        if hedge_after is None:
+            hedge_after = self.latency_percentile(0.9)
+        if hedge_after is None or attempts <= 1:
+            # Chưa có số liệu độ trễ: gọi bình thường
+            return self.call(fn)
+        hedge_after = max(hedge_after, min_hedge_after)
+
+        executor = _get_hedge_executor()
+        abandoned = threading.Event()  # Đặt khi đã có kết quả: các lời gọi còn chạy bị bỏ
+        pending = {executor.submit(self._call, fn, (), {}, _BREAKER_DEFAULT, abandoned)}
+        launched = 1
+        last_error: Optional[Exception] = None
+        while pending:
+            can_hedge = launched < attempts
+            done, pending = wait(pending, timeout=hedge_after if can_hedge else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    abandoned.set()
+                    return future.result()
+                last_error = error
+            if can_hedge and (not done or not pending) and not isinstance(last_error, CircuitOpenError):
+                # Lời gọi đang chạy quá chậm (hoặc đã lỗi): gửi thêm bản sao
+                if permit_hedge is not None and not permit_hedge():
+                    attempts = launched
+                    continue
+                with self._lock:
+                    self._counters["hedged"] += 1
+                pending.add(executor.submit(self._call, fn, (), {}, _BREAKER_DEFAULT, abandoned))
+                launched += 1
+        raise last_error
+
+    @property
+    def retry_in(self) -> float:
+        """Số giây còn lại tới khi breaker cho lời gọi thử"""
+        with self._lock:
+            if self._current_state(self._clock()) != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.recovery_timeout - self._clock())
+
+    def latency_percentile(self, quantile: float) -> Optional[float]:
+        """Percentile độ trễ các lời gọi gần đây (None nếu chưa có số liệu)"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(quantile * len(samples)))]
+
+    def status(self) -> Dict:
+        """Trạng thái breaker cho endpoint thông tin"""
+        p50, p90 = self.latency_percentile(0.5), self.latency_percentile(0.9)
+        with self._lock:
+            state = self._current_state(self._clock())
+            counters = dict(self._counters)
+            consecutive_failures = self._consecutive_failures
+        return {
+            "state": state,
+            "consecutive_failures": consecutive_failures,
+            "retry_in_seconds": round(self.retry_in, 1),
+            "latency_p50_seconds": None if p50 is None else round(p50, 3),
+            "latency_p90_seconds": None if p90 is None else round(p90, 3),
+            **counters,
+        }
+
+class CircuitBreakerRegistry:
+    """Các breaker theo provider, dùng chung trong process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def register(self, breaker: CircuitBreaker) -> CircuitBreaker:
+        """Đăng ký breaker (trả về breaker đã có nếu trùng tên)"""
+        with self._lock:
+            return self._breakers.setdefault(breaker.name, breaker)
+
+    def get(self, name: str) -> Optional[CircuitBreaker]:
+        return self._breakers.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._breakers)
+
+    def status(self) -> Dict[str, Dict]:
+        return {name: breaker.status() for name, breaker in list(self._breakers.items())}
+
+# Global instance
+circuit_breakers = CircuitBreakerRegistry()
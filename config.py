@@ -34,6 +34,69 @@ class Config:
     # USDA API Settings
     USE_USDA_CACHE: bool = os.getenv("USE_USDA_CACHE", "True").lower() in ('true', 'yes', '1')
     USDA_CACHE_TTL_DAYS: int = int(os.getenv("USDA_CACHE_TTL_DAYS", "30"))
+    USDA_REQUESTS_PER_SECOND: float = float(os.getenv("USDA_REQUESTS_PER_SECOND", "2"))
+    USDA_BURST: int = int(os.getenv("USDA_BURST", "4"))  # Số request được gửi dồn một lúc
+    
+    # Groq model discovery cache (tránh gọi models.list() mỗi lần cold start)
+    GROQ_MODELS_CACHE_FILE: str = os.path.join(CACHE_DIR, "groq_models.json")
+    GROQ_MODELS_CACHE_TTL_HOURS: int = int(os.getenv("GROQ_MODELS_CACHE_TTL_HOURS", "12"))
+    
+    # Groq quota: token bucket dùng chung giữa các worker qua file SQLite ("memory" = riêng từng process)
+    GROQ_REQUESTS_PER_MINUTE: int = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+    GROQ_REQUESTS_PER_DAY: int = int(os.getenv("GROQ_REQUESTS_PER_DAY", "14400"))
+    GROQ_RATE_LIMIT_BACKEND: str = os.getenv("GROQ_RATE_LIMIT_BACKEND", "sqlite")
+    GROQ_RATE_LIMIT_DB: str = os.getenv("GROQ_RATE_LIMIT_DB", os.path.join(CACHE_DIR, "groq_rate_limit.sqlite3"))
+    GROQ_CHAT_MAX_WAIT: float = float(os.getenv("GROQ_CHAT_MAX_WAIT", "10"))  # Giây chờ quota tối đa cho chat
+    GROQ_BATCH_MAX_WAIT: float = float(os.getenv("GROQ_BATCH_MAX_WAIT", "60"))  # ... cho sinh thực đơn
+    
+    # Timeout và circuit breaker cho provider AI (bỏ qua provider chậm/lỗi thay vì chờ tới timeout)
+    GROQ_TIMEOUT: float = float(os.getenv("GROQ_TIMEOUT", "20"))
+    GROQ_SLOW_CALL_SECONDS: float = float(os.getenv("GROQ_SLOW_CALL_SECONDS", "15"))
+    GEMINI_TIMEOUT: float = float(os.getenv("GEMINI_TIMEOUT", "30"))
+    GEMINI_SLOW_CALL_SECONDS: float = float(os.getenv("GEMINI_SLOW_CALL_SECONDS", "20"))
+    BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+    BREAKER_RECOVERY_SECONDS: float = float(os.getenv("BREAKER_RECOVERY_SECONDS", "30"))
+    # Hedge nhận diện Gemini (gửi thêm bản sao trả phí khi lời gọi đầu chậm): tắt mặc định, giới hạn số bản sao
+    GEMINI_HEDGE_ENABLED: bool = os.getenv("GEMINI_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+    GEMINI_HEDGES_PER_MINUTE: float = float(os.getenv("GEMINI_HEDGES_PER_MINUTE", "5"))
+    
+    # Tiền xử lý ảnh trước khi nhận diện/lưu trữ
+    IMAGE_MAX_EDGE: int = int(os.getenv("IMAGE_MAX_EDGE", "1536"))  # Cạnh dài tối đa gửi tới Gemini (px)
+    IMAGE_OUTPUT_FORMAT: str = os.getenv("IMAGE_OUTPUT_FORMAT", "JPEG")  # JPEG hoặc WEBP
+    IMAGE_QUALITY: int = int(os.getenv("IMAGE_QUALITY", "85"))
+    IMAGE_THUMBNAIL_EDGE: int = int(os.getenv("IMAGE_THUMBNAIL_EDGE", "320"))
+    
+    # Nhận diện nhiều ảnh trong một request
+    FOOD_BATCH_MAX_IMAGES: int = int(os.getenv("FOOD_BATCH_MAX_IMAGES", "10"))
+    FOOD_BATCH_MAX_CONCURRENCY: int = int(os.getenv("FOOD_BATCH_MAX_CONCURRENCY", "3"))
+    
+    # Cache kết quả nhận diện theo dHash ảnh (ảnh gần trùng không gọi lại Gemini)
+    RECOGNITION_CACHE_ENABLED: bool = os.getenv("RECOGNITION_CACHE_ENABLED", "True").lower() in ('true', 'yes', '1')
+    RECOGNITION_CACHE_MAX_DISTANCE: int = int(os.getenv("RECOGNITION_CACHE_MAX_DISTANCE", "6"))  # Hamming (trên 64 bit), cùng người dùng
+    RECOGNITION_CACHE_GLOBAL_MAX_DISTANCE: int = int(os.getenv("RECOGNITION_CACHE_GLOBAL_MAX_DISTANCE", "3"))  # ... giữa các người dùng
+    RECOGNITION_CACHE_USER_ENTRIES: int = int(os.getenv("RECOGNITION_CACHE_USER_ENTRIES", "50"))
+    RECOGNITION_CACHE_GLOBAL_ENTRIES: int = int(os.getenv("RECOGNITION_CACHE_GLOBAL_ENTRIES", "2000"))
+    RECOGNITION_CACHE_TTL_SECONDS: float = float(os.getenv("RECOGNITION_CACHE_TTL_SECONDS", "86400"))
+    
+    # Hàng đợi job nền cho tác vụ phụ sau response (ghi Firestore, lịch sử chat...)
+    JOB_QUEUE_WORKERS: int = int(os.getenv("JOB_QUEUE_WORKERS", "4"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    JOB_BACKOFF_SECONDS: float = float(os.getenv("JOB_BACKOFF_SECONDS", "1"))  # Nhân đôi sau mỗi lần lỗi
+    JOB_DEAD_LETTER_FILE: str = os.getenv("JOB_DEAD_LETTER_FILE", os.path.join(DATA_DIR, "dead_letter_jobs.jsonl"))
+    
+    # Job sinh kế hoạch ăn bất đồng bộ (theo dõi qua SSE)
+    MEAL_PLAN_JOB_WORKERS: int = int(os.getenv("MEAL_PLAN_JOB_WORKERS", "2"))
+    MEAL_PLAN_JOBS_DIR: str = os.getenv("MEAL_PLAN_JOBS_DIR", os.path.join(DATA_DIR, "meal_plan_jobs"))
+    MEAL_PLAN_JOB_TTL_SECONDS: float = float(os.getenv("MEAL_PLAN_JOB_TTL_SECONDS", "86400"))
+    
+    # Logging có cấu trúc (ghi stdout ở thread nền)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # "json" hoặc "text"
+    LOG_SAMPLE_RATE: float = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))  # Tỉ lệ giữ log dưới WARNING (theo request)
+    LOG_SLOW_REQUEST_SECONDS: float = float(os.getenv("LOG_SLOW_REQUEST_SECONDS", "2.0"))
+    
+    # Startup warm-up
+    WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "True").lower() in ('true', 'yes', '1')
     
     # Cache settings
     CACHE_TTL_DAYS: int = int(os.getenv("CACHE_TTL_DAYS", "30"))
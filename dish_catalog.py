@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Danh mục món ăn tĩnh dạng compact, chỉ đọc và load lười (lazy)
+
+Các bảng món ăn mẫu (FALLBACK_MEALS, SAMPLE_RECIPES, SAMPLE_DISHES, món truyền thống, món đặc
+sắc, thực đơn của VietnameseMealService) được biên dịch sẵn thành data/dish_catalog.json bằng
+scripts/build_dish_catalog.py. Lần dùng đầu tiên, catalog được đọc một lần thành các DishRecord
+(__slots__, chuỗi được intern, list -> tuple) dùng chung cho mọi request. Các view trả về tuple
+record chỉ đọc nên không cần copy; gọi to_dict() khi thật sự cần một dict để sửa hoặc trả về API.
+
+Nếu artifact thiếu hoặc cũ hơn các module dữ liệu nguồn (so fingerprint), catalog được build
+trực tiếp từ các module đó.
+"""
+import hashlib
+import importlib
+import json
+import os
+import sys
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACT_PATH = os.path.join(BASE_DIR, "data", "dish_catalog.json")
+ARTIFACT_FORMAT = 1
+
+# Nguồn -> (module, thuộc tính hoặc hàm build, kiểu bố cục)
+# - by_meal_type: {loại bữa: [món]}
+# - named_by_meal_type: {loại bữa: {tên món: thông tin}}
+# - named: {tên món: thông tin có "meal_type": [loại bữa]}
+CATALOG_SOURCES: Dict[str, Tuple[str, str, str]] = {
+    "fallback": ("fallback_meals", "FALLBACK_MEALS", "by_meal_type"),
+    "sample_recipes": ("utils", "SAMPLE_RECIPES", "by_meal_type"),
+    "sample_dishes": ("generate_random_data", "SAMPLE_DISHES", "by_meal_type"),
+    "specialty": ("vietnamese_specialty_dishes", "SPECIALTY_DISHES", "named_by_meal_type"),
+    "traditional": ("vietnamese_traditional_dishes", "ALL_TRADITIONAL_DISHES", "named"),
+    "vietnamese_menu": ("services.vietnamese_meal_service", "build_vietnamese_meals", "by_meal_type"),
+}
+
+# Module dữ liệu mà các nguồn trên đọc khi build (thay đổi cũng làm artifact cũ đi)
+SOURCE_DEPENDENCIES: Tuple[str, ...] = ("vietnamese_nutrition_database",)
+
+# Nhóm chứa toàn bộ món của bảng dạng "named" (món được xếp vào bữa theo field meal_type)
+ALL_GROUP = "*"
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({
+            (sys.intern(key) if isinstance(key, str) else key): _freeze(item) for key, item in value.items()
+        })
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+class DishRecord(Mapping):
+    """
+    Một món trong catalog: đọc như dict (record["name"], record.get(...)) nhưng không sửa được
+
+    Giá trị lồng nhau là tuple/mapping chỉ đọc; to_dict() tạo một dict mới có thể sửa tự do.
+    """
+
+    __slots__ = ("name", "source", "_data")
+
+    def __init__(self, source: str, data: Mapping):
+        self.source = source
+        self._data = data
+        self.name = data.get("name", "")
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"DishRecord({self.source!r}, {self.name!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Bản dict/list thường (mới hoàn toàn) của món ăn"""
+        return _thaw(self._data)
+
+class DishCatalog:
+    """Các view chỉ đọc theo nguồn và loại bữa"""
+
+    def __init__(self, tables: Dict[str, Dict[str, List[Dict[str, Any]]]]):
+        """
+        Args:
+            tables: Nguồn -> nhóm (loại bữa hoặc ALL_GROUP) -> danh sách món đã chuẩn hóa
+        """
+        self._views: Dict[str, Dict[Optional[str], Tuple[DishRecord, ...]]] = {}
+        self._by_name: Dict[str, Dict[str, DishRecord]] = {}
+
+        for source, groups in tables.items():
+            views: Dict[Optional[str], List[DishRecord]] = {}
+            every: List[DishRecord] = []
+            by_name: Dict[str, DishRecord] = {}
+            for group, dishes in groups.items():
+                records = [DishRecord(source, _freeze(dish)) for dish in dishes]
+                every.extend(records)
+                for record in records:
+                    by_name.setdefault(record.name.lower(), record)
+                    meal_types = record.get("meal_type", ()) if group == ALL_GROUP else (group,)
+                    for meal_type in dict.fromkeys(meal_types):
+                        views.setdefault(meal_type, []).append(record)
+            views[None] = every
+            self._views[source] = {group: tuple(records) for group, records in views.items()}
+            self._by_name[source] = by_name
+
+    def sources(self) -> Tuple[str, ...]:
+        return tuple(self._views)
+
+    def meal_types(self, source: str) -> Tuple[str, ...]:
+        """Các loại bữa có trong nguồn, theo thứ tự gốc"""
+        return tuple(group for group in self._views.get(source, {}) if group is not None)
+
+    def dishes(self, source: str, meal_type: Optional[str] = None) -> Tuple[DishRecord, ...]:
+        """
+        View chỉ đọc các món của một nguồn
+
+        Args:
+            source: Tên nguồn trong CATALOG_SOURCES
+            meal_type: Loại bữa (None là tất cả món của nguồn)
+
+        Returns:
+            Tuple DishRecord (dùng chung, không copy)
+        """
+        return self._views.get(source, {}).get(meal_type, ())
+
+    def names(self, source: str, meal_type: Optional[str] = None) -> List[str]:
+        return [record.name for record in self.dishes(source, meal_type)]
+
+    def get(self, source: str, name: str) -> Optional[DishRecord]:
+        """Tra cứu món theo tên (không phân biệt hoa thường)"""
+        return self._by_name.get(source, {}).get(name.lower())
+
+def _normalize_table(raw: Mapping, layout: str) -> Dict[str, List[Dict[str, Any]]]:
+    if layout == "by_meal_type":
+        return {meal_type: [dict(dish) for dish in dishes] for meal_type, dishes in raw.items()}
+    if layout == "named_by_meal_type":
+        return {
+            meal_type: [{"name": name, **info} for name, info in dishes.items()]
+            for meal_type, dishes in raw.items()
+        }
+    if layout == "named":
+        return {ALL_GROUP: [{"name": name, **info} for name, info in raw.items()]}
+    raise ValueError(f"Unknown catalog layout: {layout}")
+
+def build_tables_from_sources() -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """
+    Đọc các module dữ liệu nguồn và chuẩn hóa thành bảng của catalog
+
+    Returns:
+        Nguồn -> nhóm -> danh sách món
+    """
+    tables = {}
+    for source, (module_name, attribute, layout) in CATALOG_SOURCES.items():
+        raw = getattr(importlib.import_module(module_name), attribute)
+        tables[source] = _normalize_table(raw() if callable(raw) else raw, layout)
+    return tables
+
+def sources_fingerprint() -> str:
+    """Hash nội dung các file dữ liệu nguồn, dùng để phát hiện artifact đã cũ"""
+    digest = hashlib.sha1()
+    module_names = [module_name for module_name, _, _ in CATALOG_SOURCES.values()] + list(SOURCE_DEPENDENCIES)
+    for module_name in module_names:
+        path = os.path.join(BASE_DIR, *module_name.split(".")) + ".py"
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def write_artifact(path: str = ARTIFACT_PATH) -> Dict[str, int]:
+    """
+    Biên dịch catalog từ các module nguồn và ghi ra file JSON
+
+    Returns:
+        Số món theo nguồn
+    """
+    tables = build_tables_from_sources()
+    artifact = {"format": ARTIFACT_FORMAT, "fingerprint": sources_fingerprint(), "tables": tables}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, separators=(",", ":"))
+        f.write("\n")
+    return {source: sum(len(dishes) for dishes in groups.values()) for source, groups in tables.items()}
+
+def load_artifact(path: str = ARTIFACT_PATH) -> Optional[Dict[str, Dict[str, List[Dict[str, Any]]]]]:
+    """
+    Đọc artifact đã biên dịch nếu còn khớp với dữ liệu nguồn
+
+    Returns:
+        Bảng của catalog hoặc None nếu thiếu/cũ
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            artifact = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if artifact.get("format") != ARTIFACT_FORMAT or artifact.get("fingerprint") != sources_fingerprint():
+        return None
+    return artifact.get("tables")
+
+_CATALOG: Optional[DishCatalog] = None
+_CATALOG_LOCK = threading.Lock()
+
+def get_dish_catalog() -> DishCatalog:
+    """Catalog dùng chung, load một lần khi dùng lần đầu (thread-safe)"""
+    global _CATALOG
+    if _CATALOG is None:
+        with _CATALOG_LOCK:
+            if _CATALOG is None:
+                tables = load_artifact()
+                if tables is None:
+                    print("⚠️ Dish catalog artifact missing or outdated, building from source modules")
+                    tables = build_tables_from_sources()
+                _CATALOG = DishCatalog(tables)
+    return _CATALOG
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Chỉ mục món ăn gần trùng lặp cho các kiểm tra chống lặp món
+
+Mỗi tên món được tính trước một lần: tên lõi (bỏ vùng miền/đặc tính), món gốc, tập từ, các
+pattern đặc trưng và chữ ký MinHash của tập từ. Câu hỏi "món này có giống món nào gần đây
+không?" chỉ cần tra các bucket (tên, tên lõi, món gốc, pattern, band LSH) rồi xác minh vài ứng
+viên, thay vì so từng cặp với toàn bộ danh sách món gần đây.
+"""
+import random
+import zlib
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, FrozenSet, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+# Từ chỉ vùng miền, đặc tính, cách nấu, mức độ: khác nhau ở các từ này vẫn là cùng một món
+REGIONAL_TERMS = [
+    # Vùng miền
+    "miền tây", "miền bắc", "miền trung", "miền nam",
+    # Thành phố
+    "sài gòn", "hà nội", "huế", "đà nẵng", "nha trang", "cà mau",
+    "đồng nai", "an giang", "cần thơ", "vũng tàu", "hải phòng",
+    # Đặc tính
+    "đặc biệt", "truyền thống", "cổ điển", "đặc sản", "cải tiến",
+    "nguyên bản", "chính gốc", "authentic", "original",
+    # Phong cách nấu
+    "nướng than", "nướng lò", "chiên giòn", "luộc", "hấp",
+    # Mức độ
+    "cay", "ngọt", "mặn", "chua", "đậm đà", "nhẹ nhàng"
+]
+
+# Món gốc phổ biến ("Cơm Tấm Sườn Nướng Mật Ong Sài Gòn" -> "cơm tấm")
+BASE_DISHES = [
+    "cơm tấm", "bánh mì", "phở", "cháo", "bún", "hủ tiếu",
+    "mì quảng", "bánh xèo", "bánh khọt", "nem", "chả cá",
+    "lẩu", "xôi", "bánh cuốn", "bánh căn"
+]
+
+# Hai món cùng chứa đủ các cụm của một pattern được coi là biến thể của nhau
+SIMILAR_PATTERNS = [
+    ("cơm tấm", "sườn"),
+    ("bánh mì", "chả cá"),
+    ("phở", "gà"),
+    ("phở", "bò"),
+    ("cháo", "gà"),
+    ("cháo", "tôm"),
+]
+
+# Tỉ lệ từ trùng (Jaccard) tối thiểu để coi là cùng món
+WORD_OVERLAP_THRESHOLD = 0.7
+
+# MinHash 32 hàm băm chia 16 band × 2 dòng: cặp có Jaccard 0.7 trùng ít nhất một band với
+# xác suất 1 - (1 - 0.7²)^16 ≈ 0.99999
+MINHASH_PERMUTATIONS = 32
+LSH_BANDS = 16
+_ROWS_PER_BAND = MINHASH_PERMUTATIONS // LSH_BANDS
+_MERSENNE_PRIME = (1 << 61) - 1
+_hash_rng = random.Random(20240607)
+_HASH_PARAMS = [
+    (_hash_rng.randrange(1, _MERSENNE_PRIME), _hash_rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+
+class DishSignature(NamedTuple):
+    """Các đặc trưng đã tính trước của một tên món (chữ thường)"""
+    name: str
+    core: str
+    has_region: bool
+    base: str
+    words: FrozenSet[str]
+    patterns: FrozenSet[int]
+    minhash: Tuple[int, ...]
+
+def remove_regional_variations(dish_name: str) -> str:
+    """
+    Bỏ các từ vùng miền/đặc tính để lấy tên lõi của món
+
+    Args:
+        dish_name: Tên món ăn
+
+    Returns:
+        Tên lõi (chữ thường, đã gộp khoảng trắng)
+    """
+    dish_clean = dish_name.lower()
+    for term in REGIONAL_TERMS:
+        dish_clean = dish_clean.replace(term, "").strip()
+    return " ".join(dish_clean.split())
+
+def extract_base_dish_name(dish_name: str) -> str:
+    """
+    Món gốc của tên món; không thuộc danh sách món gốc thì lấy 2 từ đầu
+
+    Args:
+        dish_name: Tên món ăn
+
+    Returns:
+        Tên món gốc (chữ thường)
+    """
+    dish_lower = dish_name.lower()
+    for base in BASE_DISHES:
+        if base in dish_lower:
+            return base
+    words = dish_lower.split()
+    return " ".join(words[:2]) if len(words) >= 2 else dish_lower
+
+def _minhash(words: FrozenSet[str]) -> Tuple[int, ...]:
+    if not words:
+        return ()
+    # crc32 thay cho hash() để chữ ký ổn định giữa các tiến trình
+    hashed = [zlib.crc32(word.encode("utf-8")) for word in words]
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashed) for a, b in _HASH_PARAMS)
+
+@lru_cache(maxsize=4096)
+def dish_signature(dish_name: str) -> DishSignature:
+    """
+    Tính (và nhớ) các đặc trưng dùng cho so sánh món
+
+    Args:
+        dish_name: Tên món ăn
+
+    Returns:
+        DishSignature của tên món đã chuyển chữ thường
+    """
+    name = dish_name.lower()
+    core = remove_regional_variations(name)
+    words = frozenset(name.split())
+    patterns = frozenset(
+        pattern_id for pattern_id, pattern in enumerate(SIMILAR_PATTERNS)
+        if all(term in name for term in pattern)
+    )
+    return DishSignature(
+        name=name,
+        core=core,
+        has_region=name != core,
+        base=extract_base_dish_name(name),
+        words=words,
+        patterns=patterns,
+        minhash=_minhash(words),
+    )
+
+def signatures_similar(first: DishSignature, second: DishSignature) -> bool:
+    """
+    So sánh hai món theo các quy tắc chống trùng lặp
+
+    1. Trùng tên
+    2. Trùng tên lõi: chỉ là trùng nếu không phải cả hai đều có biến thể vùng miền
+    3. Trùng món gốc
+    4. Trên 70% từ giống nhau
+    5. Cùng chứa một pattern đặc trưng (phở + bò, cháo + gà...)
+    """
+    if first.name == second.name:
+        return True
+
+    if first.core == second.core:
+        # Cả hai đều là biến thể vùng miền khác nhau thì cho phép
+        return not (first.has_region and second.has_region)
+
+    if first.base == second.base:
+        return True
+
+    if first.words and second.words:
+        overlap = len(first.words & second.words)
+        if overlap / len(first.words | second.words) > WORD_OVERLAP_THRESHOLD:
+            return True
+
+    return bool(first.patterns & second.patterns)
+
+def are_dishes_similar(dish1: str, dish2: str) -> bool:
+    """
+    Kiểm tra 2 món ăn có tương tự nhau không
+
+    Args:
+        dish1, dish2: Tên món ăn
+
+    Returns:
+        bool: True nếu tương tự
+    """
+    return signatures_similar(dish_signature(dish1), dish_signature(dish2))
+
+def _bucket_keys(signature: DishSignature) -> List[Hashable]:
+    keys: List[Hashable] = [("name", signature.name), ("core", signature.core), ("base", signature.base)]
+    keys.extend(("pattern", pattern_id) for pattern_id in signature.patterns)
+    for band in range(len(signature.minhash) // _ROWS_PER_BAND):
+        start = band * _ROWS_PER_BAND
+        keys.append(("band", band, signature.minhash[start:start + _ROWS_PER_BAND]))
+    return keys
+
+class DishSimilarityIndex:
+    """
+    Tập món gần đây (có thể giới hạn kích thước, bỏ món cũ nhất trước) với truy vấn gần trùng lặp
+
+    Ứng viên được lấy từ các bucket theo tên, tên lõi, món gốc, pattern và band LSH, sau đó
+    xác minh bằng đúng quy tắc của signatures_similar. Quy tắc trùng từ (Jaccard) dựa vào LSH
+    nên về lý thuyết có thể bỏ sót với xác suất rất nhỏ; các quy tắc còn lại là chính xác.
+    """
+
+    def __init__(self, names: Iterable[str] = (), max_size: Optional[int] = None):
+        """
+        Args:
+            names: Các món ban đầu, theo thứ tự từ cũ đến mới
+            max_size: Số món tối đa giữ lại (None là không giới hạn)
+        """
+        self.max_size = max_size
+        self._entries: Deque[Tuple[int, str, DishSignature]] = deque()
+        self._name_of_entry: Dict[int, str] = {}
+        self._buckets: Dict[Hashable, Dict[int, DishSignature]] = {}
+        self._next_id = 0
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, dish_name: str) -> bool:
+        return bool(self._buckets.get(("name", dish_name.lower())))
+
+    @property
+    def names(self) -> List[str]:
+        """Tên các món theo thứ tự thêm vào (cũ đến mới)"""
+        return [name for _, name, _ in self._entries]
+
+    def add(self, dish_name: str) -> None:
+        """
+        Thêm món vào chỉ mục; vượt max_size thì bỏ món cũ nhất
+
+        Args:
+            dish_name: Tên món ăn
+        """
+        signature = dish_signature(dish_name)
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries.append((entry_id, dish_name, signature))
+        self._name_of_entry[entry_id] = dish_name
+        for key in _bucket_keys(signature):
+            self._buckets.setdefault(key, {})[entry_id] = signature
+
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                self.pop_oldest()
+
+    def pop_oldest(self) -> Optional[str]:
+        """
+        Bỏ món cũ nhất
+
+        Returns:
+            Tên món đã bỏ hoặc None nếu chỉ mục rỗng
+        """
+        if not self._entries:
+            return None
+        entry_id, dish_name, signature = self._entries.popleft()
+        del self._name_of_entry[entry_id]
+        for key in _bucket_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.pop(entry_id, None)
+                if not bucket:
+                    del self._buckets[key]
+        return dish_name
+
+    def clear(self) -> None:
+        """Xóa toàn bộ chỉ mục"""
+        self._entries.clear()
+        self._name_of_entry.clear()
+        self._buckets.clear()
+
+    def find_similar(self, dish_name: str) -> Optional[str]:
+        """
+        Tìm món gần đây tương tự với dish_name
+
+        Args:
+            dish_name: Tên món cần kiểm tra
+
+        Returns:
+            Tên món tương tự (cũ nhất trước) hoặc None
+        """
+        signature = dish_signature(dish_name)
+        candidates: Dict[int, DishSignature] = {}
+        for key in _bucket_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket:
+                candidates.update(bucket)
+
+        matched = [entry_id for entry_id, other in candidates.items() if signatures_similar(signature, other)]
+        return self._name_of_entry[min(matched)] if matched else None
+
+    def is_similar(self, dish_name: str) -> bool:
+        """True nếu dish_name tương tự một món trong chỉ mục"""
+        return self.find_similar(dish_name) is not None
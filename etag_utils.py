@@ -0,0 +1,96 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+
+# Tên trường lưu ETag ngay trong document Firestore (vd: latest_meal_plans/{user_id})
+# để server trả lời conditional GET mà không cần serialize lại toàn bộ kế hoạch
+ETAG_FIELD = "content_etag"
+
+def compute_etag(data: Any) -> str:
+    """
+    Tính ETag (strong) từ nội dung dữ liệu
+
+    Args:
+        data: Dict, list hoặc Pydantic model cần băm
+
+    Returns:
+        Chuỗi ETag đã có dấu nháy kép, vd: "3f2a..."
+    """
+    if hasattr(data, 'model_dump'):
+        data = data.model_dump()
+    elif hasattr(data, 'dict'):
+        data = data.dict()
+
+    # Bỏ qua chính trường ETag để giá trị không phụ thuộc vào lần stamp trước
+    if isinstance(data, dict) and ETAG_FIELD in data:
+        data = {k: v for k, v in data.items() if k != ETAG_FIELD}
+
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+def stamp_etag(data: Dict[str, Any]) -> str:
+    """
+    Ghi ETag vào document trước khi lưu xuống Firestore
+
+    Args:
+        data: Document sẽ được lưu (bị sửa trực tiếp)
+
+    Returns:
+        ETag vừa được ghi
+    """
+    etag = compute_etag(data)
+    data[ETAG_FIELD] = etag
+    return etag
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    Kiểm tra header If-None-Match của client có khớp với ETag hiện tại không
+
+    Args:
+        if_none_match: Giá trị header If-None-Match (có thể chứa nhiều ETag, cách nhau bởi dấu phẩy)
+        etag: ETag hiện tại của tài nguyên
+
+    Returns:
+        True nếu bản sao của client vẫn còn mới
+    """
+    if not if_none_match or not etag:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    current = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        # So sánh weak theo RFC 7232: bỏ tiền tố W/
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+def not_modified_response(etag: str) -> Response:
+    """
+    Tạo response 304 Not Modified (không có body)
+
+    Args:
+        etag: ETag hiện tại của tài nguyên
+
+    Returns:
+        Response 304 kèm header ETag
+    """
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+def set_etag_headers(response: Response, etag: str) -> None:
+    """
+    Gắn header ETag vào response thông thường (200)
+
+    Args:
+        response: Đối tượng Response do FastAPI inject
+        etag: ETag của nội dung trả về
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
@@ -10,6 +10,7 @@ from google.cloud.firestore_v1.base_query import FieldFilter
 from config import config
 from models import WeeklyMealPlan, DayMealPlan, Meal, Dish
 from services.preparation_utils import process_preparation_steps
+from etag_utils import stamp_etag
 
 # Hàm chuyển đổi Pydantic model sang dict tương thích với cả phiên bản 1.x và 2.x
 def model_to_dict(model: Any) -> Dict:
@@ -245,6 +246,9 @@ class FirebaseIntegration:
                             if dish['health_benefits']:
                                 print(f"[FIREBASE] Dish {dish.get('name')} has health benefits: {str(dish['health_benefits'][:2])[:30]}...")
             
+            # Ghi ETag vào document để các endpoint GET trả 304 khi kế hoạch không đổi
+            stamp_etag(meal_plan_dict)
+            
             # Lưu vào Firestore
             try:
                 print("[FIREBASE] Saving to Firestore meal_plans collection...")
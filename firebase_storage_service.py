@@ -4,40 +4,76 @@ Firebase Storage service for handling image uploads
 import os
 import time
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple
 import uuid
 
-try:
-    import firebase_admin
-    from firebase_admin import storage
-    FIREBASE_STORAGE_AVAILABLE = True
-except ImportError:
+from lazy_client import LazyClient, module_available
+
+# Check for Firebase Admin SDK (storage module is imported when the bucket is first used)
+FIREBASE_STORAGE_AVAILABLE = module_available("firebase_admin")
+if not FIREBASE_STORAGE_AVAILABLE:
     print("Firebase Admin SDK not installed. Use 'pip install firebase-admin'")
-    FIREBASE_STORAGE_AVAILABLE = False
+
+def _extension(content_type: str) -> str:
+    """File extension for an image MIME type"""
+    subtype = (content_type or "image/jpeg").split("/")[-1].lower()
+    return {"jpeg": "jpg", "svg+xml": "svg"}.get(subtype, subtype)
 
 class FirebaseStorageService:
     """Service for handling file operations with Firebase Storage"""
     
     def __init__(self, bucket_name=None):
-        """Initialize Firebase Storage service"""
-        self.available = FIREBASE_STORAGE_AVAILABLE
-        self.bucket_name = bucket_name
+        """
+        Initialize Firebase Storage service
+        
+        The bucket is resolved on first use, after main.py has initialized the Firebase app.
+        """
+        self._requested_bucket_name = bucket_name
+        self._disabled = not FIREBASE_STORAGE_AVAILABLE
+        self._bucket = LazyClient("firebase_storage", self._create_bucket)
+    
+    def _create_bucket(self):
+        """Get bucket from existing Firebase app (called once through LazyClient)"""
+        if not FIREBASE_STORAGE_AVAILABLE:
+            return None
         
-        # Try to get Firebase app and bucket
         try:
-            # Get bucket from existing Firebase app
-            if self.bucket_name:
-                self.bucket = storage.bucket(name=self.bucket_name)
+            from firebase_admin import storage
+            
+            if self._requested_bucket_name:
+                bucket = storage.bucket(name=self._requested_bucket_name)
             else:
-                self.bucket = storage.bucket()
-                
-            self.bucket_name = self.bucket.name
-            print(f"Firebase Storage service initialized with bucket: {self.bucket.name}")
-            self.available = True
+                bucket = storage.bucket()
         except Exception as e:
             print(f"Error initializing Firebase Storage service: {str(e)}")
-            self.available = False
-            self.bucket = None
+            return None
+        
+        print(f"Firebase Storage service initialized with bucket: {bucket.name}")
+        return bucket
+    
+    @property
+    def bucket(self):
+        """Storage bucket (lazily resolved, thread-safe)"""
+        return self._bucket.get()
+    
+    @property
+    def bucket_name(self) -> Optional[str]:
+        bucket = self.bucket
+        return bucket.name if bucket is not None else self._requested_bucket_name
+    
+    @property
+    def available(self) -> bool:
+        """SDK installed, not disabled and bucket lookup has not failed (does not trigger initialization)"""
+        return not self._disabled and not self._bucket.failed
+    
+    @available.setter
+    def available(self, value: bool) -> None:
+        self._disabled = not value
+    
+    def reset(self) -> None:
+        """Resolve the bucket again on next use (e.g. after the Firebase app is re-initialized)"""
+        self._bucket.reset()
+        self._disabled = not FIREBASE_STORAGE_AVAILABLE
     
     def check_connection(self) -> bool:
         """
@@ -63,7 +99,8 @@ class FirebaseStorageService:
                     image_data: bytes, 
                     user_id: str, 
                     folder: str = "food_images",
-                    content_type: str = "image/jpeg") -> Optional[str]:
+                    content_type: str = "image/jpeg",
+                    filename: str = None) -> Optional[str]:
         """
         Upload an image to Firebase Storage
         
@@ -72,6 +109,7 @@ class FirebaseStorageService:
             user_id: User ID to include in path
             folder: Storage folder name
             content_type: Image MIME type
+            filename: File name inside the user folder (generated if not provided)
             
         Returns:
             Public URL of the uploaded image or None if upload failed
@@ -82,9 +120,8 @@ class FirebaseStorageService:
             
         try:
             # Generate unique filename
-            timestamp = int(time.time() * 1000)
-            unique_id = str(uuid.uuid4())[:8]
-            filename = f"{timestamp}_{unique_id}.jpg"
+            if not filename:
+                filename = f"{self._unique_name()}.{_extension(content_type)}"
             
             # Create path with user ID for organization
             path = f"{folder}/{user_id}/{filename}"
@@ -107,6 +144,36 @@ class FirebaseStorageService:
             traceback.print_exc()
             return None
             
+    def upload_prepared_image(self, prepared, user_id: str,
+                              folder: str = "food_images") -> Tuple[Optional[str], Optional[str]]:
+        """
+        Upload a preprocessed image and its thumbnail under the same base name
+        
+        Args:
+            prepared: image_preprocessing.PreparedImage
+            user_id: User ID to include in path
+            folder: Storage folder name
+            
+        Returns:
+            Tuple of (image URL, thumbnail URL); None for an upload that failed
+        """
+        name = self._unique_name()
+        image_url = self.upload_image(
+            prepared.data, user_id, folder, prepared.content_type,
+            filename=f"{name}.{_extension(prepared.content_type)}"
+        )
+        if image_url is None:
+            return None, None
+        thumbnail_url = self.upload_image(
+            prepared.thumbnail, user_id, folder, prepared.thumbnail_content_type,
+            filename=f"{name}_thumb.{_extension(prepared.thumbnail_content_type)}"
+        )
+        return image_url, thumbnail_url
+    
+    @staticmethod
+    def _unique_name() -> str:
+        return f"{int(time.time() * 1000)}_{str(uuid.uuid4())[:8]}"
+            
     def delete_image(self, image_url: str) -> bool:
         """
         Delete an image from Firebase Storage using its URL
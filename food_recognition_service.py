@@ -1,10 +1,11 @@
 """
 Food Recognition Service combining Gemini Vision API with Firebase storage and Firestore
 """
+import asyncio
 import os
 import time
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional, Tuple
 
 # Import models
 from models import RecognizedFood, NutritionInfo, FoodLogEntry, FoodRecognitionResponse
@@ -12,42 +13,62 @@ from models import RecognizedFood, NutritionInfo, FoodLogEntry, FoodRecognitionR
 # Import services
 from gemini_vision import gemini_vision_service
 from firebase_storage_service import firebase_storage_service
+from image_preprocessing import preprocess_image_async
+from recognition_cache import recognition_cache
+from config import config
 from services.firestore_service import firestore_service
 
+async def _no_upload() -> Tuple[Optional[str], Optional[str]]:
+    return None, None
+
 class FoodRecognitionService:
     """Service for recognizing food items in images and storing data"""
     
     def __init__(self):
         """Initialize the Food Recognition Service"""
-        # Check availability of required services
-        self.gemini_available = gemini_vision_service.available
-        self.firebase_storage_available = firebase_storage_service.available
+        # Availability is read from the underlying services on each access: their clients
+        # are created lazily, so values captured at import time would go stale
         self.firestore_available = firestore_service is not None
         
-        # Service is available if at least Gemini is available
-        # (Storage and Firestore are optional but useful)
-        self.available = self.gemini_available
-        
         print(f"\n=== FOOD RECOGNITION SERVICE ===")
-        print(f"Gemini Vision available: {self.gemini_available}")
+        print(f"Gemini Vision configured: {self.gemini_available}")
         print(f"Firebase Storage available: {self.firebase_storage_available}")
         print(f"Firestore available: {self.firestore_available}")
-        print(f"Service available: {self.available}")
         print(f"=== FOOD RECOGNITION SERVICE INITIALIZED ===\n")
+    
+    @property
+    def gemini_available(self) -> bool:
+        return gemini_vision_service.available
+    
+    @property
+    def firebase_storage_available(self) -> bool:
+        return firebase_storage_service.available
+    
+    @property
+    def available(self) -> bool:
+        # Service is available if at least Gemini is available
+        # (Storage and Firestore are optional but useful)
+        return self.gemini_available
         
     async def recognize_food_from_image(self, 
                                   image_data: bytes, 
                                   user_id: str,
                                   meal_type: str = "snack",
-                                  save_to_firebase: bool = True) -> FoodRecognitionResponse:
+                                  save_to_firebase: bool = True,
+                                  defer_log: Optional[Callable[..., Any]] = None) -> FoodRecognitionResponse:
         """
         Recognize food from image data, store image, and log to Firestore
         
+        The Storage upload and the Gemini call run concurrently, so latency is
+        max(upload, recognition) rather than their sum.
+        
         Args:
-            image_data: Raw image bytes
+            image_data: Raw image bytes (downscaled and normalized before recognition and upload)
             user_id: ID of the user
             meal_type: Type of meal (breakfast, lunch, dinner, snack)
             save_to_firebase: Whether to save results to Firebase
+            defer_log: Scheduler for the Firestore log write, e.g. FastAPI BackgroundTasks.add_task,
+                so the write happens after the response is sent (awaited inline if not provided)
             
         Returns:
             FoodRecognitionResponse with recognition results
@@ -55,17 +76,101 @@ class FoodRecognitionService:
         if not self.available:
             raise ValueError("Food recognition service is not available")
             
-        # Step 1: Upload image to Firebase Storage (if available)
-        image_url = None
-        if self.firebase_storage_available and save_to_firebase:
-            image_url = firebase_storage_service.upload_image(
-                image_data=image_data,
-                user_id=user_id,
-                folder="food_images"
-            )
+        recognition_response, log_data = await self._analyze_image(image_data, user_id, meal_type, save_to_firebase)
+        
+        # Save the log entry to Firestore if requested
+        if log_data is not None:
+            if defer_log is not None:
+                defer_log(self._save_food_log, user_id, log_data)
+            else:
+                await asyncio.to_thread(self._save_food_log, user_id, log_data)
+                
+        return recognition_response
+    
+    async def recognize_food_batch(self,
+                                   images: List[bytes],
+                                   user_id: str,
+                                   meal_types: List[str],
+                                   save_to_firebase: bool = True,
+                                   max_concurrency: int = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Recognize several images with bounded concurrency, yielding results as they complete
+        
+        All food logs are written to Firestore in one batch once every image is processed.
+        
+        Args:
+            images: Raw image bytes, one entry per photo
+            user_id: ID of the user
+            meal_types: Meal type for each image (same length as images)
+            save_to_firebase: Whether to save images and logs to Firebase
+            max_concurrency: Images processed at the same time (default FOOD_BATCH_MAX_CONCURRENCY)
+            
+        Yields:
+            {"type": "result", "index", "result"} or {"type": "error", "index", "error"} per image
+            in completion order, then one {"type": "summary", ...} event
+        """
+        if not self.available:
+            raise ValueError("Food recognition service is not available")
+            
+        semaphore = asyncio.Semaphore(max_concurrency or config.FOOD_BATCH_MAX_CONCURRENCY)
+        
+        async def process(index: int, image_data: bytes, meal_type: str):
+            async with semaphore:
+                try:
+                    return index, await self._analyze_image(image_data, user_id, meal_type, save_to_firebase), None
+                except Exception as e:
+                    print(f"Error recognizing image {index} of batch: {str(e)}")
+                    return index, None, e
+                    
+        tasks = [asyncio.create_task(process(index, image_data, meal_type))
+                 for index, (image_data, meal_type) in enumerate(zip(images, meal_types))]
+        logs: Dict[int, Dict[str, Any]] = {}
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, outcome, error = await next_done
+                if error is not None:
+                    failed += 1
+                    yield {"type": "error", "index": index, "error": str(error)}
+                    continue
+                recognition_response, log_data = outcome
+                if log_data is not None:
+                    logs[index] = log_data
+                yield {"type": "result", "index": index, "result": recognition_response.model_dump(mode="json")}
+        finally:
+            # Client disconnected mid-stream: stop the remaining work
+            for task in tasks:
+                task.cancel()
+                
+        log_ids = []
+        if logs:
+            ordered = [logs[index] for index in sorted(logs)]
+            log_ids = await asyncio.to_thread(firestore_service.add_food_logs_batch, user_id, ordered)
+        yield {
+            "type": "summary",
+            "total": len(tasks),
+            "completed": len(tasks) - failed,
+            "failed": failed,
+            "logged": len(log_ids),
+            "log_ids": log_ids,
+        }
+    
+    async def _analyze_image(self, image_data: bytes, user_id: str, meal_type: str,
+                             save_to_firebase: bool) -> Tuple[FoodRecognitionResponse, Optional[Dict[str, Any]]]:
+        """Steps 0-3 for one image; returns the response and the Firestore log entry (None if not saved)"""
+        # Step 0: Normalize the image once (orientation, size, format) for both Gemini and Storage
+        try:
+            prepared = await preprocess_image_async(image_data)
+        except ValueError as e:
+            print(f"Image preprocessing skipped: {str(e)}")
+            prepared = None
             
-        # Step 2: Use Gemini Vision to recognize food items
-        recognized_foods, raw_analysis = gemini_vision_service.recognize_food(image_data)
+        # Steps 1 and 2 run concurrently: upload to Storage and recognize with Gemini
+        upload_enabled = self.firebase_storage_available and save_to_firebase
+        (image_url, thumbnail_url), (recognized_foods, raw_analysis) = await asyncio.gather(
+            self._upload_image(image_data, prepared, user_id) if upload_enabled else _no_upload(),
+            self._recognize(image_data, prepared, user_id)
+        )
         
         # Add image URL to recognized foods
         for food in recognized_foods:
@@ -107,7 +212,8 @@ class FoodRecognitionService:
                 elif food.nutrition.cholesterol:
                     total_nutrition.cholesterol = food.nutrition.cholesterol
                 
-        # Step 4: Save to Firestore if requested
+        # Step 4: Build the Firestore log entry if requested (written by the caller)
+        log_data = None
         if self.firestore_available and save_to_firebase:
             # Get current timestamp and date
             timestamp = datetime.now().isoformat()
@@ -119,23 +225,15 @@ class FoodRecognitionService:
                 recognized_foods=recognized_foods,
                 meal_type=meal_type,
                 image_url=image_url or "",
+                thumbnail_url=thumbnail_url,
                 timestamp=timestamp,
                 date=current_date,
                 total_nutrition=total_nutrition
             )
             
-            # Save to Firestore
-            try:
-                # Convert to dictionary for Firestore
-                log_data = food_log.model_dump()
-                
-                # Add to Firestore
-                firestore_service.add_food_log(user_id, log_data)
-                print(f"Food log saved to Firestore for user {user_id}")
-            except Exception as e:
-                print(f"Error saving food log to Firestore: {str(e)}")
-                
-        # Step 5: Return the recognition response
+            log_data = food_log.model_dump()
+            
+        # Step 5: Build the recognition response
         timestamp = datetime.now().isoformat()
         recognition_response = FoodRecognitionResponse(
             recognized_foods=recognized_foods,
@@ -144,7 +242,53 @@ class FoodRecognitionService:
             timestamp=timestamp
         )
         
-        return recognition_response
+        return recognition_response, log_data
+    
+    async def _upload_image(self, image_data: bytes, prepared, user_id: str) -> Tuple[Optional[str], Optional[str]]:
+        """Step 1: Upload the image (and thumbnail) to Firebase Storage in a worker thread"""
+        if prepared:
+            return await asyncio.to_thread(
+                firebase_storage_service.upload_prepared_image, prepared, user_id, "food_images"
+            )
+        image_url = await asyncio.to_thread(
+            firebase_storage_service.upload_image, image_data, user_id, "food_images"
+        )
+        return image_url, None
+    
+    async def _recognize(self, image_data: bytes, prepared, user_id: str) -> Tuple[List[RecognizedFood], Dict[str, Any]]:
+        """Step 2: Reuse the result of a near-duplicate upload, otherwise ask Gemini Vision"""
+        if prepared is None:
+            return await asyncio.to_thread(gemini_vision_service.recognize_food, image_data)
+            
+        use_cache = config.RECOGNITION_CACHE_ENABLED
+        cached = recognition_cache.lookup(user_id, prepared.image_hash) if use_cache else None
+        if cached:
+            print(f"Recognition cache hit ({cached.scope}, distance {cached.distance}) for user {user_id}")
+            recognized_foods, raw_analysis = cached.recognized_foods, cached.raw_analysis
+        else:
+            recognized_foods, raw_analysis = await asyncio.to_thread(
+                gemini_vision_service.recognize_food, prepared.data, prepared.content_type
+            )
+            if use_cache and "error" not in raw_analysis:
+                recognition_cache.store(user_id, prepared.image_hash, recognized_foods, raw_analysis)
+                
+        raw_analysis["image_preprocessing"] = {
+            "original_bytes": prepared.original_size,
+            "bytes": len(prepared.data),
+            "width": prepared.width,
+            "height": prepared.height,
+            "elapsed_ms": round(prepared.elapsed_ms, 1),
+        }
+        return recognized_foods, raw_analysis
+    
+    @staticmethod
+    def _save_food_log(user_id: str, log_data: Dict[str, Any]) -> None:
+        """Write one food log entry to Firestore"""
+        try:
+            firestore_service.add_food_log(user_id, log_data)
+            print(f"Food log saved to Firestore for user {user_id}")
+        except Exception as e:
+            print(f"Error saving food log to Firestore: {str(e)}")
         
     async def add_dish_to_meal_log(
         user_id: str,
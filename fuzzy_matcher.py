@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Fuzzy matching tên thực phẩm bằng chỉ mục n-gram ký tự (không dấu)
+
+Tên món do Gemini Vision hoặc người dùng chat trả về thường lệch chính tả, thiếu dấu hoặc thêm
+từ mô tả ("phở bò tái nạm", "ca hoi nuong"). Chỉ mục trigram cho phép tìm ứng viên gần nhất
+trong vài trăm micro giây thay vì thử từng biến thể tên hoặc gọi API bên ngoài.
+"""
+import unicodedata
+from typing import Dict, Iterable, List, Set, Tuple
+
+def _normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFC", text).lower()
+    return " ".join(text.replace("_", " ").split())
+
+def fold_text(text: str) -> str:
+    """Chữ thường, bỏ dấu tiếng Việt và gộp khoảng trắng"""
+    decomposed = unicodedata.normalize("NFD", _normalize_text(text).replace("đ", "d"))
+    return "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+
+def char_ngrams(text: str, n: int = 3) -> Set[str]:
+    """
+    Tập n-gram ký tự của text đã fold, có đệm khoảng trắng hai đầu
+
+    Args:
+        text: Chuỗi đã fold
+        n: Độ dài n-gram
+
+    Returns:
+        Tập n-gram
+    """
+    padded = f"  {text} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+class TrigramMatcher:
+    """
+    Chỉ mục trigram (inverted index) để tìm ứng viên, xếp hạng bằng trung bình của:
+    - điểm Dice giữa hai tập trigram (chịu được sai chính tả, thiếu dấu)
+    - tỉ lệ từ của ứng viên có mặt trong query (tránh "gà rán" -> "gan gà")
+
+    Khi query có dấu, so khớp từ dùng dạng có dấu để phân biệt "cá" với "cà".
+    Điểm 1.0 nghĩa là trùng khớp sau khi bỏ dấu; khoảng 0.55 trở lên thường là cùng món.
+    """
+
+    def __init__(self, names: Iterable[str], n: int = 3):
+        """
+        Args:
+            names: Danh sách tên chuẩn (giữ nguyên dạng có dấu để trả về)
+            n: Độ dài n-gram
+        """
+        self.n = n
+        self.names: List[str] = []
+        self._gram_counts: List[int] = []
+        self._words: List[Set[str]] = []
+        self._folded_words: List[Set[str]] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._exact: Dict[str, int] = {}
+        self._exact_folded: Dict[str, int] = {}
+
+        for name in dict.fromkeys(names):
+            accented = _normalize_text(name)
+            folded = fold_text(name)
+            if not folded or accented in self._exact:
+                continue
+            name_id = len(self.names)
+            grams = char_ngrams(folded, n)
+            self.names.append(name)
+            self._gram_counts.append(len(grams))
+            self._words.append(set(accented.split()))
+            self._folded_words.append(set(folded.split()))
+            self._exact[accented] = name_id
+            self._exact_folded.setdefault(folded, name_id)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(name_id)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def candidates(self, query: str, limit: int = 5, min_score: float = 0.3) -> List[Tuple[str, float]]:
+        """
+        Tìm các tên gần nhất với query
+
+        Args:
+            query: Tên cần tìm (có dấu hoặc không dấu)
+            limit: Số ứng viên tối đa
+            min_score: Điểm tối thiểu (0-1)
+
+        Returns:
+            Danh sách (tên chuẩn, điểm) giảm dần theo điểm
+        """
+        folded = fold_text(query or "")
+        if not folded:
+            return []
+
+        accented = _normalize_text(query)
+        use_accents = accented != folded
+
+        # Khớp tuyệt đối; query không dấu thì so với dạng bỏ dấu ("bơ" không được khớp "bò")
+        exact_id = self._exact.get(accented) if use_accents else self._exact_folded.get(folded)
+        if exact_id is not None:
+            return [(self.names[exact_id], 1.0)]
+
+        query_words = set((accented if use_accents else folded).split())
+
+        grams = char_ngrams(folded, self.n)
+        overlaps: Dict[int, int] = {}
+        for gram in grams:
+            for name_id in self._postings.get(gram, ()):
+                overlaps[name_id] = overlaps.get(name_id, 0) + 1
+
+        scored = []
+        for name_id, overlap in overlaps.items():
+            dice = 2.0 * overlap / (len(grams) + self._gram_counts[name_id])
+            words = self._words[name_id] if use_accents else self._folded_words[name_id]
+            coverage = len(words & query_words) / len(words)
+            score = (dice + coverage) / 2
+            if score >= min_score:
+                scored.append((round(score, 3), len(self.names[name_id]), name_id))
+
+        # Điểm cao trước; cùng điểm thì ưu tiên tên dài hơn (cụ thể hơn)
+        scored.sort(reverse=True)
+        return [(self.names[name_id], score) for score, _, name_id in scored[:limit]]
+
+    def best(self, query: str, min_score: float = 0.5):
+        """
+        Ứng viên tốt nhất hoặc None nếu không đạt ngưỡng
+
+        Returns:
+            Tuple (tên chuẩn, điểm) hoặc None
+        """
+        results = self.candidates(query, limit=1, min_score=min_score)
+        return results[0] if results else None
@@ -11,28 +11,123 @@ from typing import Dict, List, Any, Optional, Tuple
 from models import RecognizedFood, NutritionInfo
 
 # Import Vietnamese nutrition databases
-from vietnamese_nutrition_database import (
-    get_ingredient_nutrition,
-    get_dish_nutrition,
-    calculate_dish_nutrition_from_ingredients,
-    VIETNAMESE_NUTRITION_DATABASE,
-    VIETNAMESE_DISHES_NUTRITION
+from vietnamese_nutrition_database import calculate_dish_nutrition_from_ingredients
+from nutrition_index import (
+    lookup, lookup_many, fuzzy_lookup, fuzzy_candidates, scale_record,
+    PER_100G, PER_SERVING, FUZZY_MIN_SCORE
 )
-from vietnamese_nutrition_extended import (
-    VEGETABLES_NUTRITION, FRUITS_NUTRITION, MEAT_NUTRITION,
-    SEAFOOD_NUTRITION, EGGS_NUTRITION, DAIRY_NUTRITION
-)
-from vietnamese_traditional_dishes import ALL_TRADITIONAL_DISHES
+from aho_corasick import AhoCorasickTranslator
+from usda_integration import translate_food_query
 from groq_integration import GroqService
-
-# Try to import Gemini from Google Generative AI SDK
-try:
-    import google.generativeai as genai
-    from google.generativeai.types.generation_types import GenerationConfig
-    GEMINI_AVAILABLE = True
-except ImportError:
+from lazy_client import LazyClient, module_available
+from circuit_breaker import CircuitBreaker, circuit_breakers
+from rate_limiting import TokenBucket
+from config import config
+
+# Check for Google Generative AI SDK (imported when the model is first used)
+GEMINI_AVAILABLE = module_available("google.generativeai")
+if not GEMINI_AVAILABLE:
     print("Google Generative AI SDK not installed. Use 'pip install google-generativeai'")
-    GEMINI_AVAILABLE = False
+
+# Mapping các tên thường gặp -> tên trong database dinh dưỡng
+FOOD_NAME_MAPPINGS = {
+    # Món cơm
+    "cơm chiên": "cơm rang",
+    "cơm chiên gà": "cơm rang",
+    "cơm chiên thịt": "cơm rang",
+
+    # Thịt gà
+    "gà": "thịt gà ta",
+    "thịt gà": "thịt gà ta",
+    "gà ta": "thịt gà ta",
+    "gà rán": "thịt gà ta",
+    "gà nướng": "thịt gà ta",
+
+    # Thịt heo/lợn
+    "thịt heo": "thịt lợn nạc",
+    "heo": "thịt lợn nạc",
+    "lợn": "thịt lợn nạc",
+    "thịt ba chỉ": "thịt lợn nửa nạc nửa mỡ",
+
+    # Thịt bò
+    "bò": "thịt bò loại I",
+    "thịt bò": "thịt bò loại I",
+    "thịt bò nạc": "thịt bò loại I",
+
+    # Rau củ chung
+    "rau củ": "rau muống",
+    "rau xanh": "rau muống",
+    "rau": "rau muống",
+    "củ": "cà rốt",
+
+    # Cá
+    "cá": "cá chép",
+    "cá tươi": "cá chép",
+
+    # Tôm
+    "tôm": "tôm biển",
+    "tôm tươi": "tôm biển",
+    "tôm sú": "tôm biển",
+
+    # Trứng
+    "trứng": "trứng gà",
+
+    # Phở và món nước
+    "phở": "phở bò",
+    "phở tái": "phở bò",
+    "phở chín": "phở bò",
+    "bún bò": "bún bò huế",
+    "bún riêu": "bún riêu cua",
+    "hủ tiếu": "hủ tiếu",
+
+    # Món xào
+    "rau muống xào": "rau muống",
+    "cải xào": "cải xanh",
+    "thịt xào": "thịt lợn nạc",
+}
+
+# Automaton quét mọi tên trong FOOD_NAME_MAPPINGS trong một lần duyệt
+_food_name_translator = AhoCorasickTranslator(FOOD_NAME_MAPPINGS)
+
+# Mức chất lượng dữ liệu theo bảng nguồn trong nutrition index (thứ tự = độ ưu tiên)
+NUTRITION_DATA_QUALITY = {
+    "vn_dishes": "official_dish",
+    "vn_ingredients": "official_ingredient",
+    "extended": "extended_database",
+    "specialty_dishes": "static_database",
+    "knowledge_base": "static_database",
+    "staples": "estimated",
+    "fallback": "estimated",
+}
+NUTRITION_QUALITY_ORDER = list(NUTRITION_DATA_QUALITY)
+
+# Circuit breaker for Gemini: slow or failing calls are skipped quickly instead of waiting for the timeout
+gemini_breaker = circuit_breakers.register(CircuitBreaker(
+    "gemini",
+    failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=config.BREAKER_RECOVERY_SECONDS,
+    slow_call_threshold=config.GEMINI_SLOW_CALL_SECONDS,
+))
+
+# Budget for hedged (duplicate, paid) Gemini requests; hedging is off unless GEMINI_HEDGE_ENABLED is set
+gemini_hedge_budget = (
+    TokenBucket(rate=config.GEMINI_HEDGES_PER_MINUTE / 60, capacity=max(1.0, config.GEMINI_HEDGES_PER_MINUTE))
+    if config.GEMINI_HEDGES_PER_MINUTE > 0 else None
+)
+
+def call_gemini(request):
+    """
+    Call Gemini through the circuit breaker, hedging only when enabled and within the hedge budget
+
+    Args:
+        request: Zero-argument callable making the (idempotent) Gemini call
+
+    Returns:
+        The Gemini response
+    """
+    if not config.GEMINI_HEDGE_ENABLED or gemini_hedge_budget is None:
+        return gemini_breaker.call(request)
+    return gemini_breaker.hedged_call(request, permit_hedge=gemini_hedge_budget.try_acquire)
 
 class GeminiVisionService:
     """Service for food recognition using Google's Gemini Vision Pro"""
@@ -45,38 +140,55 @@ class GeminiVisionService:
             api_key: Gemini API key, from environment variable if not provided
         """
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        self.available = GEMINI_AVAILABLE and self.api_key is not None
+        self.configured = GEMINI_AVAILABLE and self.api_key is not None
         
-        # Initialize model
-        if self.available:
-            try:
-                print("\n=== INITIALIZING GEMINI VISION SERVICE ===")
-                print(f"API Key exists: {self.api_key is not None}")
-                
-                # Configure API key
-                genai.configure(api_key=self.api_key)
-                
-                # Get Gemini Vision model
-                self.model = genai.GenerativeModel('gemini-1.5-flash-latest')
-                
-                print("Gemini Vision service initialized successfully")
-                print("=== GEMINI VISION SERVICE INITIALIZED ===\n")
-            except Exception as e:
-                print(f"ERROR initializing Gemini Vision: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                self.available = False
-                self.model = None
-        else:
+        # Model is created on first use (warm-up or first recognition request)
+        self._model = LazyClient("gemini_vision", self._create_model)
+        if not self.configured:
             print("Gemini Vision service not available. Make sure to set GEMINI_API_KEY.")
-            self.model = None
+    
+    def _create_model(self):
+        """Import the SDK and create the Gemini Vision model (called once through LazyClient)"""
+        if not self.configured:
+            return None
+        
+        print("\n=== INITIALIZING GEMINI VISION SERVICE ===")
+        print(f"API Key exists: {self.api_key is not None}")
+        try:
+            import google.generativeai as genai
+            
+            # Configure API key
+            genai.configure(api_key=self.api_key)
             
-    def recognize_food(self, image_data: bytes) -> Tuple[List[RecognizedFood], Dict[str, Any]]:
+            # Get Gemini Vision model
+            model = genai.GenerativeModel('gemini-1.5-flash-latest')
+        except Exception as e:
+            print(f"ERROR initializing Gemini Vision: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return None
+        
+        print("Gemini Vision service initialized successfully")
+        print("=== GEMINI VISION SERVICE INITIALIZED ===\n")
+        return model
+    
+    @property
+    def model(self):
+        """Gemini Vision model (lazily created, thread-safe)"""
+        return self._model.get()
+    
+    @property
+    def available(self) -> bool:
+        """Configured and model creation has not failed (does not trigger initialization)"""
+        return self.configured and not self._model.failed
+            
+    def recognize_food(self, image_data: bytes, mime_type: str = "image/jpeg") -> Tuple[List[RecognizedFood], Dict[str, Any]]:
         """
         Recognize food in an image using Gemini Vision Pro
         
         Args:
-            image_data: Image bytes
+            image_data: Image bytes (preferably preprocessed with image_preprocessing.preprocess_image)
+            mime_type: MIME type of image_data
             
         Returns:
             Tuple of recognized foods list and raw analysis
@@ -207,6 +319,7 @@ class GeminiVisionService:
             """
             
             # Configure generation parameters
+            from google.generativeai.types.generation_types import GenerationConfig
             generation_config = GenerationConfig(
                 temperature=0.4,
                 top_p=1.0,
@@ -214,16 +327,18 @@ class GeminiVisionService:
                 max_output_tokens=2048,
             )
             
-            # Call Gemini Vision API
-            response = self.model.generate_content(
+            # Call Gemini Vision API through the circuit breaker; recognition is idempotent, so when
+            # hedging is enabled a duplicate request may be sent if the first one is slower than recent p90
+            response = call_gemini(lambda: self.model.generate_content(
                 contents=[
                     {"role": "user", "parts": [
                         {"text": prompt},
-                        {"inline_data": {"mime_type": "image/jpeg", "data": encoded_image}}
+                        {"inline_data": {"mime_type": mime_type, "data": encoded_image}}
                     ]}
                 ],
-                generation_config=generation_config
-            )
+                generation_config=generation_config,
+                request_options={"timeout": config.GEMINI_TIMEOUT}
+            ))
             
             # Extract response text
             result_text = response.text
@@ -391,74 +506,21 @@ class GeminiVisionService:
         # Tạo danh sách các biến thể tên để tìm kiếm
         variations = [normalized_name]
 
-        # Mapping các tên thường gặp
-        name_mappings = {
-            # Món cơm
-            "cơm chiên": "cơm rang",
-            "cơm chiên gà": "cơm rang",
-            "cơm chiên thịt": "cơm rang",
-
-            # Thịt gà
-            "gà": "thịt gà ta",
-            "thịt gà": "thịt gà ta",
-            "gà ta": "thịt gà ta",
-            "gà rán": "thịt gà ta",
-            "gà nướng": "thịt gà ta",
-
-            # Thịt heo/lợn
-            "thịt heo": "thịt lợn nạc",
-            "heo": "thịt lợn nạc",
-            "lợn": "thịt lợn nạc",
-            "thịt ba chỉ": "thịt lợn nửa nạc nửa mỡ",
-
-            # Thịt bò
-            "bò": "thịt bò loại I",
-            "thịt bò": "thịt bò loại I",
-            "thịt bò nạc": "thịt bò loại I",
-
-            # Rau củ chung
-            "rau củ": "rau muống",
-            "rau xanh": "rau muống",
-            "rau": "rau muống",
-            "củ": "cà rốt",
-
-            # Cá
-            "cá": "cá chép",
-            "cá tươi": "cá chép",
-
-            # Tôm
-            "tôm": "tôm biển",
-            "tôm tươi": "tôm biển",
-            "tôm sú": "tôm biển",
-
-            # Trứng
-            "trứng": "trứng gà",
-
-            # Phở và món nước
-            "phở": "phở bò",
-            "phở tái": "phở bò",
-            "phở chín": "phở bò",
-            "bún bò": "bún bò huế",
-            "bún riêu": "bún riêu cua",
-            "hủ tiếu": "hủ tiếu",
-
-            # Món xào
-            "rau muống xào": "rau muống",
-            "cải xào": "cải xanh",
-            "thịt xào": "thịt lợn nạc",
-        }
-
         # Thêm mapping nếu có
-        if normalized_name in name_mappings:
-            variations.append(name_mappings[normalized_name])
+        if normalized_name in FOOD_NAME_MAPPINGS:
+            variations.append(FOOD_NAME_MAPPINGS[normalized_name])
 
-        # Thêm các biến thể khác
-        for original, mapped in name_mappings.items():
-            if original in normalized_name:
-                variations.append(mapped)
-                variations.append(normalized_name.replace(original, mapped))
+        # Thêm các biến thể khác: từng thuật ngữ khớp và tên đã thay thế toàn bộ trong một lần quét
+        for _, _, _, mapped in _food_name_translator.find_all(normalized_name):
+            variations.append(mapped)
+        variations.append(_food_name_translator.translate(normalized_name))
 
-        return list(set(variations))  # Remove duplicates
+        # Bản dịch tiếng Anh cho các bản ghi fallback
+        english_name = translate_food_query(normalized_name)
+        if english_name:
+            variations.append(english_name)
+
+        return list(dict.fromkeys(variations))  # Remove duplicates
 
     def get_official_nutrition_data(self, food_name: str, estimated_grams: float) -> Optional[Dict]:
         """
@@ -476,48 +538,23 @@ class GeminiVisionService:
             name_variations = self.normalize_food_name(food_name)
             print(f"🔍 Searching for '{food_name}' with variations: {name_variations}")
 
-            # 1. Tìm trong database món ăn hoàn chỉnh trước
-            for name_variant in name_variations:
-                dish_nutrition = get_dish_nutrition(name_variant)
-                if dish_nutrition:
-                    print(f"✅ Found dish nutrition for '{name_variant}'")
-                    return {
-                        "calories": dish_nutrition["calories"],
-                        "protein": dish_nutrition["protein"],
-                        "fat": dish_nutrition["fat"],
-                        "carbs": dish_nutrition["carbs"],
-                        "fiber": dish_nutrition.get("fiber", 0),
-                        "sodium": dish_nutrition.get("sodium", 0),
-                        "source": f"Official Vietnamese Database - {dish_nutrition['source']}",
-                        "reference_code": dish_nutrition["reference_code"],
-                        "serving_size": dish_nutrition.get("serving_size", f"{estimated_grams}g"),
-                        "data_quality": "official_dish"
-                    }
-
-            # 2. Tìm trong database nguyên liệu
-            for name_variant in name_variations:
-                ingredient_nutrition = get_ingredient_nutrition(name_variant, estimated_grams)
-                if ingredient_nutrition:
-                    print(f"✅ Found ingredient nutrition for '{name_variant}'")
-                    return {
-                        "calories": round(ingredient_nutrition["calories"], 1),
-                        "protein": round(ingredient_nutrition["protein"], 1),
-                        "fat": round(ingredient_nutrition["fat"], 1),
-                        "carbs": round(ingredient_nutrition["carbs"], 1),
-                        "fiber": round(ingredient_nutrition["fiber"], 1),
-                        "sodium": 0,  # Default
-                        "source": f"Official Vietnamese Database - {ingredient_nutrition['source']}",
-                        "reference_code": ingredient_nutrition["reference_code"],
-                        "serving_size": f"{estimated_grams}g",
-                        "data_quality": "official_ingredient"
-                    }
-
-            # 3. Tìm trong extended database
-            for name_variant in name_variations:
-                extended_nutrition = self.get_extended_nutrition_data(name_variant, estimated_grams)
-                if extended_nutrition:
-                    print(f"✅ Found extended nutrition for '{name_variant}'")
-                    return extended_nutrition
+            # Tra cứu tất cả biến thể một lần qua index hợp nhất
+            records = [record for record in lookup_many(name_variations).values() if record]
+
+            # Ưu tiên món ăn hoàn chỉnh (per serving), sau đó đến nguyên liệu (per 100g)
+            if records:
+                record = min(records, key=lambda r: (r["basis"] != PER_SERVING,
+                                                     NUTRITION_QUALITY_ORDER.index(r["table"])))
+                print(f"✅ Found {record['table']} nutrition for '{record['name']}'")
+                return self._format_official_nutrition(record, estimated_grams)
+
+            # Không khớp biến thể nào: lấy ứng viên gần nhất từ chỉ mục fuzzy (sai chính tả, thiếu dấu...)
+            candidates = fuzzy_candidates(food_name, limit=3, min_score=FUZZY_MIN_SCORE)
+            for candidate, score in candidates:
+                record = lookup(candidate, allow_prefix=False)
+                if record:
+                    print(f"✅ Fuzzy match '{food_name}' -> '{record['name']}' (score {score})")
+                    return self._format_official_nutrition(record, estimated_grams)
 
             print(f"❌ No nutrition data found for '{food_name}' and its variations")
             return None
@@ -531,64 +568,43 @@ class GeminiVisionService:
         🔧 FIX: Lấy dữ liệu từ extended nutrition database với fuzzy matching
         """
         try:
-            # Tìm trong các database extended
-            all_databases = [
-                ("VEGETABLES", VEGETABLES_NUTRITION),
-                ("FRUITS", FRUITS_NUTRITION),
-                ("MEAT", MEAT_NUTRITION),
-                ("SEAFOOD", SEAFOOD_NUTRITION),
-                ("EGGS", EGGS_NUTRITION),
-                ("DAIRY", DAIRY_NUTRITION)
-            ]
-
-            # Tìm exact match trước
-            for db_name, db in all_databases:
-                if food_name in db:
-                    nutrition_per_100g = db[food_name]
-                    scale_factor = estimated_grams / 100.0
-
-                    return {
-                        "calories": round(nutrition_per_100g["calories"] * scale_factor, 1),
-                        "protein": round(nutrition_per_100g["protein"] * scale_factor, 1),
-                        "fat": round(nutrition_per_100g["fat"] * scale_factor, 1),
-                        "carbs": round(nutrition_per_100g["carbs"] * scale_factor, 1),
-                        "fiber": round(nutrition_per_100g.get("fiber", 0) * scale_factor, 1),
-                        "sodium": 0,  # Default
-                        "source": f"Vietnamese Extended Database - {db_name}",
-                        "reference_code": "VN-EXT",
-                        "serving_size": f"{estimated_grams}g",
-                        "data_quality": "extended_database"
-                    }
-
-            # Tìm partial match nếu không có exact match
-            for db_name, db in all_databases:
-                for key in db.keys():
-                    # Kiểm tra nếu food_name chứa trong key hoặc ngược lại
-                    if food_name in key or key in food_name:
-                        nutrition_per_100g = db[key]
-                        scale_factor = estimated_grams / 100.0
-
-                        print(f"🔍 Partial match: '{food_name}' -> '{key}' in {db_name}")
-
-                        return {
-                            "calories": round(nutrition_per_100g["calories"] * scale_factor, 1),
-                            "protein": round(nutrition_per_100g["protein"] * scale_factor, 1),
-                            "fat": round(nutrition_per_100g["fat"] * scale_factor, 1),
-                            "carbs": round(nutrition_per_100g["carbs"] * scale_factor, 1),
-                            "fiber": round(nutrition_per_100g.get("fiber", 0) * scale_factor, 1),
-                            "sodium": 0,  # Default
-                            "source": f"Vietnamese Extended Database - {db_name} (partial match: {key})",
-                            "reference_code": "VN-EXT",
-                            "serving_size": f"{estimated_grams}g",
-                            "data_quality": "extended_database"
-                        }
-
+            record = fuzzy_lookup(food_name, basis=PER_100G)
+            if record:
+                return self._format_official_nutrition(record, estimated_grams)
             return None
 
         except Exception as e:
             print(f"❌ Error getting extended nutrition for {food_name}: {e}")
             return None
 
+    def _format_official_nutrition(self, record, estimated_grams: float) -> Dict:
+        """
+        Chuyển bản ghi của nutrition index sang format dùng cho RecognizedFood
+        """
+        scaled = scale_record(record, estimated_grams)
+        if record["basis"] == PER_SERVING:
+            serving_size = record["serving_size"]
+        else:
+            serving_size = f"{estimated_grams}g"
+
+        if record["table"] in ("vn_dishes", "vn_ingredients"):
+            source = f"Official Vietnamese Database - {record['source']}"
+        else:
+            source = record["source"]
+
+        return {
+            "calories": round(scaled["calories"], 1),
+            "protein": round(scaled["protein"], 1),
+            "fat": round(scaled["fat"], 1),
+            "carbs": round(scaled["carbs"], 1),
+            "fiber": round(scaled["fiber"], 1),
+            "sodium": record["sodium"] if record["basis"] == PER_SERVING else 0,
+            "source": source,
+            "reference_code": record["reference_code"],
+            "serving_size": serving_size,
+            "data_quality": NUTRITION_DATA_QUALITY.get(record["table"], "static_database")
+        }
+
     def get_weight_estimation_recommendations(self, analysis_result: Dict) -> List[str]:
         """
         Đưa ra khuyến nghị để cải thiện độ chính xác ước tính khối lượng
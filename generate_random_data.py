@@ -170,9 +170,12 @@ def generate_dish(meal_type: str) -> Dict:
     }
     
     meal_key = meal_map.get(meal_type.lower(), "breakfast")
-    dishes = SAMPLE_DISHES.get(meal_key, SAMPLE_DISHES["breakfast"])
+    from dish_catalog import get_dish_catalog
+    catalog = get_dish_catalog()
+    dishes = catalog.dishes("sample_dishes", meal_key) or catalog.dishes("sample_dishes", "breakfast")
     
-    return random.choice(dishes)
+    # Bản sao riêng: generate_meal điều chỉnh nutrition của món theo tỷ lệ
+    return random.choice(dishes).to_dict()
 
 def generate_meal(meal_type: str, calories: float, protein: float, fat: float, carbs: float) -> Dict:
     """Tạo một bữa ăn với các món phù hợp với yêu cầu dinh dưỡng"""
@@ -3,21 +3,21 @@ import json
 import time
 import threading
 import random
-from typing import List, Dict, Optional, Tuple
+from typing import Any, List, Dict, Mapping, Optional, Tuple
 from models import NutritionInfo, Dish, Ingredient
+from config import config
 
 # Ensure re module is globally accessible to prevent "cannot access local variable 're'" error
 import re as regex_module
+from regex_registry import REPAIR_PATTERNS, compile_pattern, timed_stage
+from streaming_json import IncrementalMealParser, parse_meals
 
 # Helper function to ensure regex operations work
+# pattern có thể là Pattern trong REPAIR_PATTERNS hoặc chuỗi (được biên dịch một lần rồi dùng lại)
 def safe_regex_sub(pattern, replacement, text, flags=0, count=0):
     """Safe regex substitution to prevent 're' variable access errors"""
     try:
-        import re as local_re
-        if count > 0:
-            return local_re.sub(pattern, replacement, text, count=count, flags=flags)
-        else:
-            return local_re.sub(pattern, replacement, text, flags=flags)
+        return compile_pattern(pattern, flags).sub(replacement, text, count=count)
     except Exception as e:
         print(f"⚠️ Regex substitution failed: {e}")
         return text
@@ -25,8 +25,7 @@ def safe_regex_sub(pattern, replacement, text, flags=0, count=0):
 def safe_regex_findall(pattern, text, flags=0):
     """Safe regex findall to prevent 're' variable access errors"""
     try:
-        import re as local_re
-        return local_re.findall(pattern, text, flags)
+        return compile_pattern(pattern, flags).findall(text)
     except Exception as e:
         print(f"⚠️ Regex findall failed: {e}")
         return []
@@ -34,17 +33,13 @@ def safe_regex_findall(pattern, text, flags=0):
 def safe_regex_search(pattern, text, flags=0):
     """Safe regex search to prevent 're' variable access errors"""
     try:
-        import re as local_re
-        return local_re.search(pattern, text, flags)
+        return compile_pattern(pattern, flags).search(text)
     except Exception as e:
         print(f"⚠️ Regex search failed: {e}")
         return None
 
-# Import fallback data
-from fallback_meals import FALLBACK_MEALS
-
-# 🔧 FIX: Import rich Vietnamese traditional dishes database
-from vietnamese_traditional_dishes import ALL_TRADITIONAL_DISHES
+# Fallback data và Vietnamese traditional dishes database (dish catalog chỉ đọc, load khi dùng lần đầu)
+from dish_catalog import get_dish_catalog
 from vietnamese_nutrition_extended import (
     VEGETABLES_NUTRITION, FRUITS_NUTRITION, MEAT_NUTRITION,
     SEAFOOD_NUTRITION, EGGS_NUTRITION, DAIRY_NUTRITION
@@ -71,70 +66,108 @@ from vietnamese_nutrition_database import (
     calculate_dish_nutrition_from_ingredients,
     get_nutrition_sources
 )
+from amount_parser import parse_many
+from lazy_client import LazyClient, module_available
+from llm_router import DEFAULT_MODEL, llm_router
+from circuit_breaker import CircuitBreaker, CircuitOpenError, circuit_breakers
+from rate_limiting import (
+    PRIORITY_BATCH, PRIORITY_INTERACTIVE, QuotaLimiter, RateLimit, SQLiteBucketStore,
+    is_rate_limit_error, retry_after_seconds
+)
+from dish_similarity_index import (
+    DishSimilarityIndex, are_dishes_similar, remove_regional_variations, extract_base_dish_name
+)
 
-# Thử import thư viện Groq hoặc fallback
-try:
-    import groq
-    GROQ_AVAILABLE = True
-except ImportError:
+# Kiểm tra thư viện Groq (chỉ import khi tạo client lần đầu)
+GROQ_AVAILABLE = module_available("groq")
+if not GROQ_AVAILABLE:
     print("Groq client package not installed. Using fallback mode.")
-    GROQ_AVAILABLE = False
 
-class RateLimiter:
-    """Quản lý giới hạn tốc độ gọi API"""
+def _create_groq_rate_limiter() -> QuotaLimiter:
+    """Quota Groq theo phút và theo ngày; trạng thái dùng chung giữa các worker qua file SQLite"""
+    limits = [
+        RateLimit(config.GROQ_REQUESTS_PER_MINUTE, 60),
+        RateLimit(config.GROQ_REQUESTS_PER_DAY, 86400),
+    ]
+    store = None
+    if config.GROQ_RATE_LIMIT_BACKEND == "sqlite":
+        try:
+            store = SQLiteBucketStore(config.GROQ_RATE_LIMIT_DB)
+        except Exception as e:
+            print(f"Không mở được SQLite rate limit store, dùng bộ đếm trong process: {str(e)}")
+    return QuotaLimiter("groq", limits, store)
+
+# Quota Groq dùng chung cho mọi GroqService và endpoint chat (tạo ở lần dùng đầu tiên)
+groq_rate_limiter = LazyClient("groq_rate_limiter", _create_groq_rate_limiter)
+
+# Circuit breaker của Groq (429 do quota không tính là lỗi của provider)
+groq_breaker = circuit_breakers.register(CircuitBreaker(
+    "groq",
+    failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=config.BREAKER_RECOVERY_SECONDS,
+    slow_call_threshold=config.GROQ_SLOW_CALL_SECONDS,
+    is_failure=lambda error: not is_rate_limit_error(error),
+))
+
+def wait_for_groq_quota(priority: int = PRIORITY_BATCH, timeout: float = None) -> bool:
+    """
+    Chờ tới lượt gọi Groq theo độ ưu tiên
     
-    def __init__(self, requests_per_minute: int = 60, requests_per_day: int = 1000):
-        """
-        Khởi tạo bộ giới hạn tốc độ
+    Chặn thread gọi tới GROQ_BATCH_MAX_WAIT giây: endpoint async phải gọi các hàm dùng nó
+    (vd GroqService.generate_meal_suggestions) qua asyncio.to_thread.
+    
+    Args:
+        priority: PRIORITY_INTERACTIVE (chat) hoặc PRIORITY_BATCH (sinh thực đơn)
+        timeout: Thời gian chờ tối đa (mặc định theo loại request; 0 là chỉ lấy khi có ngay)
         
-        Args:
-            requests_per_minute: Số yêu cầu tối đa mỗi phút
-            requests_per_day: Số yêu cầu tối đa mỗi ngày
-        """
-        self.requests_per_minute = requests_per_minute
-        self.requests_per_day = requests_per_day
-        self.minute_requests = 0
-        self.day_requests = 0
-        self.minute_reset_time = time.time() + 60  # Reset sau 1 phút
-        self.day_reset_time = time.time() + 86400  # Reset sau 1 ngày
-        self.lock = threading.Lock()
+    Returns:
+        False nếu không có quota trong thời gian chờ tối đa của loại request này
+    """
+    limiter = groq_rate_limiter.get()
+    if limiter is None:
+        return True
+    if timeout is None:
+        timeout = config.GROQ_CHAT_MAX_WAIT if priority == PRIORITY_INTERACTIVE else config.GROQ_BATCH_MAX_WAIT
+    return limiter.acquire(priority=priority, timeout=timeout)
+
+def groq_rate_limit_status() -> Dict:
+    """Trạng thái quota Groq cho các endpoint thông tin (/cache-info, /api-status)"""
+    limiter = groq_rate_limiter.get()
+    if limiter is None:
+        return {"available": False, "error": groq_rate_limiter.error}
+    status = limiter.status()
+    minute_remaining, day_remaining = status["tokens"]
+    return {
+        "backend": type(limiter.store).__name__,
+        "minute_limit": config.GROQ_REQUESTS_PER_MINUTE,
+        "day_limit": config.GROQ_REQUESTS_PER_DAY,
+        "minute_remaining": int(minute_remaining),
+        "day_remaining": int(day_remaining),
+        "blocked_for_seconds": status["blocked_for"],
+        "waiting_requests": status["waiting"],
+    }
+
+def record_groq_rate_limit(error: Exception, default_wait: float = 60) -> Optional[float]:
+    """
+    Ghi nhận lỗi 429 từ Groq: mọi worker ngừng gửi request trong thời gian Retry-After
     
-    def can_make_request(self) -> Tuple[bool, int]:
-        """
-        Kiểm tra xem có thể thực hiện yêu cầu không
+    Args:
+        error: Exception từ Groq SDK
+        default_wait: Số giây chờ khi response không có Retry-After
         
-        Returns:
-            Tuple[bool, int]: (Có thể gọi không, thời gian chờ tính bằng giây)
-        """
-        with self.lock:
-            current_time = time.time()
-            
-            # Đặt lại bộ đếm phút nếu cần
-            if current_time > self.minute_reset_time:
-                self.minute_requests = 0
-                self.minute_reset_time = current_time + 60
-            
-            # Đặt lại bộ đếm ngày nếu cần
-            if current_time > self.day_reset_time:
-                self.day_requests = 0
-                self.day_reset_time = current_time + 86400
-            
-            # Kiểm tra giới hạn
-            if self.minute_requests < self.requests_per_minute and self.day_requests < self.requests_per_day:
-                self.minute_requests += 1
-                self.day_requests += 1
-                return True, 0
-            
-            # Tính thời gian chờ
-            wait_time = min(
-                self.minute_reset_time - current_time,
-                self.day_reset_time - current_time
-            )
-            
-            # Thêm jitter để tránh thundering herd
-            wait_time += random.uniform(1, 5)
-            
-            return False, max(1, int(wait_time))
+    Returns:
+        Số giây phải chờ, hoặc None nếu không phải lỗi rate limit
+    """
+    if not is_rate_limit_error(error):
+        return None
+    wait = retry_after_seconds(error)
+    if wait is None:
+        wait = 3600 if "quota exceeded" in str(error).lower() else default_wait
+    limiter = groq_rate_limiter.get()
+    if limiter is not None:
+        limiter.block_for(wait)
+    print(f"Groq rate limit: tạm dừng gọi API {wait:.0f}s")
+    return wait
 
 class GroqService:
     """Dịch vụ tích hợp với LLaMA 3 qua Groq để tạo kế hoạch thực đơn thông minh"""
@@ -149,14 +182,14 @@ class GroqService:
         self.api_key = api_key
         self.available = GROQ_AVAILABLE and api_key is not None
         
-        # Khởi tạo cache và rate limiter
+        # Khởi tạo cache (rate limit dùng quota chung groq_rate_limiter)
         self.cache = {}
-        self.rate_limiter = RateLimiter(requests_per_minute=60, requests_per_day=1000)
         self.max_retries = 3
 
         # 🔧 ENHANCED Anti-duplication tracking với force diversity
         self.recent_dishes = []  # Track recent dishes to avoid duplication
         self.max_recent_dishes = 100  # Tăng lên 100 để track nhiều món hơn
+        self._recent_dish_index = DishSimilarityIndex()  # Chỉ mục gần trùng lặp của recent_dishes
         self.force_diversity = True  # Force diversity mode
 
         # 🔧 FIX: Track diversity để cân bằng món ăn
@@ -170,73 +203,182 @@ class GroqService:
         self.quota_exceeded = False
         self.quota_reset_time = None
         
-        # Mô hình mặc định sử dụng LLaMA 3
-        self.default_model = "llama3-8b-8192"
-        self.client = None
+        # Mô hình mặc định sử dụng LLaMA 3; mỗi lời gọi chọn model qua llm_router
+        # (model nhanh nhất còn khỏe mạnh đạt mức chất lượng của loại lời gọi)
+        self.default_model = DEFAULT_MODEL
         self.model = self.default_model
+        self.model_discovered = False
+        self._model_lock = threading.Lock()
+        
+        # Client Groq được tạo ở lần dùng đầu tiên (warm-up hoặc request đầu tiên)
+        self._client = LazyClient("groq", self._create_client)
         
         if self.available:
+            # Chọn model từ cache trên đĩa (nếu còn hạn); việc gọi models.list()
+            # qua mạng được dời sang giai đoạn warm-up hoặc lần gọi API đầu tiên
+            self._select_model(allow_network=False)
+    
+    def _create_client(self):
+        """Import SDK và khởi tạo Groq client (gọi một lần qua LazyClient)"""
+        if not self.available:
+            return None
+        
+        print("\n=== INITIALIZING GROQ SERVICE ===")
+        print(f"API Key: {'***' + self.api_key[-4:] if self.api_key else 'None'}")
+        try:
+            import groq
+            
+            # Timeout ngắn để provider chậm bị circuit breaker bỏ qua nhanh
+            client = groq.Groq(
+                api_key=self.api_key,
+                timeout=config.GROQ_TIMEOUT
+            )
+        except Exception as e:
+            print(f"Error initializing Groq client: {str(e)}")
+            self.available = False
+            return None
+        
+        print(f"✅ Groq client initialized with timeout={config.GROQ_TIMEOUT:.0f}s")
+        print("=== GROQ SERVICE INITIALIZED ===\n")
+        return client
+    
+    @property
+    def client(self):
+        """Groq client (khởi tạo lười, thread-safe)"""
+        return self._client.get()
+    
+    @client.setter
+    def client(self, value) -> None:
+        self._client.set(value)
+    
+    @property
+    def rate_limiter(self) -> Optional[QuotaLimiter]:
+        """Quota Groq dùng chung (giữa các instance và các worker)"""
+        return groq_rate_limiter.get()
+        
+    def _load_cached_models(self) -> Optional[List[str]]:
+        """
+        Đọc danh sách model đã phát hiện từ file cache (nếu còn trong TTL)
+        
+        Returns:
+            Danh sách model ID hoặc None nếu cache không tồn tại/đã hết hạn
+        """
+        try:
+            if not os.path.exists(config.GROQ_MODELS_CACHE_FILE):
+                return None
+            with open(config.GROQ_MODELS_CACHE_FILE, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+            cache_age_hours = (time.time() - cache_data.get('timestamp', 0)) / 3600
+            if cache_age_hours > config.GROQ_MODELS_CACHE_TTL_HOURS:
+                return None
+            return cache_data.get('models') or None
+        except Exception as e:
+            print(f"Error reading Groq models cache: {str(e)}")
+            return None
+    
+    def _save_cached_models(self, available_models: List[str]) -> None:
+        """Lưu danh sách model đã phát hiện vào file cache"""
+        try:
+            os.makedirs(os.path.dirname(config.GROQ_MODELS_CACHE_FILE), exist_ok=True)
+            with open(config.GROQ_MODELS_CACHE_FILE, 'w', encoding='utf-8') as f:
+                json.dump({'timestamp': time.time(), 'models': available_models}, f)
+        except Exception as e:
+            print(f"Error saving Groq models cache: {str(e)}")
+    
+    def _select_model(self, allow_network: bool = True) -> None:
+        """
+        Chọn model ưu tiên đầu tiên có sẵn
+        
+        Args:
+            allow_network: Cho phép gọi models.list() khi cache trên đĩa không dùng được
+        """
+        available_models = self._load_cached_models()
+        if available_models is None:
+            if not allow_network:
+                return
             try:
-                print("\n=== INITIALIZING GROQ SERVICE ===")
-                print(f"API Key: {'***' + self.api_key[-4:] if self.api_key else 'None'}")
-                
-                # Khởi tạo client với timeout cho Render (phiên bản Groq 0.4.0)
-                try:
-                    self.client = groq.Groq(
-                        api_key=self.api_key,
-                        timeout=60.0  # 60 second timeout for Render
-                    )
-                    print(f"✅ Groq client initialized with timeout=60s")
-                except Exception as e:
-                    print(f"Error initializing Groq client: {str(e)}")
-                    self.available = False
-                    return
-                
-                # Danh sách model để thử theo thứ tự ưu tiên
-                self.preferred_models = [
-                    "llama3-70b-8192",  # LLaMA 3 70B - Model mạnh nhất
-                    "llama3-8b-8192",   # LLaMA 3 8B - Cân bằng tốc độ và hiệu năng
-                    "mixtral-8x7b-32768"  # Mixtral - Fallback nếu LLaMA không khả dụng
-                ]
-                
-                # Kiểm tra các model có sẵn
-                if self.client:
-                    try:
-                        print("Fetching available models...")
-                        models = self.client.models.list()
-                        available_models = [model.id for model in models.data]
-                        
-                        print("Available models:")
-                        for model_name in available_models:
-                            print(f"- {model_name}")
-                        
-                        # Tìm model ưu tiên đầu tiên có sẵn
-                        selected_model = None
-                        for model_name in self.preferred_models:
-                            if model_name in available_models:
-                                selected_model = model_name
-                                break
-                        
-                        # Nếu không tìm thấy model ưu tiên nào, sử dụng model mặc định
-                        if not selected_model:
-                            selected_model = self.default_model
-                        
-                        self.model = selected_model
-                        print(f"Using model: {self.model}")
-                        
-                    except Exception as e:
-                        print(f"Error fetching models: {str(e)}")
-                        print(f"Using default model: {self.default_model}")
-                        self.model = self.default_model
-                
-                print("Groq initialization successful")
-                print("=== GROQ SERVICE INITIALIZED ===\n")
+                print("Fetching available models...")
+                models = self.client.models.list()
+                available_models = [model.id for model in models.data]
+                self._save_cached_models(available_models)
             except Exception as e:
-                print(f"ERROR initializing Groq: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                self.available = False
+                print(f"Error fetching models: {str(e)}")
+                print(f"Using default model: {self.default_model}")
+                self.model = self.default_model
+                self.model_discovered = True
+                return
         
+        # Router chỉ định tuyến tới các model tài khoản dùng được
+        llm_router.set_available_models(available_models)
+        self.model = llm_router.choose("meal_json")
+        self.model_discovered = True
+        print(f"Using model: {self.model}")
+    
+    def ensure_model_selected(self) -> str:
+        """
+        Đảm bảo đã chọn model (gọi trong warm-up hoặc trước lần gọi API đầu tiên)
+        
+        Returns:
+            Tên model đang sử dụng
+        """
+        if self.model_discovered or not self.client:
+            return self.model
+        with self._model_lock:
+            if not self.model_discovered:
+                self._select_model(allow_network=True)
+        return self.model
+
+    def chat(self, messages: List[Dict], task: str = "chat", priority: int = PRIORITY_INTERACTIVE,
+             hedge: bool = False, **params) -> Optional[Dict]:
+        """
+        Gọi chat completion qua model do llm_router chọn cho loại lời gọi
+
+        Args:
+            messages: Danh sách message gửi tới model
+            task: Loại lời gọi ("chat", "price_analysis"...) quyết định mức chất lượng model
+            priority: Độ ưu tiên khi chờ quota Groq
+            hedge: Gửi thêm bản sao khi lời gọi chậm hơn p90 (chỉ dùng cho lời gọi không có side effect)
+            **params: Tham số khác của chat.completions.create (temperature, max_tokens...)
+
+        Returns:
+            {"model", "choices": [{"message": {"content"}}]} hoặc None nếu Groq không khả dụng/hết quota
+        """
+        if not self.available or not self.client:
+            return None
+        if groq_breaker.is_open:
+            # Không tốn quota cho lời gọi chắc chắn bị từ chối
+            print(f"Groq circuit open. Skipping Groq call for task: {task}")
+            return None
+        self.ensure_model_selected()
+        if not wait_for_groq_quota(priority):
+            print(f"Rate limit reached. Skipping Groq call for task: {task}")
+            return None
+
+        def request():
+            return llm_router.call(task, lambda model: self.client.chat.completions.with_raw_response.create(
+                model=model, messages=messages, **params
+            ))
+
+        try:
+            if hedge:
+                # Bản sao cũng tốn một request quota: chỉ gửi khi lấy được token ngay (cùng độ ưu tiên)
+                completion = groq_breaker.hedged_call(
+                    request, permit_hedge=lambda: wait_for_groq_quota(priority, timeout=0)
+                )
+            else:
+                completion = groq_breaker.call(request)
+        except CircuitOpenError as e:
+            print(f"Skipping Groq call for task {task}: {str(e)}")
+            return None
+        except Exception as e:
+            record_groq_rate_limit(e)
+            raise
+
+        return {
+            "model": getattr(completion, "model", None),
+            "choices": [{"message": {"content": completion.choices[0].message.content}}]
+        }
+
     def generate_meal_suggestions(
         self,
         calories_target: int,
@@ -296,6 +438,14 @@ class GroqService:
             print("Groq API not available. Using fallback data.")
             return self._fallback_meal_suggestions(meal_type)
         
+        # Groq đang lỗi/chậm liên tục: dùng fallback ngay thay vì chờ timeout
+        if groq_breaker.is_open:
+            print(f"Groq circuit open (retry in {groq_breaker.retry_in:.0f}s). Using intelligent fallback.")
+            return (self._create_intelligent_fallback(meal_type, calories_target, protein_target, fat_target, carbs_target)
+                    or self._fallback_meal_suggestions(meal_type))
+        
+        self.ensure_model_selected()
+        
         # 🔧 FORCE DIVERSITY: Tạo cache key với timestamp để đảm bảo unique
         import hashlib
         import time
@@ -325,10 +475,9 @@ class GroqService:
         #     return self.cache[cache_key]
         print(f"🎲 FORCE DIVERSITY: Bypassing cache, generating new meals for: {cache_key[:50]}...")
         
-        # Kiểm tra rate limit
-        can_request, wait_time = self.rate_limiter.can_make_request()
-        if not can_request:
-            print(f"Rate limit reached. Using fallback data. Try again in {wait_time} seconds.")
+        # Chờ quota (xếp sau các request chat đang chờ) thay vì bỏ qua AI ngay khi chạm giới hạn
+        if not wait_for_groq_quota(PRIORITY_BATCH):
+            print(f"Rate limit reached. Using fallback data after waiting {config.GROQ_BATCH_MAX_WAIT:.0f}s.")
             return self._fallback_meal_suggestions(meal_type)
         
         # 🔧 FIX: Tự động áp dụng chế độ ăn chay từ user_data
@@ -374,6 +523,10 @@ class GroqService:
             # Gọi API Groq với enhanced retry logic
             for attempt in range(self.max_retries):
                 try:
+                    # Lần thử đầu đã lấy quota ở trên
+                    if attempt > 0 and not wait_for_groq_quota(PRIORITY_BATCH):
+                        print("Rate limit reached during retries.")
+                        break
                     print(f"Making request to Groq API, attempt {attempt + 1}/{self.max_retries}")
 
                     # Chọn prompt strategy dựa trên attempt
@@ -384,8 +537,8 @@ class GroqService:
                     # Lấy cài đặt temperature tối ưu
                     temp_settings = get_temperature_settings()
 
-                    response = self.client.chat.completions.create(
-                        model=self.model,
+                    # Stream phản hồi: mỗi món được parse ngay khi object của nó đóng ngoặc
+                    result_text, streamed_meals = self._stream_meal_completion(
                         messages=[
                             {"role": "system", "content": get_system_message()},
                             {"role": "user", "content": current_prompt}
@@ -395,30 +548,33 @@ class GroqService:
                         top_p=temp_settings["top_p"],
                         frequency_penalty=temp_settings["frequency_penalty"],
                         presence_penalty=temp_settings["presence_penalty"],
-                        timeout=60  # Explicit timeout for each request
+                        timeout=config.GROQ_TIMEOUT  # Explicit timeout for each request
                     )
                     
                     # Trích xuất kết quả JSON từ phản hồi
-                    result_text = response.choices[0].message.content.strip()
                     print(f"🔍 Raw response from Groq (attempt {attempt + 1}):")
                     print(f"Length: {len(result_text)} characters")
                     print(f"First 200 chars: {result_text[:200]}")
                     print(f"Last 200 chars: {result_text[-200:]}")
 
                     # Validate JSON response trước khi extract
-                    is_valid, error_msg = validate_json_response(result_text)
-                    if is_valid:
+                    is_valid, error_msg = (True, None) if streamed_meals else validate_json_response(result_text)
+                    if streamed_meals:
+                        print(f"✅ Parsed {len(streamed_meals)} meals while streaming")
+                    elif is_valid:
                         print(f"✅ Response passed initial JSON validation")
                     else:
                         print(f"⚠️ Response failed validation: {error_msg}")
 
-                        # Nếu không phải attempt cuối, thử retry với validation prompt
-                        if attempt < self.max_retries - 1:
+                        # Nếu không phải attempt cuối, thử retry với validation prompt (bỏ qua khi hết quota)
+                        if attempt < self.max_retries - 1 and not wait_for_groq_quota(PRIORITY_BATCH):
+                            print("Rate limit reached. Skipping validation retry.")
+                        elif attempt < self.max_retries - 1:
                             print(f"🔄 Retrying with validation-corrected prompt...")
                             retry_prompt = get_validation_retry_prompt(result_text, error_msg)
 
-                            retry_response = self.client.chat.completions.create(
-                                model=self.model,
+                            retry_response = groq_breaker.call(llm_router.call, "meal_json", lambda model: self.client.chat.completions.with_raw_response.create(
+                                model=model,
                                 messages=[
                                     {"role": "system", "content": get_system_message()},
                                     {"role": "user", "content": retry_prompt}
@@ -426,14 +582,17 @@ class GroqService:
                                 temperature=0.0,  # Maximum strictness for correction
                                 max_tokens=2000,
                                 top_p=0.1
-                            )
+                            ))
 
                             result_text = retry_response.choices[0].message.content.strip()
                             print(f"🔧 Retry response: {result_text[:100]}...")
 
-                    # Phân tích JSON từ response
-                    print(f"🔧 Extracting JSON from response...")
-                    meal_data = self._extract_json_from_response(result_text)
+                    # Phân tích JSON từ response (bỏ qua nếu đã parse được trong lúc stream)
+                    if streamed_meals:
+                        meal_data = streamed_meals
+                    else:
+                        print(f"🔧 Extracting JSON from response...")
+                        meal_data = self._extract_json_from_response(result_text)
 
                     if meal_data and isinstance(meal_data, list) and len(meal_data) > 0:
                         print(f"✅ Successfully extracted {len(meal_data)} meals from JSON")
@@ -450,22 +609,14 @@ class GroqService:
                                 dish_name = meal.get('name', '')
                                 if dish_name:
                                     # Check if similar dish already exists in recent dishes
-                                    is_similar_to_existing = False
-                                    dish_name_lower = dish_name.lower()
-
-                                    for existing_dish in self.recent_dishes:
-                                        if self._are_dishes_similar(dish_name_lower, existing_dish.lower()):
-                                            is_similar_to_existing = True
-                                            print(f"⚠️ Detected similar dish: '{dish_name}' ~ '{existing_dish}'")
-                                            break
+                                    existing_dish = self._get_recent_dish_index().find_similar(dish_name)
+                                    if existing_dish is not None:
+                                        print(f"⚠️ Detected similar dish: '{dish_name}' ~ '{existing_dish}'")
 
                                     # Only add if not similar to existing dishes
-                                    if not is_similar_to_existing:
-                                        self.recent_dishes.append(dish_name)
+                                    if existing_dish is None:
+                                        self._remember_recent_dish(dish_name)
                                         print(f"📝 Added to recent dishes: {dish_name}")
-                                        # Keep only last N dishes
-                                        if len(self.recent_dishes) > self.max_recent_dishes:
-                                            self.recent_dishes.pop(0)
                                     else:
                                         print(f"🚫 Skipped similar dish: {dish_name}")
 
@@ -489,12 +640,21 @@ class GroqService:
                     print(f"Waiting {backoff_time}s before retry...")
                     time.sleep(backoff_time)
                     
+                except CircuitOpenError as e:
+                    print(f"Groq skipped: {str(e)}")
+                    break
                 except Exception as e:
                     print(f"Error calling Groq API: {str(e)} - Attempt {attempt + 1}/{self.max_retries}")
-                    if "quota exceeded" in str(e).lower():
+                    retry_after = record_groq_rate_limit(e, default_wait=2 ** attempt)
+                    if retry_after is not None:
+                        # Retry-After ngắn: lần thử sau tự chờ trong wait_for_groq_quota
+                        if retry_after <= config.GROQ_BATCH_MAX_WAIT:
+                            continue
                         print("API quota exceeded")
                         self.quota_exceeded = True
-                        self.quota_reset_time = time.time() + 3600  # Thử lại sau 1 giờ
+                        self.quota_reset_time = time.time() + retry_after
+                        break
+                    if groq_breaker.is_open:
                         break
 
                     # Exponential backoff for API errors
@@ -709,25 +869,9 @@ class GroqService:
             if filtered_dishes:
                 dishes = filtered_dishes
 
-        # 🔧 FIX: Enhanced anti-duplication với fuzzy matching
-        filtered_dishes = []
-        for dish in dishes:
-            # Exact match check
-            if dish not in self.recent_dishes:
-                # Fuzzy match check - tránh các món tương tự
-                is_similar = False
-                dish_lower = dish.lower()
-
-                for recent_dish in self.recent_dishes:
-                    recent_lower = recent_dish.lower()
-
-                    # Check for similar base dishes
-                    if self._are_dishes_similar(dish_lower, recent_lower):
-                        is_similar = True
-                        break
-
-                if not is_similar:
-                    filtered_dishes.append(dish)
+        # 🔧 FIX: Enhanced anti-duplication với fuzzy matching (tra chỉ mục thay vì so từng cặp)
+        recent_index = self._get_recent_dish_index()
+        filtered_dishes = [dish for dish in dishes if not recent_index.is_similar(dish)]
 
         # If too few dishes after filtering, gradually relax restrictions
         if len(filtered_dishes) < 8:  # Increased from 5 to 8
@@ -764,6 +908,31 @@ class GroqService:
         selected_dishes = filtered_dishes[:20]
         return ", ".join(selected_dishes)
 
+    def _get_recent_dish_index(self) -> DishSimilarityIndex:
+        """
+        Chỉ mục gần trùng lặp của recent_dishes, build lại nếu danh sách bị gán/sửa trực tiếp
+
+        Returns:
+            DishSimilarityIndex đồng bộ với self.recent_dishes
+        """
+        if self._recent_dish_index.names != self.recent_dishes:
+            self._recent_dish_index = DishSimilarityIndex(self.recent_dishes)
+        return self._recent_dish_index
+
+    def _remember_recent_dish(self, dish_name: str) -> None:
+        """
+        Thêm món vào recent_dishes và chỉ mục, chỉ giữ max_recent_dishes món gần nhất
+
+        Args:
+            dish_name: Tên món ăn
+        """
+        recent_index = self._get_recent_dish_index()
+        self.recent_dishes.append(dish_name)
+        recent_index.add(dish_name)
+        while len(self.recent_dishes) > self.max_recent_dishes:
+            self.recent_dishes.pop(0)
+            recent_index.pop_oldest()
+
     def _are_dishes_similar(self, dish1: str, dish2: str) -> bool:
         """
         🔧 ENHANCED: Kiểm tra xem 2 món ăn có tương tự nhau không (improved detection)
@@ -774,69 +943,7 @@ class GroqService:
         Returns:
             bool: True nếu tương tự
         """
-        # Exact match
-        if dish1 == dish2:
-            return True
-
-        # 🔧 FIX: Enhanced similarity detection
-
-        # 1. Remove regional variations and check core similarity
-        dish1_core = self._remove_regional_variations(dish1)
-        dish2_core = self._remove_regional_variations(dish2)
-
-        # 🔧 RELAXED: Chỉ coi là trùng nếu core dish hoàn toàn giống nhau VÀ không có biến thể vùng miền
-        if dish1_core == dish2_core:
-            # Kiểm tra xem có phải chỉ khác vùng miền không
-            dish1_has_region = dish1 != dish1_core
-            dish2_has_region = dish2 != dish2_core
-
-            # Nếu cả hai đều có vùng miền khác nhau, cho phép
-            if dish1_has_region and dish2_has_region:
-                print(f"🔧 Allowing regional variation: '{dish1}' vs '{dish2}'")
-                return False  # Không coi là trùng lặp
-
-            # Nếu một món có vùng miền, một món không có, coi là trùng
-            return True
-
-        # 2. Extract base dish names
-        base1 = self._extract_base_dish_name(dish1)
-        base2 = self._extract_base_dish_name(dish2)
-
-        # Same base dish
-        if base1 == base2:
-            return True
-
-        # 3. Check for word overlap (if >70% words are same, consider similar)
-        words1 = set(dish1.split())
-        words2 = set(dish2.split())
-
-        if len(words1) > 0 and len(words2) > 0:
-            overlap = len(words1.intersection(words2))
-            total_unique = len(words1.union(words2))
-            similarity_ratio = overlap / total_unique
-
-            if similarity_ratio > 0.7:  # 70% word overlap
-                return True
-
-        # 4. Enhanced pattern matching
-        similar_patterns = [
-            # Cơm tấm variations (more specific)
-            (["cơm tấm", "sườn"], ["cơm tấm", "sườn"]),
-            # Bánh mì variations
-            (["bánh mì", "chả cá"], ["bánh mì", "chả cá"]),
-            # Phở variations
-            (["phở", "gà"], ["phở", "gà"]),
-            (["phở", "bò"], ["phở", "bò"]),
-            # Cháo variations
-            (["cháo", "gà"], ["cháo", "gà"]),
-            (["cháo", "tôm"], ["cháo", "tôm"]),
-        ]
-
-        for pattern1, pattern2 in similar_patterns:
-            if all(p in dish1 for p in pattern1) and all(p in dish2 for p in pattern2):
-                return True
-
-        return False
+        return are_dishes_similar(dish1, dish2)
 
     def _remove_regional_variations(self, dish_name: str) -> str:
         """
@@ -848,31 +955,7 @@ class GroqService:
         Returns:
             str: Tên món ăn đã loại bỏ variations
         """
-        # 🔧 EXPANDED: More comprehensive regional indicators
-        regional_terms = [
-            # Vùng miền
-            "miền tây", "miền bắc", "miền trung", "miền nam",
-            # Thành phố
-            "sài gòn", "hà nội", "huế", "đà nẵng", "nha trang", "cà mau",
-            "đồng nai", "an giang", "cần thơ", "vũng tàu", "hải phòng",
-            # Đặc tính
-            "đặc biệt", "truyền thống", "cổ điển", "đặc sản", "cải tiến",
-            "nguyên bản", "chính gốc", "authentic", "original",
-            # Phong cách nấu
-            "nướng than", "nướng lò", "chiên giòn", "luộc", "hấp",
-            # Mức độ
-            "cay", "ngọt", "mặn", "chua", "đậm đà", "nhẹ nhàng"
-        ]
-
-        dish_clean = dish_name.lower()
-
-        for term in regional_terms:
-            dish_clean = dish_clean.replace(term, "").strip()
-
-        # Remove extra spaces and normalize
-        dish_clean = " ".join(dish_clean.split())
-
-        return dish_clean
+        return remove_regional_variations(dish_name)
 
     def _create_dish_variation(self, original_name: str) -> str:
         """
@@ -908,22 +991,7 @@ class GroqService:
         """
         Extract base dish name (e.g., "Cơm Tấm Sườn Nướng Mật Ong Sài Gòn" -> "cơm tấm")
         """
-        dish_lower = dish_name.lower()
-
-        # Common base dishes
-        base_dishes = [
-            "cơm tấm", "bánh mì", "phở", "cháo", "bún", "hủ tiếu",
-            "mì quảng", "bánh xèo", "bánh khọt", "nem", "chả cá",
-            "lẩu", "xôi", "bánh cuốn", "bánh căn"
-        ]
-
-        for base in base_dishes:
-            if base in dish_lower:
-                return base
-
-        # If no base found, return first 2 words
-        words = dish_lower.split()
-        return " ".join(words[:2]) if len(words) >= 2 else dish_lower
+        return extract_base_dish_name(dish_name)
 
     def _get_official_nutrition(self, dish_name: str, ingredients: List[Dict]) -> Dict:
         """
@@ -1125,9 +1193,14 @@ class GroqService:
                 {"name": "dầu ăn", "amount": "1 tbsp"}
             ])
 
+        # Quy đổi khối lượng sang gram một lần cho cả danh sách
+        grams = parse_many((ing["amount"], ing["name"]) for ing in ingredients)
+        for ing, ing_grams in zip(ingredients, grams):
+            ing["grams"] = ing_grams
+
         print(f"🔧 Parsed {len(ingredients)} ingredients from detailed dish name")
         for ing in ingredients:
-            print(f"   - {ing['name']}: {ing['amount']}")
+            print(f"   - {ing['name']}: {ing['amount']} ({ing['grams']:g}g)")
 
         return ingredients
 
@@ -1425,9 +1498,7 @@ class GroqService:
         }
 
         # Thêm vào recent dishes để tránh trùng lặp trong tương lai
-        self.recent_dishes.append(final_name)
-        if len(self.recent_dishes) > self.max_recent_dishes:
-            self.recent_dishes.pop(0)
+        self._remember_recent_dish(final_name)
 
         return additional_meal
 
@@ -1489,6 +1560,38 @@ class GroqService:
         print(f"✅ All required keys present: {required_keys}")
         return True
 
+    def _stream_meal_completion(self, messages: List[Dict], **params) -> Tuple[str, List[Dict]]:
+        """
+        Gọi Groq ở chế độ stream và parse món ăn tăng dần trong lúc nhận token
+
+        Args:
+            messages: Danh sách message gửi tới model
+            **params: Tham số khác của chat.completions.create
+
+        Returns:
+            Tuple (toàn bộ text phản hồi, các món hợp lệ đã parse được - có thể rỗng)
+        """
+        def stream_from(model: str) -> IncrementalMealParser:
+            # Đo độ trễ tới khi nhận hết stream (router ghi nhận theo loại lời gọi "meal_json")
+            self.model = model
+            parser = IncrementalMealParser()
+            stream = self.client.chat.completions.create(model=model, messages=messages, stream=True, **params)
+            llm_router.update_quota(model, getattr(getattr(stream, "response", None), "headers", None))
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                for meal in parser.feed(delta or ""):
+                    print(f"🍽️ Streamed meal: {meal.get('name', 'Unknown')}")
+            parser.close()
+            return parser
+        
+        # Thời gian stream tăng theo độ dài phản hồi (tới max_tokens): không tính lời gọi thành công nhưng
+        # lâu là lỗi; lời gọi treo vẫn bị timeout và tính là lỗi
+        parser = groq_breaker.call(llm_router.call, "meal_json", stream_from, slow_call_threshold=None)
+
+        meals = self._validate_and_filter_meals(parser.meals) or []
+        return parser.text.strip(), meals
+
+    @timed_stage("extract_json")
     def _extract_json_from_response(self, response_text: str) -> List[Dict]:
         """
         Enhanced JSON extraction with multiple fallback strategies
@@ -1508,6 +1611,7 @@ class GroqService:
         # Bước 2: Thử các phương pháp parsing theo thứ tự ưu tiên
         extraction_methods = [
             ("Direct JSON parsing", self._try_direct_json_parse),
+            ("Incremental one-pass parsing", self._try_incremental_parse),
             ("Regex JSON extraction", self._try_regex_json_extract),
             ("Bracket-based extraction", self._try_bracket_extraction),
             ("Advanced JSON fixing", self._try_advanced_json_fix),
@@ -1530,6 +1634,13 @@ class GroqService:
         print("❌ All JSON extraction methods failed")
         return None
 
+    @timed_stage("incremental_parse")
+    def _try_incremental_parse(self, text: str) -> List[Dict]:
+        """Parse một lần quét, sửa các lỗi JSON phổ biến của LLM ngay trong lúc đọc"""
+        meals, _ = parse_meals(text)
+        return self._validate_and_filter_meals(meals)
+
+    @timed_stage("direct_json_parse")
     def _try_direct_json_parse(self, text: str) -> List[Dict]:
         """Thử parse JSON trực tiếp"""
         meal_data = json.loads(text)
@@ -1539,17 +1650,18 @@ class GroqService:
             return self._validate_and_filter_meals([meal_data])
         return None
 
+    @timed_stage("regex_json_extract")
     def _try_regex_json_extract(self, text: str) -> List[Dict]:
         """Sử dụng regex để trích xuất JSON"""
         # Các pattern regex để tìm JSON
         patterns = [
-            r'\[\s*\{.*?\}\s*(?:,\s*\{.*?\}\s*)*\]',  # Array of objects
-            r'\[.*?\]',                                # Any array
-            r'\{.*?\}',                               # Single object
+            REPAIR_PATTERNS["object_array"],  # Array of objects
+            REPAIR_PATTERNS["any_array"],     # Any array
+            REPAIR_PATTERNS["any_object"],    # Single object
         ]
 
         for pattern in patterns:
-            matches = safe_regex_findall(pattern, text, 16)  # re.DOTALL = 16
+            matches = safe_regex_findall(pattern, text)
             for match in matches:
                 try:
                     data = json.loads(match)
@@ -1565,6 +1677,7 @@ class GroqService:
                     continue
         return None
 
+    @timed_stage("bracket_extraction")
     def _try_bracket_extraction(self, text: str) -> List[Dict]:
         """Trích xuất JSON giữa dấu ngoặc vuông"""
         start = text.find("[")
@@ -1591,6 +1704,7 @@ class GroqService:
                         pass
         return None
 
+    @timed_stage("advanced_json_fix")
     def _try_advanced_json_fix(self, text: str) -> List[Dict]:
         """Sử dụng advanced JSON fixing"""
         fixed_json = self._advanced_json_repair(text)
@@ -1618,6 +1732,7 @@ class GroqService:
 
         return valid_meals if valid_meals else None
 
+    @timed_stage("advanced_json_repair")
     def _advanced_json_repair(self, text: str) -> str:
         """
         Advanced JSON repair với nhiều kỹ thuật sửa lỗi
@@ -1626,18 +1741,18 @@ class GroqService:
 
         # Bước 1: Tìm và sửa pattern thiếu "name" key phổ biến
         # Pattern: { "Bánh Mì Chay", "description": -> { "name": "Bánh Mì Chay", "description":
-        text = safe_regex_sub(r'\{\s*"([^"]+)",\s*"description":', r'{"name": "\1", "description":', text)
+        text = safe_regex_sub(REPAIR_PATTERNS["unnamed_before_description"], r'{"name": "\1", "description":', text)
 
         # Bước 2: Sửa pattern object đầu tiên thiếu name
         # Pattern: [{ "Dish Name", -> [{ "name": "Dish Name",
-        text = safe_regex_sub(r'\[\s*\{\s*"([^"]+)",', r'[{"name": "\1",', text)
+        text = safe_regex_sub(REPAIR_PATTERNS["unnamed_first_in_array"], r'[{"name": "\1",', text)
 
         # Bước 3: Sửa missing quotes cho keys
-        text = safe_regex_sub(r'(\w+):', r'"\1":', text)
+        text = safe_regex_sub(REPAIR_PATTERNS["unquoted_key"], r'"\1":', text)
 
         # Bước 4: Sửa trailing commas
-        text = safe_regex_sub(r',\s*}', '}', text)
-        text = safe_regex_sub(r',\s*]', ']', text)
+        text = safe_regex_sub(REPAIR_PATTERNS["trailing_comma_object"], '}', text)
+        text = safe_regex_sub(REPAIR_PATTERNS["trailing_comma_array"], ']', text)
 
         # Bước 5: Đảm bảo cân bằng brackets
         open_brackets = text.count('[')
@@ -1679,34 +1794,35 @@ class GroqService:
             # Filter suitable dishes from traditional database
             suitable_dishes = []
 
-            for dish_name, dish_info in ALL_TRADITIONAL_DISHES.items():
-                dish_meal_types = dish_info.get("meal_type", [])
+            traditional_dishes = get_dish_catalog().dishes("traditional")
+
+            for dish in traditional_dishes:
+                dish_meal_types = dish.get("meal_type", ())
 
                 # Check if dish is suitable for this meal type
                 if any(mt in dish_meal_types for mt in target_meal_types):
                     # Check if not recently used
-                    if dish_name not in self.recent_dishes:
-                        suitable_dishes.append((dish_name, dish_info))
+                    if dish.name not in self.recent_dishes:
+                        suitable_dishes.append(dish)
 
             # If no suitable dishes, use any dishes
             if not suitable_dishes:
-                suitable_dishes = [(name, info) for name, info in ALL_TRADITIONAL_DISHES.items()
-                                 if name not in self.recent_dishes]
+                suitable_dishes = [dish for dish in traditional_dishes if dish.name not in self.recent_dishes]
 
             # If still no dishes, use all dishes
             if not suitable_dishes:
-                suitable_dishes = list(ALL_TRADITIONAL_DISHES.items())
+                suitable_dishes = list(traditional_dishes)
 
             # Select random dish
             import random
-            selected_dish_name, selected_dish_info = random.choice(suitable_dishes)
+            selected_dish = random.choice(suitable_dishes)
 
-            print(f"   📋 Selected traditional dish: {selected_dish_name}")
+            print(f"   📋 Selected traditional dish: {selected_dish.name}")
 
             # Create intelligent meal from traditional dish
             intelligent_meal = self._create_meal_from_traditional_dish(
-                selected_dish_name,
-                selected_dish_info,
+                selected_dish.name,
+                selected_dish.to_dict(),
                 calories_target,
                 meal_type
             )
@@ -1839,6 +1955,7 @@ class GroqService:
             "is_simple_fallback": True
         }
 
+    @timed_stage("create_json_from_text")
     def _create_json_from_text(self, text: str) -> List[Dict]:
         """
         Tạo JSON từ text response khi parsing thất bại - phương pháp mạnh mẽ hơn
@@ -1847,11 +1964,11 @@ class GroqService:
             print(f"🔧 Creating JSON from text response...")
 
             # Phương pháp 1: Tìm tên món ăn từ quotes
-            dish_names = safe_regex_findall(r'"([^"]*(?:Bánh|Cơm|Phở|Bún|Cháo|Chả|Gỏi|Canh|Xôi|Nem|Gà|Heo|Bò)[^"]*)"', text, 2)  # re.IGNORECASE = 2
+            dish_names = safe_regex_findall(REPAIR_PATTERNS["quoted_dish_name"], text)
 
             # Phương pháp 2: Tìm từ pattern Vietnamese dish names
             if not dish_names:
-                dish_names = safe_regex_findall(r'([A-ZÀÁẠẢÃÂẦẤẬẨẪĂẰẮẶẲẴÈÉẸẺẼÊỀẾỆỂỄÌÍỊỈĨÒÓỌỎÕÔỒỐỘỔỖƠỜỚỢỞỠÙÚỤỦŨƯỪỨỰỬỮỲÝỴỶỸĐ][a-zàáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđ\s]+(?:Bánh|Cơm|Phở|Bún|Cháo|Chả|Gỏi|Canh|Xôi|Nem|Gà|Heo|Bò)[a-zàáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđ\s]*)', text)
+                dish_names = safe_regex_findall(REPAIR_PATTERNS["titled_dish_name"], text)
 
             # Phương pháp 3: Fallback với common Vietnamese dishes
             if not dish_names:
@@ -1862,16 +1979,16 @@ class GroqService:
             print(f"🍽️ Found dish names: {dish_names}")
 
             # Tìm thông tin dinh dưỡng từ text nếu có
-            calories_match = safe_regex_search(r'"?calories"?\s*:\s*(\d+)', text)
-            protein_match = safe_regex_search(r'"?protein"?\s*:\s*(\d+)', text)
-            fat_match = safe_regex_search(r'"?fat"?\s*:\s*(\d+)', text)
-            carbs_match = safe_regex_search(r'"?carbs"?\s*:\s*(\d+)', text)
+            calories_match = safe_regex_search(REPAIR_PATTERNS["calories_value"], text)
+            protein_match = safe_regex_search(REPAIR_PATTERNS["protein_value"], text)
+            fat_match = safe_regex_search(REPAIR_PATTERNS["fat_value"], text)
+            carbs_match = safe_regex_search(REPAIR_PATTERNS["carbs_value"], text)
 
             # Tìm ingredients từ text
-            ingredients_text = safe_regex_search(r'"?ingredients"?\s*:\s*\[(.*?)\]', text, 16)  # re.DOTALL = 16
+            ingredients_text = safe_regex_search(REPAIR_PATTERNS["ingredients_block"], text)
             ingredients = []
             if ingredients_text:
-                ingredient_matches = safe_regex_findall(r'"?name"?\s*:\s*"([^"]+)".*?"?amount"?\s*:\s*"([^"]+)"', ingredients_text.group(1))
+                ingredient_matches = safe_regex_findall(REPAIR_PATTERNS["ingredient_name_amount"], ingredients_text.group(1))
                 ingredients = [{"name": name, "amount": amount} for name, amount in ingredient_matches[:4]]
 
             if not ingredients:
@@ -1920,13 +2037,14 @@ class GroqService:
             traceback.print_exc()
             return None
 
+    @timed_stage("clean_response_text")
     def _clean_response_text(self, text: str) -> str:
         """
         Làm sạch response text để cải thiện khả năng parse JSON
         """
         # Loại bỏ markdown code blocks
-        text = safe_regex_sub(r'```json\s*', '', text)
-        text = safe_regex_sub(r'```\s*', '', text)
+        text = safe_regex_sub(REPAIR_PATTERNS["code_fence_json"], '', text)
+        text = safe_regex_sub(REPAIR_PATTERNS["code_fence"], '', text)
 
         # Loại bỏ các ký tự không cần thiết ở đầu và cuối
         text = text.strip()
@@ -1944,6 +2062,7 @@ class GroqService:
 
         return text
 
+    @timed_stage("fix_missing_name_key")
     def _fix_missing_name_key(self, json_str: str) -> str:
         """
         Đặc biệt xử lý trường hợp missing "name" key - vấn đề phổ biến nhất
@@ -1951,16 +2070,16 @@ class GroqService:
         print(f"🔧 Fixing missing 'name' key specifically...")
 
         # Pattern 1: { "Bánh Mì Chay", "description": -> { "name": "Bánh Mì Chay", "description":
-        fixed = safe_regex_sub(r'\{\s*"([^"]+)",\s*"description":', r'{"name": "\1", "description":', json_str)
+        fixed = safe_regex_sub(REPAIR_PATTERNS["unnamed_before_description"], r'{"name": "\1", "description":', json_str)
 
         # Pattern 2: [ { "Dish Name", -> [ { "name": "Dish Name",
-        fixed = safe_regex_sub(r'\[\s*\{\s*"([^"]+)",', r'[{"name": "\1",', fixed)
+        fixed = safe_regex_sub(REPAIR_PATTERNS["unnamed_first_in_array"], r'[{"name": "\1",', fixed)
 
         # Pattern 3: { "Bánh Mì Chay", "Món bánh mì..." -> { "name": "Bánh Mì Chay", "description": "Món bánh mì..."
-        fixed = safe_regex_sub(r'\{\s*"([^"]+)",\s*"([^"]*[a-z][^"]*)",', r'{"name": "\1", "description": "\2",', fixed)
+        fixed = safe_regex_sub(REPAIR_PATTERNS["unnamed_with_text"], r'{"name": "\1", "description": "\2",', fixed)
 
         # Pattern 4: }, { "Next Dish", -> }, { "name": "Next Dish",
-        fixed = safe_regex_sub(r'\},\s*\{\s*"([^"]+)",', r'}, {"name": "\1",', fixed)
+        fixed = safe_regex_sub(REPAIR_PATTERNS["unnamed_next_object"], r'}, {"name": "\1",', fixed)
 
         if fixed != json_str:
             print(f"✅ Successfully fixed missing 'name' key patterns")
@@ -1969,6 +2088,7 @@ class GroqService:
             print(f"⚠️ No missing 'name' key patterns found")
             return json_str
 
+    @timed_stage("fix_malformed_json")
     def _fix_malformed_json(self, json_str: str) -> str:
         """
         Ultra-robust JSON fixing với nhiều pattern matching - Enhanced version
@@ -1981,53 +2101,53 @@ class GroqService:
 
         # Bước 1: Sửa pattern phổ biến nhất - missing "name" key
         # Pattern cực kỳ cụ thể: { "Bánh Mì Chay", "description": -> { "name": "Bánh Mì Chay", "description":
-        json_str = safe_regex_sub(r'\{\s*"([^"]+)",\s*"description":', r'{"name": "\1", "description":', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["unnamed_before_description"], r'{"name": "\1", "description":', json_str)
 
         # Pattern: { "Dish Name", "Món ăn..." -> { "name": "Dish Name", "description": "Món ăn..."
-        json_str = safe_regex_sub(r'\{\s*"([^"]+)",\s*"(Món [^"]*)"', r'{"name": "\1", "description": "\2"', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["unnamed_with_mon_description"], r'{"name": "\1", "description": "\2"', json_str)
 
         # Pattern đặc biệt cho trường hợp chỉ có tên món: { "Bánh Mì Chay", -> { "name": "Bánh Mì Chay",
-        json_str = safe_regex_sub(r'\{\s*"([^"]+)",\s*([^"])', r'{"name": "\1", \2', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["unnamed_before_value"], r'{"name": "\1", \2', json_str)
 
         # Pattern: [ { "Dish Name", -> [ { "name": "Dish Name",
-        json_str = safe_regex_sub(r'\[\s*\{\s*"([^"]+)",', r'[{"name": "\1",', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["unnamed_first_in_array"], r'[{"name": "\1",', json_str)
 
         # Pattern đặc biệt cho trường hợp không có field name: { "Bánh Mì Chay", [array]
-        json_str = safe_regex_sub(r'\{\s*"([^"]+)",\s*\[', r'{"name": "\1", "ingredients": [', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["unnamed_before_array"], r'{"name": "\1", "ingredients": [', json_str)
 
         # Pattern mới: Xử lý trường hợp có text description nhưng không có key
         # { "Bánh Mì Chay", "Bánh mì chay thơm ngon..." -> { "name": "Bánh Mì Chay", "description": "Bánh mì chay thơm ngon..."
-        json_str = safe_regex_sub(r'\{\s*"([^"]+)",\s*"([^"]*[a-z][^"]*)",', r'{"name": "\1", "description": "\2",', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["unnamed_with_text"], r'{"name": "\1", "description": "\2",', json_str)
 
         # Bước 2: Sửa missing field names cho các trường hợp phức tạp
         # Pattern: "name": "...", "text without field", -> "name": "...", "description": "text",
-        json_str = safe_regex_sub(r'"name":\s*"([^"]+)",\s*"([^"]+)",\s*\[', r'"name": "\1", "description": "\2", "ingredients": [', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["name_then_text_then_array"], r'"name": "\1", "description": "\2", "ingredients": [', json_str)
 
         # Sửa trường hợp thiếu key cho ingredients, preparation, etc.
-        json_str = safe_regex_sub(r'",\s*\[\s*\{', r'", "ingredients": [{', json_str)
-        json_str = safe_regex_sub(r'\],\s*\[\s*"', r'], "preparation": ["', json_str)
-        json_str = safe_regex_sub(r'"\],\s*\{', r'"], "nutrition": {', json_str)
-        json_str = safe_regex_sub(r'\},\s*"([^"]+)",\s*"([^"]+)"\s*\}', r'}, "preparation_time": "\1", "health_benefits": "\2"}', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["keyless_ingredients"], r'", "ingredients": [{', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["keyless_preparation"], r'], "preparation": ["', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["keyless_nutrition"], r'"], "nutrition": {', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["keyless_trailing_fields"], r'}, "preparation_time": "\1", "health_benefits": "\2"}', json_str)
 
         # Bước 4: Sửa malformed arrays - loại bỏ quotes xung quanh arrays
-        json_str = safe_regex_sub(r'"\s*\[\s*', r'[', json_str)
-        json_str = safe_regex_sub(r'\s*\]\s*"', r']', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["quoted_array_open"], r'[', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["quoted_array_close"], r']', json_str)
 
         # Bước 5: Sửa missing field names cho arrays
         # Pattern: , [ -> , "ingredients": [
-        json_str = safe_regex_sub(r',\s*\[\s*\{', r', "ingredients": [{', json_str)
-        json_str = safe_regex_sub(r',\s*\[\s*"', r', "preparation": ["', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["keyless_object_array"], r', "ingredients": [{', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["keyless_string_array"], r', "preparation": ["', json_str)
 
         # Bước 6: Sửa missing quotes cho object keys
-        json_str = safe_regex_sub(r'(\w+):', r'"\1":', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["unquoted_key"], r'"\1":', json_str)
 
         # Bước 7: Sửa trailing commas
-        json_str = safe_regex_sub(r',\s*}', '}', json_str)
-        json_str = safe_regex_sub(r',\s*]', ']', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["trailing_comma_object"], '}', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["trailing_comma_array"], ']', json_str)
 
         # Bước 8: Sửa single quotes thành double quotes
-        json_str = safe_regex_sub(r"'([^']*)':", r'"\1":', json_str)
-        json_str = safe_regex_sub(r":\s*'([^']*)'", r': "\1"', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["single_quoted_key"], r'"\1":', json_str)
+        json_str = safe_regex_sub(REPAIR_PATTERNS["single_quoted_value"], r': "\1"', json_str)
 
         # Bước 9: Sửa broken objects - thêm missing closing braces
         open_braces = json_str.count('{')
@@ -2046,23 +2166,22 @@ class GroqService:
         # Bước 11: Đảm bảo có đủ required fields
         if '"name"' not in json_str:
             print("⚠️ Missing name field, attempting to add...")
-            json_str = safe_regex_sub(r'\{', r'{"name": "Vietnamese Dish",', json_str, count=1)
+            json_str = safe_regex_sub(REPAIR_PATTERNS["first_open_brace"], r'{"name": "Vietnamese Dish",', json_str, count=1)
 
         if '"description"' not in json_str:
             print("⚠️ Missing description field, attempting to add...")
-            json_str = safe_regex_sub(r'"name":\s*"([^"]*)",', r'"name": "\1", "description": "Món ăn Việt Nam truyền thống",', json_str)
+            json_str = safe_regex_sub(REPAIR_PATTERNS["name_field"], r'"name": "\1", "description": "Món ăn Việt Nam truyền thống",', json_str)
 
         if '"ingredients"' not in json_str:
             print("⚠️ Missing ingredients field, attempting to add...")
-            json_str = safe_regex_sub(r'"description":\s*"[^"]*",', r'\g<0> "ingredients": [{"name": "Nguyên liệu", "amount": "100g"}],', json_str)
+            json_str = safe_regex_sub(REPAIR_PATTERNS["description_field"], r'\g<0> "ingredients": [{"name": "Nguyên liệu", "amount": "100g"}],', json_str)
 
         # Bước 12: Sửa malformed nutrition objects
         if '"nutrition"' in json_str:
             # Ensure nutrition has proper structure
-            nutrition_pattern = r'"nutrition":\s*\{[^}]*\}'
-            if not safe_regex_search(nutrition_pattern, json_str):
+            if not safe_regex_search(REPAIR_PATTERNS["nutrition_object"], json_str):
                 print("⚠️ Fixing malformed nutrition object...")
-                json_str = safe_regex_sub(r'"nutrition":\s*[^,}]+', r'"nutrition": {"calories": 300, "protein": 20, "fat": 10, "carbs": 40}', json_str)
+                json_str = safe_regex_sub(REPAIR_PATTERNS["nutrition_scalar"], r'"nutrition": {"calories": 300, "protein": 20, "fat": 10, "carbs": 40}', json_str)
 
         if original_json != json_str:
             print(f"🔧 JSON was extensively modified during fixing")
@@ -2203,7 +2322,7 @@ class GroqService:
         print(f"📊 Validation complete: {len(valid_meals)} out of {len(meal_data)} meals are valid")
         return valid_meals
 
-    def _get_fallback_meals(self, meal_type: str) -> List[Dict]:
+    def _get_fallback_meals(self, meal_type: str) -> List[Mapping[str, Any]]:
         """
         🔧 FIX: Lấy dữ liệu món ăn dự phòng đa dạng
 
@@ -2211,29 +2330,29 @@ class GroqService:
             meal_type: Loại bữa ăn (bữa sáng, bữa trưa, bữa tối)
 
         Returns:
-            Danh sách các món ăn dự phòng (nhiều món hơn)
+            Danh sách các món ăn dự phòng (record chỉ đọc dùng chung; gọi to_dict() trên món được chọn)
         """
         meal_type_lower = meal_type.lower()
 
+        catalog = get_dish_catalog()
+
         # 🔧 FIX: Sử dụng key mapping chính xác
         if "sáng" in meal_type_lower or "sang" in meal_type_lower:
-            meals = FALLBACK_MEALS.get("bữa sáng", [])
+            meals = catalog.dishes("fallback", "bữa sáng")
         elif "trưa" in meal_type_lower or "trua" in meal_type_lower:
-            meals = FALLBACK_MEALS.get("bữa trưa", [])
+            meals = catalog.dishes("fallback", "bữa trưa")
         elif "tối" in meal_type_lower or "toi" in meal_type_lower:
-            meals = FALLBACK_MEALS.get("bữa tối", [])
+            meals = catalog.dishes("fallback", "bữa tối")
         else:
             # Trả về hỗn hợp các món
-            all_meals = []
-            for meals_list in FALLBACK_MEALS.values():
-                all_meals.extend(meals_list)
+            all_meals = list(catalog.dishes("fallback"))
 
             # Trộn danh sách để lấy ngẫu nhiên
             random.shuffle(all_meals)
             return all_meals[:3]  # Trả về tối đa 3 món
 
         print(f"🔧 Found {len(meals)} fallback meals for {meal_type}")
-        return meals
+        return list(meals)
 
     def _generate_realistic_combination_dishes(self, meal_type: str, preferences: List[str], allergies: List[str]) -> List[str]:
         """
@@ -2961,7 +3080,8 @@ class GroqService:
             # 🔧 FIX: Ưu tiên 1 món, chỉ 2 món khi thực sự cần thiết
             # Với chế độ ăn chay và mục tiêu giảm cân, 1 món thường đủ
             num_meals = 1 if len(fallback_meals) >= 1 else len(fallback_meals)
-            selected_meals = fallback_meals[:num_meals]
+            # Chỉ copy món được chọn: caller có thể sửa món (tên, nutrition) mà không ảnh hưởng catalog
+            selected_meals = [meal.to_dict() for meal in fallback_meals[:num_meals]]
 
             print(f"🔧 Selected {len(selected_meals)} traditional fallback meals for {meal_type}")
             for meal in selected_meals:
@@ -3017,6 +3137,7 @@ class GroqService:
         self.cache = {}
         print("🗑️ Clearing recent dishes to allow dish repetition")
         self.recent_dishes = []
+        self._recent_dish_index = DishSimilarityIndex()
 
         # 🔧 FIX: Reset diversity tracker
         print("🗑️ Resetting meal diversity tracker")
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP client dùng chung (keep-alive pool) cho các API bên ngoài: YouTube, USDA, Nutritionix, Edamam
+
+Gọi requests.get()/httpx.AsyncClient() cho từng request phải bắt tay TCP + TLS lại mỗi lần.
+Registry giữ một requests.Session (code đồng bộ) và một httpx.AsyncClient (endpoint async) cho
+mỗi host, sống cùng ứng dụng: tạo khi startup, đóng khi shutdown. Mỗi host có giới hạn số kết nối
+đồng thời và timeout riêng; HTTP/2 được bật cho client async khi đã cài package h2. Thời gian mỗi
+lời gọi được ghi vào histogram upstream_request_duration_seconds (xem metrics.py).
+"""
+import threading
+import time
+from typing import Dict, NamedTuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from lazy_client import module_available
+from metrics import status_outcome, upstream_request_duration
+
+HTTP2_AVAILABLE = module_available("h2")
+
+class HostSettings(NamedTuple):
+    """Cấu hình pool kết nối cho một host"""
+    base_url: str
+    max_connections: int = 10  # Số request đồng thời tối đa tới host
+    timeout: float = 10.0  # Timeout đọc/ghi (giây)
+    connect_timeout: float = 5.0
+    keepalive_expiry: float = 30.0
+
+HTTP_HOSTS: Dict[str, HostSettings] = {
+    "youtube": HostSettings("https://www.googleapis.com", max_connections=10, timeout=10.0),
+    "usda": HostSettings("https://api.nal.usda.gov", max_connections=4, timeout=15.0),
+    "nutritionix": HostSettings("https://trackapi.nutritionix.com", max_connections=4, timeout=10.0),
+    "edamam": HostSettings("https://api.edamam.com", max_connections=4, timeout=10.0),
+}
+
+class _PooledSession(requests.Session):
+    """requests.Session có timeout mặc định (requests không có timeout nếu không truyền)"""
+
+    def __init__(self, name: str, settings: HostSettings):
+        super().__init__()
+        self._name = name
+        self._timeout = (settings.connect_timeout, settings.timeout)
+        # pool_block: request thứ max_connections + 1 chờ kết nối rảnh thay vì mở thêm kết nối
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.max_connections, pool_block=True)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self._timeout)
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, **kwargs)
+        except Exception:
+            upstream_request_duration.observe(time.perf_counter() - started, self._name, "error")
+            raise
+        upstream_request_duration.observe(time.perf_counter() - started, self._name,
+                                          status_outcome(response.status_code))
+        return response
+
+class _TimedTransport(httpx.AsyncBaseTransport):
+    """Transport async ghi thời gian tới khi nhận header response vào upstream_request_duration_seconds"""
+
+    def __init__(self, name: str, transport: httpx.AsyncBaseTransport):
+        self._name = name
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            upstream_request_duration.observe(time.perf_counter() - started, self._name, "error")
+            raise
+        upstream_request_duration.observe(time.perf_counter() - started, self._name,
+                                          status_outcome(response.status_code))
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+class HTTPClientRegistry:
+    """Các HTTP client theo host, dùng chung trong suốt vòng đời ứng dụng"""
+
+    def __init__(self, hosts: Dict[str, HostSettings] = None):
+        """
+        Args:
+            hosts: Tên host -> cấu hình (mặc định HTTP_HOSTS)
+        """
+        self.hosts = dict(HTTP_HOSTS if hosts is None else hosts)
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._async_clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _settings(self, name: str) -> HostSettings:
+        try:
+            return self.hosts[name]
+        except KeyError:
+            raise ValueError(f"Unknown HTTP host: {name}") from None
+
+    def session(self, name: str) -> requests.Session:
+        """
+        Session đồng bộ của host (tạo nếu chưa có)
+
+        Args:
+            name: Tên host trong HTTP_HOSTS
+
+        Returns:
+            requests.Session có pool keep-alive và timeout mặc định
+        """
+        session = self._sessions.get(name)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(name)
+                if session is None:
+                    session = _PooledSession(name, self._settings(name))
+                    self._sessions[name] = session
+        return session
+
+    def async_client(self, name: str) -> httpx.AsyncClient:
+        """
+        Client async của host (tạo nếu chưa có)
+
+        Args:
+            name: Tên host trong HTTP_HOSTS
+
+        Returns:
+            httpx.AsyncClient có pool keep-alive, giới hạn kết nối và timeout
+        """
+        client = self._async_clients.get(name)
+        if client is None or client.is_closed:
+            with self._lock:
+                client = self._async_clients.get(name)
+                if client is None or client.is_closed:
+                    settings = self._settings(name)
+                    transport = httpx.AsyncHTTPTransport(
+                        limits=httpx.Limits(
+                            max_connections=settings.max_connections,
+                            max_keepalive_connections=settings.max_connections,
+                            keepalive_expiry=settings.keepalive_expiry,
+                        ),
+                        http2=HTTP2_AVAILABLE,
+                    )
+                    client = httpx.AsyncClient(
+                        timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+                        transport=_TimedTransport(name, transport),
+                    )
+                    self._async_clients[name] = client
+        return client
+
+    def startup(self) -> None:
+        """Tạo sẵn client cho mọi host (gọi khi ứng dụng khởi động)"""
+        for name in self.hosts:
+            self.session(name)
+            self.async_client(name)
+
+    async def aclose(self) -> None:
+        """Đóng mọi client và pool kết nối (gọi khi ứng dụng tắt)"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            async_clients = list(self._async_clients.values())
+            self._sessions.clear()
+            self._async_clients.clear()
+        for client in async_clients:
+            await client.aclose()
+        for session in sessions:
+            session.close()
+
+    def stats(self) -> Dict[str, Dict[str, bool]]:
+        """Host nào đã có client đồng bộ/async đang mở"""
+        return {
+            name: {
+                "session": name in self._sessions,
+                "async_client": name in self._async_clients and not self._async_clients[name].is_closed,
+            }
+            for name in self.hosts
+        }
+
+# Global instance
+http_clients = HTTPClientRegistry()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Image preprocessing before food recognition and storage
+
+Phone photos are often 3-8 MB at 12+ megapixels, far more than the vision model needs. Each upload
+is normalized once (EXIF orientation applied, downscaled to IMAGE_MAX_EDGE, re-encoded as JPEG or
+WebP), and a small thumbnail is made for list views. The same bytes are then sent to Gemini and to
+Firebase Storage. A 64-bit difference hash (dHash) of the normalized image is computed at the same
+time so near-duplicate uploads can be matched (see recognition_cache). Pillow work is CPU-bound, so
+async callers run it in a worker thread.
+"""
+import asyncio
+import io
+import time
+from typing import NamedTuple
+
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError, features
+
+from config import config
+
+_FORMATS = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+class PreparedImage(NamedTuple):
+    """Preprocessed image and thumbnail ready for recognition and upload"""
+    data: bytes
+    content_type: str
+    width: int
+    height: int
+    thumbnail: bytes
+    thumbnail_content_type: str
+    original_size: int
+    image_hash: int
+    elapsed_ms: float
+
+    @property
+    def extension(self) -> str:
+        return self.content_type.split("/")[1].replace("jpeg", "jpg")
+
+def _output_format(requested: str) -> str:
+    fmt = (requested or "JPEG").upper()
+    if fmt == "WEBP" and not features.check("webp"):
+        return "JPEG"
+    return fmt if fmt in _FORMATS else "JPEG"
+
+def _to_rgb(image: Image.Image) -> Image.Image:
+    """Flatten transparency onto white (JPEG has no alpha channel)"""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB") if image.mode != "RGB" else image
+
+def _encode(image: Image.Image, fmt: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "JPEG":
+        image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, format=fmt, quality=quality, method=4)
+    return buffer.getvalue()
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash: one bit per horizontally adjacent pixel pair of a (hash_size+1) x hash_size
+    grayscale copy. Re-encoding, resizing and small edits change only a few bits.
+    """
+    pixels = list(image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def preprocess_image(image_data: bytes, max_edge: int = None, output_format: str = None,
+                     quality: int = None, thumbnail_edge: int = None) -> PreparedImage:
+    """
+    Normalize an uploaded image for recognition and storage
+
+    Args:
+        image_data: Raw uploaded bytes
+        max_edge: Longest edge in pixels after downscaling (default IMAGE_MAX_EDGE)
+        output_format: "JPEG" or "WEBP" (default IMAGE_OUTPUT_FORMAT; JPEG if WebP is unsupported)
+        quality: Encoder quality 1-95 (default IMAGE_QUALITY)
+        thumbnail_edge: Longest edge of the thumbnail (default IMAGE_THUMBNAIL_EDGE)
+
+    Returns:
+        PreparedImage with the processed image and its thumbnail
+
+    Raises:
+        ValueError: The bytes are not a readable image
+    """
+    started = time.perf_counter()
+    max_edge = max_edge or config.IMAGE_MAX_EDGE
+    fmt = _output_format(output_format or config.IMAGE_OUTPUT_FORMAT)
+    quality = quality or config.IMAGE_QUALITY
+    thumbnail_edge = thumbnail_edge or config.IMAGE_THUMBNAIL_EDGE
+
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        source_format, source_size = image.format, image.size
+        # JPEG: let the decoder downscale by a power of two (much faster than decoding full size)
+        image.draft("RGB", (max_edge, max_edge))
+        rotated = image.getexif().get(ExifTags.Base.Orientation, 1) not in (0, 1)
+        if rotated:
+            image = ImageOps.exif_transpose(image)
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Unsupported image: {str(e)}") from e
+
+    if max(image.size) > max_edge:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    image = _to_rgb(image)
+
+    if not rotated and source_format == fmt and max(source_size) <= max_edge:
+        # Already small, upright and in the target format: keep the original bytes (no re-encode loss)
+        data = image_data
+    else:
+        data = _encode(image, fmt, quality)
+
+    thumbnail = image.copy()
+    thumbnail.thumbnail((thumbnail_edge, thumbnail_edge), Image.LANCZOS)
+    thumbnail_data = _encode(thumbnail, fmt, min(quality, 75))
+
+    return PreparedImage(
+        data=data,
+        content_type=_FORMATS[fmt],
+        width=image.width,
+        height=image.height,
+        thumbnail=thumbnail_data,
+        thumbnail_content_type=_FORMATS[fmt],
+        original_size=len(image_data),
+        image_hash=dhash(thumbnail),
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+    )
+
+async def preprocess_image_async(image_data: bytes, **options) -> PreparedImage:
+    """preprocess_image() in a worker thread so the event loop is not blocked"""
+    return await asyncio.to_thread(preprocess_image, image_data, **options)
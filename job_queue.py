@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+Hàng đợi job nền trong process cho các tác vụ phụ sau response
+
+Handler đưa tác vụ phụ (ghi Firestore, lưu lịch sử chat...) vào hàng đợi rồi trả response ngay.
+Một pool worker thread chạy các job; job lỗi được thử lại với backoff lũy thừa, hết số lần thử
+thì được ghi vào file dead-letter (JSONL) trên đĩa để xem lại hoặc chạy lại bằng replay_dead_letters().
+
+Job được gọi theo tên handler đã đăng ký (không phải closure) để bản ghi dead-letter chạy lại được
+sau khi restart; tham số nên là dữ liệu JSON được.
+
+Job ghi đè trạng thái (vd kế hoạch mới nhất của một người dùng) được đưa vào kèm supersede_key: job mới
+cùng tên và cùng key thay thế job cũ chưa chạy hoặc đang chờ thử lại, các job cùng key không chạy song
+song, nên một lần ghi cũ bị thử lại không đè lên dữ liệu mới hơn.
+"""
+import contextlib
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import config
+
+class Job:
+    """Một lần gọi handler kèm trạng thái thử lại"""
+
+    __slots__ = ("id", "name", "args", "kwargs", "max_attempts", "supersede_key", "attempts", "enqueued_at",
+                 "last_error")
+
+    def __init__(self, name: str, args: tuple, kwargs: dict, max_attempts: int, supersede_key: str = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.max_attempts = max_attempts
+        self.supersede_key = supersede_key
+        self.attempts = 0
+        self.enqueued_at = time.time()
+        self.last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "args": list(self.args),
+            "kwargs": self.kwargs,
+            "supersede_key": self.supersede_key,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "enqueued_at": datetime.fromtimestamp(self.enqueued_at).isoformat(),
+            "last_error": self.last_error,
+        }
+
+class JobQueue:
+    """Hàng đợi job với worker pool, retry backoff và dead-letter (thread-safe)"""
+
+    def __init__(self, workers: int = 4, max_attempts: int = 3, backoff_base: float = 1.0,
+                 backoff_max: float = 60.0, dead_letter_path: str = None):
+        """
+        Args:
+            workers: Số worker thread
+            max_attempts: Số lần chạy tối đa mặc định của một job (kể cả lần đầu)
+            backoff_base: Thời gian chờ trước lần thử lại đầu tiên (giây), nhân đôi mỗi lần
+            backoff_max: Thời gian chờ tối đa giữa hai lần thử
+            dead_letter_path: File JSONL lưu job thất bại hẳn (None: chỉ giữ trong bộ nhớ)
+        """
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.dead_letter_path = dead_letter_path
+        self._handlers: Dict[str, Callable[..., Any]] = {}
+        self._condition = threading.Condition()
+        self._heap: List[tuple] = []  # (chạy lúc, thứ tự, job)
+        self._sequence = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self._running = False
+        self._in_flight = 0
+        self._recent_dead: List[Dict[str, Any]] = []
+        self._latest_keyed: Dict[Tuple[str, str], str] = {}  # (tên, supersede_key) -> id job mới nhất
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._counters = {"enqueued": 0, "succeeded": 0, "failed_attempts": 0, "retried": 0, "dead_lettered": 0,
+                          "superseded": 0}
+        self._by_name: Dict[str, Dict[str, float]] = {}
+
+    def handler(self, name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Decorator đăng ký handler theo tên; handler báo lỗi (raise) để được thử lại"""
+        def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+            self._handlers[name] = fn
+            return fn
+        return decorator
+
+    def register(self, name: str, fn: Callable[..., Any]) -> None:
+        self._handlers[name] = fn
+
+    def enqueue(self, name: str, *args, max_attempts: int = None, supersede_key: str = None, **kwargs) -> str:
+        """
+        Đưa job vào hàng đợi (worker được khởi động nếu chưa chạy)
+
+        Args:
+            name: Tên handler đã đăng ký
+            *args, **kwargs: Tham số truyền cho handler
+            max_attempts: Ghi đè số lần thử tối đa cho job này
+            supersede_key: Job cùng tên và cùng key đưa vào trước đó bị bỏ nếu chưa chạy xong
+                (không chạy, không thử lại); các job cùng key không chạy song song
+
+        Returns:
+            ID của job
+
+        Raises:
+            KeyError: Chưa đăng ký handler này
+        """
+        if name not in self._handlers:
+            raise KeyError(f"Unknown job handler: {name}")
+        job = Job(name, args, kwargs, max_attempts or self.max_attempts, supersede_key)
+        self.start()
+        with self._condition:
+            self._counters["enqueued"] += 1
+            if supersede_key is not None:
+                self._latest_keyed[(name, supersede_key)] = job.id
+                self._key_locks.setdefault((name, supersede_key), threading.Lock())
+                pending = [entry for entry in self._heap if not self._is_superseded(entry[2])]
+                if len(pending) != len(self._heap):
+                    self._counters["superseded"] += len(self._heap) - len(pending)
+                    self._heap = pending
+                    heapq.heapify(self._heap)
+            heapq.heappush(self._heap, (time.monotonic(), next(self._sequence), job))
+            self._condition.notify()
+        return job.id
+
+    def start(self) -> None:
+        """Khởi động worker pool (gọi nhiều lần không sao)"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._threads = [
+                threading.Thread(target=self._worker, name=f"job-worker-{index}", daemon=True)
+                for index in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 10.0) -> int:
+        """
+        Chờ các job đang có chạy xong rồi dừng worker; job còn lại sau timeout được ghi dead-letter
+
+        Returns:
+            Số job chưa chạy được ghi vào dead-letter
+        """
+        self.drain(timeout)
+        with self._condition:
+            self._running = False
+            leftover = [job for _, _, job in self._heap]
+            self._heap.clear()
+            self._condition.notify_all()
+        for job in leftover:
+            job.last_error = job.last_error or "not run before shutdown"
+            self._dead_letter(job)
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+        return len(leftover)
+
+    def drain(self, timeout: float = None) -> bool:
+        """Chờ tới khi hàng đợi rỗng và không còn job đang chạy; False nếu hết timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._heap or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def _is_superseded(self, job: Job) -> bool:
+        """Đã có job mới hơn cùng tên và supersede_key (gọi khi giữ self._condition)"""
+        if job.supersede_key is None:
+            return False
+        return self._latest_keyed.get((job.name, job.supersede_key), job.id) != job.id
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _worker(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if not self._running:
+                        return
+                    if self._heap:
+                        wait = self._heap[0][0] - time.monotonic()
+                        if wait <= 0:
+                            _, _, job = heapq.heappop(self._heap)
+                            self._in_flight += 1
+                            break
+                        self._condition.wait(wait)
+                    else:
+                        self._condition.wait()
+            self._run(job)
+
+    def _run(self, job: Job) -> None:
+        key_lock = None
+        if job.supersede_key is not None:
+            with self._condition:
+                key_lock = self._key_locks.setdefault((job.name, job.supersede_key), threading.Lock())
+
+        # Job cùng supersede_key chạy lần lượt; job đã có bản mới hơn thì bỏ qua
+        with key_lock or contextlib.nullcontext():
+            with self._condition:
+                superseded = self._is_superseded(job)
+                if superseded:
+                    self._counters["superseded"] += 1
+            if not superseded:
+                self._run_once(job)
+
+        # Chỉ hết "đang chạy" sau khi đã ghi dead-letter để drain() không trả về sớm
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def _run_once(self, job: Job) -> None:
+        job.attempts += 1
+        started = time.perf_counter()
+        error = None
+        try:
+            self._handlers[job.name](*job.args, **job.kwargs)
+        except Exception as e:
+            error = e
+        duration = time.perf_counter() - started
+
+        retry_at = None
+        dropped = False
+        with self._condition:
+            stats = self._by_name.setdefault(job.name, {"succeeded": 0, "failed_attempts": 0, "dead_lettered": 0,
+                                                        "total_seconds": 0.0})
+            stats["total_seconds"] += duration
+            if error is None:
+                self._counters["succeeded"] += 1
+                stats["succeeded"] += 1
+            else:
+                job.last_error = f"{type(error).__name__}: {error}"
+                self._counters["failed_attempts"] += 1
+                stats["failed_attempts"] += 1
+                if self._is_superseded(job):
+                    # Đã có job mới hơn cùng key: không thử lại, không ghi dead-letter
+                    dropped = True
+                    self._counters["superseded"] += 1
+                elif job.attempts < job.max_attempts and self._running:
+                    retry_at = time.monotonic() + self._backoff(job.attempts)
+                    self._counters["retried"] += 1
+                    heapq.heappush(self._heap, (retry_at, next(self._sequence), job))
+                else:
+                    stats["dead_lettered"] += 1
+            if retry_at is None and job.supersede_key is not None and not self._is_superseded(job):
+                # Job mới nhất của key đã xong: bỏ trạng thái của key
+                self._latest_keyed.pop((job.name, job.supersede_key), None)
+                self._key_locks.pop((job.name, job.supersede_key), None)
+
+        if dropped:
+            print(f"Job {job.name} ({job.id}) failed and was superseded by a newer job: {job.last_error}")
+        elif error is not None and retry_at is not None:
+            print(f"⚠️ Job {job.name} ({job.id}) failed attempt {job.attempts}/{job.max_attempts}: {job.last_error}")
+        elif error is not None:
+            print(f"❌ Job {job.name} ({job.id}) failed after {job.attempts} attempts: {job.last_error}")
+            traceback.print_exception(type(error), error, error.__traceback__)
+            self._dead_letter(job)
+
+    def _dead_letter(self, job: Job) -> None:
+        record = job.to_dict()
+        record["failed_at"] = datetime.now().isoformat()
+        with self._condition:
+            self._counters["dead_lettered"] += 1
+            self._recent_dead = (self._recent_dead + [record])[-20:]
+        if not self.dead_letter_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            print(f"Error writing dead-letter job {job.id}: {str(e)}")
+
+    def dead_letters(self, limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+        """Các job thất bại hẳn gần nhất (từ file dead-letter nếu có; limit=None: tất cả)"""
+        if not self.dead_letter_path or not os.path.exists(self.dead_letter_path):
+            with self._condition:
+                return list(self._recent_dead[-limit:] if limit else self._recent_dead)
+        with open(self.dead_letter_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        if limit:
+            lines = lines[-limit:]
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def replay_dead_letters(self) -> int:
+        """
+        Đưa lại các job trong file dead-letter vào hàng đợi và xóa file
+
+        Returns:
+            Số job được đưa lại (bỏ qua job có handler không còn tồn tại)
+        """
+        if not self.dead_letter_path or not os.path.exists(self.dead_letter_path):
+            return 0
+        records = self.dead_letters(limit=None)
+        os.remove(self.dead_letter_path)
+        replayed = 0
+        for record in records:
+            if record["name"] in self._handlers:
+                self.enqueue(record["name"], *record.get("args", []), supersede_key=record.get("supersede_key"),
+                             **record.get("kwargs", {}))
+                replayed += 1
+        return replayed
+
+    def stats(self) -> Dict[str, Any]:
+        """Số liệu hàng đợi cho endpoint thông tin"""
+        with self._condition:
+            now = time.monotonic()
+            return {
+                "running": self._running,
+                "workers": self.workers,
+                "queued": sum(1 for run_at, _, _ in self._heap if run_at <= now),
+                "scheduled_retries": sum(1 for run_at, _, _ in self._heap if run_at > now),
+                "in_flight": self._in_flight,
+                **self._counters,
+                "jobs": {
+                    name: {**stats, "total_seconds": round(stats["total_seconds"], 3)}
+                    for name, stats in self._by_name.items()
+                },
+            }
+
+# Global instance
+job_queue = JobQueue(
+    workers=config.JOB_QUEUE_WORKERS,
+    max_attempts=config.JOB_MAX_ATTEMPTS,
+    backoff_base=config.JOB_BACKOFF_SECONDS,
+    dead_letter_path=config.JOB_DEAD_LETTER_FILE,
+)
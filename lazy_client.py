@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Khởi tạo lười (lazy) cho client dịch vụ ngoài
+
+Import SDK (google.generativeai, groq, openai, firebase storage) và tạo client tốn hàng trăm ms
+mỗi cái, làm cold start chậm dù request đầu tiên có thể không cần tới chúng. LazyClient dời việc
+import/khởi tạo tới lần dùng đầu tiên (hoặc bước warm-up chạy nền), an toàn khi nhiều thread cùng
+gọi, và ghi lại thời gian khởi tạo.
+"""
+import importlib.util
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+class LazyClient:
+    """
+    Giữ một client được tạo bằng factory ở lần get() đầu tiên
+
+    Factory trả về None hoặc raise nghĩa là client không khả dụng; kết quả (kể cả lỗi) được giữ lại,
+    các lần get() sau không thử lại cho tới khi reset().
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        """
+        Args:
+            name: Tên client (dùng trong log và trạng thái)
+            factory: Hàm tạo client
+        """
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._value: Any = None
+        self._initialized = False
+        self.error: Optional[str] = None
+        self.init_ms: Optional[float] = None
+
+    @property
+    def initialized(self) -> bool:
+        return self._initialized
+
+    @property
+    def failed(self) -> bool:
+        """Đã thử khởi tạo nhưng không có client"""
+        return self._initialized and self._value is None
+
+    def get(self) -> Any:
+        """
+        Lấy client, khởi tạo nếu chưa có
+
+        Returns:
+            Client hoặc None nếu không khả dụng
+        """
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    started = time.perf_counter()
+                    try:
+                        self._value = self._factory()
+                    except Exception as e:
+                        print(f"❌ Error initializing {self.name} client: {e}")
+                        self._value = None
+                        self.error = str(e)
+                    self.init_ms = round((time.perf_counter() - started) * 1000, 1)
+                    self._initialized = True
+        return self._value
+
+    def set(self, value: Any) -> None:
+        """Gán client có sẵn (vd: client giả lập trong test)"""
+        with self._lock:
+            self._value = value
+            self._initialized = True
+            self.error = None
+
+    def reset(self) -> None:
+        """Bỏ client hiện tại; lần get() sau sẽ khởi tạo lại"""
+        with self._lock:
+            self._value = None
+            self._initialized = False
+            self.error = None
+            self.init_ms = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "initialized": self._initialized,
+            "available": self._value is not None if self._initialized else None,
+            "init_ms": self.init_ms,
+            "error": self.error,
+        }
+
+def module_available(module_name: str) -> bool:
+    """
+    Kiểm tra package đã cài hay chưa mà không import (không tốn thời gian import SDK)
+
+    Args:
+        module_name: Tên module, vd "google.generativeai"
+
+    Returns:
+        True nếu import được
+    """
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+Định tuyến lời gọi LLM (Groq) theo độ trễ, tỉ lệ lỗi và quota còn lại của từng model
+
+Mỗi loại lời gọi (sinh JSON thực đơn, chat, phân tích giá) có một mức chất lượng tối thiểu. Router chọn
+model nhanh nhất (độ trễ trung bình trượt của chính loại lời gọi đó) trong số các model khỏe mạnh đạt
+mức chất lượng; khi model bị ngừng cung cấp (decommissioned) hoặc bị throttle (429, hết quota theo
+header x-ratelimit-*), lời gọi tự chuyển sang model kế tiếp. Không còn model nào đạt mức chất lượng thì
+hạ xuống model tốt nhất còn dùng được thay vì thất bại.
+"""
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, TypeVar
+
+from rate_limiting import is_rate_limit_error, retry_after_seconds
+
+T = TypeVar("T")
+
+# Mức chất lượng model (lớn hơn = tốt hơn)
+QUALITY_BASIC = 1
+QUALITY_STANDARD = 2
+QUALITY_HIGH = 3
+
+class ModelProfile(NamedTuple):
+    """Thông tin tĩnh của một model"""
+    name: str
+    tier: int
+    expected_latency: float  # Độ trễ ước tính (giây) khi chưa đo được
+
+MODEL_PROFILES: Dict[str, ModelProfile] = {
+    profile.name: profile for profile in (
+        ModelProfile("llama-3.3-70b-versatile", QUALITY_HIGH, 2.5),
+        ModelProfile("llama3-70b-8192", QUALITY_HIGH, 3.0),
+        ModelProfile("llama-3.1-8b-instant", QUALITY_STANDARD, 0.8),
+        ModelProfile("llama3-8b-8192", QUALITY_STANDARD, 1.0),
+        ModelProfile("mixtral-8x7b-32768", QUALITY_STANDARD, 1.5),
+        ModelProfile("gemma2-9b-it", QUALITY_BASIC, 1.0),
+    )
+}
+
+# Mức chất lượng tối thiểu theo loại lời gọi
+TASK_TIERS: Dict[str, int] = {
+    "meal_json": QUALITY_HIGH,
+    "price_analysis": QUALITY_HIGH,
+    "chat": QUALITY_STANDARD,
+}
+
+DEFAULT_MODEL = "llama3-8b-8192"
+
+_DECOMMISSIONED_MARKERS = ("decommissioned", "model_not_found", "does not exist")
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def parse_reset_duration(value: str) -> Optional[float]:
+    """
+    Parse thời gian reset trong header Groq (vd "2m59.56s", "7.66s", "120ms")
+
+    Returns:
+        Số giây, hoặc None nếu không đọc được
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+def is_model_unavailable_error(error: Exception) -> bool:
+    """Model đã ngừng cung cấp hoặc không tồn tại"""
+    message = str(error).lower()
+    return any(marker in message for marker in _DECOMMISSIONED_MARKERS)
+
+class _ModelStats:
+    """Số liệu trượt của một model (truy cập dưới lock của router)"""
+
+    def __init__(self, window: int):
+        self.latencies: Dict[str, deque] = {}
+        self.outcomes = deque(maxlen=window)  # True = thành công
+        self.decommissioned = False
+        self.throttled_until = 0.0
+        self.cooldown_until = 0.0
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+class LLMRouter:
+    """Chọn model cho từng lời gọi LLM và ghi nhận kết quả để điều chỉnh các lần chọn sau"""
+
+    def __init__(self, profiles: Dict[str, ModelProfile] = None, task_tiers: Dict[str, int] = None,
+                 window: int = 20, max_error_rate: float = 0.5, min_samples: int = 4,
+                 cooldown: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            profiles: Các model có thể định tuyến (mặc định MODEL_PROFILES)
+            task_tiers: Mức chất lượng tối thiểu theo loại lời gọi (mặc định TASK_TIERS)
+            window: Số lời gọi gần nhất dùng để tính độ trễ và tỉ lệ lỗi
+            max_error_rate: Tỉ lệ lỗi vượt ngưỡng này thì tạm ngừng dùng model
+            min_samples: Số lời gọi tối thiểu trước khi xét tỉ lệ lỗi
+            cooldown: Số giây tạm ngừng model có tỉ lệ lỗi cao (sau đó thử lại)
+            clock: Hàm thời gian (thay được trong test)
+        """
+        self.profiles = dict(MODEL_PROFILES if profiles is None else profiles)
+        self.task_tiers = dict(TASK_TIERS if task_tiers is None else task_tiers)
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats = {name: _ModelStats(window) for name in self.profiles}
+        self._available: Optional[set] = None
+
+    def set_available_models(self, model_ids: Optional[Iterable[str]]) -> None:
+        """Giới hạn định tuyến trong các model tài khoản dùng được (kết quả models.list(); None = tất cả)"""
+        with self._lock:
+            self._available = None if model_ids is None else set(model_ids)
+
+    def _healthy(self, stats: _ModelStats, now: float) -> bool:
+        return now >= stats.throttled_until and now >= stats.cooldown_until
+
+    def _latency(self, name: str, task: str) -> float:
+        samples = self._stats[name].latencies.get(task)
+        if samples:
+            return sum(samples) / len(samples)
+        return self.profiles[name].expected_latency
+
+    def candidates(self, task: str) -> List[str]:
+        """
+        Các model cho một loại lời gọi theo thứ tự nên thử
+
+        Model khỏe mạnh đạt mức chất lượng (nhanh nhất trước), rồi model khỏe mạnh dưới mức
+        (chất lượng cao trước), cuối cùng là model đang bị throttle/tạm ngừng (phương án cuối).
+        """
+        min_tier = self.task_tiers.get(task, QUALITY_STANDARD)
+        with self._lock:
+            now = self._clock()
+            usable = [
+                profile for name, profile in self.profiles.items()
+                if not self._stats[name].decommissioned and (self._available is None or name in self._available)
+            ]
+
+            def order(profile):
+                below_tier = profile.tier < min_tier
+                return (
+                    not self._healthy(self._stats[profile.name], now),
+                    below_tier,
+                    -profile.tier if below_tier else 0,
+                    self._latency(profile.name, task),
+                )
+
+            ranked = [profile.name for profile in sorted(usable, key=order)]
+        return ranked or [DEFAULT_MODEL]
+
+    def choose(self, task: str) -> str:
+        """Model tốt nhất hiện tại cho loại lời gọi"""
+        return self.candidates(task)[0]
+
+    def update_quota(self, model: str, headers) -> None:
+        """Cập nhật quota còn lại của model từ header x-ratelimit-* của Groq"""
+        if headers is None or model not in self._stats:
+            return
+        with self._lock:
+            stats = self._stats[model]
+            now = self._clock()
+            for kind in ("requests", "tokens"):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if remaining is None:
+                    continue
+                try:
+                    remaining = int(float(remaining))
+                except ValueError:
+                    continue
+                setattr(stats, f"remaining_{kind}", remaining)
+                reset = parse_reset_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if remaining <= 0 and reset:
+                    stats.throttled_until = max(stats.throttled_until, now + reset)
+
+    def record_success(self, model: str, task: str, latency: float, headers=None) -> None:
+        """Ghi nhận lời gọi thành công và độ trễ (giây)"""
+        if model not in self._stats:
+            return
+        with self._lock:
+            stats = self._stats[model]
+            stats.latencies.setdefault(task, deque(maxlen=self.window)).append(latency)
+            stats.outcomes.append(True)
+        self.update_quota(model, headers)
+
+    def record_failure(self, model: str, task: str, error: Exception) -> None:
+        """Ghi nhận lời gọi lỗi: đánh dấu model ngừng cung cấp, bị throttle hoặc tạm ngừng khi lỗi nhiều"""
+        if model not in self._stats:
+            return
+        response = getattr(error, "response", None)
+        self.update_quota(model, getattr(response, "headers", None))
+        with self._lock:
+            stats = self._stats[model]
+            now = self._clock()
+            if is_model_unavailable_error(error):
+                stats.decommissioned = True
+                print(f"LLM router: model {model} không còn khả dụng, bỏ khỏi danh sách định tuyến")
+                return
+            if is_rate_limit_error(error):
+                wait = retry_after_seconds(error)
+                stats.throttled_until = max(stats.throttled_until, now + (60 if wait is None else wait))
+                return
+            stats.outcomes.append(False)
+            if len(stats.outcomes) >= self.min_samples and stats.error_rate > self.max_error_rate:
+                # Tạm ngừng rồi cho thử lại với cửa sổ mới
+                stats.cooldown_until = now + self.cooldown
+                stats.outcomes.clear()
+                print(f"LLM router: model {model} lỗi nhiều, tạm ngừng {self.cooldown:.0f}s")
+
+    def call(self, task: str, request: Callable[[str], T], max_attempts: int = 3) -> T:
+        """
+        Gọi LLM qua model được chọn, tự chuyển model khi model bị ngừng cung cấp hoặc bị throttle
+
+        Args:
+            task: Loại lời gọi ("meal_json", "chat", "price_analysis"...)
+            request: Hàm nhận tên model và thực hiện lời gọi. Trả về phản hồi thô
+                (client.chat.completions.with_raw_response.create) để router đọc được header quota
+            max_attempts: Số model tối đa được thử
+
+        Returns:
+            Kết quả của request (đã parse nếu là phản hồi thô)
+
+        Raises:
+            Exception: Lỗi của lần thử cuối (hoặc lỗi không liên quan tới model)
+        """
+        candidates = self.candidates(task)[:max_attempts]
+        for index, model in enumerate(candidates):
+            started = time.perf_counter()
+            try:
+                result = request(model)
+            except Exception as e:
+                self.record_failure(model, task, e)
+                switch_model = is_model_unavailable_error(e) or is_rate_limit_error(e)
+                if switch_model and index < len(candidates) - 1:
+                    print(f"LLM router: {model} lỗi ({str(e)[:80]}), chuyển sang {candidates[index + 1]}")
+                    continue
+                raise
+            headers = None
+            if hasattr(result, "headers") and hasattr(result, "parse"):
+                # Phản hồi thô (completions.with_raw_response.create): đọc header quota rồi parse ra kết quả
+                headers = result.headers
+                result = result.parse()
+            self.record_success(model, task, time.perf_counter() - started, headers)
+            return result
+
+    def status(self) -> Dict[str, Dict]:
+        """Trạng thái từng model cho endpoint thông tin"""
+        with self._lock:
+            now = self._clock()
+            return {
+                name: {
+                    "tier": profile.tier,
+                    "available": self._available is None or name in self._available,
+                    "decommissioned": self._stats[name].decommissioned,
+                    "healthy": self._healthy(self._stats[name], now),
+                    "throttled_for_seconds": round(max(0.0, self._stats[name].throttled_until - now), 1),
+                    "error_rate": round(self._stats[name].error_rate, 2),
+                    "latency_seconds": {
+                        task: round(sum(samples) / len(samples), 3)
+                        for task, samples in self._stats[name].latencies.items() if samples
+                    },
+                    "remaining_requests": self._stats[name].remaining_requests,
+                    "remaining_tokens": self._stats[name].remaining_tokens,
+                }
+                for name, profile in self.profiles.items()
+            }
+
+# Global instance
+llm_router = LLMRouter()
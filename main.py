@@ -1,14 +1,15 @@
-from fastapi import FastAPI, HTTPException, Depends, Query, Body, Path, Header, Security, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, Depends, Query, Body, Path, Header, Security, File, UploadFile, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
 from typing import Dict, Optional, List, Any
+import asyncio
 import time
 import os
 import json
 from datetime import datetime
 import logging
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from datetime import timedelta as Duration
 import auth_utils as auth_service
 
@@ -21,13 +22,8 @@ from auth_utils import get_current_user, security, ensure_user_in_firestore, get
 # Import DAYS_OF_WEEK từ utils
 from utils import DAYS_OF_WEEK
 
-# Thiết lập logger
+# Thiết lập logger (handler được cấu hình khi startup, xem structured_logging)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-if not logger.handlers:
-    handler = logging.StreamHandler()
-    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-    logger.addHandler(handler)
 
 # Thêm các import còn thiếu
 try:
@@ -67,14 +63,14 @@ from auth_utils import get_current_user, security, ensure_user_in_firestore
 from generate_random_data import generate_weekly_plan
 
 # Import USDA API integration
-from usda_integration import usda_api
+from usda_integration import usda_api, usda_async_api
 
 # Import routers
 from routers import firestore_router, api_router, compat_router, meal_plan_router, openfood_router, admin_router, youtube_router
 
 # Thêm import cho chat API
 from pydantic import BaseModel, Field, validator
-from openai import OpenAI
+from lazy_client import LazyClient
 
 # Firebase Admin SDK
 import firebase_admin
@@ -86,6 +82,24 @@ from food_recognition_service import food_recognition_service
 # Import Firebase Storage
 from firebase_storage_service import firebase_storage_service
 
+# HTTP client dùng chung cho API bên ngoài
+from http_clients import http_clients
+from rate_limiting import PRIORITY_INTERACTIVE
+from llm_router import llm_router
+from circuit_breaker import CircuitOpenError, circuit_breakers
+
+# Hàng đợi job nền cho tác vụ phụ sau response
+from job_queue import job_queue
+
+# Histogram độ trễ theo route/upstream, xuất ở /metrics
+from metrics import metrics, MetricsMiddleware
+
+# Logging có cấu trúc với correlation ID theo request
+from structured_logging import LazyJSON, RequestContextMiddleware, setup_logging, shutdown_logging
+
+# Startup warm-up
+from warmup import start_warmup_in_background, warmup_state, register_warmup_task
+
 # YouTube services removed
 
 # Initialize Firebase Admin SDK
@@ -96,6 +110,45 @@ from firebase_storage_service import firebase_storage_service
 # import json
 # from config import config # Đảm bảo config được import
 
+def _check_firebase_storage(cred, firebase_config: Dict[str, Any]) -> None:
+    """
+    Kiểm tra kết nối Firebase Storage, thử đặt storageBucket mặc định nếu không kết nối được
+
+    Args:
+        cred: Credentials đã dùng để khởi tạo Firebase Admin SDK
+        firebase_config: Cấu hình Firebase đã dùng
+    """
+    print("Testing Firebase Storage connection...")
+    if firebase_storage_service.check_connection():
+        print("Successfully connected to Firebase Storage!")
+    else:
+        print("WARNING: Could not connect to Firebase Storage!")
+
+        # Nếu không thể kết nối, kiểm tra và cố gắng sửa cấu hình storageBucket
+        if not firebase_config.get('storageBucket'):
+            # Thử thiết lập storageBucket mặc định nếu chưa có
+            default_bucket = "food-ai-96ef6.appspot.com"
+            print(f"Attempting to set default storage bucket: {default_bucket}")
+
+            try:
+                # Tạo cấu hình mới với storageBucket
+                updated_config = firebase_config.copy()
+                updated_config['storageBucket'] = default_bucket
+
+                # Khởi tạo lại app với cấu hình mới
+                firebase_admin.delete_app(firebase_admin.get_app())
+                firebase_admin.initialize_app(cred, updated_config)
+                firebase_storage_service.reset()
+                print(f"Reinitialized Firebase with storage bucket: {default_bucket}")
+
+                # Kiểm tra lại kết nối
+                if firebase_storage_service.check_connection():
+                    print("Successfully connected to Firebase Storage after reconfiguration!")
+                else:
+                    print("Still unable to connect to Firebase Storage after reconfiguration.")
+            except Exception as storage_error:
+                print(f"Error setting default storage bucket: {storage_error}")
+
 try:
     firebase_app = firebase_admin.get_app()
     print("Firebase Admin SDK đã được khởi tạo trước đó.")
@@ -156,36 +209,8 @@ except ValueError:  # Nghĩa là chưa có app nào được khởi tạo
             print(f"Firebase Admin SDK initialized successfully using {initialized_method}.")
             print(f"Project ID: {firebase_admin.get_app().project_id}, Storage Bucket: {firebase_config['storageBucket']}")
             
-            # Kiểm tra kết nối với Storage
-            print("Testing Firebase Storage connection...")
-            if firebase_storage_service.check_connection():
-                print("Successfully connected to Firebase Storage!")
-            else:
-                print("WARNING: Could not connect to Firebase Storage!")
-                
-                # Nếu không thể kết nối, kiểm tra và cố gắng sửa cấu hình storageBucket
-                if not firebase_config.get('storageBucket'):
-                    # Thử thiết lập storageBucket mặc định nếu chưa có
-                    default_bucket = "food-ai-96ef6.appspot.com"
-                    print(f"Attempting to set default storage bucket: {default_bucket}")
-                    
-                    try:
-                        # Tạo cấu hình mới với storageBucket
-                        updated_config = firebase_config.copy()
-                        updated_config['storageBucket'] = default_bucket
-                        
-                        # Khởi tạo lại app với cấu hình mới
-                        firebase_admin.delete_app(firebase_admin.get_app())
-                        firebase_admin.initialize_app(cred, updated_config)
-                        print(f"Reinitialized Firebase with storage bucket: {default_bucket}")
-                        
-                        # Kiểm tra lại kết nối
-                        if firebase_storage_service.check_connection():
-                            print("Successfully connected to Firebase Storage after reconfiguration!")
-                        else:
-                            print("Still unable to connect to Firebase Storage after reconfiguration.")
-                    except Exception as storage_error:
-                        print(f"Error setting default storage bucket: {storage_error}")
+            # Kiểm tra kết nối Storage (gọi mạng) chạy trong warm-up nền thay vì lúc import
+            register_warmup_task("firebase_storage_check", lambda: _check_firebase_storage(cred, firebase_config))
         except Exception as e:
             print(f"Lỗi khi gọi firebase_admin.initialize_app: {e}")
             # raise e # Bỏ comment nếu muốn dừng hẳn
@@ -209,48 +234,25 @@ app.add_middleware(
     expose_headers=["Content-Length", "Content-Range", "Content-Disposition"],
 )
 
-# Middleware để ghi log các request
-@app.middleware("http")
-async def log_requests(request, call_next):
-    path = request.url.path
-    method = request.method
-    
-    # Log chi tiết cho endpoint /sync
-    if path == "/sync" or path.endswith("/sync"):
-        print(f"\n===== REQUEST {method} {path} =====")
-        print(f"Query params: {request.query_params}")
-        try:
-            body = await request.body()
-            if body:
-                print(f"Request body length: {len(body)} bytes")
-                if len(body) < 1000:  # Chỉ in nếu body không quá dài
-                    try:
-                        body_json = json.loads(body)
-                        print(f"Request body (JSON): {json.dumps(body_json, indent=2)[:500]}...")
-                    except:
-                        print(f"Request body: {body[:200]}...")
-        except Exception as e:
-            print(f"Error reading request body: {str(e)}")
-    
-    response = await call_next(request)
-    
-    # Log chi tiết cho endpoint /sync
-    if path == "/sync" or path.endswith("/sync"):
-        print(f"===== RESPONSE {response.status_code} =====\n")
-    
-    return response
+# Ghi độ trễ mỗi request theo route template và nhóm mã trạng thái
+app.add_middleware(MetricsMiddleware)
 
-# Khởi tạo Groq client cho chat API
+# Correlation ID (X-Request-ID) và access log có cấu trúc; thêm sau cùng để bọc ngoài mọi middleware khác
+app.add_middleware(RequestContextMiddleware)
+
+# Groq client cho chat API (OpenAI-compatible), khởi tạo ở request chat đầu tiên
 groq_api_key = os.environ.get("GROQ_API_KEY", "")
-try:
-    chat_client = OpenAI(
+chat_available = bool(groq_api_key)
+
+def _create_chat_client():
+    from openai import OpenAI
+    return OpenAI(
         api_key=groq_api_key,
-        base_url="https://api.groq.com/openai/v1"
+        base_url="https://api.groq.com/openai/v1",
+        timeout=config.GROQ_TIMEOUT
     )
-    chat_available = bool(groq_api_key)
-except:
-    chat_client = None
-    chat_available = False
+
+chat_client = LazyClient("groq_chat", _create_chat_client)
 
 # Chat API models
 class ChatMessage(BaseModel):
@@ -361,6 +363,61 @@ async def root():
     """Root endpoint to check if API is running"""
     return {"message": "Welcome to DietAI API. Visit /docs for API documentation."}
 
+@app.on_event("startup")
+async def start_logging():
+    """Cấu hình logging có cấu trúc, ghi stdout trong thread nền"""
+    setup_logging()
+
+@app.on_event("startup")
+async def open_http_clients():
+    """Tạo các HTTP client dùng chung (keep-alive pool) cho API bên ngoài"""
+    http_clients.startup()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Đóng các HTTP client và pool kết nối"""
+    await http_clients.aclose()
+
+@app.on_event("startup")
+async def start_job_queue():
+    """Khởi động worker của hàng đợi job nền"""
+    job_queue.start()
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    """Chạy nốt các job còn lại (job chưa chạy kịp được ghi dead-letter)"""
+    await asyncio.to_thread(job_queue.stop, 10.0)
+
+@app.on_event("shutdown")
+async def stop_logging():
+    """Ghi nốt các bản ghi log còn trong hàng đợi (sau cùng, để giữ log của các hook shutdown khác)"""
+    shutdown_logging()
+
+@job_queue.handler("chat.save_history")
+def save_chat_history_job(chat_id: str, chat_data: Dict[str, Any]) -> None:
+    """Lưu một lượt chat vào collection chat_history"""
+    from firebase_admin import firestore
+    firestore.client().collection("chat_history").document(chat_id).set(chat_data)
+    print(f"Đã lưu chat với ID: {chat_id}")
+
+@app.on_event("startup")
+async def start_warmup():
+    """Build các bảng tra cứu tĩnh và chọn model Groq trong thread nền"""
+    start_warmup_in_background()
+
+@app.get("/health")
+async def health_check():
+    """
+    Health check cho nền tảng deploy: trả 503 khi instance còn đang warm-up
+    
+    Returns:
+    - Trạng thái warm-up (200 khi sẵn sàng nhận traffic)
+    """
+    return JSONResponse(
+        status_code=200 if warmup_state.ready else 503,
+        content=warmup_state.to_dict()
+    )
+
 @app.get("/debug/groq")
 async def debug_groq():
     """Debug endpoint to check Groq integration on Render"""
@@ -415,8 +472,9 @@ async def debug_groq():
         debug_info["groq_service_available"] = service.available
 
         if service.available:
-            # Test meal generation
-            meals = service.generate_meal_suggestions(
+            # Test meal generation (chờ quota Groq đồng bộ: chạy trong thread để không chặn event loop)
+            meals = await asyncio.to_thread(
+                service.generate_meal_suggestions,
                 calories_target=300,
                 protein_target=20,
                 fat_target=10,
@@ -539,7 +597,7 @@ async def check_ai_availability():
     try:
         # Kiểm tra Groq LLaMA 3
         try:
-            from groq_integration import groq_service  # Enhanced version  # Fixed version
+            from groq_integration import groq_service, groq_rate_limit_status  # Enhanced version  # Fixed version
             if groq_service.available:
                 return {
                     "ai_available": True,
@@ -570,21 +628,17 @@ async def get_cache_info():
     - Thông tin về cache và rate limiting
     """
     try:
-        from groq_integration import groq_service  # Enhanced version  # Fixed version
+        from groq_integration import groq_service, groq_rate_limit_status  # Enhanced version  # Fixed version
         cache_info = groq_service.get_cache_info()
         
-        rate_limiter_info = {
-            "requests_per_minute": groq_service.rate_limiter.requests_per_minute,
-            "requests_per_day": groq_service.rate_limiter.requests_per_day,
-            "minute_requests_used": groq_service.rate_limiter.minute_requests,
-            "day_requests_used": groq_service.rate_limiter.day_requests,
-            "minute_reset_in_seconds": max(0, int(groq_service.rate_limiter.minute_reset_time - time.time())),
-            "day_reset_in_seconds": max(0, int(groq_service.rate_limiter.day_reset_time - time.time()))
-        }
+        rate_limiter_info = groq_rate_limit_status()
+        
+        from recognition_cache import recognition_cache
         
         return {
             "cache": cache_info,
             "rate_limiter": rate_limiter_info,
+            "recognition_cache": recognition_cache.stats(),
             "ai_available": groq_service.available
         }
     except Exception as e:
@@ -606,7 +660,7 @@ async def get_api_status():
         
         # Kiểm tra Groq LLaMA 3
         try:
-            from groq_integration import groq_service  # Enhanced version  # Fixed version
+            from groq_integration import groq_service, groq_rate_limit_status  # Enhanced version  # Fixed version
             if groq_service.available:
                 current_time = time.time()
                 quota_status = {
@@ -623,14 +677,7 @@ async def get_api_status():
                     reset_time_utc = datetime.datetime.utcfromtimestamp(groq_service.quota_reset_time).isoformat()
                     quota_status["estimated_reset_time_utc"] = reset_time_utc
                 
-                rate_limit_status = {
-                    "minute_limit": groq_service.rate_limiter.requests_per_minute,
-                    "day_limit": groq_service.rate_limiter.requests_per_day,
-                    "minute_used": groq_service.rate_limiter.minute_requests,
-                    "day_used": groq_service.rate_limiter.day_requests,
-                    "minute_reset_in": max(0, int(groq_service.rate_limiter.minute_reset_time - current_time)),
-                    "day_reset_in": max(0, int(groq_service.rate_limiter.day_reset_time - current_time)),
-                }
+                rate_limit_status = groq_rate_limit_status()
                 
                 return {
                     "ai_available": True,
@@ -639,6 +686,10 @@ async def get_api_status():
                     "use_fallback_data": groq_service.quota_exceeded or not groq_service.available,
                     "quota_status": quota_status,
                     "rate_limits": rate_limit_status,
+                    "models": llm_router.status(),
+                    "circuit_breakers": circuit_breakers.status(),
+                    "job_queue": job_queue.stats(),
+                    "latency": metrics.summary(),
                     "server_time_utc": datetime.datetime.utcnow().isoformat()
                 }
         except ImportError:
@@ -649,6 +700,9 @@ async def get_api_status():
             "ai_available": False,
             "ai_type": "None",
             "use_fallback_data": True,
+            "circuit_breakers": circuit_breakers.status(),
+            "job_queue": job_queue.stats(),
+            "latency": metrics.summary(),
             "server_time_utc": datetime.datetime.utcnow().isoformat()
         }
     except Exception as e:
@@ -658,6 +712,13 @@ async def get_api_status():
             "error": f"Error checking API status: {str(e)}"
         }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Histogram độ trễ theo Prometheus text format (request HTTP theo route, lời gọi dịch vụ bên ngoài)
+    """
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post("/clear-cache")
 async def clear_cache():
     """
@@ -710,7 +771,7 @@ async def search_usda_foods(
                 detail="USDA API không khả dụng. Vui lòng cấu hình USDA_API_KEY trong biến môi trường."
             )
         
-        results = usda_api.search_foods(query, vietnamese=vietnamese, max_results=max_results)
+        results = await usda_async_api.search_foods(query, vietnamese=vietnamese, max_results=max_results)
         
         return {
             "query": query,
@@ -741,7 +802,7 @@ async def get_usda_food(
                 detail="USDA API không khả dụng. Vui lòng cấu hình USDA_API_KEY trong biến môi trường."
             )
         
-        food_detail = usda_api.get_food_detail(food_id)
+        food_detail = await usda_async_api.get_food_detail(food_id)
         
         if not food_detail:
             raise HTTPException(status_code=404, detail=f"Không tìm thấy thực phẩm có ID: {food_id}")
@@ -776,7 +837,7 @@ async def get_nutrition_info(
                 detail="USDA API không khả dụng. Vui lòng cấu hình USDA_API_KEY trong biến môi trường."
             )
         
-        nutrition_info = usda_api.get_nutrition_info(query, amount, vietnamese=vietnamese)
+        nutrition_info = await usda_async_api.get_nutrition_info(query, amount, vietnamese=vietnamese)
         
         if not nutrition_info:
             raise HTTPException(status_code=404, detail=f"Không tìm thấy thông tin dinh dưỡng cho: {query}")
@@ -791,6 +852,53 @@ async def get_nutrition_info(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Lỗi khi lấy thông tin dinh dưỡng: {str(e)}")
 
+# USDA batch API models
+class USDANutritionBatchItem(BaseModel):
+    query: str = Field(..., description="Tên thực phẩm cần tìm (tiếng Việt hoặc tiếng Anh)")
+    amount: Optional[str] = Field(None, description="Số lượng (ví dụ: '100g', '1 cup')")
+
+class USDANutritionBatchRequest(BaseModel):
+    items: List[USDANutritionBatchItem] = Field(..., max_length=50, description="Danh sách thực phẩm")
+    vietnamese: bool = Field(True, description="Có phải truy vấn tiếng Việt không")
+
+@app.post("/usda/nutrition/batch", tags=["USDA Food Database"])
+async def get_nutrition_info_batch(request: USDANutritionBatchRequest):
+    """
+    Lấy thông tin dinh dưỡng cho nhiều thực phẩm trong một request.
+    
+    Các truy vấn được gửi tới USDA song song (giới hạn số request đồng thời và tốc độ),
+    kết quả dùng chung cache với endpoint /usda/nutrition.
+    
+    Parameters:
+    - items: Danh sách {query, amount}
+    - vietnamese: Có phải truy vấn tiếng Việt không
+    
+    Returns:
+    - Thông tin dinh dưỡng theo đúng thứ tự items
+    """
+    if not usda_api.available:
+        raise HTTPException(
+            status_code=503, 
+            detail="USDA API không khả dụng. Vui lòng cấu hình USDA_API_KEY trong biến môi trường."
+        )
+    
+    try:
+        results = await usda_async_api.get_nutrition_many(
+            [item.query for item in request.items],
+            [item.amount for item in request.items],
+            vietnamese=request.vietnamese
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi khi lấy thông tin dinh dưỡng: {str(e)}")
+    
+    return {
+        "count": len(results),
+        "results": [
+            {"query": item.query, "amount": item.amount, "nutrition": nutrition}
+            for item, nutrition in zip(request.items, results)
+        ]
+    }
+
 @app.get("/usda/translate", tags=["USDA Food Database"])
 async def translate_food_name(
     vietnamese_query: str = Query(..., description="Tên thực phẩm bằng tiếng Việt")
@@ -1088,7 +1196,8 @@ async def chat(
     - Phản hồi từ AI
     """
     try:
-        if not chat_client or not chat_available:
+        client = chat_client.get() if chat_available else None
+        if not client:
             raise HTTPException(
                 status_code=503,
                 detail="Groq API không khả dụng. Vui lòng cấu hình GROQ_API_KEY trong biến môi trường."
@@ -1196,56 +1305,67 @@ Câu hỏi: "{message.message}"
             # Fallback to regular prompt if retrieval fails
             augmented_prompt = message.message
             
-        # Gọi Groq API với prompt đã được bổ sung dữ liệu
-        completion = chat_client.chat.completions.create(
-            model="llama3-8b-8192",  # Có thể nâng cấp lên model lớn hơn nếu cần
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "Bạn là trợ lý dinh dưỡng ảo tên là DietAI. Trả lời dựa trên dữ liệu người dùng."
-                },
-                {
-                    "role": "user", 
-                    "content": augmented_prompt
-                }
-            ],
-            temperature=0.7,
-        )
+        # Chat được ưu tiên hơn sinh thực đơn khi cùng chờ quota Groq
+        from groq_integration import groq_breaker, groq_rate_limiter, record_groq_rate_limit
+        limiter = groq_rate_limiter.get()
+        if limiter and not await limiter.acquire_async(priority=PRIORITY_INTERACTIVE, timeout=config.GROQ_CHAT_MAX_WAIT):
+            raise HTTPException(status_code=429, detail="Hệ thống đang quá tải, vui lòng thử lại sau ít phút.")
+        
+        # Gọi Groq API với prompt đã được bổ sung dữ liệu (model do llm_router chọn cho chat)
+        try:
+            completion = groq_breaker.call(llm_router.call, "chat", lambda model: client.chat.completions.with_raw_response.create(
+                model=model,
+                messages=[
+                    {
+                        "role": "system", 
+                        "content": "Bạn là trợ lý dinh dưỡng ảo tên là DietAI. Trả lời dựa trên dữ liệu người dùng."
+                    },
+                    {
+                        "role": "user", 
+                        "content": augmented_prompt
+                    }
+                ],
+                temperature=0.7,
+            ))
+        except CircuitOpenError as e:
+            raise HTTPException(
+                status_code=503,
+                detail="Trợ lý AI tạm thời không phản hồi, vui lòng thử lại sau ít phút.",
+                headers={"Retry-After": str(int(e.retry_in) + 1)}
+            )
+        except Exception as e:
+            retry_after = record_groq_rate_limit(e)
+            if retry_after is not None:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Hệ thống đang quá tải, vui lòng thử lại sau ít phút.",
+                    headers={"Retry-After": str(int(retry_after))}
+                )
+            raise
         
         # Trích xuất phản hồi từ AI
         ai_reply = completion.choices[0].message.content
         
-        # Lưu tin nhắn vào Firebase
-        try:
-            from firebase_admin import firestore
-            db = firestore.client()
-            
-            # Tạo dữ liệu chat
-            chat_data = {
-                "user_id": user_id,
-                "user_message": message.message,
-                "ai_reply": ai_reply,
-                "timestamp": datetime.now().isoformat(),
-                "model": "llama3-8b-8192",
-                "augmented": True  # Đánh dấu đây là câu trả lời đã được tăng cường
-            }
-            
-            # Tạo ID cho chat
-            import uuid
-            chat_id = str(uuid.uuid4())
-            
-            # Lưu vào Firestore
-            db.collection("chat_history").document(chat_id).set(chat_data)
-            print(f"Đã lưu chat với ID: {chat_id}")
-            
-            # Trả về kết quả dạng JSON với chat_id
-            return {"reply": ai_reply, "chat_id": chat_id}
-            
-        except Exception as firebase_error:
-            print(f"Lỗi khi lưu chat vào Firebase: {str(firebase_error)}")
-            # Vẫn trả về phản hồi ngay cả khi lưu vào Firebase thất bại
-            return ChatResponse(reply=ai_reply)
+        # Tạo dữ liệu chat
+        chat_data = {
+            "user_id": user_id,
+            "user_message": message.message,
+            "ai_reply": ai_reply,
+            "timestamp": datetime.now().isoformat(),
+            "model": completion.model,
+            "augmented": True  # Đánh dấu đây là câu trả lời đã được tăng cường
+        }
         
+        # Lưu tin nhắn vào Firebase trong hàng đợi nền (có thử lại), trả lời ngay với chat_id
+        import uuid
+        chat_id = str(uuid.uuid4())
+        job_queue.enqueue("chat.save_history", chat_id, chat_data)
+        
+        # Trả về kết quả dạng JSON với chat_id
+        return {"reply": ai_reply, "chat_id": chat_id}
+        
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Lỗi khi xử lý chat: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Đã xảy ra lỗi: {str(e)}")
@@ -1304,8 +1424,8 @@ async def redirect_to_api_sync(
     """
     from fastapi.responses import RedirectResponse
     redirect_url = f"/api/sync?user_id={user_id}" if user_id else "/api/sync"
-    print(f"Chuyển hướng từ /api/firestore/users/sync sang {redirect_url}")
-    print(f"Dữ liệu nhận được: {json.dumps(data, indent=2)[:500]}...")
+    logger.info("Chuyển hướng từ /api/firestore/users/sync sang %s", redirect_url)
+    logger.debug("Dữ liệu nhận được: %s", LazyJSON(data, limit=500))
     # Sử dụng status_code=307 để đảm bảo phương thức POST và body được giữ nguyên khi chuyển hướng
     return RedirectResponse(url=redirect_url, status_code=307)
 
@@ -1316,6 +1436,7 @@ class FoodRecognitionRequest(BaseModel):
 
 @app.post("/api/food/recognize", response_model=FoodRecognitionResponse, tags=["Food Recognition"])
 async def recognize_food(
+    background_tasks: BackgroundTasks,
     meal_type: str = Form("snack", description="Loại bữa ăn (breakfast, lunch, dinner, snack)"),
     save_to_firebase: bool = Form(True, description="Lưu kết quả vào Firebase"),
     image: UploadFile = File(..., description="Ảnh thực phẩm cần nhận diện"),
@@ -1324,6 +1445,8 @@ async def recognize_food(
     """
     Nhận diện thực phẩm từ ảnh sử dụng Gemini Vision Pro
     
+    Ảnh được tải lên Storage song song với nhận diện; bản ghi Firestore được lưu sau khi trả response.
+    
     Parameters:
     - meal_type: Loại bữa ăn (breakfast, lunch, dinner, snack)
     - save_to_firebase: Lưu kết quả vào Firebase
@@ -1355,7 +1478,8 @@ async def recognize_food(
             image_data=image_data,
             user_id=user.uid,
             meal_type=meal_type,
-            save_to_firebase=save_to_firebase
+            save_to_firebase=save_to_firebase,
+            defer_log=background_tasks.add_task
         )
         
         return result
@@ -1368,6 +1492,68 @@ async def recognize_food(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Lỗi nhận diện thực phẩm: {str(e)}")
 
+@app.post("/api/food/recognize/batch", tags=["Food Recognition"])
+async def recognize_food_batch(
+    images: List[UploadFile] = File(..., description="Các ảnh thực phẩm cần nhận diện"),
+    meal_type: str = Form("snack", description="Loại bữa ăn áp dụng cho mọi ảnh"),
+    meal_types: Optional[str] = Form(None, description="Loại bữa ăn cho từng ảnh, phân tách bởi dấu phẩy (ghi đè meal_type)"),
+    save_to_firebase: bool = Form(True, description="Lưu kết quả vào Firebase"),
+    user: TokenPayload = Depends(get_current_user)
+):
+    """
+    Nhận diện nhiều ảnh thực phẩm trong một request
+    
+    Các ảnh được xử lý song song (giới hạn FOOD_BATCH_MAX_CONCURRENCY). Kết quả trả về dạng
+    NDJSON, mỗi dòng một ảnh theo thứ tự xử lý xong ({"type": "result"|"error", "index": ...}),
+    dòng cuối là tổng kết ({"type": "summary", ...}) sau khi mọi bản ghi được lưu trong một batch Firestore.
+    
+    Parameters:
+    - images: Các file ảnh (tối đa FOOD_BATCH_MAX_IMAGES)
+    - meal_type: Loại bữa ăn mặc định
+    - meal_types: Loại bữa ăn cho từng ảnh, vd "breakfast,lunch,dinner"
+    - save_to_firebase: Lưu kết quả vào Firebase
+    
+    Returns:
+    - Luồng NDJSON kết quả nhận diện
+    """
+    if not food_recognition_service.available:
+        raise HTTPException(
+            status_code=503,
+            detail="Dịch vụ nhận diện thực phẩm không khả dụng. Hãy đảm bảo GEMINI_API_KEY đã được cấu hình."
+        )
+    if len(images) > config.FOOD_BATCH_MAX_IMAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tối đa {config.FOOD_BATCH_MAX_IMAGES} ảnh mỗi request, nhận được {len(images)}"
+        )
+    for image in images:
+        if not (image.content_type or "").startswith("image/"):
+            raise HTTPException(
+                status_code=400,
+                detail=f"File {image.filename} phải là ảnh, không phải {image.content_type}"
+            )
+    
+    per_image_meal_types = [value.strip() for value in meal_types.split(",")] if meal_types else [meal_type] * len(images)
+    if len(per_image_meal_types) != len(images):
+        raise HTTPException(
+            status_code=400,
+            detail=f"meal_types có {len(per_image_meal_types)} giá trị nhưng có {len(images)} ảnh"
+        )
+    
+    # Đọc dữ liệu ảnh trước khi trả response (UploadFile bị đóng khi handler kết thúc)
+    image_data = [await image.read() for image in images]
+    filenames = [image.filename for image in images]
+    
+    async def stream_results():
+        async for event in food_recognition_service.recognize_food_batch(
+            image_data, user.uid, per_image_meal_types, save_to_firebase=save_to_firebase
+        ):
+            if "index" in event:
+                event["filename"] = filenames[event["index"]]
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @app.get("/api/food/logs", tags=["Food Recognition"])
 async def get_food_logs(
     limit: int = Query(20, description="Số lượng bản ghi tối đa"),
@@ -1613,7 +1799,8 @@ async def generate_meal_plan(
         # Generate weekly meal plan
         weekly_plan = {}
         for day in DAYS_OF_WEEK:
-            breakfast_meals = groq_service.generate_meal_suggestions(
+            breakfast_meals = await asyncio.to_thread(
+                groq_service.generate_meal_suggestions,
                 calories_target=int(calories_target * 0.25),  # 25% of calories for breakfast
                 protein_target=int(protein_target * 0.25),
                 fat_target=int(fat_target * 0.25),
@@ -1626,7 +1813,8 @@ async def generate_meal_plan(
                 user_data=user_data  # Pass all health-related data
             )
             
-            lunch_meals = groq_service.generate_meal_suggestions(
+            lunch_meals = await asyncio.to_thread(
+                groq_service.generate_meal_suggestions,
                 calories_target=int(calories_target * 0.35),  # 35% of calories for lunch
                 protein_target=int(protein_target * 0.35),
                 fat_target=int(fat_target * 0.35),
@@ -1639,7 +1827,8 @@ async def generate_meal_plan(
                 user_data=user_data  # Pass all health-related data
             )
             
-            dinner_meals = groq_service.generate_meal_suggestions(
+            dinner_meals = await asyncio.to_thread(
+                groq_service.generate_meal_suggestions,
                 calories_target=int(calories_target * 0.40),  # 40% of calories for dinner
                 protein_target=int(protein_target * 0.40),
                 fat_target=int(fat_target * 0.40),
@@ -1855,8 +2044,9 @@ async def replace_meal(
             "sodium_target": sodium_target
         }
         
-        # Generate new meal
-        new_meals = groq_service.generate_meal_suggestions(
+        # Generate new meal (chờ quota Groq đồng bộ: chạy trong thread để không chặn event loop)
+        new_meals = await asyncio.to_thread(
+            groq_service.generate_meal_suggestions,
             calories_target=calories_target,
             protein_target=protein_target,
             fat_target=fat_target,
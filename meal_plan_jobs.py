@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Job sinh kế hoạch ăn bất đồng bộ
+
+Sinh kế hoạch tuần gọi LLM nhiều lần và có thể mất vài chục giây, dễ vượt timeout của proxy nếu giữ
+kết nối HTTP. Client gửi yêu cầu và nhận job id ngay; việc sinh chạy trong thread pool riêng (không
+phụ thuộc kết nối của client), mỗi ngày xong thì ghi một sự kiện tiến độ. Client hỏi trạng thái hoặc
+theo dõi qua SSE (hỗ trợ Last-Event-ID để nối lại). Job đã xong được lưu ra đĩa để vẫn tra được sau
+khi instance khởi động lại.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config import config
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+FINISHED_STATES = (COMPLETED, FAILED)
+
+# generate(progress) -> kế hoạch (dict); progress(day_index, day_name, day_plan_dict) sau mỗi ngày
+ProgressCallback = Callable[[int, str, Dict[str, Any]], None]
+GenerateFunction = Callable[[ProgressCallback], Dict[str, Any]]
+
+class MealPlanJob:
+    """Trạng thái một job sinh kế hoạch ăn"""
+
+    def __init__(self, user_id: str, total_days: int):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.status = QUEUED
+        self.total_days = total_days
+        self.days_completed = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.events: List[Dict[str, Any]] = []
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        def iso(timestamp):
+            return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+        data = {
+            "job_id": self.id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "days_completed": self.days_completed,
+            "total_days": self.total_days,
+            "created_at": iso(self.created_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+            "error": self.error,
+        }
+        if include_result and self.status == COMPLETED:
+            data["meal_plan"] = self.result
+        return data
+
+class MealPlanJobManager:
+    """Chạy job sinh kế hoạch ăn trong thread nền và lưu tiến độ (thread-safe)"""
+
+    def __init__(self, max_workers: int = 2, jobs_dir: str = None, ttl_seconds: float = 86400,
+                 total_days: int = 7):
+        """
+        Args:
+            max_workers: Số job chạy đồng thời
+            jobs_dir: Thư mục lưu job đã xong (None: chỉ giữ trong bộ nhớ)
+            ttl_seconds: Thời gian giữ job đã xong (bộ nhớ và đĩa)
+            total_days: Số ngày của một kế hoạch (để tính tiến độ)
+        """
+        self.max_workers = max_workers
+        self.jobs_dir = jobs_dir
+        self.ttl_seconds = ttl_seconds
+        self.total_days = total_days
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, MealPlanJob] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="meal-plan-job")
+            return self._executor
+
+    def submit(self, user_id: str, generate: GenerateFunction) -> MealPlanJob:
+        """
+        Tạo job và bắt đầu sinh trong thread nền
+
+        Args:
+            user_id: Chủ sở hữu job
+            generate: Hàm sinh kế hoạch nhận callback tiến độ, trả về kế hoạch dạng dict
+
+        Returns:
+            Job vừa tạo (trạng thái queued)
+        """
+        self._evict_expired()
+        job = MealPlanJob(user_id, self.total_days)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._add_event(job, QUEUED, job.to_dict())
+        self._get_executor().submit(self._run, job, generate)
+        return job
+
+    def _add_event(self, job: MealPlanJob, event: str, data: Dict[str, Any]) -> None:
+        # Gọi khi đang giữ self._lock
+        job.events.append({"id": len(job.events) + 1, "event": event, "data": data})
+
+    def _run(self, job: MealPlanJob, generate: GenerateFunction) -> None:
+        with self._lock:
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._add_event(job, RUNNING, job.to_dict())
+
+        def progress(day_index: int, day_name: str, day_plan: Dict[str, Any]) -> None:
+            with self._lock:
+                job.days_completed = day_index + 1
+                self._add_event(job, "progress", {
+                    "day_index": day_index,
+                    "day": day_name,
+                    "days_completed": job.days_completed,
+                    "total_days": job.total_days,
+                    "day_plan": day_plan,
+                })
+
+        try:
+            result = generate(progress)
+            with self._lock:
+                job.status = COMPLETED
+                job.result = result
+                job.days_completed = job.total_days
+                job.finished_at = time.time()
+                self._add_event(job, COMPLETED, job.to_dict())
+            print(f"✅ Meal plan job {job.id} completed in {job.finished_at - job.started_at:.1f}s")
+        except Exception as e:
+            with self._lock:
+                job.status = FAILED
+                job.error = str(e)
+                job.finished_at = time.time()
+                self._add_event(job, FAILED, job.to_dict())
+            print(f"❌ Meal plan job {job.id} failed: {str(e)}")
+        self._save(job)
+
+    def _path(self, job_id: str) -> Optional[str]:
+        if not self.jobs_dir or not job_id.isalnum():
+            return None
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job: MealPlanJob) -> None:
+        path = self._path(job.id)
+        if not path:
+            return
+        try:
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            with self._lock:
+                data = job.to_dict()
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, default=str)
+        except OSError as e:
+            print(f"Error saving meal plan job {job.id}: {str(e)}")
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        path = self._path(job_id)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Trạng thái job (kèm kế hoạch nếu đã xong), tìm trong bộ nhớ rồi trên đĩa"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.to_dict()
+        return self._load(job_id)
+
+    def events_since(self, job_id: str, after: int = 0) -> Optional[List[Dict[str, Any]]]:
+        """
+        Các sự kiện có id > after (không chờ)
+
+        Returns:
+            Danh sách sự kiện, None nếu không có job. Job chỉ còn trên đĩa trả về một sự kiện kết thúc.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return [event for event in job.events if event["id"] > after]
+        stored = self._load(job_id)
+        if stored is None:
+            return None
+        return [{"id": after + 1, "event": stored["status"], "data": stored}]
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at and now - job.finished_at > self.ttl_seconds]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if not self.jobs_dir or not os.path.isdir(self.jobs_dir):
+            return
+        for entry in os.scandir(self.jobs_dir):
+            try:
+                if entry.name.endswith(".json") and now - entry.stat().st_mtime > self.ttl_seconds:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.max_workers, "jobs": counts}
+
+# Global instance
+meal_plan_jobs = MealPlanJobManager(
+    max_workers=config.MEAL_PLAN_JOB_WORKERS,
+    jobs_dir=config.MEAL_PLAN_JOBS_DIR,
+    ttl_seconds=config.MEAL_PLAN_JOB_TTL_SECONDS,
+)
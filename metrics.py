@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Số liệu độ trễ dạng histogram bucket cố định và xuất theo định dạng Prometheus
+
+Chỉ lưu count/avg/min/max thì không biết được độ trễ đuôi (p95/p99). Mỗi tổ hợp nhãn giữ một
+histogram với các cận bucket cố định: ghi một giá trị chỉ là bisect trên tuple cận và tăng bộ đếm
+dưới lock riêng của histogram đó (không cấp phát, không sắp xếp), nên gần như không tốn gì trên
+hot path. Percentile được ước lượng bằng nội suy tuyến tính trong bucket; /metrics xuất bucket
+tích lũy để Prometheus tự tính histogram_quantile().
+
+Nhãn được giữ ở số lượng thấp: route là template (/api/meal-plan/jobs/{job_id}), không phải URL thật.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Cận trên các bucket (giây): từ request cache (vài ms) tới lời gọi LLM sinh kế hoạch tuần
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+class Histogram:
+    """Histogram bucket cố định cho một tổ hợp nhãn (thread-safe)"""
+
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # Bucket cuối: lớn hơn cận lớn nhất (+Inf)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """(số đếm từng bucket, tổng, số mẫu) tại một thời điểm"""
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def percentile(self, quantile: float, snapshot: Tuple[List[int], float, int] = None) -> Optional[float]:
+        """
+        Ước lượng percentile bằng nội suy tuyến tính trong bucket chứa nó
+
+        Returns:
+            Giá trị ước lượng (giây), None nếu chưa có mẫu. Rơi vào bucket +Inf thì trả cận lớn nhất.
+        """
+        counts, _, count = snapshot or self.snapshot()
+        if count == 0:
+            return None
+        rank = quantile * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.bounds[-1]
+
+class HistogramFamily:
+    """Một metric histogram với các nhãn; mỗi tổ hợp giá trị nhãn là một Histogram"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], Histogram] = {}
+
+    def labels(self, *values: str) -> Histogram:
+        """Histogram của tổ hợp nhãn (tạo nếu chưa có)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def observe(self, value: float, *label_values: str) -> None:
+        self.labels(*label_values).observe(value)
+
+    def children(self) -> List[Tuple[Tuple[str, ...], Histogram]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._children.clear()
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    body = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return "{" + body + "}" if body else ""
+
+class MetricsRegistry:
+    """Các histogram của process, xuất ra Prometheus text hoặc bảng percentile"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families: Dict[str, HistogramFamily] = {}
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str],
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> HistogramFamily:
+        """Đăng ký histogram (trả về histogram đã có nếu trùng tên)"""
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = HistogramFamily(name, documentation, label_names, buckets)
+                self._families[name] = family
+            return family
+
+    def get(self, name: str) -> Optional[HistogramFamily]:
+        return self._families.get(name)
+
+    def render_prometheus(self) -> str:
+        """Toàn bộ histogram theo Prometheus text exposition format 0.0.4"""
+        lines: List[str] = []
+        with self._lock:
+            families = list(self._families.values())
+        for family in families:
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} histogram")
+            for values, histogram in family.children():
+                counts, total, count = histogram.snapshot()
+                labels = list(zip(family.label_names, values))
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.bounds, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{family.name}_bucket{_format_labels(labels + [('le', repr(float(bound)))])} {cumulative}")
+                lines.append(f"{family.name}_bucket{_format_labels(labels + [('le', '+Inf')])} {count}")
+                lines.append(f"{family.name}_sum{_format_labels(labels)} {repr(float(total))}")
+                lines.append(f"{family.name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, name: str = None) -> Dict[str, List[Dict]]:
+        """
+        Số mẫu, trung bình và p50/p95/p99 (giây) của từng tổ hợp nhãn, cho endpoint thông tin
+
+        Args:
+            name: Chỉ lấy một histogram (mặc định tất cả)
+        """
+        with self._lock:
+            families = [self._families[name]] if name in self._families else (
+                [] if name else list(self._families.values()))
+        result: Dict[str, List[Dict]] = {}
+        for family in families:
+            rows = []
+            for values, histogram in family.children():
+                snapshot = histogram.snapshot()
+                _, total, count = snapshot
+                row = dict(zip(family.label_names, values))
+                row["count"] = count
+                row["avg_seconds"] = round(total / count, 4) if count else None
+                for quantile in PERCENTILES:
+                    value = histogram.percentile(quantile, snapshot)
+                    row[f"p{round(quantile * 100)}_seconds"] = None if value is None else round(value, 4)
+                rows.append(row)
+            result[family.name] = rows
+        return result
+
+# Global instance
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds",
+    "Thời gian xử lý request HTTP theo route template",
+    ("route", "method", "outcome"),
+)
+upstream_request_duration = metrics.histogram(
+    "upstream_request_duration_seconds",
+    "Thời gian gọi dịch vụ bên ngoài (Groq, Gemini, USDA...)",
+    ("upstream", "outcome"),
+)
+
+def status_outcome(status_code: int) -> str:
+    """Nhãn outcome theo nhóm mã trạng thái HTTP (2xx, 4xx, 5xx...)"""
+    return f"{status_code // 100}xx"
+
+class MetricsMiddleware:
+    """
+    ASGI middleware ghi thời gian mỗi request HTTP vào http_request_duration_seconds
+
+    Đo tới khi gửi xong phần body cuối (đúng cả với StreamingResponse). Request không khớp route nào
+    được gộp vào route="unmatched" để URL lạ không làm nổ số lượng nhãn.
+    """
+
+    def __init__(self, app, histogram: HistogramFamily = None):
+        self.app = app
+        self.histogram = histogram or http_request_duration
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        outcome = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            route = scope.get("route")
+            self.histogram.observe(
+                time.perf_counter() - started,
+                getattr(route, "path", None) or "unmatched",
+                scope.get("method", ""),
+                outcome or status_outcome(status[0]),
+            )
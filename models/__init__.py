@@ -280,6 +280,7 @@ class FoodLogEntry(BaseModel):
     recognized_foods: List[RecognizedFood] = Field(..., description="Danh sách các món ăn đã nhận diện")
     meal_type: str = Field(..., description="Loại bữa ăn (breakfast, lunch, dinner, snack)")
     image_url: str = Field(..., description="URL của hình ảnh đã lưu")
+    thumbnail_url: Optional[str] = Field(None, description="URL của ảnh thu nhỏ")
     timestamp: str = Field(..., description="Thời gian nhận diện")
     date: str = Field(..., description="Ngày ghi nhận (YYYY-MM-DD)")
     total_nutrition: NutritionInfo = Field(..., description="Tổng dinh dưỡng của bữa ăn") 
\ No newline at end of file
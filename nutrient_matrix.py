@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Ma trận dinh dưỡng (nguyên liệu × chất dinh dưỡng, per 100g) và API tính theo lô
+
+Thay vì cộng dồn từng nguyên liệu bằng vòng lặp dict, danh sách nguyên liệu được chuyển thành
+vector (chỉ số hàng, gram) và tổng dinh dưỡng của cả bữa/cả tuần được tính bằng một phép nhân
+ma trận. NumPy là tùy chọn: nếu chưa cài, module dùng vòng lặp Python với cùng kết quả.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from nutrition_index import lookup, iter_records, PER_100G
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+NUTRIENT_FIELDS = ("calories", "protein", "fat", "carbs", "fiber")
+
+# Giới hạn số tên được nhớ chỉ số hàng (tên từ LLM/người dùng không giới hạn)
+MAX_MEMOIZED_NAMES = 10000
+
+_MISSING = object()
+
+# Kết quả cho một danh sách nguyên liệu: (tổng dinh dưỡng, tên nguyên liệu không tìm thấy)
+NutritionTotals = Tuple[Dict[str, float], List[str]]
+
+class NutrientMatrix:
+    """
+    Ma trận per 100g cho mọi bản ghi nguyên liệu trong nutrition index
+
+    Chỉ số hàng của mỗi tên được nhớ lại sau lần tra cứu đầu tiên, nên các lần tính sau
+    chỉ còn thao tác số học.
+    """
+
+    def __init__(self, records: Iterable[Any]):
+        """
+        Args:
+            records: Các bản ghi per 100g từ nutrition index
+        """
+        rows: List[List[float]] = []
+        self.sources: List[str] = []
+        self._row_of_record: Dict[int, int] = {}
+        for record in records:
+            if id(record) in self._row_of_record:
+                continue
+            self._row_of_record[id(record)] = len(rows)
+            rows.append([float(record[field]) for field in NUTRIENT_FIELDS])
+            self.sources.append(record["source"])
+
+        self.rows = rows
+        self.matrix = np.array(rows, dtype=float).reshape(-1, len(NUTRIENT_FIELDS)) if NUMPY_AVAILABLE else None
+        self._row_of_name: Dict[str, Optional[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def row_index(self, name: str) -> Optional[int]:
+        """
+        Chỉ số hàng của nguyên liệu (None nếu không có trong index)
+
+        Args:
+            name: Tên nguyên liệu
+
+        Returns:
+            Chỉ số hàng hoặc None
+        """
+        # Memo có thể bị thread khác xóa bất kỳ lúc nào: chỉ đọc một lần và trả về biến cục bộ
+        row = self._row_of_name.get(name, _MISSING)
+        if row is _MISSING:
+            record = lookup(name, basis=PER_100G)
+            row = self._row_of_record.get(id(record)) if record else None
+            if len(self._row_of_name) >= MAX_MEMOIZED_NAMES:
+                self._row_of_name.clear()
+            self._row_of_name[name] = row
+        return row
+
+    def vectorize(self, ingredients: Iterable[Tuple[str, float]]) -> Tuple[List[int], List[float], List[str]]:
+        """
+        Chuyển danh sách (tên, gram) thành vector chỉ số hàng và gram
+
+        Args:
+            ingredients: Các cặp (tên nguyên liệu, khối lượng gram)
+
+        Returns:
+            Tuple (chỉ số hàng, gram, tên không tìm thấy)
+        """
+        indices: List[int] = []
+        grams: List[float] = []
+        missing: List[str] = []
+        for name, amount in ingredients:
+            row = self.row_index(name)
+            if row is None:
+                missing.append(name)
+            else:
+                indices.append(row)
+                grams.append(float(amount or 0))
+        return indices, grams, missing
+
+    def totals(self, indices: Sequence[int], grams: Sequence[float]) -> Dict[str, float]:
+        """
+        Tổng dinh dưỡng của một vector (chỉ số hàng, gram)
+
+        Returns:
+            Dict calories/protein/fat/carbs/fiber
+        """
+        return self.batch_totals_from_vectors([(indices, grams)])[0]
+
+    def batch_totals_from_vectors(self, vectors: Sequence[Tuple[Sequence[int], Sequence[float]]]) -> List[Dict[str, float]]:
+        """
+        Tổng dinh dưỡng cho nhiều vector bằng một phép nhân ma trận (lô × nguyên liệu) @ (nguyên liệu × chất)
+
+        Args:
+            vectors: Danh sách (chỉ số hàng, gram), mỗi phần tử là một món/bữa/ngày
+
+        Returns:
+            Danh sách dict tổng dinh dưỡng theo thứ tự đầu vào
+        """
+        if not vectors:
+            return []
+
+        if NUMPY_AVAILABLE:
+            used_rows = sorted({row for indices, _ in vectors for row in indices})
+            if not used_rows:
+                return [dict.fromkeys(NUTRIENT_FIELDS, 0.0) for _ in vectors]
+            column_of_row = {row: column for column, row in enumerate(used_rows)}
+
+            weights = np.zeros((len(vectors), len(used_rows)))
+            for batch, (indices, grams) in enumerate(vectors):
+                columns = [column_of_row[row] for row in indices]
+                np.add.at(weights[batch], columns, np.asarray(grams, dtype=float) / 100.0)
+
+            results = weights @ self.matrix[used_rows]
+            return [dict(zip(NUTRIENT_FIELDS, (float(value) for value in row))) for row in results]
+
+        results = []
+        for indices, grams in vectors:
+            total = [0.0] * len(NUTRIENT_FIELDS)
+            for row, amount in zip(indices, grams):
+                scale = amount / 100.0
+                for column, value in enumerate(self.rows[row]):
+                    total[column] += value * scale
+            results.append(dict(zip(NUTRIENT_FIELDS, total)))
+        return results
+
+    def batch_totals(self, batches: Sequence[Iterable[Tuple[str, float]]]) -> List[NutritionTotals]:
+        """
+        Tính tổng dinh dưỡng cho nhiều danh sách nguyên liệu cùng lúc (cả bữa, cả tuần)
+
+        Args:
+            batches: Mỗi phần tử là danh sách (tên nguyên liệu, gram)
+
+        Returns:
+            Danh sách (tổng dinh dưỡng, tên không tìm thấy) theo thứ tự đầu vào
+        """
+        vectors = []
+        missing_per_batch = []
+        for ingredients in batches:
+            indices, grams, missing = self.vectorize(ingredients)
+            vectors.append((indices, grams))
+            missing_per_batch.append(missing)
+        return list(zip(self.batch_totals_from_vectors(vectors), missing_per_batch))
+
+_NUTRIENT_MATRIX: Optional[NutrientMatrix] = None
+
+def get_nutrient_matrix() -> NutrientMatrix:
+    """Ma trận dùng chung, build lần đầu dùng (hoặc khi warm-up)"""
+    global _NUTRIENT_MATRIX
+    if _NUTRIENT_MATRIX is None:
+        _NUTRIENT_MATRIX = NutrientMatrix(iter_records(basis=PER_100G))
+    return _NUTRIENT_MATRIX
+
+def calculate_totals(ingredients: Iterable[Tuple[str, float]]) -> NutritionTotals:
+    """
+    Tổng dinh dưỡng của một danh sách (tên nguyên liệu, gram)
+
+    Returns:
+        Tuple (tổng dinh dưỡng, tên không tìm thấy)
+    """
+    return get_nutrient_matrix().batch_totals([ingredients])[0]
+
+def calculate_many(batches: Sequence[Iterable[Tuple[str, float]]]) -> List[NutritionTotals]:
+    """
+    Tổng dinh dưỡng cho nhiều danh sách nguyên liệu trong một lần tính
+
+    Returns:
+        Danh sách (tổng dinh dưỡng, tên không tìm thấy)
+    """
+    return get_nutrient_matrix().batch_totals(batches)
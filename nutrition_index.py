@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+Index tra cứu dinh dưỡng hợp nhất cho tất cả các bảng tĩnh
+
+Dữ liệu dinh dưỡng nằm rải rác trong nhiều module (database chính thức, bảng mở rộng theo
+nhóm thực phẩm, món đặc sắc, knowledge base, dữ liệu fallback của Nutritionix). Module này
+gộp tất cả vào một index bất biến được build một lần khi import:
+
+- Khóa chuẩn hóa (chữ thường, NFC, gộp khoảng trắng/gạch dưới) để tra cứu O(1)
+- Khóa bỏ dấu (phở bò -> pho bo) cho tên gõ không dấu, chỉ dùng khi không nhập nhằng
+- Alias cho các tên gọi phổ biến (thịt heo/thịt lợn, cơm/cơm trắng...)
+- Prefix trie để "bún bò" tìm được "bún bò huế" thay vì rơi xuống gọi API mạng (chỉ khi tiền tố
+  khớp đúng một khóa, không đoán giữa nhiều món)
+
+Mỗi bản ghi có trường "basis": "per_100g" (nguyên liệu) hoặc "per_serving" (món hoàn chỉnh).
+"""
+import re
+import unicodedata
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from vietnamese_nutrition_database import VIETNAMESE_NUTRITION_DATABASE, VIETNAMESE_DISHES_NUTRITION
+from vietnamese_nutrition_extended import (
+    VEGETABLES_NUTRITION, FRUITS_NUTRITION, MEAT_NUTRITION,
+    SEAFOOD_NUTRITION, EGGS_NUTRITION, DAIRY_NUTRITION
+)
+from vietnamese_specialty_dishes import SPECIALTY_DISHES
+from nutrition_knowledge_base import NUTRITION_FACTS
+from nutritionix import FALLBACK_NUTRITION_DATA
+from fuzzy_matcher import TrigramMatcher
+
+PER_100G = "per_100g"
+PER_SERVING = "per_serving"
+
+# Tinh bột nền dùng khi sinh món ăn (trước đây được thêm vào VEGETABLES_NUTRITION lúc runtime)
+STAPLE_NUTRITION = {
+    "cơm trắng": {"calories": 130, "fat": 0.3, "carbs": 28.0, "protein": 2.7},
+    "xôi nếp": {"calories": 116, "fat": 0.2, "carbs": 26.0, "protein": 2.4},
+    "bánh tráng": {"calories": 334, "fat": 0.6, "carbs": 83.0, "protein": 3.0},
+}
+
+# Tên gọi khác -> tên chuẩn trong các bảng
+ALIASES = {
+    "thịt lợn": "thịt heo",
+    "heo": "thịt heo",
+    "lợn": "thịt heo",
+    "thịt heo nạc": "thịt lợn nạc",
+    "thịt ba chỉ": "thịt lợn nửa nạc nửa mỡ",
+    "ba chỉ": "thịt lợn nửa nạc nửa mỡ",
+    "sườn heo": "sườn lợn",
+    "gan heo": "gan lợn",
+    "gà": "thịt gà",
+    "bò": "thịt bò",
+    "vịt": "thịt vịt",
+    "cơm": "cơm trắng",
+    "xôi": "xôi nếp",
+    "bún": "bún tươi",
+    "phở": "phở bò",
+    "đậu hũ": "đậu phụ",
+    "tàu hũ": "đậu phụ",
+    "trứng": "trứng gà",
+    "tôm": "tôm biển",
+    "cá": "cá chép",
+    "mực": "mực tươi",
+    "dưa leo": "dưa chuột",
+    "bắp cải": "cải bắp",
+    "khổ qua": "mướp đắng",
+    "bí đỏ": "bí ngô",
+    "thơm": "dứa ta",
+    "sữa tươi": "sữa bò tươi",
+    "phô mai": "phô mát",
+    "chicken": "chicken breast",
+    "fish": "salmon",
+}
+
+# Khóa của knowledge base là slug không dấu -> tên món tiếng Việt
+KNOWLEDGE_BASE_NAMES = {
+    "pho_bo": "phở bò",
+    "com_tam": "cơm tấm",
+}
+
+# Tiền tố quá ngắn ("ca", "bo") dễ khớp nhầm nên không dùng trie
+_MIN_PREFIX_LENGTH = 3
+
+_WHITESPACE_RE = re.compile(r"[\s_]+")
+
+def normalize_name(name: str) -> str:
+    """
+    Chuẩn hóa tên thực phẩm: NFC, chữ thường, gộp khoảng trắng và dấu gạch dưới
+
+    Args:
+        name: Tên gốc
+
+    Returns:
+        Tên đã chuẩn hóa (vẫn giữ dấu tiếng Việt)
+    """
+    name = unicodedata.normalize("NFC", str(name)).lower()
+    return _WHITESPACE_RE.sub(" ", name).strip()
+
+def fold_diacritics(name: str) -> str:
+    """
+    Bỏ dấu tiếng Việt (phở bò -> pho bo, đậu -> dau)
+
+    Args:
+        name: Tên đã chuẩn hóa
+
+    Returns:
+        Tên không dấu
+    """
+    decomposed = unicodedata.normalize("NFD", name.replace("đ", "d").replace("Đ", "D"))
+    return "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+
+def _make_record(name: str, data: Mapping[str, Any], basis: str, table: str,
+                 source: str, reference_code: str, serving_size: str) -> Mapping[str, Any]:
+    calories = data.get("calories")
+    if calories is None:
+        calories = data.get("calories_per_serving", data.get("calories_per_bowl", 0))
+    return MappingProxyType({
+        "name": name,
+        "calories": float(calories or 0),
+        "protein": float(data.get("protein") or 0),
+        "fat": float(data.get("fat") or 0),
+        "carbs": float(data.get("carbs") or 0),
+        "fiber": float(data.get("fiber") or 0),
+        "sodium": float(data.get("sodium") or 0),
+        "basis": basis,
+        "table": table,
+        "source": data.get("source", source),
+        "reference_code": data.get("reference_code", reference_code),
+        "serving_size": data.get("serving_size", serving_size),
+        "data": data,
+    })
+
+def _iter_source_records() -> Iterable[Tuple[str, Mapping[str, Any]]]:
+    """Sinh (tên, bản ghi) theo thứ tự ưu tiên: dữ liệu chính thức trước, ước tính sau"""
+    for name, data in VIETNAMESE_DISHES_NUTRITION.items():
+        yield name, _make_record(name, data, PER_SERVING, "vn_dishes", "", "", "1 phần")
+
+    for name, data in VIETNAMESE_NUTRITION_DATABASE.items():
+        yield name, _make_record(name, data, PER_100G, "vn_ingredients", "", "", "100g")
+
+    extended_tables = [
+        ("VEGETABLES", VEGETABLES_NUTRITION),
+        ("FRUITS", FRUITS_NUTRITION),
+        ("MEAT", MEAT_NUTRITION),
+        ("SEAFOOD", SEAFOOD_NUTRITION),
+        ("EGGS", EGGS_NUTRITION),
+        ("DAIRY", DAIRY_NUTRITION),
+    ]
+    for db_name, db in extended_tables:
+        for name, data in db.items():
+            yield name, _make_record(name, data, PER_100G, "extended",
+                                     f"Vietnamese Extended Database - {db_name}", "VN-EXT", "100g")
+
+    for name, data in STAPLE_NUTRITION.items():
+        yield name, _make_record(name, data, PER_100G, "staples",
+                                 "Ước tính tinh bột nền", "VN-EST", "100g")
+
+    for meal_type, dishes in SPECIALTY_DISHES.items():
+        for name, dish in dishes.items():
+            if dish.get("nutrition"):
+                yield name, _make_record(name, dish["nutrition"], PER_SERVING, "specialty_dishes",
+                                         "Món ăn đặc sắc Việt Nam", "VN-SPECIALTY", "1 phần")
+
+    traditional = NUTRITION_FACTS.get("vietnamese_nutrition", {}).get("traditional_dishes", {})
+    for key, data in traditional.items():
+        name = KNOWLEDGE_BASE_NAMES.get(key, key)
+        serving = "1 tô" if "calories_per_bowl" in data else "1 phần"
+        yield name, _make_record(name, data, PER_SERVING, "knowledge_base",
+                                "Nutrition knowledge base", "KB", serving)
+
+    for name, info in FALLBACK_NUTRITION_DATA.items():
+        data = info.model_dump() if hasattr(info, "model_dump") else dict(info)
+        yield name, _make_record(name, data, PER_100G, "fallback",
+                                 "Fallback nutrition data", "FALLBACK", "100g")
+
+_TERMINAL = "\0"
+
+def _trie_insert(trie: Dict[str, Any], key: str) -> None:
+    node = trie
+    for ch in key:
+        node = node.setdefault(ch, {})
+    node[_TERMINAL] = key
+
+def _trie_complete(trie: Dict[str, Any], prefix: str) -> Optional[str]:
+    """
+    Khóa duy nhất bắt đầu bằng prefix theo ranh giới từ ("phở tá" không khớp, "bún bò" -> "bún bò huế")
+
+    Nhiều khóa cùng tiền tố ("rau" -> rau bí, rau muống...) thì không đoán: trả None để caller đi đường cũ.
+    """
+    node = trie
+    for ch in prefix:
+        node = node.get(ch)
+        if node is None:
+            return None
+
+    boundary = node.get(" ")
+    if boundary is None:
+        return None
+
+    # Duyệt cây con, dừng ngay khi gặp khóa thứ hai
+    found: Optional[str] = None
+    stack = [boundary]
+    while stack:
+        current = stack.pop()
+        for ch, child in current.items():
+            if ch == _TERMINAL:
+                if found is not None:
+                    return None
+                found = child
+            else:
+                stack.append(child)
+    return found
+
+def _build_index():
+    records: Dict[str, List[Mapping[str, Any]]] = {}
+    for name, record in _iter_source_records():
+        records.setdefault(normalize_name(name), []).append(record)
+
+    for alias, target in ALIASES.items():
+        alias_key, target_key = normalize_name(alias), normalize_name(target)
+        if target_key in records and alias_key not in records:
+            records[alias_key] = list(records[target_key])
+
+    # Khóa bỏ dấu chỉ dùng khi chỉ có đúng một tên có dấu tương ứng (tránh "cá" ~ "cà", "bò" ~ "bơ")
+    folded_candidates: Dict[str, set] = {}
+    for key in records:
+        folded_candidates.setdefault(fold_diacritics(key), set()).add(key)
+    folded = {fkey: next(iter(keys)) for fkey, keys in folded_candidates.items() if len(keys) == 1}
+
+    trie: Dict[str, Any] = {}
+    folded_trie: Dict[str, Any] = {}
+    for key in records:
+        _trie_insert(trie, key)
+    for fkey in folded:
+        _trie_insert(folded_trie, fkey)
+
+    frozen = MappingProxyType({key: tuple(value) for key, value in records.items()})
+    return frozen, MappingProxyType(folded), trie, folded_trie
+
+_INDEX, _FOLDED_INDEX, _TRIE, _FOLDED_TRIE = _build_index()
+
+def _resolve_key(key: str, allow_prefix: bool) -> Optional[str]:
+    if key in _INDEX:
+        return key
+
+    # Khóa bỏ dấu chỉ dùng khi người dùng gõ không dấu ("bơ" không được khớp "bò")
+    folded_key = fold_diacritics(key)
+    if folded_key == key and folded_key in _FOLDED_INDEX:
+        return _FOLDED_INDEX[folded_key]
+
+    if not allow_prefix or len(key) < _MIN_PREFIX_LENGTH:
+        return None
+
+    completed = _trie_complete(_TRIE, key)
+    if completed:
+        return completed
+
+    # Prefix không dấu chỉ áp dụng khi người dùng gõ không dấu
+    if folded_key == key:
+        completed = _trie_complete(_FOLDED_TRIE, folded_key)
+        if completed:
+            return _FOLDED_INDEX[completed]
+    return None
+
+def lookup(name: str, basis: Optional[str] = None, allow_prefix: bool = True) -> Optional[Mapping[str, Any]]:
+    """
+    Tra cứu dinh dưỡng theo tên trên toàn bộ các bảng tĩnh
+
+    Args:
+        name: Tên món ăn hoặc nguyên liệu (có dấu hoặc không dấu)
+        basis: Lọc theo PER_100G (nguyên liệu) hoặc PER_SERVING (món ăn), None = bất kỳ
+        allow_prefix: Cho phép khớp theo tiền tố ("phở" -> "phở bò")
+
+    Returns:
+        Bản ghi dinh dưỡng (chỉ đọc) hoặc None nếu không tìm thấy
+    """
+    if not name:
+        return None
+
+    key = _resolve_key(normalize_name(name), allow_prefix)
+    if key is None:
+        return None
+
+    for record in _INDEX[key]:
+        if basis is None or record["basis"] == basis:
+            return record
+    return None
+
+def lookup_many(names: Iterable[str], basis: Optional[str] = None,
+                allow_prefix: bool = True) -> Dict[str, Optional[Mapping[str, Any]]]:
+    """
+    Tra cứu nhiều tên một lần, mỗi tên chuẩn hóa chỉ được tra một lần
+
+    Args:
+        names: Danh sách tên
+        basis: Lọc theo PER_100G hoặc PER_SERVING
+        allow_prefix: Cho phép khớp theo tiền tố
+
+    Returns:
+        Dict tên gốc -> bản ghi (hoặc None)
+    """
+    resolved: Dict[str, Optional[Mapping[str, Any]]] = {}
+    results: Dict[str, Optional[Mapping[str, Any]]] = {}
+    for name in names:
+        key = normalize_name(name) if name else ""
+        if key not in resolved:
+            resolved[key] = lookup(key, basis=basis, allow_prefix=allow_prefix)
+        results[name] = resolved[key]
+    return results
+
+def scale_record(record: Mapping[str, Any], amount_grams: float) -> Dict[str, float]:
+    """
+    Tính dinh dưỡng theo khối lượng cho bản ghi per 100g
+
+    Args:
+        record: Bản ghi trả về từ lookup
+        amount_grams: Khối lượng (gram)
+
+    Returns:
+        Dict calories/protein/fat/carbs/fiber đã nhân hệ số
+    """
+    scale = amount_grams / 100.0 if record["basis"] == PER_100G else 1.0
+    return {field: record[field] * scale for field in ("calories", "protein", "fat", "carbs", "fiber")}
+
+def index_size() -> int:
+    """Số khóa (gồm alias) trong index"""
+    return len(_INDEX)
+
+# Chỉ mục fuzzy trên toàn bộ tên/alias (build lần đầu dùng, xem build_fuzzy_index)
+_FUZZY_MATCHER: Optional[TrigramMatcher] = None
+
+# Ngưỡng điểm Dice mặc định để coi là cùng một món
+FUZZY_MIN_SCORE = 0.55
+
+def build_fuzzy_index() -> TrigramMatcher:
+    """Build chỉ mục trigram trên các khóa của index"""
+    global _FUZZY_MATCHER
+    if _FUZZY_MATCHER is None:
+        _FUZZY_MATCHER = TrigramMatcher(_INDEX.keys())
+    return _FUZZY_MATCHER
+
+def fuzzy_candidates(name: str, limit: int = 5, min_score: float = 0.3) -> List[Tuple[str, float]]:
+    """
+    Các tên trong index gần giống name nhất, kèm điểm
+
+    Args:
+        name: Tên cần tìm (sai chính tả, thiếu dấu, thêm từ mô tả...)
+        limit: Số ứng viên tối đa
+        min_score: Điểm tối thiểu (0-1)
+
+    Returns:
+        Danh sách (tên chuẩn hóa trong index, điểm) giảm dần theo điểm
+    """
+    return build_fuzzy_index().candidates(name, limit=limit, min_score=min_score)
+
+def fuzzy_lookup(name: str, basis: Optional[str] = None,
+                 min_score: float = FUZZY_MIN_SCORE) -> Optional[Mapping[str, Any]]:
+    """
+    Tra cứu chính xác trước, nếu không có thì lấy ứng viên fuzzy tốt nhất đạt ngưỡng
+
+    Args:
+        name: Tên món ăn hoặc nguyên liệu
+        basis: Lọc theo PER_100G hoặc PER_SERVING
+        min_score: Điểm tối thiểu để chấp nhận ứng viên fuzzy
+
+    Returns:
+        Bản ghi dinh dưỡng hoặc None
+    """
+    record = lookup(name, basis=basis)
+    if record:
+        return record
+
+    for candidate, _ in fuzzy_candidates(name, limit=5, min_score=min_score):
+        for candidate_record in _INDEX[candidate]:
+            if basis is None or candidate_record["basis"] == basis:
+                return candidate_record
+    return None
+
+def iter_records(basis: Optional[str] = None) -> Iterable[Mapping[str, Any]]:
+    """
+    Duyệt các bản ghi (không lặp lại bản ghi dùng chung giữa tên và alias)
+
+    Args:
+        basis: Lọc theo PER_100G hoặc PER_SERVING
+
+    Returns:
+        Iterator các bản ghi
+    """
+    seen = set()
+    for records in _INDEX.values():
+        for record in records:
+            if id(record) in seen or (basis is not None and record["basis"] != basis):
+                continue
+            seen.add(id(record))
+            yield record
@@ -1,7 +1,7 @@
 import os
-import requests
 from typing import Dict, List, Optional, Union
 from models import NutritionInfo, Ingredient
+from http_clients import http_clients
 
 # Normally, these would be stored securely in environment variables
 NUTRITIONIX_APP_ID = "f837778f"
@@ -33,7 +33,7 @@ class NutritionixAPI:
         payload = {"query": query}
         
         try:
-            response = requests.post(endpoint, json=payload, headers=self.headers)
+            response = http_clients.session("nutritionix").post(endpoint, json=payload, headers=self.headers)
             response.raise_for_status()
             data = response.json()
             
@@ -161,6 +161,17 @@ def get_nutrition_fallback(ingredient_name: str, amount_str: str = "100g") -> Nu
     # Scale factor (relative to 100g)
     scale = amount / 100
     
+    # Look up the unified static index first (Vietnamese tables, aliases, unaccented names)
+    from nutrition_index import lookup, PER_100G
+    record = lookup(ingredient_name, basis=PER_100G)
+    if record:
+        return NutritionInfo(
+            calories=record["calories"] * scale,
+            protein=record["protein"] * scale,
+            fat=record["fat"] * scale,
+            carbs=record["carbs"] * scale
+        )
+
     # Find the closest matching ingredient in our fallback data
     ingredient_key = next((k for k in FALLBACK_NUTRITION_DATA.keys() 
                           if ingredient_name.lower() in k or k in ingredient_name.lower()), None)
@@ -1,10 +1,10 @@
 import os
 import json
 import time
-import requests
 from typing import Dict, List, Optional, Any, Union
 from models import NutritionInfo, Ingredient
 from config import config
+from http_clients import http_clients
 
 # Cùng APP ID & API KEY từ file gốc
 from nutritionix import NUTRITIONIX_APP_ID, NUTRITIONIX_API_KEY
@@ -101,7 +101,7 @@ class NutritionixAPIOptimized:
         
         try:
             print(f"Calling Nutritionix API for '{query}'")
-            response = requests.post(endpoint, json=payload, headers=self.headers)
+            response = http_clients.session("nutritionix").post(endpoint, json=payload, headers=self.headers)
             response.raise_for_status()
             data = response.json()
             
@@ -210,7 +210,7 @@ class NutritionixAPIOptimized:
         
         try:
             print(f"Calling Nutritionix API in batch mode for {query[:50]}...")
-            response = requests.post(endpoint, json=payload, headers=self.headers)
+            response = http_clients.session("nutritionix").post(endpoint, json=payload, headers=self.headers)
             response.raise_for_status()
             data = response.json()
             
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+Giới hạn tốc độ gọi API bên ngoài
+
+- TokenBucket: bucket trong process theo kiểu đặt chỗ (reservation): mỗi lần acquire trừ token ngay
+  (số dư có thể âm) và trả về thời gian cần chờ tới lượt mình. Nhờ vậy các lời gọi được phục vụ theo
+  thứ tự đến, không giữ lock trong lúc chờ, và cùng một bucket dùng được cho cả code đồng bộ
+  (time.sleep) lẫn endpoint async (asyncio.sleep, không chặn event loop).
+- QuotaLimiter: nhiều token bucket (vd theo phút + theo ngày) có trạng thái lưu trong store dùng chung
+  giữa các worker (SQLiteBucketStore), tôn trọng Retry-After của provider và xếp hàng request theo
+  độ ưu tiên (chat tương tác trước sinh dữ liệu hàng loạt) thay vì báo lỗi ngay.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Độ ưu tiên khi xếp hàng chờ quota (số nhỏ được phục vụ trước)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate` token mỗi giây, tích lũy tối đa `capacity` token"""
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            rate: Số token được nạp mỗi giây
+            capacity: Số token tối đa (số request được gửi dồn một lúc)
+            clock: Hàm thời gian (thay được trong test)
+        """
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Đặt chỗ `tokens` token
+
+        Returns:
+            Số giây cần chờ trước khi được gửi request (0 nếu còn token)
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Lấy token nếu có ngay (không chờ, không đặt chỗ trước)"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Chờ (chặn thread) tới khi có token; trả về số giây đã chờ"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """Chờ (không chặn event loop) tới khi có token; trả về số giây đã chờ"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    @property
+    def available_tokens(self) -> float:
+        """Số token hiện có (âm khi đang có request xếp hàng)"""
+        with self._lock:
+            return min(self.capacity, self._tokens + (self._clock() - self._updated) * self.rate)
+
+class RateLimit(NamedTuple):
+    """Giới hạn `requests` request trong `period` giây (bucket đầy cho phép gửi dồn cả `requests`)"""
+    requests: float
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.period
+
+class BucketState(NamedTuple):
+    """Trạng thái lưu trong store của một QuotaLimiter"""
+    tokens: Tuple[float, ...]  # Số token còn lại của từng RateLimit
+    updated: float  # Thời điểm (epoch) nạp token lần cuối
+    blocked_until: float = 0.0  # Provider yêu cầu chờ (Retry-After) tới thời điểm này
+
+class MemoryBucketStore:
+    """Store trong process (một worker, hoặc khi không dùng được SQLite)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: Dict[str, BucketState] = {}
+
+    def transact(self, name: str, update: Callable[[Optional[BucketState]], Tuple[BucketState, object]]):
+        """
+        Đọc - sửa - ghi trạng thái bucket một cách nguyên tử
+
+        Args:
+            name: Tên bucket
+            update: Hàm nhận trạng thái hiện tại (None nếu chưa có), trả về (trạng thái mới, kết quả)
+
+        Returns:
+            Kết quả của update
+        """
+        with self._lock:
+            state, result = update(self._states.get(name))
+            self._states[name] = state
+            return result
+
+class SQLiteBucketStore:
+    """
+    Store dùng chung giữa các worker/process trên cùng máy qua một file SQLite
+
+    Mỗi transact chạy trong BEGIN IMMEDIATE nên các worker không thể cùng lấy một token.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        """
+        Args:
+            path: Đường dẫn file SQLite (tạo nếu chưa có)
+            busy_timeout: Số giây chờ khi worker khác đang giữ khóa ghi
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets ("
+            "name TEXT PRIMARY KEY, tokens TEXT NOT NULL, updated REAL NOT NULL, blocked_until REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # Mỗi thread một kết nối (sqlite3.Connection không dùng chung giữa các thread)
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def transact(self, name: str, update: Callable[[Optional[BucketState]], Tuple[BucketState, object]]):
+        """Đọc - sửa - ghi trạng thái bucket trong một transaction ghi (xem MemoryBucketStore.transact)"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated, blocked_until FROM token_buckets WHERE name = ?", (name,)
+            ).fetchone()
+            current = BucketState(tuple(json.loads(row[0])), row[1], row[2]) if row else None
+            state, result = update(current)
+            connection.execute(
+                "INSERT OR REPLACE INTO token_buckets (name, tokens, updated, blocked_until) VALUES (?, ?, ?, ?)",
+                (name, json.dumps(list(state.tokens)), state.updated, state.blocked_until)
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return result
+
+class QuotaLimiter:
+    """
+    Giới hạn quota của một provider: nhiều RateLimit cùng lúc, trạng thái dùng chung qua store
+
+    Khác TokenBucket, token chỉ bị trừ khi đủ cho mọi RateLimit (không đặt chỗ trước), nên request
+    ưu tiên cao tới sau vẫn được phục vụ trước các request ưu tiên thấp đang chờ.
+    """
+
+    def __init__(self, name: str, limits: Sequence[RateLimit], store=None,
+                 clock: Callable[[], float] = time.time, poll_interval: float = 0.5):
+        """
+        Args:
+            name: Tên quota (khóa trong store)
+            limits: Các giới hạn phải thỏa mãn đồng thời (vd theo phút và theo ngày)
+            store: MemoryBucketStore hoặc SQLiteBucketStore (mặc định trong process)
+            clock: Hàm thời gian epoch (dùng chung giữa các process; thay được trong test)
+            poll_interval: Chu kỳ tối đa kiểm tra lại store khi đang chờ (worker khác có thể đổi trạng thái)
+        """
+        if not limits or any(limit.requests <= 0 or limit.period <= 0 for limit in limits):
+            raise ValueError("limits must be non-empty with positive requests and period")
+        self.name = name
+        self.limits = tuple(limits)
+        self.store = store or MemoryBucketStore()
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+
+    def _refill(self, state: Optional[BucketState], now: float) -> BucketState:
+        if state is None or len(state.tokens) != len(self.limits):
+            return BucketState(tuple(limit.requests for limit in self.limits), now)
+        elapsed = max(0.0, now - state.updated)
+        tokens = tuple(
+            min(limit.requests, value + elapsed * limit.rate) for limit, value in zip(self.limits, state.tokens)
+        )
+        return BucketState(tokens, now, state.blocked_until)
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Lấy token nếu đủ cho mọi giới hạn (không chờ)
+
+        Returns:
+            0 nếu đã lấy được, ngược lại số giây ước tính cần chờ
+        """
+        def update(state):
+            now = self._clock()
+            state = self._refill(state, now)
+            if state.blocked_until > now:
+                return state, state.blocked_until - now
+            wait = max(
+                (tokens - value) / limit.rate for limit, value in zip(self.limits, state.tokens)
+            )
+            if wait > 0:
+                return state, wait
+            return state._replace(tokens=tuple(value - tokens for value in state.tokens)), 0.0
+
+        return self.store.transact(self.name, update)
+
+    def block_for(self, seconds: float) -> None:
+        """Không gửi request nào (mọi worker) trong `seconds` giây, vd theo header Retry-After"""
+        def update(state):
+            now = self._clock()
+            state = self._refill(state, now)
+            return state._replace(blocked_until=max(state.blocked_until, now + seconds)), None
+
+        self.store.transact(self.name, update)
+        with self._cond:
+            self._cond.notify_all()
+
+    def acquire(self, tokens: float = 1.0, priority: int = PRIORITY_BATCH, timeout: float = None) -> bool:
+        """
+        Chờ tới khi lấy được token, phục vụ theo độ ưu tiên rồi theo thứ tự đến
+
+        Args:
+            tokens: Số token cần lấy
+            priority: PRIORITY_INTERACTIVE, PRIORITY_BATCH... (số nhỏ được phục vụ trước)
+            timeout: Thời gian chờ tối đa (giây); None là chờ tới khi có
+
+        Returns:
+            True nếu lấy được token, False nếu hết thời gian chờ
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        entry = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            self._cond.notify_all()
+            try:
+                while True:
+                    # Chỉ request đứng đầu hàng đợi được thử lấy token
+                    wait = None
+                    if self._waiters[0] == entry:
+                        wait = self.try_acquire(tokens)
+                        if wait == 0:
+                            return True
+                        wait = min(wait, self.poll_interval)
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    async def acquire_async(self, tokens: float = 1.0, priority: int = PRIORITY_BATCH, timeout: float = None) -> bool:
+        """acquire() chạy trong thread riêng để không chặn event loop"""
+        return await asyncio.to_thread(self.acquire, tokens, priority, timeout)
+
+    @property
+    def queue_length(self) -> int:
+        """Số request trong process đang chờ token"""
+        with self._cond:
+            return len(self._waiters)
+
+    def status(self) -> Dict:
+        """Trạng thái quota hiện tại (không trừ token)"""
+        def update(state):
+            state = self._refill(state, self._clock())
+            return state, state
+
+        now = self._clock()
+        state = self.store.transact(self.name, update)
+        return {
+            "name": self.name,
+            "limits": [{"requests": limit.requests, "period": limit.period} for limit in self.limits],
+            "tokens": [round(value, 2) for value in state.tokens],
+            "blocked_for": round(max(0.0, state.blocked_until - now), 2),
+            "waiting": self.queue_length,
+        }
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Đọc header Retry-After (số giây hoặc HTTP-date) từ lỗi HTTP của SDK/httpx/requests
+
+    Returns:
+        Số giây cần chờ, hoặc None nếu lỗi không có header này
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Lỗi do vượt rate limit/quota (HTTP 429) của provider"""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code == 429:
+        return True
+    message = str(error).lower()
+    return "rate limit" in message or "quota exceeded" in message or "429" in message
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Near-duplicate cache for food recognition results
+
+Users often upload the same photo again (retry after a timeout, logging the same meal twice), and
+every upload costs a Gemini Vision call. Recent successful results are indexed by the 64-bit dHash
+of the normalized image (image_preprocessing.dhash): per user, and globally for identical photos
+shared between users. A lookup returns the closest entry within the Hamming-distance threshold.
+
+Each scope keeps at most a few thousand recent hashes, so a linear XOR/popcount scan is cheaper
+than maintaining a multi-index structure.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from config import config
+from models import RecognizedFood
+
+USER_SCOPE = "user"
+GLOBAL_SCOPE = "global"
+
+class _Entry(NamedTuple):
+    foods: List[Dict[str, Any]]
+    raw_analysis: Dict[str, Any]
+    created_at: float
+
+class CacheHit(NamedTuple):
+    """Cached recognition result for a near-duplicate image"""
+    recognized_foods: List[RecognizedFood]
+    raw_analysis: Dict[str, Any]
+    distance: int
+    scope: str
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+class RecognitionCache:
+    """Per-user and global dHash index over recent recognition results (thread-safe)"""
+
+    def __init__(self, max_distance: int = 6, global_max_distance: int = 3,
+                 user_entries: int = 50, global_entries: int = 2000, max_users: int = 1000,
+                 ttl_seconds: float = 86400, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            max_distance: Largest Hamming distance (of 64 bits) treated as the same photo for one user
+            global_max_distance: Same threshold across users (stricter: only true re-uploads)
+            user_entries: Recent results kept per user
+            global_entries: Recent results kept globally
+            max_users: Users with a per-user index (least recently used are dropped)
+            ttl_seconds: Age after which an entry is ignored
+            clock: Time function (replaceable in tests)
+        """
+        self.max_distance = max_distance
+        self.global_max_distance = global_max_distance
+        self.user_entries = user_entries
+        self.global_entries = global_entries
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._users: "OrderedDict[str, OrderedDict[int, _Entry]]" = OrderedDict()
+        self._global: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._counters = {"hits_user": 0, "hits_global": 0, "misses": 0, "stores": 0}
+
+    def _closest(self, index: "OrderedDict[int, _Entry]", image_hash: int, max_distance: int, now: float):
+        best = None
+        for key in list(index):
+            entry = index[key]
+            if now - entry.created_at > self.ttl_seconds:
+                del index[key]
+                continue
+            distance = hamming_distance(key, image_hash)
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, key, entry)
+        return best
+
+    def lookup(self, user_id: str, image_hash: int) -> Optional[CacheHit]:
+        """
+        Find the cached result of a near-duplicate image
+
+        Args:
+            user_id: ID of the uploading user (searched first, with the looser threshold)
+            image_hash: dHash of the normalized upload
+
+        Returns:
+            CacheHit with copies of the cached foods and analysis, or None
+        """
+        if not image_hash:
+            # Uniform image: the hash carries no information
+            return None
+        with self._lock:
+            now = self._clock()
+            found = None
+            user_index = self._users.get(user_id)
+            if user_index is not None:
+                self._users.move_to_end(user_id)
+                found = self._closest(user_index, image_hash, self.max_distance, now)
+                scope = USER_SCOPE
+            if found is None:
+                found = self._closest(self._global, image_hash, self.global_max_distance, now)
+                scope = GLOBAL_SCOPE
+            if found is None:
+                self._counters["misses"] += 1
+                return None
+            distance, _, entry = found
+            self._counters[f"hits_{scope}"] += 1
+
+        raw_analysis = copy.deepcopy(entry.raw_analysis)
+        raw_analysis["cache"] = {"hit": True, "scope": scope, "distance": distance}
+        return CacheHit(
+            recognized_foods=[RecognizedFood(**food) for food in entry.foods],
+            raw_analysis=raw_analysis,
+            distance=distance,
+            scope=scope,
+        )
+
+    def store(self, user_id: str, image_hash: int, recognized_foods: List[RecognizedFood],
+              raw_analysis: Dict[str, Any]) -> None:
+        """Remember a successful recognition result (image URLs are not shared between uploads)"""
+        if not image_hash or not recognized_foods:
+            return
+        foods = [food.model_dump() for food in recognized_foods]
+        for food in foods:
+            food["image_url"] = None
+        entry = _Entry(foods, copy.deepcopy(raw_analysis), self._clock())
+
+        with self._lock:
+            user_index = self._users.setdefault(user_id, OrderedDict())
+            self._users.move_to_end(user_id)
+            for index, limit in ((user_index, self.user_entries), (self._global, self.global_entries)):
+                index[image_hash] = entry
+                index.move_to_end(image_hash)
+                while len(index) > limit:
+                    index.popitem(last=False)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            self._counters["stores"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+            self._global.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit counters for the info endpoints"""
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "user_entries": sum(len(index) for index in self._users.values()),
+                "global_entries": len(self._global),
+                "max_distance": self.max_distance,
+                "global_max_distance": self.global_max_distance,
+                **self._counters,
+            }
+
+# Global instance
+recognition_cache = RecognitionCache(
+    max_distance=config.RECOGNITION_CACHE_MAX_DISTANCE,
+    global_max_distance=config.RECOGNITION_CACHE_GLOBAL_MAX_DISTANCE,
+    user_entries=config.RECOGNITION_CACHE_USER_ENTRIES,
+    global_entries=config.RECOGNITION_CACHE_GLOBAL_ENTRIES,
+    ttl_seconds=config.RECOGNITION_CACHE_TTL_SECONDS,
+)
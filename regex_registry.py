@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Registry các regex đã biên dịch sẵn và đo thời gian cho pipeline sửa JSON từ LLM
+
+Các bước làm sạch/sửa phản hồi của Groq (_clean_response_text, _fix_missing_name_key,
+_fix_malformed_json, _advanced_json_repair, _create_json_from_text) chạy hàng chục phép thay
+thế trên phản hồi vài KB cho mỗi request. Pattern được biên dịch một lần khi import; thời gian
+của từng bước được cộng dồn để theo dõi và để benchmark phát hiện hồi quy.
+"""
+import re
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, Pattern, Tuple, Union
+
+RegexLike = Union[str, Pattern]
+
+_VN_UPPER = "A-ZÀÁẠẢÃÂẦẤẬẨẪĂẰẮẶẲẴÈÉẸẺẼÊỀẾỆỂỄÌÍỊỈĨÒÓỌỎÕÔỒỐỘỔỖƠỜỚỢỞỠÙÚỤỦŨƯỪỨỰỬỮỲÝỴỶỸĐ"
+_VN_LOWER = "a-zàáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđ"
+_DISH_WORDS = "Bánh|Cơm|Phở|Bún|Cháo|Chả|Gỏi|Canh|Xôi|Nem|Gà|Heo|Bò"
+
+# Tên pattern -> (pattern, flags)
+_PATTERN_SOURCES: Dict[str, Tuple[str, int]] = {
+    # Làm sạch phản hồi
+    "code_fence_json": (r'```json\s*', 0),
+    "code_fence": (r'```\s*', 0),
+
+    # Trích xuất JSON
+    "object_array": (r'\[\s*\{.*?\}\s*(?:,\s*\{.*?\}\s*)*\]', re.DOTALL),
+    "any_array": (r'\[.*?\]', re.DOTALL),
+    "any_object": (r'\{.*?\}', re.DOTALL),
+
+    # Thiếu key "name"/"description"
+    "unnamed_before_description": (r'\{\s*"([^"]+)",\s*"description":', 0),
+    "unnamed_first_in_array": (r'\[\s*\{\s*"([^"]+)",', 0),
+    "unnamed_with_text": (r'\{\s*"([^"]+)",\s*"([^"]*[a-z][^"]*)",', 0),
+    "unnamed_next_object": (r'\},\s*\{\s*"([^"]+)",', 0),
+    "unnamed_with_mon_description": (r'\{\s*"([^"]+)",\s*"(Món [^"]*)"', 0),
+    "unnamed_before_value": (r'\{\s*"([^"]+)",\s*([^"])', 0),
+    "unnamed_before_array": (r'\{\s*"([^"]+)",\s*\[', 0),
+    "name_then_text_then_array": (r'"name":\s*"([^"]+)",\s*"([^"]+)",\s*\[', 0),
+
+    # Thiếu key cho ingredients/preparation/nutrition/...
+    "keyless_ingredients": (r'",\s*\[\s*\{', 0),
+    "keyless_preparation": (r'\],\s*\[\s*"', 0),
+    "keyless_nutrition": (r'"\],\s*\{', 0),
+    "keyless_trailing_fields": (r'\},\s*"([^"]+)",\s*"([^"]+)"\s*\}', 0),
+    "quoted_array_open": (r'"\s*\[\s*', 0),
+    "quoted_array_close": (r'\s*\]\s*"', 0),
+    "keyless_object_array": (r',\s*\[\s*\{', 0),
+    "keyless_string_array": (r',\s*\[\s*"', 0),
+
+    # Cú pháp
+    "unquoted_key": (r'(\w+):', 0),
+    "trailing_comma_object": (r',\s*}', 0),
+    "trailing_comma_array": (r',\s*]', 0),
+    "single_quoted_key": (r"'([^']*)':", 0),
+    "single_quoted_value": (r":\s*'([^']*)'", 0),
+
+    # Bổ sung field bắt buộc
+    "first_open_brace": (r'\{', 0),
+    "name_field": (r'"name":\s*"([^"]*)",', 0),
+    "description_field": (r'"description":\s*"[^"]*",', 0),
+    "nutrition_object": (r'"nutrition":\s*\{[^}]*\}', 0),
+    "nutrition_scalar": (r'"nutrition":\s*[^,}]+', 0),
+
+    # Tạo JSON từ text
+    "quoted_dish_name": (rf'"([^"]*(?:{_DISH_WORDS})[^"]*)"', re.IGNORECASE),
+    "titled_dish_name": (rf'([{_VN_UPPER}][{_VN_LOWER}\s]+(?:{_DISH_WORDS})[{_VN_LOWER}\s]*)', 0),
+    "calories_value": (r'"?calories"?\s*:\s*(\d+)', 0),
+    "protein_value": (r'"?protein"?\s*:\s*(\d+)', 0),
+    "fat_value": (r'"?fat"?\s*:\s*(\d+)', 0),
+    "carbs_value": (r'"?carbs"?\s*:\s*(\d+)', 0),
+    "ingredients_block": (r'"?ingredients"?\s*:\s*\[(.*?)\]', re.DOTALL),
+    "ingredient_name_amount": (r'"?name"?\s*:\s*"([^"]+)".*?"?amount"?\s*:\s*"([^"]+)"', 0),
+}
+
+REPAIR_PATTERNS: Dict[str, Pattern] = {
+    name: re.compile(pattern, flags) for name, (pattern, flags) in _PATTERN_SOURCES.items()
+}
+
+# Pattern dạng chuỗi truyền trực tiếp vào safe_regex_* (ngoài registry) được biên dịch một lần
+_ADHOC_PATTERNS: Dict[Tuple[str, int], Pattern] = {}
+_MAX_ADHOC_PATTERNS = 256
+
+def compile_pattern(pattern: RegexLike, flags: int = 0) -> Pattern:
+    """
+    Trả về pattern đã biên dịch (pattern đã biên dịch thì trả lại nguyên)
+
+    Args:
+        pattern: Chuỗi regex hoặc Pattern
+        flags: Cờ re (chỉ dùng cho chuỗi)
+
+    Returns:
+        Pattern đã biên dịch
+    """
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    key = (pattern, flags)
+    compiled = _ADHOC_PATTERNS.get(key)
+    if compiled is None:
+        if len(_ADHOC_PATTERNS) >= _MAX_ADHOC_PATTERNS:
+            _ADHOC_PATTERNS.clear()
+        compiled = _ADHOC_PATTERNS[key] = re.compile(pattern, flags)
+    return compiled
+
+# Thời gian theo bước sửa JSON: tên bước -> {calls, total_ms, max_ms}
+_STAGE_TIMINGS: Dict[str, Dict[str, float]] = {}
+_STAGE_LOCK = threading.Lock()
+
+def record_stage_time(stage: str, elapsed_ms: float) -> None:
+    """Cộng dồn thời gian một lần chạy của bước sửa JSON"""
+    with _STAGE_LOCK:
+        stats = _STAGE_TIMINGS.setdefault(stage, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+        stats["calls"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+def timed_stage(stage: str) -> Callable:
+    """
+    Decorator đo thời gian một bước trong pipeline sửa JSON
+
+    Args:
+        stage: Tên bước (hiển thị trong get_stage_timings)
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_stage_time(stage, (time.perf_counter() - started) * 1000)
+        return wrapper
+    return decorator
+
+def get_stage_timings() -> Dict[str, Dict[str, float]]:
+    """
+    Thống kê thời gian theo bước
+
+    Returns:
+        Dict tên bước -> {calls, total_ms, max_ms, avg_ms}
+    """
+    with _STAGE_LOCK:
+        return {
+            stage: {
+                "calls": int(stats["calls"]),
+                "total_ms": round(stats["total_ms"], 3),
+                "max_ms": round(stats["max_ms"], 3),
+                "avg_ms": round(stats["total_ms"] / stats["calls"], 3) if stats["calls"] else 0.0,
+            }
+            for stage, stats in _STAGE_TIMINGS.items()
+        }
+
+def reset_stage_timings() -> None:
+    """Xóa thống kê thời gian"""
+    with _STAGE_LOCK:
+        _STAGE_TIMINGS.clear()
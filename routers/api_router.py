@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, Path, Body, status, Security
+from fastapi import APIRouter, HTTPException, Depends, Query, Path, Body, Header, Request, Response, status, Security
+from fastapi.responses import StreamingResponse
 from typing import Dict, Optional, List, Any
+import asyncio
+import threading
 import time
 from datetime import datetime
 from pydantic import BaseModel, Field, validator, root_validator
 import json
+import logging
 
 from models.firestore_models import UserProfile, MealPlan
 from services.firestore_service import firestore_service
@@ -18,6 +22,17 @@ from models import (
 import services
 from auth_utils import get_current_user, security
 from storage_manager import storage_manager
+from etag_utils import compute_etag, etag_matches, not_modified_response, set_etag_headers
+from job_queue import job_queue
+from meal_plan_jobs import meal_plan_jobs, FINISHED_STATES
+from structured_logging import LazyJSON
+
+# Nhịp kiểm tra sự kiện mới và gửi keep-alive cho luồng SSE (giây)
+SSE_POLL_SECONDS = 0.5
+SSE_KEEPALIVE_SECONDS = 15.0
+
+# Thiết lập logger
+logger = logging.getLogger(__name__)
 
 # Create API router
 router = APIRouter(prefix="/api", tags=["API"])
@@ -100,7 +115,9 @@ async def create_or_update_user_profile(
 # Endpoint để lấy thông tin user profile theo ID
 @router.get("/user-profile/{user_id}", response_model=UserProfile)
 async def get_user_profile(
+    response: Response,
     user_id: str = Path(..., description="ID của người dùng"),
+    if_none_match: Optional[str] = Header(None),
     user: TokenPayload = Depends(get_current_user)
 ):
     """
@@ -108,6 +125,7 @@ async def get_user_profile(
     
     Parameters:
     - user_id: ID của người dùng (từ path)
+    - If-None-Match: ETag của bản profile client đang giữ (trả 304 nếu không đổi)
     
     Returns:
     - Thông tin profile của người dùng
@@ -126,6 +144,12 @@ async def get_user_profile(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Không tìm thấy profile cho người dùng với ID: {user_id}"
             )
+        
+        # Document users được cập nhật từ nhiều nơi nên ETag tính theo nội dung trả về
+        etag = compute_etag(user_profile)
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+        set_etag_headers(response, etag)
         return user_profile
     except HTTPException:
         raise
@@ -157,6 +181,27 @@ async def generate_meal_plan_get(
         user=user
     )
 
+def _parse_generate_request(request_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Đọc tham số sinh kế hoạch từ body (hỗ trợ cả cấu trúc nutrition_targets của Flutter)"""
+    request_data = request_data or {}
+    
+    params = {
+        "calories": request_data.get("calories", request_data.get("calories_target", 2000)),
+        "protein": request_data.get("protein", request_data.get("protein_target", 100)),
+        "fat": request_data.get("fat", request_data.get("fat_target", 70)),
+        "carbs": request_data.get("carbs", request_data.get("carbs_target", 250)),
+        "user_id": request_data.get("user_id", "default"),
+        "use_ai": request_data.get("use_ai", False),
+        "use_tdee": request_data.get("use_tdee", True),  # Mặc định sử dụng TDEE
+    }
+    
+    # Handle nutrition_targets structure from Flutter
+    if "nutrition_targets" in request_data and isinstance(request_data["nutrition_targets"], dict):
+        nutrition_targets = request_data["nutrition_targets"]
+        for key in ("calories", "protein", "fat", "carbs"):
+            params[key] = nutrition_targets.get(key, params[key])
+    return params
+
 # Meal plan generation endpoint - POST method
 @router.post("/meal-plan/generate", response_model=GenerateWeeklyMealResponse)
 async def generate_meal_plan_post(
@@ -164,35 +209,62 @@ async def generate_meal_plan_post(
     user: TokenPayload = Depends(get_current_user)
 ):
     """Generate a weekly meal plan using POST method"""
-    # Extract parameters from request body
-    request_data = request_data or {}
-    
-    calories = request_data.get("calories", request_data.get("calories_target", 2000))
-    protein = request_data.get("protein", request_data.get("protein_target", 100))
-    fat = request_data.get("fat", request_data.get("fat_target", 70))
-    carbs = request_data.get("carbs", request_data.get("carbs_target", 250))
-    user_id = request_data.get("user_id", "default")
-    use_ai = request_data.get("use_ai", False)
-    use_tdee = request_data.get("use_tdee", True)  # Mặc định sử dụng TDEE
+    return await generate_meal_plan_internal(user=user, **_parse_generate_request(request_data))
+
+@job_queue.handler("meal_plan.save")
+def save_meal_plan_job(user_id: str, plan_dict: Dict) -> None:
+    """Lưu kế hoạch vào storage_manager (local và Firebase); báo lỗi để job được thử lại"""
+    storage_manager.save_meal_plan(WeeklyMealPlan(**plan_dict), user_id, raise_on_error=True)
+
+@job_queue.handler("meal_plan.set_latest")
+def set_latest_meal_plan_job(user_id: str, plan_dict: Dict) -> None:
+    """Ghi kế hoạch vào collection latest_meal_plans (đưa vào với supersede_key=user_id)"""
+    firestore_service.set_latest_meal_plan(user_id, plan_dict)
+    print(f"[DEBUG] Đã lưu kế hoạch ăn cập nhật vào Firestore cho user {user_id}")
+
+# Bộ sinh dùng trạng thái toàn cục (tracker món đã dùng, random.seed): mỗi lúc chỉ sinh một kế hoạch
+_generation_lock = threading.Lock()
+
+def _generate_weekly_plan(calories: int, protein: int, fat: int, carbs: int, user_id: str,
+                          use_ai: bool, use_tdee: bool = True, on_day_complete=None) -> WeeklyMealPlan:
+    """Sinh kế hoạch tuần (chạy trong worker thread) và đưa việc lưu vào hàng đợi nền"""
+    # Get user profile data for personalization
+    user_data = None
+    try:
+        user_profile = firestore_service.get_user(user_id)
+        if user_profile:
+            user_data = {
+                'gender': user_profile.get('gender', 'unknown'),
+                'age': user_profile.get('age', 30),
+                'goal': user_profile.get('goal', 'unknown'),
+                'activity_level': user_profile.get('activity_level', 'unknown')
+            }
+            print(f"Using user profile data for personalization: {user_data}")
+    except Exception as e:
+        print(f"Error getting user profile for personalization: {str(e)}")
     
-    # Handle nutrition_targets structure from Flutter
-    if "nutrition_targets" in request_data and isinstance(request_data["nutrition_targets"], dict):
-        nutrition_targets = request_data["nutrition_targets"]
-        calories = nutrition_targets.get("calories", calories)
-        protein = nutrition_targets.get("protein", protein)
-        fat = nutrition_targets.get("fat", fat)
-        carbs = nutrition_targets.get("carbs", carbs)
+    # Generate meal plan
+    with _generation_lock:
+        meal_plan = services.generate_weekly_meal_plan(
+            calories_target=calories,
+            protein_target=protein,
+            fat_target=fat,
+            carbs_target=carbs,
+            preferences=[],  # Optional preferences
+            allergies=[],    # Optional allergies
+            cuisine_style=None,  # Optional cuisine style
+            use_ai=use_ai,
+            use_tdee=use_tdee,
+            user_data=user_data,
+            on_day_complete=on_day_complete
+        )
     
-    return await generate_meal_plan_internal(
-        calories=calories,
-        protein=protein,
-        fat=fat,
-        carbs=carbs,
-        user_id=user_id,
-        use_ai=use_ai,
-        user=user,
-        use_tdee=use_tdee  # Đã di chuyển xuống cuối
-    )
+    # Lưu kế hoạch (storage_manager và latest_meal_plans) trong hàng đợi nền, trả response ngay.
+    # Lỗi ghi Firestore được thử lại, không làm lỗi request của người dùng. Kế hoạch mới hơn của cùng
+    # người dùng thay thế lần ghi latest_meal_plans cũ còn đang chờ, nên bản cũ thử lại không đè bản mới
+    job_queue.enqueue("meal_plan.save", user_id, meal_plan.dict())
+    job_queue.enqueue("meal_plan.set_latest", user_id, meal_plan.dict(), supersede_key=user_id)
+    return meal_plan
 
 # Internal function to handle meal plan generation
 async def generate_meal_plan_internal(
@@ -214,53 +286,13 @@ async def generate_meal_plan_internal(
         print(f"Generating meal plan for user: {user_id}")
         start_time = time.time()
         
-        # Get user profile data for personalization
-        user_data = None
-        try:
-            user_profile = firestore_service.get_user(user_id)
-            if user_profile:
-                user_data = {
-                    'gender': user_profile.get('gender', 'unknown'),
-                    'age': user_profile.get('age', 30),
-                    'goal': user_profile.get('goal', 'unknown'),
-                    'activity_level': user_profile.get('activity_level', 'unknown')
-                }
-                print(f"Using user profile data for personalization: {user_data}")
-        except Exception as e:
-            print(f"Error getting user profile for personalization: {str(e)}")
-        
-        # Generate meal plan
-        meal_plan = services.generate_weekly_meal_plan(
-            calories_target=calories,
-            protein_target=protein,
-            fat_target=fat,
-            carbs_target=carbs,
-            preferences=[],  # Optional preferences
-            allergies=[],    # Optional allergies
-            cuisine_style=None,  # Optional cuisine style
-            use_ai=use_ai,
-            use_tdee=use_tdee,
-            user_data=user_data
+        meal_plan = await asyncio.to_thread(
+            _generate_weekly_plan, calories, protein, fat, carbs, user_id, use_ai, use_tdee
         )
         
         generation_time = time.time() - start_time
         print(f"Meal plan generated in {generation_time:.2f} seconds")
         
-        # Save the meal plan
-        storage_manager.save_meal_plan(meal_plan, user_id)
-        
-        # Đồng thời lưu vào Firestore để đảm bảo dữ liệu được đồng bộ
-        try:
-            # Chuyển đổi model thành dict để lưu vào Firestore
-            plan_dict = meal_plan.dict()
-            # Lưu vào collection latest_meal_plans
-            firestore_service.db.collection('latest_meal_plans').document(user_id).set(plan_dict)
-            print(f"[DEBUG] Đã lưu kế hoạch ăn cập nhật vào Firestore cho user {user_id}")
-        except Exception as e:
-            print(f"[WARNING] Không thể lưu kế hoạch ăn vào Firestore: {str(e)}")
-            # Không raise exception ở đây để tránh lỗi cho người dùng, 
-            # vì đã lưu thành công vào storage_manager
-        
         # Return response
         return GenerateWeeklyMealResponse(
             meal_plan=meal_plan,
@@ -274,13 +306,101 @@ async def generate_meal_plan_internal(
             detail=f"Error generating meal plan: {str(e)}"
         )
 
+# Async meal plan generation: submit a job, then poll or follow progress over SSE
+@router.post("/meal-plan/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_meal_plan_job(
+    request: Request,
+    request_data: Optional[Dict[str, Any]] = Body(None),
+    user: TokenPayload = Depends(get_current_user)
+):
+    """
+    Tạo job sinh kế hoạch tuần và trả về job id ngay (cùng tham số với POST /meal-plan/generate)
+    
+    Việc sinh chạy nền, không bị hủy khi client ngắt kết nối; kế hoạch được lưu như khi sinh đồng bộ.
+    """
+    params = _parse_generate_request(request_data)
+    if params["user_id"] == "default":
+        params["user_id"] = user.uid
+    if params["user_id"] != user.uid and not getattr(user, "is_admin", False):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Not authorized to generate a meal plan for this user")
+    
+    def generate(progress) -> Dict[str, Any]:
+        on_day_complete = lambda day_index, day_plan: progress(day_index, day_plan.day_of_week, day_plan.dict())
+        return _generate_weekly_plan(on_day_complete=on_day_complete, **params).dict()
+    
+    job = meal_plan_jobs.submit(params["user_id"], generate)
+    # URL lấy từ route đã đăng ký (đúng cả khi router được gắn thêm prefix)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": str(request.url_for("get_meal_plan_job", job_id=job.id)),
+        "events_url": str(request.url_for("stream_meal_plan_job", job_id=job.id)),
+    }
+
+def _get_owned_job(job_id: str, user: TokenPayload) -> Dict[str, Any]:
+    job = meal_plan_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Không tìm thấy job {job_id}")
+    if job["user_id"] != user.uid and not getattr(user, "is_admin", False):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this job")
+    return job
+
+@router.get("/meal-plan/jobs/{job_id}")
+async def get_meal_plan_job(
+    job_id: str = Path(..., description="Job ID"),
+    user: TokenPayload = Depends(get_current_user)
+):
+    """Trạng thái job sinh kế hoạch (kèm meal_plan khi status = completed)"""
+    return _get_owned_job(job_id, user)
+
+@router.get("/meal-plan/jobs/{job_id}/events")
+async def stream_meal_plan_job(
+    request: Request,
+    job_id: str = Path(..., description="Job ID"),
+    last_event_id: Optional[str] = Header(None),
+    user: TokenPayload = Depends(get_current_user)
+):
+    """
+    Server-Sent Events tiến độ job: queued, running, progress (mỗi ngày xong, kèm day_plan), rồi completed hoặc failed
+    
+    Gửi lại header Last-Event-ID khi kết nối lại để chỉ nhận các sự kiện còn thiếu.
+    """
+    _get_owned_job(job_id, user)
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    
+    async def event_stream():
+        nonlocal after
+        idle = 0.0
+        while not await request.is_disconnected():
+            events = meal_plan_jobs.events_since(job_id, after) or []
+            for event in events:
+                after = event["id"]
+                yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False, default=str)}\n\n"
+                if event["event"] in FINISHED_STATES:
+                    return
+            idle = 0.0 if events else idle + SSE_POLL_SECONDS
+            if idle >= SSE_KEEPALIVE_SECONDS:
+                # Giữ kết nối qua proxy khi một ngày sinh lâu
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(SSE_POLL_SECONDS)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Get meal plan by user ID endpoint
 @router.get("/meal-plan/{user_id}", response_model=Dict)
 async def get_user_meal_plan(
+    response: Response,
     user_id: str = Path(..., description="User ID"),
+    if_none_match: Optional[str] = Header(None),
     user: TokenPayload = Depends(get_current_user)
 ):
-    """Get meal plan for a specific user"""
+    """Get meal plan for a specific user (supports If-None-Match / 304)"""
     try:
         # Only allow users to access their own data unless it's "default"
         if user_id != "default" and user_id != user.uid:
@@ -294,8 +414,14 @@ async def get_user_meal_plan(
         if user_id == "default":
             user_id = user.uid
             
+        # Client đã có bản sao: chỉ đọc trường ETag, không tải cả kế hoạch
+        if if_none_match:
+            stored_etag = firestore_service.get_latest_meal_plan_etag(user_id)
+            if etag_matches(if_none_match, stored_etag):
+                return not_modified_response(stored_etag)
+            
         # Try to get the latest meal plan from Firestore
-        meal_plan = firestore_service.get_latest_meal_plan(user_id)
+        meal_plan, etag = firestore_service.get_latest_meal_plan_with_etag(user_id)
         
         if not meal_plan:
             # Nếu không tìm thấy trong Firestore, thử lấy từ bộ nhớ cục bộ
@@ -312,13 +438,23 @@ async def get_user_meal_plan(
                 try:
                     # Lưu kế hoạch ăn vào Firestore để đồng bộ
                     plan_dict = meal_plan.dict()
-                    firestore_service.db.collection('latest_meal_plans').document(user_id).set(plan_dict)
+                    firestore_service.set_latest_meal_plan(user_id, plan_dict)
                     print(f"[DEBUG] Đã đồng bộ kế hoạch ăn từ bộ nhớ cục bộ vào Firestore cho user {user_id}")
                 except Exception as e:
                     print(f"[WARNING] Không thể đồng bộ kế hoạch ăn vào Firestore: {str(e)}")
                 
+                etag = compute_etag(meal_plan)
+                if etag_matches(if_none_match, etag):
+                    return not_modified_response(etag)
+                set_etag_headers(response, etag)
                 return {"meal_plan": meal_plan.dict()}
-            
+        
+        # Document cũ chưa có ETag: tính theo nội dung
+        if not etag:
+            etag = compute_etag(meal_plan)
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+        set_etag_headers(response, etag)
         return {"meal_plan": meal_plan}
         
     except HTTPException:
@@ -444,7 +580,7 @@ async def replace_day(
             # Chuyển đổi model thành dict để lưu vào Firestore
             plan_dict = meal_plan.dict()
             # Lưu vào collection latest_meal_plans
-            firestore_service.db.collection('latest_meal_plans').document(user_id).set(plan_dict)
+            firestore_service.set_latest_meal_plan(user_id, plan_dict)
             print(f"[DEBUG] Đã lưu kế hoạch ăn cập nhật vào Firestore cho user {user_id}")
         except Exception as e:
             print(f"[WARNING] Không thể lưu kế hoạch ăn: {str(e)}")
@@ -710,7 +846,7 @@ async def replace_meal(
             # Chuyển đổi model thành dict để lưu vào Firestore
             plan_dict = current_plan.dict()
             # Lưu vào collection latest_meal_plans
-            firestore_service.db.collection('latest_meal_plans').document(user_id).set(plan_dict)
+            firestore_service.set_latest_meal_plan(user_id, plan_dict)
             print(f"[DEBUG] Đã lưu kế hoạch ăn cập nhật vào Firestore cho user {user_id}")
         except Exception as e:
             print(f"[WARNING] Không thể lưu kế hoạch ăn vào Firestore: {str(e)}")
@@ -756,8 +892,8 @@ async def sync_data(
         if not user_id:
             user_id = user.uid
             
-        print(f"Received sync request for user: {user_id}")
-        print(f"Received data: {json.dumps(data, indent=2)[:500]}...")
+        logger.info("Received sync request for user: %s", user_id)
+        logger.debug("Received data: %s", LazyJSON(data, limit=500))
         
         results = {
             "user_sync": False,
@@ -773,7 +909,7 @@ async def sync_data(
                 user_data = data["user"].copy()  # Tạo bản sao để tránh thay đổi dữ liệu gốc
                 user_data["lastSyncTime"] = datetime.now().isoformat()
                 
-                print(f"[SYNC] Processing user data for {user_id}: {json.dumps(user_data, indent=2)}")
+                logger.debug("[SYNC] Processing user data for %s: %s", user_id, LazyJSON(dict(user_data)))
                 
                 # Đảm bảo các trường dữ liệu được ánh xạ đúng
                 # Chuyển đổi tên trường từ Flutter sang tên trường trong Firestore nếu cần
@@ -796,7 +932,7 @@ async def sync_data(
                 # Xử lý nutrition_goals đặc biệt
                 if "nutrition_goals" in user_data and isinstance(user_data["nutrition_goals"], dict):
                     nutrition_goals = user_data.pop("nutrition_goals")
-                    print(f"[SYNC] Found nutrition_goals: {nutrition_goals}")
+                    logger.debug("[SYNC] Found nutrition_goals: %s", LazyJSON(nutrition_goals))
                     
                     # Ánh xạ trực tiếp các giá trị dinh dưỡng vào document gốc
                     if "calories" in nutrition_goals:
@@ -811,14 +947,14 @@ async def sync_data(
                     # Vẫn giữ lại nutritionGoals cho tương thích ngược
                     user_data["nutritionGoals"] = nutrition_goals
                 
-                print(f"[SYNC] Mapped user data: {json.dumps(user_data, indent=2)}")
+                logger.debug("[SYNC] Mapped user data: %s", LazyJSON(dict(user_data)))
                 
                 # Kiểm tra xem người dùng đã tồn tại chưa
                 existing_user = firestore_service.get_user(user_id)
                 
                 if existing_user:
-                    print(f"[SYNC] Updating existing user: {user_id}")
-                    print(f"[SYNC] Existing data: {json.dumps(existing_user, indent=2)}")
+                    logger.info("[SYNC] Updating existing user: %s", user_id)
+                    logger.debug("[SYNC] Existing data: %s", LazyJSON(existing_user))
                     
                     # Đảm bảo giữ lại các trường quan trọng từ dữ liệu hiện có
                     # nhưng vẫn cập nhật các giá trị dinh dưỡng mới
@@ -839,28 +975,27 @@ async def sync_data(
                         if key not in ["targetCalories", "targetProtein", "targetFat", "targetCarbs"]:
                             merged_data[key] = value
                     
-                    print(f"[SYNC] Merged data to save: {json.dumps(merged_data, indent=2)}")
+                    # Bản sao: update_user thêm updated_at vào merged_data trước khi bản ghi log được định dạng
+                    logger.debug("[SYNC] Merged data to save: %s", LazyJSON(dict(merged_data)))
                     
                     success = firestore_service.update_user(user_id, merged_data)
                     if success:
-                        print(f"[SYNC] Successfully updated user: {user_id}")
+                        logger.info("[SYNC] Successfully updated user: %s", user_id)
                         results["user_sync"] = True
                     else:
-                        print(f"[SYNC] Failed to update user: {user_id}")
+                        logger.warning("[SYNC] Failed to update user: %s", user_id)
                 else:
                     # Tạo người dùng mới
-                    print(f"[SYNC] Creating new user: {user_id}")
+                    logger.info("[SYNC] Creating new user: %s", user_id)
                     user_data["created_at"] = datetime.now().isoformat()
                     success = firestore_service.create_user(user_id, user_data)
                     if success:
-                        print(f"[SYNC] Successfully created new user: {user_id}")
+                        logger.info("[SYNC] Successfully created new user: %s", user_id)
                         results["user_sync"] = True
                     else:
-                        print(f"[SYNC] Failed to create user: {user_id}")
+                        logger.warning("[SYNC] Failed to create user: %s", user_id)
             except Exception as e:
-                print(f"[SYNC] Error syncing user data: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("[SYNC] Error syncing user data: %s", e)
                 results["user_sync_error"] = str(e)
         
         # Đồng bộ dữ liệu bữa ăn
@@ -869,7 +1004,7 @@ async def sync_data(
                 # TODO: Implement meal sync
                 results["meals_sync"] = True
             except Exception as e:
-                print(f"Error syncing meals data: {str(e)}")
+                logger.exception("Error syncing meals data: %s", e)
                 results["meals_sync_error"] = str(e)
         
         # Đồng bộ dữ liệu bài tập
@@ -878,7 +1013,7 @@ async def sync_data(
                 # TODO: Implement exercise sync
                 results["exercises_sync"] = True
             except Exception as e:
-                print(f"Error syncing exercises data: {str(e)}")
+                logger.exception("Error syncing exercises data: %s", e)
                 results["exercises_sync_error"] = str(e)
                 
         # Đồng bộ dữ liệu uống nước
@@ -887,12 +1022,12 @@ async def sync_data(
                 # TODO: Implement water log sync
                 results["water_logs_sync"] = True
             except Exception as e:
-                print(f"Error syncing water logs data: {str(e)}")
+                logger.exception("Error syncing water logs data: %s", e)
                 results["water_logs_sync_error"] = str(e)
         
         # Kiểm tra lại dữ liệu sau khi đồng bộ
         final_user = firestore_service.get_user(user_id)
-        print(f"[SYNC] Final user data after sync: {json.dumps(final_user, indent=2) if final_user else 'None'}")
+        logger.debug("[SYNC] Final user data after sync: %s", LazyJSON(final_user))
         
         return {
             "message": "Đồng bộ dữ liệu thành công",
@@ -900,9 +1035,7 @@ async def sync_data(
             "results": results
         }
     except Exception as e:
-        print(f"Error in sync_data: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in sync_data: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Lỗi đồng bộ dữ liệu: {str(e)}"
@@ -1,5 +1,5 @@
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Header, Response
 from fastapi.responses import RedirectResponse
 from datetime import datetime
 
@@ -21,6 +21,7 @@ from models.firestore_models import (
 from models.flutter_user_profile import FlutterUserProfile, FlutterUserUpdate
 from auth_utils import get_current_user
 from models.token import TokenPayload
+from etag_utils import compute_etag, etag_matches, not_modified_response, set_etag_headers
 
 router = APIRouter(tags=["firestore"])
 
@@ -351,8 +352,12 @@ async def get_meal_plans_by_user(user_id: str):
         )
 
 @router.get("/latest-meal-plan/{user_id}")
-async def get_latest_meal_plan(user_id: str):
-    """Lấy kế hoạch bữa ăn mới nhất của một người dùng"""
+async def get_latest_meal_plan(
+    user_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None)
+):
+    """Lấy kế hoạch bữa ăn mới nhất của một người dùng (hỗ trợ If-None-Match / 304)"""
     if not firestore_service.initialized:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -360,10 +365,22 @@ async def get_latest_meal_plan(user_id: str):
         )
     
     try:
+        # Client đã có bản sao: chỉ đọc trường ETag, không tải cả kế hoạch
+        if if_none_match:
+            stored_etag = firestore_service.get_latest_meal_plan_etag(user_id)
+            if etag_matches(if_none_match, stored_etag):
+                return not_modified_response(stored_etag)
+        
         # Sử dụng hàm trong firebase integration để truy vấn
-        meal_plan = firestore_service.get_latest_meal_plan(user_id)
+        meal_plan, etag = firestore_service.get_latest_meal_plan_with_etag(user_id)
         
         if meal_plan:
+            # Document cũ chưa có ETag: tính theo nội dung
+            if not etag:
+                etag = compute_etag(meal_plan)
+            if etag_matches(if_none_match, etag):
+                return not_modified_response(etag)
+            set_etag_headers(response, etag)
             # Trả về meal plan đầy đủ thay vì chỉ metadata
             return meal_plan
         else:
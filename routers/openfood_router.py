@@ -2,6 +2,7 @@ from fastapi import APIRouter, Request, Depends, Form, HTTPException, Body
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from typing import List, Dict, Optional, Any
+import asyncio
 import os
 import uuid
 from datetime import datetime
@@ -280,8 +281,9 @@ async def generate_meal(
         
         # Sử dụng groq_service đã import
         
-        # Gọi API để tạo món ăn
-        meal_suggestions = groq_service.generate_meal_suggestions(
+        # Gọi API để tạo món ăn (chạy trong thread: có thể chờ quota Groq)
+        meal_suggestions = await asyncio.to_thread(
+            groq_service.generate_meal_suggestions,
             calories_target=calories,
             protein_target=protein,
             fat_target=fat,
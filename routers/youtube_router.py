@@ -10,12 +10,12 @@ import json
 import hashlib
 from datetime import datetime, timedelta
 import asyncio
-import httpx
 import os
 from urllib.parse import quote_plus, urlencode
 from pydantic import BaseModel
 
 from auth_utils import get_current_user
+from http_clients import http_clients
 from models import TokenPayload
 
 # Setup logger
@@ -189,16 +189,15 @@ def _is_quality_video(video_data: Dict) -> bool:
     return positive_count > 0
 
 async def _make_youtube_request(url: str) -> Dict:
-    """Make async request to YouTube API"""
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.get(url)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"YouTube API error: {response.status_code}"
-            )
+    """Make async request to YouTube API (shared keep-alive client)"""
+    response = await http_clients.async_client("youtube").get(url)
+    if response.status_code == 200:
+        return response.json()
+    else:
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"YouTube API error: {response.status_code}"
+        )
 
 @router.post("/search", response_model=VideoSearchResponse)
 async def search_videos(
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+⏱️ Micro-benchmark pipeline sửa JSON từ phản hồi Groq
+Chạy _extract_json_from_response trên các phản hồi LLM đã ghi lại (scripts/fixtures) và in thời
+gian theo từng bước sửa JSON. Dùng --max-avg-ms để báo lỗi (exit code 1) khi có hồi quy.
+
+    python scripts/benchmark_json_repair.py --iterations 200 --max-avg-ms 5
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from groq_integration import GroqService
+from regex_registry import get_stage_timings, reset_stage_timings
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "groq_meal_responses.json")
+
+def load_recorded_responses(path: str = FIXTURES_PATH) -> List[Dict[str, str]]:
+    """
+    Đọc các phản hồi LLM đã ghi lại
+
+    Returns:
+        Danh sách {"label", "response"}
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def run_benchmark(iterations: int = 100, samples: List[Dict[str, str]] = None) -> Dict[str, Dict]:
+    """
+    Chạy pipeline trích xuất/sửa JSON trên từng phản hồi đã ghi lại
+
+    Args:
+        iterations: Số lần chạy mỗi phản hồi
+        samples: Phản hồi cần đo (mặc định đọc từ fixtures)
+
+    Returns:
+        Dict {"samples": label -> {avg_ms, meals}, "stages": thống kê theo bước}
+    """
+    samples = samples if samples is not None else load_recorded_responses()
+    service = GroqService(api_key=None)
+    reset_stage_timings()
+
+    results = {}
+    # Pipeline in rất nhiều log; bỏ stdout để không đo thời gian in ra màn hình
+    with contextlib.redirect_stdout(io.StringIO()):
+        for sample in samples:
+            meals = None
+            started = time.perf_counter()
+            for _ in range(iterations):
+                meals = service._extract_json_from_response(sample["response"])
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            results[sample["label"]] = {
+                "avg_ms": round(elapsed_ms / iterations, 3),
+                "meals": len(meals) if meals else 0,
+            }
+
+    return {"samples": results, "stages": get_stage_timings()}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark pipeline sửa JSON từ Groq")
+    parser.add_argument("--iterations", type=int, default=100, help="Số lần chạy mỗi phản hồi")
+    parser.add_argument("--max-avg-ms", type=float, default=None,
+                        help="Ngưỡng thời gian trung bình mỗi phản hồi (ms); vượt ngưỡng thì exit 1")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.iterations)
+
+    print(f"⏱️ JSON repair benchmark ({args.iterations} iterations)")
+    print(f"{'sample':<32}{'avg ms':>10}{'meals':>8}")
+    for label, stats in report["samples"].items():
+        print(f"{label:<32}{stats['avg_ms']:>10.3f}{stats['meals']:>8}")
+
+    print(f"\n{'stage':<32}{'calls':>8}{'avg ms':>10}{'max ms':>10}")
+    for stage, stats in sorted(report["stages"].items(), key=lambda item: -item[1]["total_ms"]):
+        print(f"{stage:<32}{stats['calls']:>8}{stats['avg_ms']:>10.3f}{stats['max_ms']:>10.3f}")
+
+    if args.max_avg_ms is not None:
+        slow = {label: stats["avg_ms"] for label, stats in report["samples"].items() if stats["avg_ms"] > args.max_avg_ms}
+        if slow:
+            print(f"\n❌ Vượt ngưỡng {args.max_avg_ms} ms: {slow}")
+            return 1
+        print(f"\n✅ Tất cả phản hồi dưới {args.max_avg_ms} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+📦 Biên dịch dish catalog
+Đọc các bảng món ăn tĩnh (fallback_meals, utils, generate_random_data, món truyền thống/đặc sắc,
+thực đơn VietnameseMealService) và ghi ra data/dish_catalog.json. Chạy lại sau khi sửa các module
+dữ liệu này; nếu quên, catalog phát hiện artifact cũ qua fingerprint và build từ module nguồn.
+
+    python scripts/build_dish_catalog.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dish_catalog import ARTIFACT_PATH, write_artifact
+
+def main() -> int:
+    counts = write_artifact(ARTIFACT_PATH)
+    print(f"📦 Wrote {ARTIFACT_PATH} ({os.path.getsize(ARTIFACT_PATH) // 1024} KB)")
+    for source, count in counts.items():
+        print(f"   {source:<20}{count:>6} dishes")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
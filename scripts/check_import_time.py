@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+⏱️ Kiểm tra thời gian import lúc khởi động (cold start)
+Chạy `python -X importtime -c "import main"` trong process mới, in các module tốn thời gian nhất
+và báo lỗi (exit code 1) khi tổng thời gian vượt ngân sách hoặc khi một SDK lẽ ra phải khởi tạo
+lười (LazyClient) bị import ngay lúc khởi động.
+
+    python scripts/check_import_time.py --budget-ms 3000
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# SDK chỉ được import khi client được dùng lần đầu
+DEFERRED_MODULES: Tuple[str, ...] = ("google.generativeai", "groq", "openai", "googleapiclient")
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def parse_importtime(output: str) -> List[Dict]:
+    """
+    Parse output của -X importtime
+
+    Returns:
+        Danh sách {"module", "self_ms", "cumulative_ms", "depth"} theo thứ tự import xong
+    """
+    rows = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            rows.append({
+                "module": match.group(4),
+                "self_ms": int(match.group(1)) / 1000,
+                "cumulative_ms": int(match.group(2)) / 1000,
+                "depth": (len(match.group(3)) - 1) // 2,
+            })
+    return rows
+
+def measure_import_time(module: str = "main") -> Dict:
+    """
+    Đo thời gian import một module trong process Python mới
+
+    Args:
+        module: Module cần import (mặc định ứng dụng FastAPI)
+
+    Returns:
+        Dict {"total_ms", "modules": các dòng importtime, "deferred_imported": SDK bị import sớm}
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR, capture_output=True, text=True, timeout=300
+    )
+    rows = parse_importtime(result.stderr)
+    total = next((row["cumulative_ms"] for row in rows if row["module"] == module and row["depth"] == 0), None)
+    if total is None:
+        raise RuntimeError(f"Không import được {module}:\n{result.stderr[-2000:]}")
+
+    imported = {row["module"] for row in rows}
+    return {
+        "total_ms": total,
+        "modules": rows,
+        "deferred_imported": [name for name in DEFERRED_MODULES if name in imported],
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Kiểm tra thời gian import lúc khởi động")
+    parser.add_argument("--module", default="main", help="Module cần đo (mặc định: main)")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Ngân sách tổng thời gian import (ms); vượt ngân sách thì exit 1")
+    parser.add_argument("--top", type=int, default=15, help="Số module tốn thời gian nhất cần in")
+    args = parser.parse_args()
+
+    report = measure_import_time(args.module)
+
+    print(f"⏱️ import {args.module}: {report['total_ms']:.0f} ms")
+    direct = [row for row in report["modules"] if row["depth"] == 1]
+    print(f"\n{'direct import':<40}{'cumulative ms':>15}")
+    for row in sorted(direct, key=lambda row: -row["cumulative_ms"])[:args.top]:
+        print(f"{row['module']:<40}{row['cumulative_ms']:>15.1f}")
+    print(f"\n{'module (self time)':<40}{'self ms':>15}")
+    for row in sorted(report["modules"], key=lambda row: -row["self_ms"])[:args.top]:
+        print(f"{row['module']:<40}{row['self_ms']:>15.1f}")
+
+    failed = False
+    if report["deferred_imported"]:
+        print(f"\n❌ SDK bị import lúc khởi động (cần khởi tạo lười): {report['deferred_imported']}")
+        failed = True
+    if args.budget_ms is not None and report["total_ms"] > args.budget_ms:
+        print(f"\n❌ Vượt ngân sách: {report['total_ms']:.0f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("\n✅ Import time OK")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,7 @@ AI Price Analysis Service for Vietnamese Food Prices
 Provides intelligent analysis, predictions, and optimization for food pricing
 """
 
+import asyncio
 import json
 import random
 from datetime import datetime, timedelta
@@ -171,9 +172,13 @@ class AIPriceAnalysisService:
         """
         try:
             if self.groq_service and hasattr(self.groq_service, 'chat'):
-                response = self.groq_service.chat(
+                # Model do llm_router chọn cho loại lời gọi "price_analysis" (idempotent nên cho phép hedge);
+                # chạy trong thread để không chặn event loop
+                response = await asyncio.to_thread(
+                    self.groq_service.chat,
                     messages=[{"role": "user", "content": prompt}],
-                    model="llama3-70b-8192",
+                    task="price_analysis",
+                    hedge=True,
                     max_tokens=1000,
                     temperature=0.7
                 )
@@ -1,6 +1,7 @@
 import traceback
 import json
-from typing import List, Dict, Any, Optional, Union
+import logging
+from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime
 from firebase_admin import firestore
 from google.cloud.firestore_v1.base_query import FieldFilter
@@ -23,6 +24,10 @@ from models.firestore_models import (
 from firebase_integration import firebase
 from models import WeeklyMealPlan
 from services.preparation_utils import process_preparation_steps
+from etag_utils import ETAG_FIELD, stamp_etag
+
+# Thiết lập logger
+logger = logging.getLogger(__name__)
 
 class FirestoreService:
     """
@@ -1060,9 +1065,22 @@ class FirestoreService:
         Returns:
             Đối tượng WeeklyMealPlan hoặc None nếu không tìm thấy
         """
+        meal_plan, _ = self.get_latest_meal_plan_with_etag(user_id)
+        return meal_plan
+
+    def get_latest_meal_plan_with_etag(self, user_id: str) -> Tuple[Optional[WeeklyMealPlan], Optional[str]]:
+        """
+        Lấy kế hoạch bữa ăn mới nhất kèm ETag đã lưu trong document
+        
+        Args:
+            user_id: ID của người dùng
+            
+        Returns:
+            Tuple (WeeklyMealPlan hoặc None, ETag hoặc None nếu document cũ chưa có ETag)
+        """
         if not self.initialized:
             print(f"Firestore not initialized when trying to get latest meal plan for {user_id}")
-            return None
+            return None, None
             
         try:
             print(f"[DEBUG] Getting latest meal plan for user: {user_id}")
@@ -1083,22 +1101,22 @@ class FirestoreService:
                         try:
                             # Chuyển đổi dữ liệu trước khi parse
                             transformed_data = self._transform_meal_plan_data(data)
-                            return WeeklyMealPlan(**transformed_data)
+                            return WeeklyMealPlan(**transformed_data), data.get(ETAG_FIELD)
                         except Exception as e:
                             print(f"[DEBUG] Error parsing meal plan from meal_plans: {str(e)}")
-                            return None
+                            return None, None
                     else:
                         print(f"[DEBUG] Invalid meal plan data from meal_plans for user: {user_id}")
-                        return None
+                        return None, None
                 else:
                     print(f"[DEBUG] No meal plans found for user: {user_id}")
-                    return None
+                    return None, None
             
             print(f"[DEBUG] Document found in latest_meal_plans for user: {user_id}")
             data = doc.to_dict()
             if not data or 'days' not in data:
                 print(f"[DEBUG] Invalid meal plan data in latest_meal_plans for user: {user_id}")
-                return None
+                return None, None
                 
             try:
                 # Chuyển đổi dữ liệu trước khi parse
@@ -1119,7 +1137,7 @@ class FirestoreService:
                     from pydantic import ValidationError
                     result = WeeklyMealPlan(**transformed_data)
                     print(f"[DEBUG] Successfully parsed meal plan with {len(result.days)} days")
-                    return result
+                    return result, data.get(ETAG_FIELD)
                 except ValidationError as ve:
                     print(f"[DEBUG] Pydantic validation error: {str(ve)}")
                     
@@ -1132,7 +1150,7 @@ class FirestoreService:
                     
                     import traceback
                     traceback.print_exc()
-                    return None
+                    return None, None
                     
             except Exception as e:
                 # Xử lý lỗi validation và in ra để debug
@@ -1143,12 +1161,50 @@ class FirestoreService:
                 print(f"[DEBUG] Raw data structure: {json.dumps(data)[:1000]}...")
                 
                 # Trả về None nếu không thể chuyển đổi, để backend cũ xử lý
-                return None
+                return None, None
         except Exception as e:
             print(f"[DEBUG] Error in get_latest_meal_plan: {str(e)}")
             traceback.print_exc()
+            return None, None
+
+    def get_latest_meal_plan_etag(self, user_id: str) -> Optional[str]:
+        """
+        Chỉ đọc trường ETag của kế hoạch bữa ăn mới nhất (không tải toàn bộ kế hoạch)
+        
+        Args:
+            user_id: ID của người dùng
+            
+        Returns:
+            ETag đã lưu hoặc None nếu không có
+        """
+        if not self.initialized:
+            return None
+            
+        try:
+            doc = self.db.collection('latest_meal_plans').document(user_id).get(field_paths=[ETAG_FIELD])
+            if not doc.exists:
+                return None
+            data = doc.to_dict() or {}
+            return data.get(ETAG_FIELD)
+        except Exception as e:
+            print(f"[DEBUG] Error reading meal plan ETag for user {user_id}: {str(e)}")
             return None
 
+    def set_latest_meal_plan(self, user_id: str, plan_dict: Dict[str, Any]) -> str:
+        """
+        Ghi kế hoạch bữa ăn vào collection latest_meal_plans kèm ETag mới
+        
+        Args:
+            user_id: ID của người dùng
+            plan_dict: Dữ liệu kế hoạch bữa ăn (sẽ được thêm trường ETag)
+            
+        Returns:
+            ETag của kế hoạch vừa ghi
+        """
+        etag = stamp_etag(plan_dict)
+        self.db.collection('latest_meal_plans').document(user_id).set(plan_dict)
+        return etag
+
     def _find_and_print_preparation_fields(self, data: Dict) -> None:
         """
         Tìm và in ra một số trường preparation để phân tích vấn đề
@@ -1454,7 +1510,7 @@ class FirestoreService:
                 # Thực hiện truy vấn
                 results2 = query2.get()
             except Exception as e:
-                print(f"[DEBUG] Query2 failed: {e}")
+                logger.debug("Exercise query by userId failed: %s", e)
                 results2 = []
 
             # Function để kiểm tra date có match với range không
@@ -1466,27 +1522,17 @@ class FirestoreService:
                 if 'T' in record_date:
                     record_date = record_date.split('T')[0]
 
-                print(f"[DEBUG] Comparing record_date: {record_date} with start_date: {start_date}, end_date: {end_date}")
-
                 # Kiểm tra range
                 if start_date and end_date:
-                    result = start_date <= record_date <= end_date
-                    print(f"[DEBUG] Range check result: {result}")
-                    return result
+                    return start_date <= record_date <= end_date
                 elif start_date:
-                    result = record_date >= start_date
-                    print(f"[DEBUG] Start date check result: {result}")
-                    return result
+                    return record_date >= start_date
                 elif end_date:
-                    result = record_date <= end_date
-                    print(f"[DEBUG] End date check result: {result}")
-                    return result
+                    return record_date <= end_date
                 else:
-                    print(f"[DEBUG] No date filter, returning True")
                     return True
 
             # Xử lý kết quả từ truy vấn thứ nhất
-            print(f"[DEBUG] Processing {len(results1)} results from query1")
             for doc in results1:
                 doc_id = doc.id
 
@@ -1494,7 +1540,6 @@ class FirestoreService:
                 if doc_id not in processed_ids:
                     data = doc.to_dict()
                     record_date = data.get('date', '')
-                    print(f"[DEBUG] Found exercise record: {data.get('name', 'N/A')} with date: {record_date}")
 
                     # Kiểm tra date có match với range không
                     if date_matches(record_date, start_date, end_date):
@@ -1522,7 +1567,6 @@ class FirestoreService:
                         history.append(transformed_data)
 
             # Xử lý kết quả từ truy vấn thứ hai, chỉ thêm vào nếu ID chưa tồn tại
-            print(f"[DEBUG] Processing {len(results2)} results from query2")
             for doc in results2:
                 doc_id = doc.id
 
@@ -1530,7 +1574,6 @@ class FirestoreService:
                 if doc_id not in processed_ids:
                     data = doc.to_dict()
                     record_date = data.get('date', '')
-                    print(f"[DEBUG] Found exercise record (query2): {data.get('name', 'N/A')} with date: {record_date}")
 
                     # Kiểm tra date có match với range không
                     if date_matches(record_date, start_date, end_date):
@@ -1557,13 +1600,12 @@ class FirestoreService:
 
                         history.append(transformed_data)
 
-            print(f"[DEBUG] Found {len(history)} exercise records for user {user_id}")
+            logger.debug("Found %d exercise records for user %s (%d user_id + %d userId documents scanned)",
+                         len(history), user_id, len(results1), len(results2))
             return history
 
         except Exception as e:
-            print(f"Error getting exercise history: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error getting exercise history: %s", e)
             return []
     
     # ===== BEVERAGE METHODS =====
@@ -2559,6 +2601,54 @@ class FirestoreService:
             # Trả về dict rỗng trong trường hợp lỗi
             return {"user_id": user_id}
 
+    def _prepare_food_log(self, food_log_data: dict) -> dict:
+        """
+        Tính lại tổng dinh dưỡng của bản ghi thực phẩm từ items hoặc recognized_foods (sửa trực tiếp food_log_data)
+        
+        Args:
+            food_log_data: Dữ liệu bản ghi thực phẩm
+            
+        Returns:
+            food_log_data đã cập nhật nutritionInfo/calories hoặc total_nutrition
+        """
+        # Tính toán lại tổng dinh dưỡng từ danh sách món ăn
+        if 'items' in food_log_data and isinstance(food_log_data['items'], list) and food_log_data['items']:
+            # Tính tổng dinh dưỡng từ danh sách items
+            total_nutrition = {
+                'calories': sum(item.get('calories', 0) for item in food_log_data['items']),
+                'protein': sum(item.get('protein', 0) for item in food_log_data['items']),
+                'carbs': sum(item.get('carbs', 0) for item in food_log_data['items']),
+                'fat': sum(item.get('fat', 0) for item in food_log_data['items']),
+                'fiber': sum(item.get('fiber', 0) for item in food_log_data['items'] if 'fiber' in item),
+                'sugar': sum(item.get('sugar', 0) for item in food_log_data['items'] if 'sugar' in item),
+                'sodium': sum(item.get('sodium', 0) for item in food_log_data['items'] if 'sodium' in item)
+            }
+            
+            # Cập nhật nutritionInfo trong food_log_data
+            if 'nutritionInfo' in food_log_data:
+                food_log_data['nutritionInfo'].update(total_nutrition)
+            else:
+                food_log_data['nutritionInfo'] = total_nutrition
+                
+            # Cập nhật calories ở mức cao nhất
+            food_log_data['calories'] = total_nutrition['calories']
+                
+            print(f"[DEBUG] Recalculated total nutrition: {total_nutrition}")
+        elif 'recognized_foods' in food_log_data and isinstance(food_log_data['recognized_foods'], list) and food_log_data['recognized_foods']:
+            # Tính tổng dinh dưỡng từ danh sách recognized_foods
+            total_nutrition = {
+                'calories': sum(food.get('nutrition', {}).get('calories', 0) for food in food_log_data['recognized_foods']),
+                'protein': sum(food.get('nutrition', {}).get('protein', 0) for food in food_log_data['recognized_foods']),
+                'carbs': sum(food.get('nutrition', {}).get('carbs', 0) for food in food_log_data['recognized_foods']),
+                'fat': sum(food.get('nutrition', {}).get('fat', 0) for food in food_log_data['recognized_foods'])
+            }
+            
+            # Cập nhật total_nutrition trong food_log_data
+            food_log_data['total_nutrition'] = total_nutrition
+            
+            print(f"[DEBUG] Recalculated total nutrition from recognized_foods: {total_nutrition}")
+        return food_log_data
+
     def add_food_log(self, user_id: str, food_log_data: dict) -> str:
         """
         Thêm bản ghi nhận diện thực phẩm vào Firestore
@@ -2578,42 +2668,7 @@ class FirestoreService:
             # Đảm bảo người dùng tồn tại trong Firestore
             self.get_or_create_user(user_id)
             
-            # Tính toán lại tổng dinh dưỡng từ danh sách món ăn
-            if 'items' in food_log_data and isinstance(food_log_data['items'], list) and food_log_data['items']:
-                # Tính tổng dinh dưỡng từ danh sách items
-                total_nutrition = {
-                    'calories': sum(item.get('calories', 0) for item in food_log_data['items']),
-                    'protein': sum(item.get('protein', 0) for item in food_log_data['items']),
-                    'carbs': sum(item.get('carbs', 0) for item in food_log_data['items']),
-                    'fat': sum(item.get('fat', 0) for item in food_log_data['items']),
-                    'fiber': sum(item.get('fiber', 0) for item in food_log_data['items'] if 'fiber' in item),
-                    'sugar': sum(item.get('sugar', 0) for item in food_log_data['items'] if 'sugar' in item),
-                    'sodium': sum(item.get('sodium', 0) for item in food_log_data['items'] if 'sodium' in item)
-                }
-                
-                # Cập nhật nutritionInfo trong food_log_data
-                if 'nutritionInfo' in food_log_data:
-                    food_log_data['nutritionInfo'].update(total_nutrition)
-                else:
-                    food_log_data['nutritionInfo'] = total_nutrition
-                    
-                # Cập nhật calories ở mức cao nhất
-                food_log_data['calories'] = total_nutrition['calories']
-                    
-                print(f"[DEBUG] Recalculated total nutrition: {total_nutrition}")
-            elif 'recognized_foods' in food_log_data and isinstance(food_log_data['recognized_foods'], list) and food_log_data['recognized_foods']:
-                # Tính tổng dinh dưỡng từ danh sách recognized_foods
-                total_nutrition = {
-                    'calories': sum(food.get('nutrition', {}).get('calories', 0) for food in food_log_data['recognized_foods']),
-                    'protein': sum(food.get('nutrition', {}).get('protein', 0) for food in food_log_data['recognized_foods']),
-                    'carbs': sum(food.get('nutrition', {}).get('carbs', 0) for food in food_log_data['recognized_foods']),
-                    'fat': sum(food.get('nutrition', {}).get('fat', 0) for food in food_log_data['recognized_foods'])
-                }
-                
-                # Cập nhật total_nutrition trong food_log_data
-                food_log_data['total_nutrition'] = total_nutrition
-                
-                print(f"[DEBUG] Recalculated total nutrition from recognized_foods: {total_nutrition}")
+            self._prepare_food_log(food_log_data)
             
             # Thêm bản ghi vào collection food_records
             food_logs_ref = self.db.collection('users').document(user_id).collection('food_records')
@@ -2630,6 +2685,43 @@ class FirestoreService:
             traceback.print_exc()
             return None
 
+    def add_food_logs_batch(self, user_id: str, food_logs: List[dict]) -> List[str]:
+        """
+        Thêm nhiều bản ghi nhận diện thực phẩm trong một batch (một lần ghi Firestore)
+        
+        Args:
+            user_id: ID của người dùng
+            food_logs: Danh sách dữ liệu bản ghi (tối đa 500, giới hạn của Firestore batch)
+            
+        Returns:
+            Danh sách ID document theo thứ tự food_logs (rỗng nếu thất bại)
+        """
+        if not self.db:
+            print("Firestore service not available")
+            return []
+        if not food_logs:
+            return []
+            
+        try:
+            # Đảm bảo người dùng tồn tại trong Firestore
+            self.get_or_create_user(user_id)
+            
+            food_logs_ref = self.db.collection('users').document(user_id).collection('food_records')
+            batch = self.db.batch()
+            doc_ids = []
+            for food_log_data in food_logs:
+                doc_ref = food_logs_ref.document()
+                batch.set(doc_ref, self._prepare_food_log(food_log_data))
+                doc_ids.append(doc_ref.id)
+            batch.commit()
+            
+            print(f"Added {len(doc_ids)} food logs in one batch for user {user_id}")
+            return doc_ids
+        except Exception as e:
+            print(f"Error adding food logs batch: {str(e)}")
+            traceback.print_exc()
+            return []
+
     def update_food_log(self, user_id: str, log_id: str, recognized_foods=None, total_nutrition=None) -> bool:
         """
         Cập nhật bản ghi thực phẩm
@@ -2789,9 +2881,8 @@ class FirestoreService:
         try:
             print(f"[INFO] Saving meal plan for user: {user_id}")
             
-            # Lưu vào collection latest_meal_plans
-            latest_ref = self.db.collection('latest_meal_plans').document(user_id)
-            latest_ref.set(meal_plan_data)
+            # Lưu vào collection latest_meal_plans (kèm ETag cho conditional GET)
+            self.set_latest_meal_plan(user_id, meal_plan_data)
             
             # Đồng thời lưu vào collection meal_plans với timestamp
             import time
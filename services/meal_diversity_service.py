@@ -1,8 +1,15 @@
 """
 Dịch vụ đảm bảo đa dạng món ăn trong kế hoạch ăn uống.
+
+Trùng lặp được xác định bằng DishSimilarityIndex (cùng quy tắc với GroqService), nên các biến
+thể gần giống nhau như "Phở Bò" và "Phở Bò Tái" cũng được tính là trùng.
 """
 import random
-from typing import Dict, List, Set, Any
+from typing import Dict, List, Any
+
+from dish_similarity_index import DishSimilarityIndex
+
+MEAL_TYPES = ("Bữa sáng", "Bữa trưa", "Bữa tối")
 
 class MealDiversityService:
     """Dịch vụ đảm bảo đa dạng món ăn trong kế hoạch ăn uống."""
@@ -22,11 +29,7 @@ class MealDiversityService:
             return 0.0
             
         weekly_plan = meal_plan["weekly_plan"]
-        meal_names_by_type = {
-            "Bữa sáng": set(),
-            "Bữa trưa": set(),
-            "Bữa tối": set(),
-        }
+        meal_names_by_type = {meal_type: DishSimilarityIndex() for meal_type in MEAL_TYPES}
         
         duplicate_count = 0
         total_meals = 0
@@ -46,8 +49,8 @@ class MealDiversityService:
                 meal_name = meal.get("name", "")
                 total_meals += 1
                 
-                # Kiểm tra trùng lặp
-                if meal_type in meal_names_by_type and meal_name in meal_names_by_type[meal_type]:
+                # Kiểm tra trùng lặp (kể cả gần trùng)
+                if meal_type in meal_names_by_type and meal_names_by_type[meal_type].is_similar(meal_name):
                     duplicate_count += 1
                 elif meal_type in meal_names_by_type:
                     meal_names_by_type[meal_type].add(meal_name)
@@ -71,18 +74,10 @@ class MealDiversityService:
             return meal_plan
             
         weekly_plan = meal_plan["weekly_plan"]
-        meal_names_by_type = {
-            "Bữa sáng": set(),
-            "Bữa trưa": set(),
-            "Bữa tối": set(),
-        }
+        meal_names_by_type = {meal_type: DishSimilarityIndex() for meal_type in MEAL_TYPES}
         
         # Lưu trữ tất cả món ăn theo loại bữa
-        all_meals_by_type = {
-            "Bữa sáng": [],
-            "Bữa trưa": [],
-            "Bữa tối": [],
-        }
+        all_meals_by_type = {meal_type: [] for meal_type in MEAL_TYPES}
         
         # Thu thập tất cả món ăn
         for day, day_plan in weekly_plan.items():
@@ -114,12 +109,12 @@ class MealDiversityService:
                 meal = meals[0]
                 meal_name = meal.get("name", "")
                 
-                # Nếu món ăn đã tồn tại trong set, thay thế bằng món khác
-                if meal_type in meal_names_by_type and meal_name in meal_names_by_type[meal_type]:
+                # Nếu món ăn (hoặc món gần giống) đã được dùng, thay thế bằng món khác
+                if meal_type in meal_names_by_type and meal_names_by_type[meal_type].is_similar(meal_name):
                     # Tìm món ăn thay thế không trùng lặp
                     replacement_meal = MealDiversityService._find_replacement_meal(
                         all_meals_by_type.get(meal_type, []),
-                        meal_names_by_type.get(meal_type, set())
+                        meal_names_by_type[meal_type]
                     )
                     
                     if replacement_meal:
@@ -128,20 +123,20 @@ class MealDiversityService:
                         # Cập nhật nutrition summary cho ngày
                         MealDiversityService._update_day_nutrition_summary(day_plan)
                         
-                # Thêm món ăn vào set đã sử dụng
+                # Thêm món ăn vào chỉ mục đã sử dụng
                 if meal_type in meal_names_by_type:
                     meal_names_by_type[meal_type].add(meals[0].get("name", ""))
         
         return meal_plan
     
     @staticmethod
-    def _find_replacement_meal(available_meals: List[Dict[str, Any]], used_names: Set[str]) -> Dict[str, Any]:
+    def _find_replacement_meal(available_meals: List[Dict[str, Any]], used_names: DishSimilarityIndex) -> Dict[str, Any]:
         """
         Tìm món ăn thay thế không trùng lặp.
 
         Args:
             available_meals: Danh sách các món ăn có sẵn
-            used_names: Tên các món ăn đã được sử dụng
+            used_names: Chỉ mục các món ăn đã được sử dụng
 
         Returns:
             Dict[str, Any]: Món ăn thay thế hoặc None nếu không tìm thấy
@@ -149,8 +144,8 @@ class MealDiversityService:
         # 🔧 FIX: Enhanced diversity logic
         import time
 
-        # Lọc các món ăn chưa được sử dụng
-        unused_meals = [meal for meal in available_meals if meal.get("name", "") not in used_names]
+        # Lọc các món ăn chưa được sử dụng và không gần giống món đã dùng
+        unused_meals = [meal for meal in available_meals if not used_names.is_similar(meal.get("name", ""))]
 
         if unused_meals:
             # 🔧 FIX: Use time-based seed for better randomness
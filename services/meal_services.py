@@ -1,4 +1,5 @@
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
+import logging
 import random
 from models import (
     NutritionTarget, ReplaceDayRequest, DayMealPlan, WeeklyMealPlan,
@@ -11,6 +12,9 @@ from utils import (
 )
 from services.vietnamese_meal_service import vietnamese_meal_service
 
+# Thiết lập logger
+logger = logging.getLogger(__name__)
+
 # 🔧 FIX: Import Vietnamese dish generator để thay thế SAMPLE_RECIPES
 try:
     from services.vietnamese_dish_generator import vietnamese_dish_generator
@@ -858,7 +862,8 @@ def generate_weekly_meal_plan(
     cuisine_style: str = None,
     use_ai: bool = True,
     use_tdee: bool = True,  # Thêm tham số use_tdee
-    user_data: Dict = None  # Add user_data parameter
+    user_data: Dict = None,  # Add user_data parameter
+    on_day_complete: Callable[[int, DayMealPlan], None] = None
 ) -> WeeklyMealPlan:
     """
     Generate a weekly meal plan with daily meals that meet nutritional targets.
@@ -874,16 +879,14 @@ def generate_weekly_meal_plan(
         use_ai: Whether to use AI for generation
         use_tdee: Whether to use TDEE for calorie adjustment
         user_data: Dictionary containing user demographic and goal info (optional)
+        on_day_complete: Called with (day index, day plan) after each day is generated (optional)
         
     Returns:
         WeeklyMealPlan object with daily meal plans
     """
-    print("======================= GENERATING WEEKLY MEAL PLAN =======================")
-    print(f"Targets: calories={calories_target}, protein={protein_target}, fat={fat_target}, carbs={carbs_target}")
-    print(f"Preferences: {preferences}")
-    print(f"Allergies: {allergies}")
-    print(f"Cuisine style: {cuisine_style}")
-    print(f"Using AI: {use_ai}")
+    logger.info("Generating weekly meal plan: calories=%s, protein=%s, fat=%s, carbs=%s, use_ai=%s",
+                calories_target, protein_target, fat_target, carbs_target, use_ai)
+    logger.debug("Preferences: %s, allergies: %s, cuisine style: %s", preferences, allergies, cuisine_style)
     
     # Reset used dishes tracker to ensure fresh variety for a new weekly plan
     reset_tracker()
@@ -891,8 +894,6 @@ def generate_weekly_meal_plan(
     # Generate meal plan for each day of the week
     days = []
     for day_idx, day in enumerate(DAYS_OF_WEEK):
-        print(f"\n----- Generating plan for {day} (Day {day_idx+1}/7) -----")
-        
         # Thêm biến động nhỏ vào mục tiêu dinh dưỡng để tăng sự đa dạng
         # Sử dụng day_idx để tạo biến động khác nhau cho mỗi ngày
         # Biến động từ -5% đến +5% dựa trên ngày
@@ -903,7 +904,8 @@ def generate_weekly_meal_plan(
         day_fat = int(fat_target * variation_factor)
         day_carbs = int(carbs_target * variation_factor)
         
-        print(f"Day {day} targets with variation ({variation_factor:.3f}): cal={day_calories}, protein={day_protein}, fat={day_fat}, carbs={day_carbs}")
+        logger.debug("Day %s (%d/7) targets with variation (%.3f): cal=%s, protein=%s, fat=%s, carbs=%s",
+                     day, day_idx + 1, variation_factor, day_calories, day_protein, day_fat, day_carbs)
         
         # Thêm random seed dựa trên ngày để đảm bảo mỗi ngày có món ăn khác nhau
         random.seed(day_idx * 1000 + calories_target % 100)
@@ -924,22 +926,21 @@ def generate_weekly_meal_plan(
             day_plan.dinner and day_plan.dinner.dishes and len(day_plan.dinner.dishes) > 0):
             has_dishes = True
         
-        print(f"Day {day} has dishes: {has_dishes}")
-        print(f"Breakfast dishes: {len(day_plan.breakfast.dishes)}")
-        print(f"Lunch dishes: {len(day_plan.lunch.dishes)}")
-        print(f"Dinner dishes: {len(day_plan.dinner.dishes)}")
+        logger.debug("Day %s has dishes: %s (breakfast=%d, lunch=%d, dinner=%d)", day, has_dishes,
+                     len(day_plan.breakfast.dishes), len(day_plan.lunch.dishes), len(day_plan.dinner.dishes))
         
         # Kiểm tra tổng calories của ngày có vượt quá mục tiêu không
         day_total_calories = day_plan.nutrition.calories
         calories_diff = abs(day_total_calories - day_calories)
         calories_percent_diff = (calories_diff / day_calories) * 100
         
-        print(f"Day {day} total calories: {day_total_calories:.1f}, target: {day_calories}, diff: {calories_percent_diff:.1f}%")
+        logger.debug("Day %s total calories: %.1f, target: %s, diff: %.1f%%",
+                     day, day_total_calories, day_calories, calories_percent_diff)
         
         # Nếu chênh lệch quá lớn (>10%), tạo lại kế hoạch cho ngày đó
         if calories_percent_diff > 10:
-            print(f"WARNING: Day {day} calories {day_total_calories:.1f} differ from target {day_calories} by {calories_percent_diff:.1f}%")
-            print("Regenerating day plan with stricter controls...")
+            logger.warning("Day %s calories %.1f differ from target %s by %.1f%%, regenerating with stricter controls",
+                           day, day_total_calories, day_calories, calories_percent_diff)
             
             # Tạo lại kế hoạch ngày với mục tiêu chính xác
             day_plan = generate_day_meal_plan(
@@ -948,42 +949,42 @@ def generate_weekly_meal_plan(
                 user_data=user_data
             )
             
-            print(f"Regenerated day {day} calories: {day_plan.nutrition.calories:.1f}")
+            logger.info("Regenerated day %s calories: %.1f", day, day_plan.nutrition.calories)
         
         days.append(day_plan)
+        if on_day_complete:
+            on_day_complete(day_idx, day_plan)
         
-        # In ra thông tin về các món đã sử dụng trong tuần
-        print(f"Weekly tracking - Breakfast dishes used so far: {len(used_dishes_tracker['breakfast'])}")
-        print(f"Weekly tracking - Lunch dishes used so far: {len(used_dishes_tracker['lunch'])}")
-        print(f"Weekly tracking - Dinner dishes used so far: {len(used_dishes_tracker['dinner'])}")
+        # Ghi lại số món đã sử dụng trong tuần
+        logger.debug("Weekly tracking - dishes used so far: breakfast=%d, lunch=%d, dinner=%d",
+                     len(used_dishes_tracker['breakfast']), len(used_dishes_tracker['lunch']),
+                     len(used_dishes_tracker['dinner']))
     
     # Create and return the WeeklyMealPlan object
     weekly_plan = WeeklyMealPlan(days=days)
     
-    print("\n----- Weekly Plan Summary -----")
-    total_dishes = 0
-    total_calories = 0
-    unique_dishes = set()
-    
-    for day in weekly_plan.days:
-        day_dishes = []
-        if day.breakfast and day.breakfast.dishes:
-            day_dishes.extend([dish.name for dish in day.breakfast.dishes])
-        if day.lunch and day.lunch.dishes:
-            day_dishes.extend([dish.name for dish in day.lunch.dishes])
-        if day.dinner and day.dinner.dishes:
-            day_dishes.extend([dish.name for dish in day.dinner.dishes])
-            
-        total_dishes += len(day_dishes)
-        unique_dishes.update(day_dishes)
-        total_calories += day.nutrition.calories
-        print(f"Day {day.day_of_week}: {len(day_dishes)} dishes, {day.nutrition.calories:.1f} calories")
-    
-    avg_daily_calories = total_calories / len(weekly_plan.days) if weekly_plan.days else 0
-    print(f"Total dishes across all days: {total_dishes}")
-    print(f"Unique dishes in the plan: {len(unique_dishes)} of {total_dishes} ({len(unique_dishes)/total_dishes*100:.1f}% unique)")
-    print(f"Average daily calories: {avg_daily_calories:.1f} (target: {calories_target})")
-    print("======================= WEEKLY MEAL PLAN GENERATED =======================")
+    # Tổng kết chỉ tính khi log INFO được bật
+    if logger.isEnabledFor(logging.INFO):
+        total_dishes = 0
+        total_calories = 0
+        unique_dishes = set()
+        
+        for day in weekly_plan.days:
+            day_dishes = []
+            if day.breakfast and day.breakfast.dishes:
+                day_dishes.extend([dish.name for dish in day.breakfast.dishes])
+            if day.lunch and day.lunch.dishes:
+                day_dishes.extend([dish.name for dish in day.lunch.dishes])
+            if day.dinner and day.dinner.dishes:
+                day_dishes.extend([dish.name for dish in day.dinner.dishes])
+                
+            total_dishes += len(day_dishes)
+            unique_dishes.update(day_dishes)
+            total_calories += day.nutrition.calories
+        
+        avg_daily_calories = total_calories / len(weekly_plan.days) if weekly_plan.days else 0
+        logger.info("Weekly meal plan generated: %d dishes, %d unique, average daily calories %.1f (target: %s)",
+                    total_dishes, len(unique_dishes), avg_daily_calories, calories_target)
     
     return weekly_plan
 
@@ -3,7 +3,6 @@ Professional Nutrition API Service
 Tích hợp các API dinh dưỡng chuyên nghiệp cho chatbot
 """
 
-import httpx
 import asyncio
 import json
 import os
@@ -11,6 +10,8 @@ from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import logging
 
+from http_clients import http_clients
+
 logger = logging.getLogger(__name__)
 
 class USDAFoodDataService:
@@ -39,28 +40,28 @@ class USDAFoodDataService:
                 "dataType": ["Foundation", "SR Legacy"]  # High quality data
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
+            client = http_clients.async_client("usda")
+            response = await client.get(url, params=params)
+            
+            if response.status_code == 200:
+                data = response.json()
+                foods = []
+                
+                for food in data.get("foods", []):
+                    food_info = {
+                        "fdc_id": food.get("fdcId"),
+                        "description": food.get("description"),
+                        "brand": food.get("brandOwner", ""),
+                        "ingredients": food.get("ingredients", ""),
+                        "nutrients": self._extract_nutrients(food.get("foodNutrients", []))
+                    }
+                    foods.append(food_info)
+                
+                return foods
+            else:
+                logger.error(f"USDA API error: {response.status_code}")
+                return []
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    foods = []
-                    
-                    for food in data.get("foods", []):
-                        food_info = {
-                            "fdc_id": food.get("fdcId"),
-                            "description": food.get("description"),
-                            "brand": food.get("brandOwner", ""),
-                            "ingredients": food.get("ingredients", ""),
-                            "nutrients": self._extract_nutrients(food.get("foodNutrients", []))
-                        }
-                        foods.append(food_info)
-                    
-                    return foods
-                else:
-                    logger.error(f"USDA API error: {response.status_code}")
-                    return []
-                    
         except Exception as e:
             logger.error(f"Error searching USDA foods: {e}")
             return []
@@ -73,19 +74,19 @@ class USDAFoodDataService:
             url = f"{self.base_url}/food/{fdc_id}"
             params = {"api_key": self.api_key}
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
+            client = http_clients.async_client("usda")
+            response = await client.get(url, params=params)
+            
+            if response.status_code == 200:
+                food = response.json()
+                return {
+                    "fdc_id": food.get("fdcId"),
+                    "description": food.get("description"),
+                    "nutrients": self._extract_nutrients(food.get("foodNutrients", [])),
+                    "portions": self._extract_portions(food.get("foodPortions", [])),
+                    "category": food.get("foodCategory", {}).get("description", "")
+                }
                 
-                if response.status_code == 200:
-                    food = response.json()
-                    return {
-                        "fdc_id": food.get("fdcId"),
-                        "description": food.get("description"),
-                        "nutrients": self._extract_nutrients(food.get("foodNutrients", [])),
-                        "portions": self._extract_portions(food.get("foodPortions", [])),
-                        "category": food.get("foodCategory", {}).get("description", "")
-                    }
-                    
         except Exception as e:
             logger.error(f"Error getting USDA food details: {e}")
             return None
@@ -161,20 +162,20 @@ class EdamamNutritionService:
                 "ingr": ingredients
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, params=params, json=data)
+            client = http_clients.async_client("edamam")
+            response = await client.post(url, params=params, json=data)
+            
+            if response.status_code == 200:
+                result = response.json()
+                return {
+                    "calories": result.get("calories", 0),
+                    "totalWeight": result.get("totalWeight", 0),
+                    "nutrients": result.get("totalNutrients", {}),
+                    "healthLabels": result.get("healthLabels", []),
+                    "dietLabels": result.get("dietLabels", []),
+                    "cautions": result.get("cautions", [])
+                }
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    return {
-                        "calories": result.get("calories", 0),
-                        "totalWeight": result.get("totalWeight", 0),
-                        "nutrients": result.get("totalNutrients", {}),
-                        "healthLabels": result.get("healthLabels", []),
-                        "dietLabels": result.get("dietLabels", []),
-                        "cautions": result.get("cautions", [])
-                    }
-                    
         except Exception as e:
             logger.error(f"Error analyzing recipe with Edamam: {e}")
             return None
@@ -4,11 +4,12 @@ Service xác minh độ chính xác của dữ liệu dinh dưỡng
 Tích hợp với các API chính thức để đảm bảo tính chính xác
 """
 
-import requests
 import json
 from typing import Dict, Optional, List
 from dataclasses import dataclass
 
+from http_clients import http_clients
+
 @dataclass
 class NutritionVerification:
     """Kết quả xác minh dữ liệu dinh dưỡng"""
@@ -71,7 +72,7 @@ class NutritionVerificationService:
                 "pageSize": 5
             }
             
-            response = requests.get(search_url, params=params, timeout=10)
+            response = http_clients.session("usda").get(search_url, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -119,7 +120,7 @@ class NutritionVerificationService:
                 "ingr": [f"1 serving {dish_name}"]
             }
             
-            response = requests.post(url, params=params, json=recipe_data, timeout=10)
+            response = http_clients.session("edamam").post(url, params=params, json=recipe_data, timeout=10)
             
             if response.status_code == 200:
                 edamam_data = response.json()
@@ -10,7 +10,9 @@ from vietnamese_nutrition_extended import (
     VEGETABLES_NUTRITION, FRUITS_NUTRITION, MEAT_NUTRITION,
     SEAFOOD_NUTRITION, EGGS_NUTRITION, DAIRY_NUTRITION
 )
-from vietnamese_traditional_dishes import ALL_TRADITIONAL_DISHES
+from dish_catalog import get_dish_catalog
+from nutrient_matrix import calculate_many
+from amount_parser import parse_many
 
 class VietnameseDishGenerator:
     """
@@ -100,6 +102,25 @@ class VietnameseDishGenerator:
         self.seasonings = [
             "nước mắm", "muối", "đường", "tiêu", "tỏi", "hành", "gừng", "sả", "ớt"
         ]
+        
+        # Bảng tra cứu dựng sẵn (build một lần khi warm-up hoặc lần dùng đầu tiên)
+        self._traditional_by_meal_type: Optional[Dict[str, List[Tuple[str, Dict]]]] = None
+        self._protein_ingredient_names: frozenset = frozenset()
+    
+    def build_lookup_tables(self) -> None:
+        """Build các bảng tra cứu tĩnh: món truyền thống theo bữa, tên nguyên liệu đạm (idempotent)"""
+        if self._traditional_by_meal_type is not None:
+            return
+        
+        # View theo bữa của dish catalog (record chỉ đọc, dùng chung, không copy)
+        catalog = get_dish_catalog()
+        traditional_by_meal_type: Dict[str, List[Tuple[str, Dict]]] = {
+            meal_type: [(dish.name, dish) for dish in catalog.dishes("traditional", meal_type)]
+            for meal_type in catalog.meal_types("traditional")
+        }
+        
+        self._protein_ingredient_names = frozenset(MEAT_NUTRITION) | frozenset(SEAFOOD_NUTRITION)
+        self._traditional_by_meal_type = traditional_by_meal_type
     
     def generate_dish_name(self, pattern: Dict, region: str) -> str:
         """Tạo tên món ăn từ pattern"""
@@ -122,48 +143,58 @@ class VietnameseDishGenerator:
     
     def calculate_dish_nutrition(self, ingredients: List[Dict]) -> Dict:
         """Tính toán dinh dưỡng món ăn từ nguyên liệu"""
-        total_nutrition = {"calories": 0, "protein": 0, "fat": 0, "carbs": 0}
-        
-        for ingredient in ingredients:
-            name = ingredient["name"]
-            amount = ingredient["amount"]  # in grams
-            
-            # 🔧 FIX: Enhanced nutrition lookup với fallback
-            nutrition_data = None
+        return self.calculate_many_dish_nutrition([ingredients])[0]
 
-            # Tìm trong các database
-            for nutrition_db in [VEGETABLES_NUTRITION, FRUITS_NUTRITION, MEAT_NUTRITION,
-                               SEAFOOD_NUTRITION, EGGS_NUTRITION, DAIRY_NUTRITION]:
-                if name in nutrition_db:
-                    nutrition_data = nutrition_db[name]
-                    break
+    def calculate_many_dish_nutrition(self, ingredient_lists: List[List[Dict]]) -> List[Dict]:
+        """
+        Tính dinh dưỡng cho nhiều món cùng lúc bằng ma trận dinh dưỡng
 
-            # 🔧 FIX: Fallback cho các ingredient không tìm thấy
-            if not nutrition_data:
-                # Estimate nutrition based on ingredient type
-                if any(keyword in name.lower() for keyword in ['thịt', 'bò', 'heo', 'gà']):
-                    nutrition_data = {"calories": 150, "protein": 20, "fat": 8, "carbs": 0}
-                elif any(keyword in name.lower() for keyword in ['cá', 'tôm', 'mực']):
-                    nutrition_data = {"calories": 100, "protein": 18, "fat": 2, "carbs": 0}
-                elif any(keyword in name.lower() for keyword in ['cơm', 'bánh', 'bún', 'phở']):
-                    nutrition_data = {"calories": 130, "protein": 3, "fat": 0.3, "carbs": 28}
-                elif any(keyword in name.lower() for keyword in ['rau', 'cải', 'cà']):
-                    nutrition_data = {"calories": 25, "protein": 2, "fat": 0.2, "carbs": 4}
-                else:
-                    # Default fallback
-                    nutrition_data = {"calories": 50, "protein": 2, "fat": 1, "carbs": 8}
+        Args:
+            ingredient_lists: Mỗi phần tử là danh sách nguyên liệu {"name", "amount"} của một món
 
-                print(f"⚠️ Using fallback nutrition for '{name}': {nutrition_data}")
+        Returns:
+            Danh sách dict calories/protein/fat/carbs theo thứ tự đầu vào
+        """
+        # Khối lượng có thể là số gram hoặc chuỗi như "2 quả", "1 muỗng canh"
+        grams_per_dish = [parse_many((ingredient["amount"], ingredient["name"]) for ingredient in ingredients)
+                          for ingredients in ingredient_lists]
+        batches = [list(zip((ingredient["name"] for ingredient in ingredients), grams))
+                   for ingredients, grams in zip(ingredient_lists, grams_per_dish)]
 
-            if nutrition_data:
+        results = []
+        for batch, (totals, missing) in zip(batches, calculate_many(batches)):
+            total_nutrition = {field: totals[field] for field in ("calories", "protein", "fat", "carbs")}
+
+            # 🔧 FIX: Fallback cho các ingredient không tìm thấy
+            missing_names = set(missing)
+            for name, grams in batch:
+                if name not in missing_names:
+                    continue
+                nutrition_data = self._estimate_ingredient_nutrition(name)
                 # Scale theo amount (nutrition data là per 100g)
-                scale = amount / 100.0
-                total_nutrition["calories"] += nutrition_data["calories"] * scale
-                total_nutrition["protein"] += nutrition_data["protein"] * scale
-                total_nutrition["fat"] += nutrition_data["fat"] * scale
-                total_nutrition["carbs"] += nutrition_data["carbs"] * scale
-        
-        return total_nutrition
+                scale = grams / 100.0
+                for field in total_nutrition:
+                    total_nutrition[field] += nutrition_data[field] * scale
+
+            results.append(total_nutrition)
+        return results
+
+    def _estimate_ingredient_nutrition(self, name: str) -> Dict:
+        """Ước tính dinh dưỡng (per 100g) theo loại nguyên liệu khi không có trong database"""
+        if any(keyword in name.lower() for keyword in ['thịt', 'bò', 'heo', 'gà']):
+            nutrition_data = {"calories": 150, "protein": 20, "fat": 8, "carbs": 0}
+        elif any(keyword in name.lower() for keyword in ['cá', 'tôm', 'mực']):
+            nutrition_data = {"calories": 100, "protein": 18, "fat": 2, "carbs": 0}
+        elif any(keyword in name.lower() for keyword in ['cơm', 'bánh', 'bún', 'phở']):
+            nutrition_data = {"calories": 130, "protein": 3, "fat": 0.3, "carbs": 28}
+        elif any(keyword in name.lower() for keyword in ['rau', 'cải', 'cà']):
+            nutrition_data = {"calories": 25, "protein": 2, "fat": 0.2, "carbs": 4}
+        else:
+            # Default fallback
+            nutrition_data = {"calories": 50, "protein": 2, "fat": 1, "carbs": 8}
+
+        print(f"⚠️ Using fallback nutrition for '{name}': {nutrition_data}")
+        return nutrition_data
     
     def generate_ingredients(self, pattern: Dict, serving_size: int = 1) -> List[Dict]:
         """Tạo danh sách nguyên liệu cho món ăn"""
@@ -174,25 +205,14 @@ class VietnameseDishGenerator:
         if base in ["phở", "bún", "hủ tiếu"]:
             # Thêm bánh phở/bún với lượng hợp lý
             carb_name = "bánh phở" if base == "phở" else "bún tươi"
-            # Tạo nutrition data cho bánh phở/bún (estimate based on rice noodles)
             ingredients.append({"name": carb_name, "amount": 200 * serving_size})
-            # Add to nutrition database if not exists
-            if carb_name not in VEGETABLES_NUTRITION:
-                # Rice noodles nutrition estimate
-                VEGETABLES_NUTRITION[carb_name] = {"calories": 109, "fat": 0.2, "carbs": 25.0, "protein": 2.2}
         elif base == "cơm":
             # Cooked rice
             ingredients.append({"name": "cơm trắng", "amount": 200 * serving_size})
-            if "cơm trắng" not in VEGETABLES_NUTRITION:
-                VEGETABLES_NUTRITION["cơm trắng"] = {"calories": 130, "fat": 0.3, "carbs": 28.0, "protein": 2.7}
         elif base == "xôi":
             ingredients.append({"name": "xôi nếp", "amount": 150 * serving_size})
-            if "xôi nếp" not in VEGETABLES_NUTRITION:
-                VEGETABLES_NUTRITION["xôi nếp"] = {"calories": 116, "fat": 0.2, "carbs": 26.0, "protein": 2.4}
         elif base in ["bánh", "bánh cuốn", "bánh xèo"]:
             ingredients.append({"name": "bánh tráng", "amount": 100 * serving_size})
-            if "bánh tráng" not in VEGETABLES_NUTRITION:
-                VEGETABLES_NUTRITION["bánh tráng"] = {"calories": 334, "fat": 0.6, "carbs": 83.0, "protein": 3.0}
         elif base == "canh":
             # Canh thường ăn với cơm
             ingredients.append({"name": "cơm trắng", "amount": 150 * serving_size})
@@ -237,9 +257,8 @@ class VietnameseDishGenerator:
         instructions.append("Sơ chế nguyên liệu: rửa sạch rau củ, thái nhỏ gia vị")
         
         # Protein preparation
-        protein_ingredients = [ing for ing in ingredients if ing["name"] in 
-                             [item for sublist in [MEAT_NUTRITION.keys(), SEAFOOD_NUTRITION.keys()] 
-                              for item in sublist]]
+        self.build_lookup_tables()
+        protein_ingredients = [ing for ing in ingredients if ing["name"] in self._protein_ingredient_names]
         
         if protein_ingredients:
             protein_name = protein_ingredients[0]["name"]
@@ -283,17 +302,17 @@ class VietnameseDishGenerator:
         """
         🔧 FIX: Lấy món ăn từ database truyền thống 200+ món
         """
-        # Filter dishes by meal type
+        # Filter dishes by meal type (dùng index dựng sẵn thay vì quét toàn bộ database)
+        self.build_lookup_tables()
         suitable_dishes = {}
-        for dish_name, dish_info in ALL_TRADITIONAL_DISHES.items():
-            if meal_type in dish_info.get("meal_type", []):
-                # Filter by region if specified
-                if region:
-                    dish_region = dish_info.get("region", "")
-                    if region in dish_region.lower() or "toàn quốc" in dish_region.lower():
-                        suitable_dishes[dish_name] = dish_info
-                else:
+        for dish_name, dish_info in self._traditional_by_meal_type.get(meal_type, []):
+            # Filter by region if specified
+            if region:
+                dish_region = dish_info.get("region", "")
+                if region in dish_region.lower() or "toàn quốc" in dish_region.lower():
                     suitable_dishes[dish_name] = dish_info
+            else:
+                suitable_dishes[dish_name] = dish_info
 
         if not suitable_dishes:
             return None
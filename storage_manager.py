@@ -38,13 +38,14 @@ class StorageManager:
         else:
             self.firebase_initialized = False
     
-    def save_meal_plan(self, meal_plan: WeeklyMealPlan, user_id: str = "default") -> str:
+    def save_meal_plan(self, meal_plan: WeeklyMealPlan, user_id: str = "default", raise_on_error: bool = False) -> str:
         """
         Lưu kế hoạch thực đơn
         
         Args:
             meal_plan: Đối tượng WeeklyMealPlan cần lưu
             user_id: ID của người dùng
+            raise_on_error: Báo lỗi (RuntimeError) khi không lưu được vào Firestore thay vì chỉ trả đường dẫn local
             
         Returns:
             ID của document hoặc đường dẫn đến file đã lưu
@@ -80,8 +81,12 @@ class StorageManager:
                     return firebase_id
                 else:
                     print(f"Failed to save to Firestore, using local path: {local_path}")
+                    if raise_on_error:
+                        raise RuntimeError(f"Failed to save meal plan to Firestore for user {user_id}")
                     return local_path
             except Exception as e:
+                if raise_on_error:
+                    raise
                 print(f"Error saving to Firebase: {str(e)}")
                 import traceback
                 traceback.print_exc()
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+Parser JSON tăng dần (streaming) và chịu lỗi cho danh sách món ăn do LLM sinh ra
+
+Parser nhận từng đoạn text của stream và trả về mỗi object món ăn ngay khi dấu ngoặc của nó
+đóng lại, không cần chờ toàn bộ phản hồi. Các lỗi LLM hay gặp được sửa ngay trong một lần quét:
+- text/markdown bao quanh JSON (```json, lời dẫn)
+- key không có ngoặc kép (name: "..."), chuỗi dùng nháy đơn, True/False/None
+- dấu phẩy thừa (trailing comma) hoặc thiếu dấu phẩy giữa các phần tử
+- thiếu key theo vị trí ({ "Phở Gà", "description": ... } -> "name": "Phở Gà")
+- xuống dòng thô trong chuỗi, phản hồi bị cắt giữa chừng (khi gọi close())
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Thứ tự field của một món và kiểu giá trị, dùng để đoán key bị thiếu theo vị trí
+MEAL_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("name", "string"),
+    ("description", "string"),
+    ("ingredients", "array"),
+    ("preparation", "array"),
+    ("nutrition", "object"),
+    ("preparation_time", "string"),
+    ("health_benefits", "string"),
+)
+NESTED_FIELDS: Tuple[Tuple[str, str], ...] = (("name", "string"), ("amount", "string"))
+
+_BARE_LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+_BARE_VALUE_END = ",}]\n"
+
+class _Frame:
+    """Trạng thái một object/array đang mở"""
+    __slots__ = ("kind", "expect_key", "after_value", "keys", "pair_start", "fields")
+
+    def __init__(self, kind: str, fields: Tuple[Tuple[str, str], ...]):
+        self.kind = kind
+        self.expect_key = kind == "{"
+        self.after_value = False
+        self.keys: set = set()
+        self.pair_start = 0
+        self.fields = fields
+
+    def missing_field(self, value_type: str) -> Optional[str]:
+        for field, field_type in self.fields:
+            if field not in self.keys and field_type == value_type:
+                return field
+        return None
+
+class IncrementalMealParser:
+    """
+    Parser một lần quét cho stream JSON món ăn
+
+    Mỗi object cấp ngoài cùng (thường là phần tử của mảng món ăn) được gom lại trong lúc sửa lỗi
+    và parse ngay khi đóng ngoặc. Dùng feed() cho từng đoạn stream và close() khi stream kết thúc.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self.meals: List[Dict[str, Any]] = []
+        self.errors: List[str] = []
+        self._reset_object()
+
+    def _reset_object(self) -> None:
+        self._out: Optional[List[str]] = None
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._quote = '"'
+        self._escape = False
+        self._string_is_key = False
+        self._string_chars: List[str] = []
+        self._token_start = 0
+        self._bare: Optional[List[str]] = None
+        self._bare_is_key = False
+        self._pending_comma = False
+        self._await_colon: Optional[Tuple[int, str]] = None
+
+    @property
+    def text(self) -> str:
+        """Toàn bộ text đã nhận"""
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Nhận thêm một đoạn text từ stream
+
+        Args:
+            chunk: Đoạn text mới
+
+        Returns:
+            Các món ăn vừa hoàn thành trong đoạn này
+        """
+        if not chunk:
+            return []
+        self._chunks.append(chunk)
+        completed: List[Dict[str, Any]] = []
+        for ch in chunk:
+            self._consume(ch, completed)
+        return completed
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        Kết thúc stream; object đang dở (phản hồi bị cắt) được đóng lại nếu còn parse được
+
+        Returns:
+            Các món ăn hoàn thành thêm khi đóng
+        """
+        if self._out is None:
+            return []
+
+        if self._in_string:
+            self._out.append('"')
+            self._in_string = False
+            self._finish_scalar(self._string_is_key, "".join(self._string_chars))
+        if self._bare is not None:
+            self._finish_bare()
+
+        frame = self._stack[-1]
+        if self._await_colon is not None:
+            # Key cuối cùng bị cắt trước khi có giá trị
+            del self._out[frame.pair_start:]
+            self._await_colon = None
+        elif frame.kind == "{" and not frame.expect_key and not frame.after_value:
+            del self._out[frame.pair_start:]
+
+        completed: List[Dict[str, Any]] = []
+        while self._stack:
+            self._close_frame(self._stack[-1].kind, completed)
+        return completed
+
+    def _consume(self, ch: str, completed: List[Dict[str, Any]]) -> None:
+        if self._out is None:
+            if ch == "{":
+                self._out = ["{"]
+                self._open_container("{", MEAL_FIELDS)
+            return
+
+        if self._in_string:
+            self._consume_string_char(ch)
+            return
+
+        if self._bare is not None:
+            if self._bare_is_key and (ch.isalnum() or ch == "_"):
+                self._bare.append(ch)
+                return
+            if not self._bare_is_key and ch not in _BARE_VALUE_END:
+                self._bare.append(ch)
+                return
+            self._finish_bare()
+
+        if ch.isspace():
+            return
+
+        if self._await_colon is not None and ch != ":":
+            self._resolve_positional_value()
+
+        frame = self._stack[-1]
+        if ch == ":":
+            if self._await_colon is not None:
+                frame.keys.add(self._await_colon[1])
+                self._await_colon = None
+            self._out.append(":")
+            frame.expect_key = False
+        elif ch == ",":
+            self._pending_comma = True
+        elif ch in "}]":
+            self._pending_comma = False
+            self._close_frame("{" if ch == "}" else "[", completed)
+        elif ch in "\"'{[" or ch.isalnum() or ch in "-_.":
+            self._start_token(ch, frame)
+
+    def _consume_string_char(self, ch: str) -> None:
+        if self._escape:
+            self._escape = False
+            if ch == "'" and self._quote == "'":
+                self._out[-1] = "'"
+            else:
+                self._out.append(ch)
+            self._string_chars.append(ch)
+        elif ch == "\\":
+            self._out.append("\\")
+            self._escape = True
+        elif ch == self._quote:
+            self._out.append('"')
+            self._in_string = False
+            self._finish_scalar(self._string_is_key, "".join(self._string_chars))
+        elif ch == '"':
+            self._out.append('\\"')
+            self._string_chars.append(ch)
+        elif ch == "\n":
+            self._out.append("\\n")
+        elif ch == "\t":
+            self._out.append("\\t")
+        elif ch != "\r":
+            self._out.append(ch)
+            self._string_chars.append(ch)
+
+    def _start_token(self, ch: str, frame: _Frame) -> None:
+        is_key = frame.kind == "{" and frame.expect_key
+
+        if is_key:
+            frame.pair_start = len(self._out)
+        if self._pending_comma or frame.after_value:
+            # Dấu phẩy chỉ được ghi khi thật sự có phần tử tiếp theo (bỏ trailing comma, thêm phẩy thiếu)
+            self._out.append(",")
+            frame.after_value = False
+        self._pending_comma = False
+
+        if is_key and ch in "{[":
+            # Giá trị không có key: đoán key theo thứ tự field còn thiếu
+            field = frame.missing_field("object" if ch == "{" else "array")
+            if field is None:
+                field = f"field_{len(frame.keys)}"
+            frame.keys.add(field)
+            self._out.append(json.dumps(field) + ":")
+            frame.expect_key = False
+            is_key = False
+
+        self._token_start = len(self._out)
+        if ch in "{[":
+            self._out.append(ch)
+            self._open_container(ch, NESTED_FIELDS)
+        elif ch in "\"'":
+            self._out.append('"')
+            self._in_string = True
+            self._quote = ch
+            self._string_is_key = is_key
+            self._string_chars = []
+        else:
+            self._bare = [ch]
+            self._bare_is_key = is_key
+
+    def _open_container(self, kind: str, fields: Tuple[Tuple[str, str], ...]) -> None:
+        self._stack.append(_Frame(kind, fields))
+
+    def _finish_bare(self) -> None:
+        token = "".join(self._bare).strip()
+        is_key = self._bare_is_key
+        self._bare = None
+        if is_key:
+            self._out.append(json.dumps(token))
+        elif token in _BARE_LITERALS:
+            self._out.append(_BARE_LITERALS[token])
+        else:
+            try:
+                float(token)
+                self._out.append(token)
+            except ValueError:
+                self._out.append(json.dumps(token, ensure_ascii=False))
+        self._finish_scalar(is_key, token)
+
+    def _finish_scalar(self, is_key: bool, value: str) -> None:
+        frame = self._stack[-1]
+        if is_key:
+            self._await_colon = (self._token_start, value)
+        else:
+            frame.after_value = True
+            if frame.kind == "{":
+                frame.expect_key = True
+
+    def _resolve_positional_value(self) -> None:
+        """Chuỗi ở vị trí key nhưng không có ':' phía sau -> là giá trị của field bị thiếu key"""
+        start, value = self._await_colon
+        self._await_colon = None
+        frame = self._stack[-1]
+        field = frame.missing_field("string") or f"field_{len(frame.keys)}"
+        frame.keys.add(field)
+        self._out.insert(start, json.dumps(field) + ":")
+        frame.after_value = True
+        frame.expect_key = True
+
+    def _close_frame(self, kind: str, completed: List[Dict[str, Any]]) -> None:
+        if self._await_colon is not None:
+            self._resolve_positional_value()
+        if not any(frame.kind == kind for frame in self._stack):
+            return  # Ngoặc đóng thừa
+
+        while self._stack:
+            frame = self._stack.pop()
+            self._out.append("}" if frame.kind == "{" else "]")
+            if self._stack:
+                parent = self._stack[-1]
+                parent.after_value = True
+                if parent.kind == "{":
+                    parent.expect_key = True
+            if frame.kind == kind:
+                break
+
+        if not self._stack:
+            self._emit("".join(self._out), completed)
+            self._reset_object()
+
+    def _emit(self, object_text: str, completed: List[Dict[str, Any]]) -> None:
+        try:
+            data = json.loads(object_text)
+        except json.JSONDecodeError:
+            self.errors.append(object_text)
+            return
+
+        if not isinstance(data, dict):
+            return
+
+        # Đóng gói dạng {"meals": [...]}: lấy các món bên trong
+        if "name" not in data:
+            nested = [value for value in data.values() if isinstance(value, list)]
+            meals = [item for items in nested for item in items if isinstance(item, dict)]
+            if meals:
+                self.meals.extend(meals)
+                completed.extend(meals)
+                return
+
+        self.meals.append(data)
+        completed.append(data)
+
+def parse_meals(text: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Parse toàn bộ text trong một lần quét
+
+    Args:
+        text: Phản hồi đầy đủ từ LLM
+
+    Returns:
+        Tuple (danh sách món ăn, các object không parse được)
+    """
+    parser = IncrementalMealParser()
+    parser.feed(text)
+    parser.close()
+    return parser.meals, parser.errors
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Logging có cấu trúc: mức log, correlation ID theo request, lấy mẫu, định dạng lười và ghi ra stdout ở thread nền
+
+print() trên hot path ghi thẳng stdout trong thread xử lý request (và json.dumps cả payload dù không ai đọc).
+Ở đây mọi logger ghi qua một QueueHandler: thread request chỉ lọc theo mức/lấy mẫu rồi đẩy LogRecord
+vào hàng đợi; việc định dạng (JSON một dòng hoặc text) và ghi stdout do QueueListener làm trong thread nền.
+
+- Correlation ID: RequestContextMiddleware lấy X-Request-ID của client (hoặc tạo mới), gắn vào mọi bản ghi
+  log trong request đó và trả lại trong header response.
+- Lấy mẫu: bản ghi dưới WARNING chỉ giữ theo tỉ lệ LOG_SAMPLE_RATE; quyết định theo request ID nên một
+  request hoặc được ghi đủ hoặc không ghi dòng nào. WARNING trở lên luôn được ghi.
+- Định dạng lười: dùng logger.debug("... %s", value) thay vì f-string, và LazyJSON(obj) thay vì
+  json.dumps(obj) để chỉ serialize khi bản ghi thực sự được ghi. Vì định dạng diễn ra ở thread nền,
+  không sửa object đã truyền vào log sau khi gọi.
+"""
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+from config import config
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Thuộc tính chuẩn của LogRecord; các thuộc tính khác (truyền qua extra=) được ghi thành trường JSON
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+def get_request_id() -> Optional[str]:
+    """Correlation ID của request hiện tại (None nếu ngoài request)"""
+    return request_id_var.get()
+
+class LazyJSON:
+    """JSON của một object, chỉ serialize khi bản ghi log được định dạng"""
+
+    __slots__ = ("obj", "limit")
+
+    def __init__(self, obj: Any, limit: int = None):
+        """
+        Args:
+            obj: Object cần ghi
+            limit: Cắt chuỗi JSON còn tối đa limit ký tự (None: không cắt)
+        """
+        self.obj = obj
+        self.limit = limit
+
+    def __str__(self) -> str:
+        text = json.dumps(self.obj, ensure_ascii=False, default=str)
+        if self.limit and len(text) > self.limit:
+            return text[:self.limit] + "..."
+        return text
+
+class ContextFilter(logging.Filter):
+    """Gắn request_id của request hiện tại vào bản ghi (chạy trong thread gọi log)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Giữ bản ghi dưới always_level theo tỉ lệ; cùng request ID thì cùng quyết định"""
+
+    def __init__(self, rate: float = 1.0, always_level: int = logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.always_level = always_level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.always_level or self.rate >= 1.0:
+            return True
+        if self.rate <= 0.0:
+            return False
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            return zlib.crc32(request_id.encode()) % 10000 < self.rate * 10000
+        return random.random() < self.rate
+
+class JSONFormatter(logging.Formatter):
+    """Một dòng JSON cho mỗi bản ghi: thời gian, mức, logger, message, request_id và các trường extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            data["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Định dạng dễ đọc khi phát triển local"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler không định dạng trong thread gọi log (QueueListener định dạng trong thread nền)"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+def setup_logging(level: str = None, fmt: str = None, sample_rate: float = None, stream=None) -> QueueListener:
+    """
+    Cấu hình root logger ghi qua hàng đợi (gọi lại sẽ thay cấu hình cũ)
+
+    Args:
+        level: Mức log tối thiểu (mặc định config.LOG_LEVEL)
+        fmt: "json" hoặc "text" (mặc định config.LOG_FORMAT)
+        sample_rate: Tỉ lệ giữ bản ghi dưới WARNING (mặc định config.LOG_SAMPLE_RATE)
+        stream: Nơi ghi (mặc định sys.stdout)
+
+    Returns:
+        QueueListener đang chạy
+    """
+    global _listener, _queue_handler
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JSONFormatter() if (fmt or config.LOG_FORMAT) == "json" else TextFormatter())
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    handler.addFilter(SamplingFilter(config.LOG_SAMPLE_RATE if sample_rate is None else sample_rate))
+
+    root = logging.getLogger()
+    root.setLevel((level or config.LOG_LEVEL).upper())
+    root.addHandler(handler)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    _queue_handler = handler
+    return _listener
+
+def shutdown_logging() -> None:
+    """Ghi nốt các bản ghi còn trong hàng đợi và dừng thread nền"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+access_logger = logging.getLogger("access")
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware: gán correlation ID cho request, đo thời gian và ghi một dòng access log có cấu trúc
+
+    Request lỗi 5xx hoặc chậm hơn slow_seconds được ghi ở mức WARNING (luôn được giữ khi lấy mẫu),
+    còn lại ở mức INFO.
+    """
+
+    def __init__(self, app, slow_seconds: float = None):
+        self.app = app
+        self.slow_seconds = config.LOG_SLOW_REQUEST_SECONDS if slow_seconds is None else slow_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == REQUEST_ID_HEADER:
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER, request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        except Exception:
+            access_logger.exception("Unhandled error in %s %s", scope.get("method"), scope.get("path"))
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            slow = duration > self.slow_seconds
+            level = logging.WARNING if status[0] >= 500 or slow else logging.INFO
+            if access_logger.isEnabledFor(level):
+                route = scope.get("route")
+                access_logger.log(level, "%s %s %s %.1fms", scope.get("method"), scope.get("path"), status[0],
+                                  duration * 1000, extra={
+                                      "method": scope.get("method"),
+                                      "path": scope.get("path"),
+                                      "route": getattr(route, "path", None),
+                                      "status": status[0],
+                                      "duration_ms": round(duration * 1000, 1),
+                                      "slow": slow,
+                                  })
+            request_id_var.reset(token)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Test automaton Aho-Corasick dịch thuật ngữ thực phẩm Việt -> Anh
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_automaton_matching():
+    """Test khớp chồng lấn, leftmost-longest và ranh giới từ"""
+    from aho_corasick import AhoCorasickTranslator
+
+    print("🔧 Testing Aho-Corasick matching...")
+
+    translator = AhoCorasickTranslator({"cá": "fish", "cá hồi": "salmon", "hồi": "anise", "cơm": "rice"})
+
+    all_terms = [term for _, _, term, _ in translator.find_all("Cá hồi với cơm")]
+    assert sorted(all_terms) == ["cá", "cá hồi", "cơm", "hồi"]
+
+    # Cụm dài nhất thắng và mọi thuật ngữ đều được dịch trong một lần quét
+    assert translator.translate("Cá hồi với cơm") == "salmon với rice"
+
+    # Không khớp bên trong một từ khác
+    assert translator.find_all("cách làm") == []
+    assert translator.translate("cơmx") == "cơmx"
+
+    print("✅ Aho-Corasick matching test completed")
+
+def test_usda_translation():
+    """Test dịch truy vấn USDA nhiều thuật ngữ"""
+    from usda_integration import usda_api, translate_food_query
+
+    print("🔧 Testing USDA query translation...")
+
+    assert translate_food_query("Cơm") == "rice"
+    assert translate_food_query("cơm trắng và thịt gà luộc") == "white rice và boiled chicken"
+    assert translate_food_query("không có gì") is None
+
+    assert usda_api._translate_vi_to_en("cá nướng với cơm") == "grilled fish với rice"
+    assert usda_api._translate_vi_to_en("xyz") == "xyz"
+
+    print("✅ USDA query translation test completed")
+
+if __name__ == "__main__":
+    test_automaton_matching()
+    test_usda_translation()
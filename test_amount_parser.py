@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Test bộ phân tích khối lượng nguyên liệu sang gram
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_parse_amount_grammar():
+    """Test số lượng dạng phân số/khoảng/chữ và các nhóm đơn vị"""
+    from amount_parser import parse_amount
+
+    print("🔧 Testing amount parser...")
+
+    cases = [
+        ("200g", "thịt heo", 200),
+        ("0,5 kg", "thịt bò", 500),
+        ("2 quả", "trứng gà", 120),
+        ("1/2 quả", "chanh", 25),
+        ("1 1/2 cup", "gạo", 270),
+        ("2-3 quả", "cà chua", 250),
+        ("½ tô", "", 100),
+        ("một ổ", "bánh mì", 150),
+        ("3 lát", "thịt ba chỉ", 90),
+        ("khoảng 150 gram", "", 150),
+        ("50", "", 50),
+        ("2", "", 200),
+        (120, "", 120),
+        ("", "", 100),
+    ]
+    for amount, name, expected in cases:
+        result = parse_amount(amount, name)
+        print(f"   {amount!r} ({name}) -> {result}g")
+        assert abs(result - expected) < 1e-6, (amount, name, result)
+
+    # Trước đây "muỗng canh" chứa chữ "g" nên bị hiểu là 1g
+    assert parse_amount("1 muỗng canh", "nước") == 15
+    assert parse_amount("1 muỗng cà phê", "nước") == 5
+    # Khối lượng riêng theo nguyên liệu cho đơn vị thể tích
+    assert abs(parse_amount("1 tbsp", "dầu ăn") - 13.8) < 1e-6
+
+    print("✅ Amount parser test completed")
+
+def test_parse_many_and_memo():
+    """Test parse_many giữ thứ tự và dùng lại kết quả đã nhớ"""
+    from amount_parser import parse_many, cache_info
+    from vietnamese_nutrition_database import parse_ingredient_amount
+
+    print("🔧 Testing parse_many...")
+
+    items = [("2 quả", "Trứng gà"), ("100g", "cơm"), ("2 quả", "Trứng gà")]
+    hits_before = cache_info().hits
+    assert parse_many(items) == [120, 100, 120]
+    assert cache_info().hits > hits_before
+
+    assert parse_ingredient_amount("1 ổ", "bánh mì") == 150
+
+    print("✅ parse_many test completed")
+
+if __name__ == "__main__":
+    test_parse_amount_grammar()
+    test_parse_many_and_memo()
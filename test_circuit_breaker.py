@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Test circuit breaker (closed/open/half_open), hedged request và fallback khi Groq bị ngắt
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _fail():
+    raise RuntimeError("timeout")
+
+def test_breaker_state_transitions():
+    """Test breaker mở sau N lỗi liên tiếp, half_open sau recovery_timeout, đóng lại khi thử thành công"""
+    from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+    print("🔧 Testing circuit breaker states...")
+
+    clock = _FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=30, clock=clock,
+                             is_failure=lambda error: not isinstance(error, KeyError))
+
+    for _ in range(2):
+        try:
+            breaker.call(_fail)
+        except RuntimeError:
+            pass
+    # Lỗi không thuộc provider không làm mở breaker
+    try:
+        breaker.call(lambda: {}["missing"])
+    except KeyError:
+        pass
+    assert breaker.state == CLOSED
+
+    try:
+        breaker.call(_fail)
+    except RuntimeError:
+        pass
+    assert breaker.state == OPEN and breaker.is_open
+
+    try:
+        breaker.call(lambda: "ok")
+        assert False, "breaker mở phải từ chối ngay"
+    except CircuitOpenError as e:
+        assert e.retry_in == 30
+
+    clock.now += 30
+    assert breaker.state == HALF_OPEN and not breaker.is_open
+    # Chỉ một lời gọi thử khi half_open; thử lỗi thì mở lại
+    assert breaker.allow_request() and not breaker.allow_request()
+    breaker.record_failure(RuntimeError("still down"))
+    assert breaker.state == OPEN
+
+    clock.now += 30
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+    assert breaker.status()["rejected"] == 2
+
+    print("✅ Circuit breaker states test completed")
+
+def test_slow_calls_open_breaker():
+    """Test lời gọi thành công nhưng quá chậm cũng tính là lỗi"""
+    from circuit_breaker import CircuitBreaker, OPEN
+
+    print("🔧 Testing slow call detection...")
+
+    breaker = CircuitBreaker("slow", failure_threshold=2, slow_call_threshold=0.5)
+    breaker.record_success(0.1)
+    breaker.record_success(2.0)
+    breaker.record_success(3.0)
+    assert breaker.state == OPEN and breaker.status()["slow_calls"] == 2
+
+    print("✅ Slow call detection test completed")
+
+def test_hedged_call_returns_fastest_copy():
+    """Test hedged_call gửi bản sao khi lời gọi đầu chậm và trả kết quả về trước"""
+    from circuit_breaker import CircuitBreaker
+
+    print("🔧 Testing hedged requests...")
+
+    breaker = CircuitBreaker("hedge")
+    calls = []
+    lock = threading.Lock()
+
+    def request():
+        with lock:
+            calls.append(len(calls))
+            index = calls[-1]
+        time.sleep(1.0 if index == 0 else 0.01)
+        return index
+
+    started = time.perf_counter()
+    assert breaker.hedged_call(request, hedge_after=0.05, min_hedge_after=0.0) == 1
+    assert time.perf_counter() - started < 0.5
+    assert breaker.status()["hedged"] == 1
+
+    # Lời gọi đầu lỗi: bản sao được gửi ngay
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("reset by peer")
+        return "ok"
+
+    assert breaker.hedged_call(flaky, hedge_after=5) == "ok"
+
+    # Không lấy được quota cho bản sao: không gửi bản sao, chờ lời gọi đầu
+    calls.clear()
+    permits = []
+
+    def no_quota():
+        permits.append(1)
+        return False
+
+    assert breaker.hedged_call(request, hedge_after=0.05, min_hedge_after=0.0, permit_hedge=no_quota) == 0
+    assert calls == [0] and permits == [1]
+
+    print("✅ Hedged requests test completed")
+
+def test_open_groq_breaker_uses_fallback():
+    """Test GroqService dùng fallback ngay (không gọi API) khi breaker của Groq đang mở"""
+    from groq_integration import GroqService, groq_breaker, GROQ_AVAILABLE
+
+    print("🔧 Testing Groq fallback with open breaker...")
+
+    if not GROQ_AVAILABLE:
+        print("⚠️ groq package not installed, skipping")
+        return
+
+    class ExplodingClient:
+        def __getattr__(self, name):
+            raise AssertionError("API must not be called while the circuit is open")
+
+    service = GroqService(api_key="gsk_test")
+    service.client = ExplodingClient()
+    original_recovery = groq_breaker.recovery_timeout
+    groq_breaker.recovery_timeout = 3600
+    try:
+        for _ in range(groq_breaker.failure_threshold):
+            groq_breaker.record_failure(RuntimeError("timeout"))
+        assert groq_breaker.is_open
+        meals = service.generate_meal_suggestions(400, 20, 10, 50, "bữa sáng")
+        assert meals and all(meal.get("name") for meal in meals)
+        assert service.chat([{"role": "user", "content": "hi"}]) is None
+    finally:
+        groq_breaker.recovery_timeout = original_recovery
+        groq_breaker.record_success(0.0)
+
+    print("✅ Groq fallback with open breaker test completed")
+
+def test_slow_successful_stream_does_not_open_breaker():
+    """Test stream sinh thực đơn dài nhưng thành công không làm mở breaker của Groq"""
+    from types import SimpleNamespace
+    from circuit_breaker import CircuitBreaker
+    from groq_integration import GroqService, groq_breaker
+
+    print("🔧 Testing slow streamed completions...")
+
+    # Ngưỡng chậm riêng cho từng lời gọi: None thì không xét chậm
+    breaker = CircuitBreaker("stream", failure_threshold=2, slow_call_threshold=0.01)
+    for _ in range(3):
+        breaker.call(time.sleep, 0.02, slow_call_threshold=None)
+    assert breaker.state == "closed" and breaker.status()["slow_calls"] == 0
+    breaker.call(time.sleep, 0.02)
+    assert breaker.status()["slow_calls"] == 1
+
+    def chunk(text):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    class SlowStream:
+        def create(self, **kwargs):
+            def chunks():
+                for part in ('[{"name": "Phở Gà", ', '"description": "Phở"}]'):
+                    time.sleep(0.02)
+                    yield chunk(part)
+            return chunks()
+
+    service = GroqService(api_key=None)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SlowStream()))
+    original_threshold = groq_breaker.slow_call_threshold
+    groq_breaker.slow_call_threshold = 0.01
+    try:
+        for _ in range(groq_breaker.failure_threshold + 1):
+            service._stream_meal_completion(messages=[{"role": "user", "content": "?"}], max_tokens=10)
+        assert groq_breaker.state == "closed"
+    finally:
+        groq_breaker.slow_call_threshold = original_threshold
+        groq_breaker.record_success(0.0)
+
+    print("✅ Slow streamed completions test completed")
+
+def test_abandoned_hedge_copy_not_counted():
+    """Test bản sao hedge thua (chậm) không bị tính là lời gọi chậm của breaker"""
+    from circuit_breaker import CircuitBreaker
+
+    print("🔧 Testing abandoned hedge copies...")
+
+    breaker = CircuitBreaker("hedge-slow", failure_threshold=1, slow_call_threshold=0.2)
+    calls = []
+    lock = threading.Lock()
+
+    def request():
+        with lock:
+            calls.append(len(calls))
+            index = calls[-1]
+        time.sleep(0.4 if index == 0 else 0.01)
+        return index
+
+    assert breaker.hedged_call(request, hedge_after=0.05, min_hedge_after=0.0) == 1
+    time.sleep(0.5)  # Chờ lời gọi đầu (bị bỏ) chạy xong
+    assert breaker.state == "closed" and breaker.status()["slow_calls"] == 0
+
+    print("✅ Abandoned hedge copies test completed")
+
+def test_gemini_hedging_is_optional_and_budgeted():
+    """Test hedge Gemini tắt mặc định; khi bật chỉ gửi bản sao trong budget"""
+    import gemini_vision
+    from config import config
+    from rate_limiting import TokenBucket
+
+    print("🔧 Testing optional Gemini hedging...")
+
+    calls = []
+    first_call_seconds = [0.3]
+    lock = threading.Lock()
+
+    def request():
+        with lock:
+            calls.append(len(calls))
+            index = calls[-1]
+        time.sleep(first_call_seconds[0] if index == 0 else 0.01)
+        return index
+
+    breaker = gemini_vision.gemini_breaker
+    originals = (config.GEMINI_HEDGE_ENABLED, gemini_vision.gemini_hedge_budget, breaker.slow_call_threshold)
+    breaker.slow_call_threshold = None
+    try:
+        for _ in range(10):
+            breaker.record_success(0.01)
+        hedged = breaker.status()["hedged"]
+
+        # Mặc định: không hedge dù lời gọi chậm hơn p90
+        config.GEMINI_HEDGE_ENABLED = False
+        assert gemini_vision.call_gemini(request) == 0 and calls == [0]
+
+        # Bật hedge nhưng hết budget: không gửi bản sao
+        config.GEMINI_HEDGE_ENABLED = True
+        gemini_vision.gemini_hedge_budget = TokenBucket(rate=0.001, capacity=1)
+        assert gemini_vision.gemini_hedge_budget.try_acquire()
+        calls.clear()
+        assert gemini_vision.call_gemini(request) == 0 and calls == [0]
+        assert breaker.status()["hedged"] == hedged
+
+        # Còn budget: bản sao được gửi (sau tối thiểu 1s) và về trước
+        gemini_vision.gemini_hedge_budget = TokenBucket(rate=0.001, capacity=1)
+        first_call_seconds[0] = 1.3
+        calls.clear()
+        assert gemini_vision.call_gemini(request) == 1
+        assert breaker.status()["hedged"] == hedged + 1
+        assert not gemini_vision.gemini_hedge_budget.try_acquire()
+    finally:
+        config.GEMINI_HEDGE_ENABLED, gemini_vision.gemini_hedge_budget, breaker.slow_call_threshold = originals
+        time.sleep(0.4)  # Chờ lời gọi đầu (bị bỏ) chạy xong
+        breaker.record_success(0.0)
+
+    print("✅ Optional Gemini hedging test completed")
+
+if __name__ == "__main__":
+    test_breaker_state_transitions()
+    test_slow_calls_open_breaker()
+    test_hedged_call_returns_fastest_copy()
+    test_open_groq_breaker_uses_fallback()
+    test_slow_successful_stream_does_not_open_breaker()
+    test_abandoned_hedge_copy_not_counted()
+    test_gemini_hedging_is_optional_and_budgeted()
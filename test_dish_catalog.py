@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Test dish catalog chỉ đọc: artifact biên dịch sẵn, record dùng chung và bản sao theo request
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_artifact_matches_source_modules():
+    """Test artifact đã commit khớp với các module dữ liệu nguồn"""
+    from dish_catalog import load_artifact, build_tables_from_sources
+
+    print("🔧 Testing dish catalog artifact...")
+
+    tables = load_artifact()
+    assert tables is not None, "Artifact cũ: chạy python scripts/build_dish_catalog.py"
+    assert tables == build_tables_from_sources()
+
+    print("✅ Dish catalog artifact test completed")
+
+def test_records_are_shared_and_read_only():
+    """Test view dùng chung record chỉ đọc, to_dict() trả về bản sao độc lập"""
+    from dish_catalog import get_dish_catalog
+
+    print("🔧 Testing dish catalog views...")
+
+    catalog = get_dish_catalog()
+    breakfast = catalog.dishes("vietnamese_menu", "breakfast")
+    assert breakfast is catalog.dishes("vietnamese_menu", "breakfast")
+
+    record = catalog.get("vietnamese_menu", "PHỞ BÒ")
+    assert record.name == "Phở bò" and record in breakfast
+    try:
+        record["nutrition"]["calories"] = 0
+        assert False, "record phải chỉ đọc"
+    except TypeError:
+        pass
+
+    copy = record.to_dict()
+    copy["nutrition"]["calories"] = 0
+    copy["ingredients"].append({"name": "quẩy", "amount": "1 cái"})
+    assert record["nutrition"]["calories"] > 0
+    assert len(record["ingredients"]) == len(copy["ingredients"]) - 1
+
+    # Món truyền thống được xếp vào bữa theo field meal_type
+    lunch = catalog.dishes("traditional", "lunch")
+    assert lunch and all("lunch" in dish["meal_type"] for dish in lunch)
+
+    print("✅ Dish catalog views test completed")
+
+def test_generated_meals_do_not_mutate_catalog():
+    """Test generate_meal điều chỉnh nutrition trên bản sao, không làm hỏng dữ liệu dùng chung"""
+    from dish_catalog import get_dish_catalog
+    from generate_random_data import generate_meal
+
+    print("🔧 Testing generated meals against shared catalog...")
+
+    catalog = get_dish_catalog()
+    before = [dish.to_dict() for dish in catalog.dishes("sample_dishes")]
+    for _ in range(20):
+        generate_meal("breakfast", 5000, 100, 50, 300)
+    assert [dish.to_dict() for dish in catalog.dishes("sample_dishes")] == before
+
+    print("✅ Generated meals test completed")
+
+def test_callers_copy_only_returned_dishes():
+    """Test các hàm chọn món lọc trên record dùng chung và chỉ copy đúng những món trả về"""
+    import dish_catalog
+    import services.meal_services as meal_services
+    import utils
+    from groq_integration import groq_service
+    from services.vietnamese_meal_service import vietnamese_meal_service
+
+    print("🔧 Testing catalog copies per request...")
+
+    copies = []
+    original_to_dict = dish_catalog.DishRecord.to_dict
+
+    def counting_to_dict(self):
+        copies.append(self.name)
+        return original_to_dict(self)
+
+    original_generator = meal_services.get_vietnamese_dishes
+    dish_catalog.DishRecord.to_dict = counting_to_dict
+    # Bỏ qua Vietnamese dish generator để đi vào nhánh SAMPLE_RECIPES
+    meal_services.get_vietnamese_dishes = lambda *args, **kwargs: []
+    try:
+        dishes = utils.generate_random_dishes("lunch", count=2, used_dishes=[], day_index=1)
+        assert len(dishes) == 2 and len(copies) == 2
+        assert all(isinstance(dish, dict) for dish in dishes)
+        dishes[0]["nutrition"] = {"calories": 0}
+
+        copies.clear()
+        meals = groq_service._traditional_fallback_meal_suggestions("bữa trưa")
+        assert len(meals) == len(copies) == 1 and isinstance(meals[0], dict)
+
+        copies.clear()
+        assert len(vietnamese_meal_service.get_diverse_meals("breakfast", 2)) == len(copies) == 2
+    finally:
+        dish_catalog.DishRecord.to_dict = original_to_dict
+        meal_services.get_vietnamese_dishes = original_generator
+
+    print("✅ Catalog copies per request test completed")
+
+if __name__ == "__main__":
+    test_artifact_matches_source_modules()
+    test_records_are_shared_and_read_only()
+    test_generated_meals_do_not_mutate_catalog()
+    test_callers_copy_only_returned_dishes()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Test chỉ mục món ăn gần trùng lặp (DishSimilarityIndex)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_pairwise_rules():
+    """Test các quy tắc so sánh hai món"""
+    from dish_similarity_index import are_dishes_similar
+
+    print("🔧 Testing dish similarity rules...")
+
+    assert are_dishes_similar("Phở Bò", "phở bò")
+    assert are_dishes_similar("cơm tấm sườn nướng", "cơm tấm bì chả")          # cùng món gốc
+    assert are_dishes_similar("bún bò huế", "bún bò")                          # một món có vùng miền
+    assert not are_dishes_similar("bún bò huế", "bún bò sài gòn")             # hai vùng miền khác nhau
+    assert are_dishes_similar("gà kho gừng", "gà kho tộ")                      # 2 từ đầu giống nhau
+    assert not are_dishes_similar("canh chua cá lóc", "gỏi cuốn tôm thịt")
+
+    print("✅ Dish similarity rules test completed")
+
+def test_index_matches_pairwise_scan():
+    """Test chỉ mục trả lời giống hệt việc so từng cặp với toàn bộ danh sách"""
+    from dish_similarity_index import DishSimilarityIndex, are_dishes_similar
+    from vietnamese_traditional_dishes import ALL_TRADITIONAL_DISHES
+
+    print("🔧 Testing index vs pairwise scan...")
+
+    names = list(ALL_TRADITIONAL_DISHES)
+    variants = [f"{name} {suffix}" for name in names[:40] for suffix in ("Miền Bắc", "Đặc Biệt", "Chay")]
+    recent = names[::3] + variants[::5]
+    queries = names + variants
+
+    index = DishSimilarityIndex(recent)
+    for query in queries:
+        expected = any(are_dishes_similar(query, existing) for existing in recent)
+        found = index.find_similar(query)
+        assert (found is not None) == expected, (query, found)
+        if found is not None:
+            assert are_dishes_similar(query, found)
+
+    print(f"✅ Index matches pairwise scan for {len(queries)} queries over {len(recent)} dishes")
+
+def test_bounded_index_evicts_oldest():
+    """Test giới hạn kích thước bỏ món cũ nhất và cập nhật bucket"""
+    from dish_similarity_index import DishSimilarityIndex
+
+    print("🔧 Testing bounded index...")
+
+    index = DishSimilarityIndex(["Phở Bò", "Bánh Xèo", "Gỏi Cuốn"], max_size=2)
+    assert index.names == ["Bánh Xèo", "Gỏi Cuốn"]
+    assert not index.is_similar("Phở Bò Tái")
+    assert index.find_similar("bánh xèo miền tây") == "Bánh Xèo"
+    assert "gỏi cuốn" in index
+
+    index.add("Phở Gà")
+    assert index.names == ["Gỏi Cuốn", "Phở Gà"]
+    assert index.is_similar("Phở Bò Tái")
+
+    print("✅ Bounded index test completed")
+
+def test_meal_diversity_service_near_duplicates():
+    """Test MealDiversityService coi món gần giống là trùng lặp"""
+    from services.meal_diversity_service import MealDiversityService
+
+    print("🔧 Testing near-duplicate diversity check...")
+
+    def day(name):
+        return {"meals": {"Bữa sáng": [{"name": name, "nutrition": {"calories": 400}}]}}
+
+    meal_plan = {"weekly_plan": {
+        "Thứ 2": day("Phở Bò"),
+        "Thứ 3": day("Phở Bò Tái Nạm"),
+        "Thứ 4": day("Bánh Mì Trứng"),
+        "Thứ 5": day("Xôi Gấc"),
+    }}
+    assert MealDiversityService.check_meal_diversity(meal_plan) == 0.25
+
+    meal_plan = MealDiversityService.ensure_meal_diversity(meal_plan)
+    replaced = meal_plan["weekly_plan"]["Thứ 3"]["meals"]["Bữa sáng"][0]["name"]
+    assert replaced in ("Bánh Mì Trứng", "Xôi Gấc"), replaced
+
+    print("✅ Near-duplicate diversity check test completed")
+
+if __name__ == "__main__":
+    test_pairwise_rules()
+    test_index_matches_pairwise_scan()
+    test_bounded_index_evicts_oldest()
+    test_meal_diversity_service_near_duplicates()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Test ETag / If-None-Match cho các endpoint đọc meal plan
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_etag_utils():
+    """Test tính ETag, stamp và so khớp If-None-Match"""
+    from etag_utils import ETAG_FIELD, compute_etag, stamp_etag, etag_matches
+
+    print("🔧 Testing ETag utils...")
+
+    plan = {"days": [{"day_of_week": "Thứ 2", "breakfast": {"dishes": []}}]}
+    etag = compute_etag(plan)
+    print(f"   ETag: {etag}")
+
+    # Thứ tự key không ảnh hưởng ETag
+    assert etag == compute_etag({"days": [{"breakfast": {"dishes": []}, "day_of_week": "Thứ 2"}]})
+
+    # Stamp không làm thay đổi ETag của chính document đó
+    stamped = dict(plan)
+    assert stamp_etag(stamped) == etag
+    assert stamped[ETAG_FIELD] == etag
+    assert compute_etag(stamped) == etag
+
+    # Nội dung đổi -> ETag đổi
+    changed = {"days": [{"day_of_week": "Thứ 3", "breakfast": {"dishes": []}}]}
+    assert compute_etag(changed) != etag
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches(etag, None)
+
+    print("✅ ETag utils test completed")
+
+def test_latest_meal_plan_not_modified():
+    """Test endpoint /firestore/latest-meal-plan trả 304 khi client đã có bản mới nhất"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from services.firestore_service import firestore_service as service
+    from routers.firestore_router import router
+    from models import WeeklyMealPlan
+
+    print("🔧 Testing conditional GET on latest meal plan...")
+
+    plan = WeeklyMealPlan(days=[])
+    stored_etag = '"abc123"'
+    calls = {"full": 0, "etag": 0}
+
+    def fake_get_with_etag(user_id):
+        calls["full"] += 1
+        return plan, stored_etag
+
+    def fake_get_etag(user_id):
+        calls["etag"] += 1
+        return stored_etag
+
+    originals = (service.initialized, service.get_latest_meal_plan_with_etag, service.get_latest_meal_plan_etag)
+    service.initialized = True
+    service.get_latest_meal_plan_with_etag = fake_get_with_etag
+    service.get_latest_meal_plan_etag = fake_get_etag
+    try:
+        app = FastAPI()
+        app.include_router(router, prefix="/firestore")
+        client = TestClient(app)
+
+        first = client.get("/firestore/latest-meal-plan/user-1")
+        assert first.status_code == 200
+        assert first.headers["ETag"] == stored_etag
+
+        second = client.get("/firestore/latest-meal-plan/user-1", headers={"If-None-Match": stored_etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        # Lần thứ hai chỉ đọc ETag, không tải lại kế hoạch
+        assert calls == {"full": 1, "etag": 1}
+
+        stale = client.get("/firestore/latest-meal-plan/user-1", headers={"If-None-Match": '"old"'})
+        assert stale.status_code == 200
+        print(f"   Calls: {calls}")
+    finally:
+        service.initialized, service.get_latest_meal_plan_with_etag, service.get_latest_meal_plan_etag = originals
+
+    print("✅ Conditional GET test completed")
+
+if __name__ == "__main__":
+    test_etag_utils()
+    test_latest_meal_plan_not_modified()
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Test nhận diện món ăn: tải ảnh lên Storage song song với gọi Gemini, ghi log Firestore sau khi trả kết quả,
+nhận diện nhiều ảnh trong một request
+"""
+
+import asyncio
+import io
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def _photo_bytes(extent=(-2.0, -1.2, 1.0, 1.2)):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.effect_mandelbrot((900, 600), extent, 60).convert("RGB").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+def test_upload_and_recognition_run_concurrently():
+    """Test độ trễ ≈ max(upload, nhận diện) và log Firestore chỉ được lên lịch, không ghi trước khi trả kết quả"""
+    import food_recognition_service as service_module
+    from models import RecognizedFood, NutritionInfo
+    from recognition_cache import recognition_cache
+
+    print("🔧 Testing concurrent upload and recognition...")
+
+    delay = 0.4
+    saved_logs = []
+
+    class FakeStorage:
+        available = True
+
+        def upload_prepared_image(self, prepared, user_id, folder="food_images"):
+            time.sleep(delay)
+            return "https://storage.example.com/a.jpg", "https://storage.example.com/a_thumb.jpg"
+
+    class FakeGemini:
+        available = True
+
+        def recognize_food(self, image_data, mime_type="image/jpeg"):
+            time.sleep(delay)
+            return [RecognizedFood(food_name="Cơm tấm", confidence=0.8,
+                                   nutrition=NutritionInfo(calories=600, protein=30, fat=20, carbs=75))], {}
+
+    class FakeFirestore:
+        def add_food_log(self, user_id, log_data):
+            saved_logs.append(log_data)
+
+    originals = (service_module.firebase_storage_service, service_module.gemini_vision_service,
+                 service_module.firestore_service)
+    service_module.firebase_storage_service = FakeStorage()
+    service_module.gemini_vision_service = FakeGemini()
+    service_module.firestore_service = FakeFirestore()
+    recognition_cache.clear()
+    deferred = []
+    try:
+        service = service_module.FoodRecognitionService()
+        service.firestore_available = True
+        started = time.perf_counter()
+        result = asyncio.run(service.recognize_food_from_image(
+            _photo_bytes(), "user-1", meal_type="lunch",
+            defer_log=lambda fn, *args: deferred.append((fn, args))
+        ))
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < delay * 1.75, f"upload và nhận diện phải chạy song song ({elapsed:.2f}s)"
+        assert result.recognized_foods[0].image_url == "https://storage.example.com/a.jpg"
+        assert len(deferred) == 1 and not saved_logs
+
+        fn, args = deferred[0]
+        fn(*args)
+        assert saved_logs[0]["thumbnail_url"] == "https://storage.example.com/a_thumb.jpg"
+        assert saved_logs[0]["total_nutrition"]["calories"] == 600
+    finally:
+        (service_module.firebase_storage_service, service_module.gemini_vision_service,
+         service_module.firestore_service) = originals
+        recognition_cache.clear()
+
+    print("✅ Concurrent upload and recognition test completed")
+
+def test_batch_streams_results_and_writes_one_firestore_batch():
+    """Test batch: giới hạn số ảnh xử lý đồng thời, trả kết quả theo thứ tự xong, ảnh lỗi không làm hỏng cả batch"""
+    import threading
+    import food_recognition_service as service_module
+    from models import RecognizedFood, NutritionInfo
+    from recognition_cache import recognition_cache
+
+    print("🔧 Testing batch recognition...")
+
+    lock = threading.Lock()
+    running = [0, 0]  # đang chạy, tối đa
+    batches = []
+    # Ảnh 0 chậm nhất, ảnh 2 lỗi
+    images = [_photo_bytes((-2.0, -1.2, 1.0, 1.2)), _photo_bytes((-1.5, -1.0, 0.5, 1.0)),
+              b"not an image", _photo_bytes((-0.8, 0.0, -0.6, 0.2))]
+    delays = {images[0]: 0.4, images[1]: 0.05, images[3]: 0.05}
+
+    class FakeGemini:
+        available = True
+
+        def recognize_food(self, image_data, mime_type="image/jpeg"):
+            if image_data == b"not an image":
+                raise RuntimeError("invalid image")
+            with lock:
+                running[0] += 1
+                running[1] = max(running[1], running[0])
+            time.sleep(delays[image_data])
+            with lock:
+                running[0] -= 1
+            return [RecognizedFood(food_name="Bún chả", confidence=0.9,
+                                   nutrition=NutritionInfo(calories=500, protein=25, fat=18, carbs=55))], {}
+
+    class FakeFirestore:
+        def add_food_logs_batch(self, user_id, food_logs):
+            batches.append([log["meal_type"] for log in food_logs])
+            return [f"log-{i}" for i in range(len(food_logs))]
+
+    originals = (service_module.gemini_vision_service, service_module.firestore_service)
+    service_module.gemini_vision_service = FakeGemini()
+    service_module.firestore_service = FakeFirestore()
+    recognition_cache.clear()
+
+    async def collect(service):
+        return [event async for event in service.recognize_food_batch(
+            images, "user-1", ["breakfast", "lunch", "snack", "dinner"], max_concurrency=2
+        )]
+
+    try:
+        service = service_module.FoodRecognitionService()
+        service.firestore_available = True
+        events = asyncio.run(collect(service))
+    finally:
+        service_module.gemini_vision_service, service_module.firestore_service = originals
+        recognition_cache.clear()
+
+    per_image = [event for event in events if event["type"] != "summary"]
+    assert sorted(event["index"] for event in per_image) == [0, 1, 2, 3]
+    assert per_image[-1]["index"] == 0, "ảnh chậm nhất phải được trả về sau cùng"
+    assert [event["index"] for event in per_image if event["type"] == "error"] == [2]
+    assert running[1] <= 2
+    assert batches == [["breakfast", "lunch", "dinner"]]
+    summary = events[-1]
+    assert summary["type"] == "summary" and summary["completed"] == 3 and summary["failed"] == 1
+    assert summary["log_ids"] == ["log-0", "log-1", "log-2"]
+
+    print("✅ Batch recognition test completed")
+
+def test_batch_food_logs_recalculate_nutrition_like_single_log():
+    """Test add_food_logs_batch tính lại tổng dinh dưỡng cho từng bản ghi giống add_food_log"""
+    from services.firestore_service import FirestoreService
+
+    print("🔧 Testing batch food log normalisation...")
+
+    written = {}
+
+    class FakeDocument:
+        def __init__(self, doc_id):
+            self.id = doc_id
+
+    class FakeCollection:
+        def __init__(self):
+            self.count = 0
+
+        def document(self, *args):
+            if args:
+                return self
+            self.count += 1
+            return FakeDocument(f"log-{self.count}")
+
+        def collection(self, name):
+            return self
+
+        def add(self, data):
+            written["single"] = data
+            return None, FakeDocument("single")
+
+    class FakeBatch:
+        def set(self, doc_ref, data):
+            written[doc_ref.id] = data
+
+        def commit(self):
+            pass
+
+    class FakeDB:
+        def collection(self, name):
+            return FakeCollection()
+
+        def batch(self):
+            return FakeBatch()
+
+    service = FirestoreService.__new__(FirestoreService)
+    service.db = FakeDB()
+    service.get_or_create_user = lambda user_id: {}
+
+    def new_logs():
+        return [
+            {"items": [{"calories": 300, "protein": 10, "carbs": 40, "fat": 8},
+                       {"calories": 150, "protein": 5, "carbs": 20, "fat": 4, "fiber": 3}]},
+            {"recognized_foods": [{"nutrition": {"calories": 500, "protein": 25, "carbs": 55, "fat": 18}},
+                                  {"nutrition": {"calories": 100, "protein": 2, "carbs": 20, "fat": 1}}]},
+        ]
+
+    assert service.add_food_logs_batch("user-1", new_logs()) == ["log-1", "log-2"]
+    singles = []
+    for log in new_logs():
+        service.add_food_log("user-1", log)
+        singles.append(written["single"])
+    assert [written["log-1"], written["log-2"]] == singles
+    assert written["log-1"]["calories"] == 450 and written["log-1"]["nutritionInfo"]["fiber"] == 3
+    assert written["log-2"]["total_nutrition"]["calories"] == 600
+
+    print("✅ Batch food log normalisation test completed")
+
+if __name__ == "__main__":
+    test_upload_and_recognition_run_concurrently()
+    test_batch_streams_results_and_writes_one_firestore_batch()
+    test_batch_food_logs_recalculate_nutrition_like_single_log()
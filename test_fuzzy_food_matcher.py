@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Test fuzzy matching tên món ăn/nguyên liệu (trigram, không dấu)
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_trigram_matcher_ranking():
+    """Test xếp hạng ứng viên và phân biệt dấu"""
+    from fuzzy_matcher import TrigramMatcher, fold_text
+
+    print("🔧 Testing trigram matcher...")
+
+    assert fold_text("  Đậu   Phụ ") == "dau phu"
+
+    matcher = TrigramMatcher(["phở bò", "phổi bò", "gà", "gan gà", "cá lóc", "cà chua", "bò", "bơ"])
+
+    assert matcher.best("pho bo tai nam")[0] == "phở bò"
+    assert matcher.best("gà rán")[0] == "gà"
+    assert matcher.best("canh chua cá lóc")[0] == "cá lóc"
+
+    # Có dấu thì so khớp tuyệt đối theo dạng có dấu
+    assert matcher.candidates("bơ")[0] == ("bơ", 1.0)
+    assert matcher.best("xyz") is None
+
+    scores = [score for _, score in matcher.candidates("phở bò tái", limit=5, min_score=0.0)]
+    assert scores == sorted(scores, reverse=True)
+
+    print("✅ Trigram matcher test completed")
+
+def test_fuzzy_lookup_and_vision():
+    """Test fuzzy lookup trên nutrition index và trong Gemini Vision"""
+    from nutrition_index import fuzzy_lookup, fuzzy_candidates, build_fuzzy_index
+    from gemini_vision import gemini_vision_service
+
+    print("🔧 Testing fuzzy nutrition lookup...")
+
+    build_fuzzy_index()
+    start = time.perf_counter()
+    candidates = fuzzy_candidates("com tam suon bi cha")
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"   Candidates: {candidates} ({elapsed_ms:.3f}ms)")
+    assert candidates[0][0] == "cơm tấm"
+
+    assert fuzzy_lookup("ca hoi nuong")["name"] == "cá hồi"
+    assert fuzzy_lookup("bơ") is None
+
+    nutrition = gemini_vision_service.get_official_nutrition_data("Bánh mì thịt nướng", 150)
+    assert nutrition["data_quality"] == "official_dish"
+
+    print("✅ Fuzzy nutrition lookup test completed")
+
+if __name__ == "__main__":
+    test_trigram_matcher_ranking()
+    test_fuzzy_lookup_and_vision()
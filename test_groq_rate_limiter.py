@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Test quota Groq dùng chung: token bucket lưu trong SQLite, Retry-After và hàng đợi theo độ ưu tiên
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_sqlite_store_shared_between_workers():
+    """Test hai limiter (giả lập hai worker) dùng chung quota qua một file SQLite"""
+    from rate_limiting import QuotaLimiter, RateLimit, SQLiteBucketStore
+
+    print("🔧 Testing shared SQLite quota...")
+
+    clock = _FakeClock()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "quota.sqlite3")
+        limits = [RateLimit(3, 60), RateLimit(4, 86400)]
+        worker_a = QuotaLimiter("groq", limits, SQLiteBucketStore(path), clock=clock)
+        worker_b = QuotaLimiter("groq", limits, SQLiteBucketStore(path), clock=clock)
+
+        assert worker_a.try_acquire() == 0 and worker_b.try_acquire() == 0 and worker_a.try_acquire() == 0
+        # Quota phút đã hết cho cả hai worker: chờ 1/rate = 20 giây
+        assert abs(worker_b.try_acquire() - 20) < 1e-6
+
+        clock.now += 20
+        assert worker_b.try_acquire() == 0
+        # Quota ngày (4 request) cũng được tính chung
+        clock.now += 60
+        assert worker_a.try_acquire() > 60
+        assert worker_a.status()["tokens"][0] == 3
+
+    print("✅ Shared SQLite quota test completed")
+
+def test_retry_after_blocks_all_callers():
+    """Test Retry-After chặn mọi limiter dùng chung store cho tới khi hết hạn"""
+    from rate_limiting import MemoryBucketStore, QuotaLimiter, RateLimit, retry_after_seconds, is_rate_limit_error
+
+    print("🔧 Testing Retry-After handling...")
+
+    class _Response:
+        status_code = 429
+        headers = {"retry-after": "7"}
+
+    class _RateLimitError(Exception):
+        response = _Response()
+
+    error = _RateLimitError("Error code: 429")
+    assert is_rate_limit_error(error) and retry_after_seconds(error) == 7.0
+    assert retry_after_seconds(ValueError("boom")) is None and not is_rate_limit_error(ValueError("boom"))
+
+    _Response.headers = {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    assert retry_after_seconds(error) == 0.0
+
+    clock = _FakeClock()
+    store = MemoryBucketStore()
+    first = QuotaLimiter("groq", [RateLimit(30, 60)], store, clock=clock)
+    second = QuotaLimiter("groq", [RateLimit(30, 60)], store, clock=clock)
+    first.block_for(7)
+    assert second.try_acquire() == 7
+    assert not second.acquire(timeout=0.05)
+    clock.now += 7
+    assert second.acquire(timeout=0.05)
+
+    print("✅ Retry-After handling test completed")
+
+def test_interactive_requests_served_first():
+    """Test request chat (PRIORITY_INTERACTIVE) được phục vụ trước request hàng loạt đang chờ"""
+    from rate_limiting import QuotaLimiter, RateLimit, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+
+    print("🔧 Testing priority queue...")
+
+    limiter = QuotaLimiter("test", [RateLimit(20, 1)], poll_interval=0.01)
+    while limiter.try_acquire() == 0:
+        pass
+
+    order = []
+
+    def worker(label, priority):
+        assert limiter.acquire(priority=priority, timeout=5)
+        order.append(label)
+
+    batch = [threading.Thread(target=worker, args=(f"batch{i}", PRIORITY_BATCH)) for i in range(3)]
+    for thread in batch:
+        thread.start()
+    while limiter.queue_length < 3:
+        time.sleep(0.001)
+    chat = threading.Thread(target=worker, args=("chat", PRIORITY_INTERACTIVE))
+    chat.start()
+    for thread in batch + [chat]:
+        thread.join()
+
+    # Request đầu hàng đợi có thể đã lấy được token trước khi chat tới; chat không phải đứng cuối
+    assert order.index("chat") <= 1, order
+    assert limiter.queue_length == 0
+
+    print("✅ Priority queue test completed")
+
+def test_meal_generation_skips_validation_retry_without_quota():
+    """Test sinh thực đơn không gửi lời gọi sửa JSON khi hết thời gian chờ quota, dùng fallback"""
+    from types import SimpleNamespace
+    import groq_integration
+    from groq_integration import GroqService
+
+    print("🔧 Testing validation retry without quota...")
+
+    class FakeCompletions:
+        def __init__(self):
+            self.calls = []
+
+        def create(self, **kwargs):
+            self.calls.append(kwargs)
+            chunk = SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="không phải JSON"))])
+            return iter([chunk])
+
+    completions = FakeCompletions()
+    service = GroqService(api_key=None)
+    service.available = True
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    service.model_discovered = True
+    service.max_retries = 2
+
+    grants = iter([True])
+    original_wait = groq_integration.wait_for_groq_quota
+    groq_integration.wait_for_groq_quota = lambda priority=None: next(grants, False)
+    try:
+        meals = service.generate_meal_suggestions(400, 20, 10, 50, "bữa sáng")
+    finally:
+        groq_integration.wait_for_groq_quota = original_wait
+
+    # Chỉ lời gọi stream đầu tiên (đã có quota) được gửi; lời gọi sửa JSON và lần thử sau bị bỏ qua
+    assert [call.get("stream") for call in completions.calls] == [True]
+    assert meals and all(meal.get("name") for meal in meals)
+
+    print("✅ Validation retry without quota test completed")
+
+if __name__ == "__main__":
+    test_sqlite_store_shared_between_workers()
+    test_retry_after_blocks_all_callers()
+    test_interactive_requests_served_first()
+    test_meal_generation_skips_validation_retry_without_quota()
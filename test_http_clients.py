@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Test HTTP client dùng chung: tái sử dụng kết nối keep-alive, timeout mặc định và vòng đời
+"""
+
+import sys
+import os
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        _KeepAliveHandler.connections += 1
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def _start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def test_connections_are_reused():
+    """Test session và client async dùng lại một kết nối cho nhiều request"""
+    from http_clients import HTTPClientRegistry, HostSettings
+
+    print("🔧 Testing pooled HTTP clients...")
+
+    server, base_url = _start_server()
+    try:
+        registry = HTTPClientRegistry({"local": HostSettings(base_url, max_connections=2, timeout=5.0)})
+
+        _KeepAliveHandler.connections = 0
+        session = registry.session("local")
+        assert session is registry.session("local")
+        for _ in range(5):
+            assert session.get(f"{base_url}/ping").json() == {"ok": True}
+        assert _KeepAliveHandler.connections == 1
+
+        async def fetch_async():
+            client = registry.async_client("local")
+            assert client is registry.async_client("local")
+            for _ in range(5):
+                response = await client.get(f"{base_url}/ping")
+                assert response.status_code == 200
+            await registry.aclose()
+
+        _KeepAliveHandler.connections = 0
+        asyncio.run(fetch_async())
+        assert _KeepAliveHandler.connections == 1
+        assert registry.stats() == {"local": {"session": False, "async_client": False}}
+    finally:
+        server.shutdown()
+
+    print("✅ Pooled HTTP clients test completed")
+
+def test_registry_configuration():
+    """Test timeout mặc định, giới hạn kết nối và host không hợp lệ"""
+    from http_clients import http_clients, HTTP_HOSTS
+
+    print("🔧 Testing HTTP client configuration...")
+
+    session = http_clients.session("usda")
+    assert session._timeout == (HTTP_HOSTS["usda"].connect_timeout, HTTP_HOSTS["usda"].timeout)
+    adapter = session.get_adapter("https://api.nal.usda.gov")
+    assert adapter._pool_maxsize == HTTP_HOSTS["usda"].max_connections and adapter._pool_block
+
+    try:
+        http_clients.session("unknown")
+        assert False, "host không hợp lệ phải báo lỗi"
+    except ValueError:
+        pass
+
+    print("✅ HTTP client configuration test completed")
+
+if __name__ == "__main__":
+    test_connections_are_reused()
+    test_registry_configuration()
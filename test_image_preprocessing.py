@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Test tiền xử lý ảnh trước khi nhận diện món ăn: xoay theo EXIF, thu nhỏ, chuyển định dạng, ảnh thu nhỏ
+"""
+
+import io
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def _image_bytes(size, fmt="JPEG", mode="RGB", orientation=None):
+    from PIL import Image
+
+    image = Image.new(mode, size, (200, 80, 40, 128)[:len(mode)])
+    buffer = io.BytesIO()
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        image.save(buffer, format=fmt, exif=exif)
+    else:
+        image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+def test_large_rotated_photo_is_downscaled_and_upright():
+    """Test ảnh điện thoại lớn có EXIF xoay 90° được xoay đúng chiều và thu nhỏ theo cạnh dài nhất"""
+    from PIL import Image
+    from image_preprocessing import preprocess_image
+
+    print("🔧 Testing downscale with EXIF orientation...")
+
+    raw = _image_bytes((4000, 3000), orientation=6)
+    prepared = preprocess_image(raw, max_edge=1536, output_format="JPEG", thumbnail_edge=320)
+
+    assert (prepared.width, prepared.height) == (1152, 1536)
+    assert prepared.content_type == "image/jpeg" and prepared.extension == "jpg"
+    assert len(prepared.data) < len(raw) and prepared.original_size == len(raw)
+
+    result = Image.open(io.BytesIO(prepared.data))
+    assert result.size == (1152, 1536)
+    assert result.getexif().get(0x0112, 1) == 1
+    assert max(Image.open(io.BytesIO(prepared.thumbnail)).size) == 320
+
+    print("✅ Downscale with EXIF orientation test completed")
+
+def test_small_jpeg_keeps_original_bytes():
+    """Test ảnh JPEG nhỏ, đúng chiều được giữ nguyên (không nén lại làm giảm chất lượng)"""
+    from image_preprocessing import preprocess_image
+
+    print("🔧 Testing small JPEG passthrough...")
+
+    raw = _image_bytes((800, 600))
+    prepared = preprocess_image(raw, max_edge=1536, output_format="JPEG")
+    assert prepared.data == raw
+    assert (prepared.width, prepared.height) == (800, 600)
+
+    print("✅ Small JPEG passthrough test completed")
+
+def test_transparent_png_and_invalid_bytes():
+    """Test PNG có kênh alpha được chuyển sang JPEG, dữ liệu không phải ảnh báo ValueError"""
+    from PIL import Image
+    from image_preprocessing import preprocess_image
+
+    print("🔧 Testing PNG conversion and invalid input...")
+
+    prepared = preprocess_image(_image_bytes((600, 400), fmt="PNG", mode="RGBA"), output_format="JPEG")
+    result = Image.open(io.BytesIO(prepared.data))
+    assert result.format == "JPEG" and result.mode == "RGB"
+
+    try:
+        preprocess_image(b"not an image")
+        assert False, "dữ liệu không phải ảnh phải báo lỗi"
+    except ValueError:
+        pass
+
+    print("✅ PNG conversion and invalid input test completed")
+
+if __name__ == "__main__":
+    test_large_rotated_photo_is_downscaled_and_upright()
+    test_small_jpeg_keeps_original_bytes()
+    test_transparent_png_and_invalid_bytes()
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Test hàng đợi job nền: worker pool, thử lại với backoff, dead-letter ra đĩa và chạy lại
+"""
+
+import sys
+import os
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_retries_until_success():
+    """Test job lỗi tạm thời được thử lại tới khi thành công, số liệu được ghi nhận theo tên job"""
+    from job_queue import JobQueue
+
+    print("🔧 Testing job retries...")
+
+    queue = JobQueue(workers=2, max_attempts=3, backoff_base=0.01)
+    attempts = []
+    saved = []
+
+    @queue.handler("flaky.save")
+    def flaky_save(key, value=None):
+        attempts.append(key)
+        if len(attempts) < 3:
+            raise ConnectionError("firestore unavailable")
+        saved.append((key, value))
+
+    queue.enqueue("flaky.save", "plan-1", value={"calories": 2000})
+    assert queue.drain(timeout=5)
+    stats = queue.stats()
+    queue.stop()
+
+    assert saved == [("plan-1", {"calories": 2000})]
+    assert stats["succeeded"] == 1 and stats["retried"] == 2 and stats["dead_lettered"] == 0
+    assert stats["jobs"]["flaky.save"]["failed_attempts"] == 2
+
+    try:
+        queue.enqueue("missing.handler")
+        assert False, "handler chưa đăng ký phải báo lỗi"
+    except KeyError:
+        pass
+
+    print("✅ Job retries test completed")
+
+def test_dead_letter_and_replay():
+    """Test job lỗi hết số lần thử được ghi vào file dead-letter và chạy lại được"""
+    from job_queue import JobQueue
+
+    print("🔧 Testing dead-letter persistence...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dead_letter_jobs.jsonl")
+        queue = JobQueue(workers=1, max_attempts=2, backoff_base=0.01, dead_letter_path=path)
+        healthy = threading.Event()
+        done = []
+
+        @queue.handler("chat.save")
+        def save_chat(chat_id, data):
+            if not healthy.is_set():
+                raise RuntimeError("deadline exceeded")
+            done.append(chat_id)
+
+        queue.enqueue("chat.save", "chat-1", {"reply": "xin chào"})
+        assert queue.drain(timeout=5)
+        records = queue.dead_letters()
+        assert len(records) == 1
+        assert records[0]["args"] == ["chat-1", {"reply": "xin chào"}] and records[0]["attempts"] == 2
+        assert "deadline exceeded" in records[0]["last_error"]
+
+        healthy.set()
+        assert queue.replay_dead_letters() == 1
+        assert queue.drain(timeout=5)
+        assert done == ["chat-1"] and not os.path.exists(path)
+
+        # Job đang chờ thử lại khi dừng: ghi dead-letter thay vì mất
+        queue.backoff_base = 60
+        healthy.clear()
+        queue.enqueue("chat.save", "chat-2", {})
+        queue.drain(timeout=0.2)
+        assert queue.stop(timeout=0.1) == 1
+        assert queue.dead_letters()[-1]["args"][0] == "chat-2"
+
+    print("✅ Dead-letter persistence test completed")
+
+def test_newer_job_supersedes_stale_retry():
+    """Test job cùng supersede_key: bản cũ đang chờ thử lại bị bỏ, không đè dữ liệu mới hơn"""
+    import time
+    from job_queue import JobQueue
+
+    print("🔧 Testing superseded jobs...")
+
+    queue = JobQueue(workers=2, max_attempts=5, backoff_base=0.2)
+    written = {}
+    failed_once = threading.Event()
+
+    @queue.handler("latest.set")
+    def set_latest(user_id, version):
+        if version == 1:
+            failed_once.set()
+            raise ConnectionError("firestore unavailable")
+        written[user_id] = version
+
+    queue.enqueue("latest.set", "user-1", 1, supersede_key="user-1")
+    assert failed_once.wait(timeout=5)
+    queue.enqueue("latest.set", "user-1", 2, supersede_key="user-1")
+    queue.enqueue("latest.set", "user-2", 1, supersede_key="user-2")
+    assert queue.drain(timeout=5)
+    time.sleep(0.3)
+    stats = queue.stats()
+    queue.stop()
+
+    assert written == {"user-1": 2}
+    assert stats["superseded"] >= 1 and stats["dead_lettered"] == 1
+    assert [record["args"] for record in queue.dead_letters()] == [["user-2", 1]]
+    assert queue.dead_letters()[0]["supersede_key"] == "user-2"
+
+    print("✅ Superseded jobs test completed")
+
+def test_meal_plan_save_job_raises_on_firestore_failure():
+    """Test job meal_plan.save báo lỗi (để được thử lại) khi không lưu được vào Firestore"""
+    import importlib
+    import storage_manager as storage_manager_module
+    from storage_manager import StorageManager
+
+    print("🔧 Testing meal plan save job errors...")
+
+    api_router = importlib.import_module("routers.api_router")
+
+    class FakeStorage:
+        def save_meal_plan(self, meal_plan, user_id):
+            return f"local/{user_id}.json"
+
+    class FakeFirebase:
+        def save_meal_plan(self, meal_plan, user_id):
+            return None
+
+    manager = StorageManager()
+    manager.use_firebase = manager.firebase_initialized = True
+    originals = (storage_manager_module.storage, getattr(storage_manager_module, "firebase", None),
+                 api_router.storage_manager)
+    storage_manager_module.storage = FakeStorage()
+    storage_manager_module.firebase = FakeFirebase()
+    api_router.storage_manager = manager
+    nutrition = {"calories": 500, "protein": 20, "fat": 15, "carbs": 60}
+    meal = {"dishes": [], "nutrition": nutrition}
+    plan = {"days": [{"day_of_week": "Thứ 2", "breakfast": meal, "lunch": meal, "dinner": meal,
+                      "nutrition": nutrition}]}
+    try:
+        # Gọi trực tiếp (không qua job) vẫn trả đường dẫn local như trước
+        assert manager.save_meal_plan(api_router.WeeklyMealPlan(**plan), "user-1") == "local/user-1.json"
+        try:
+            api_router.save_meal_plan_job("user-1", plan)
+            assert False, "lưu Firestore thất bại phải báo lỗi để job được thử lại"
+        except RuntimeError:
+            pass
+    finally:
+        storage_manager_module.storage, storage_manager_module.firebase, api_router.storage_manager = originals
+
+    print("✅ Meal plan save job errors test completed")
+
+if __name__ == "__main__":
+    test_retries_until_success()
+    test_dead_letter_and_replay()
+    test_newer_job_supersedes_stale_retry()
+    test_meal_plan_save_job_raises_on_firestore_failure()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Test registry regex biên dịch sẵn và thời gian theo bước của pipeline sửa JSON
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_safe_regex_helpers_use_compiled_patterns():
+    """Test safe_regex_* nhận Pattern trong registry lẫn chuỗi regex"""
+    from regex_registry import REPAIR_PATTERNS, compile_pattern
+    from groq_integration import safe_regex_sub, safe_regex_findall, safe_regex_search
+
+    print("🔧 Testing precompiled regex helpers...")
+
+    fixed = safe_regex_sub(REPAIR_PATTERNS["unnamed_before_description"], r'{"name": "\1", "description":',
+                           '[{ "Phở Gà", "description": "Phở"}]')
+    assert fixed == '[{"name": "Phở Gà", "description": "Phở"}]'
+    assert safe_regex_sub(r',\s*}', '}', '{"a": 1, }') == '{"a": 1}'
+    assert safe_regex_findall(REPAIR_PATTERNS["quoted_dish_name"], 'món "phở bò" và "cơm tấm"') == ["phở bò", "cơm tấm"]
+    assert safe_regex_search(r'"?calories"?\s*:\s*(\d+)', "calories: 350").group(1) == "350"
+
+    # Chuỗi regex được biên dịch một lần rồi dùng lại
+    assert compile_pattern(r'\d+', 0) is compile_pattern(r'\d+', 0)
+    # Regex lỗi không làm hỏng pipeline
+    assert safe_regex_sub("(", "", "text") == "text"
+
+    print("✅ Precompiled regex helpers test completed")
+
+def test_repair_pipeline_on_recorded_outputs():
+    """Test pipeline trích xuất JSON trên phản hồi đã ghi lại và thống kê theo bước"""
+    from scripts.benchmark_json_repair import run_benchmark, load_recorded_responses
+
+    print("🔧 Testing JSON repair benchmark...")
+
+    samples = load_recorded_responses()
+    report = run_benchmark(iterations=1, samples=samples)
+
+    for sample in samples:
+        assert report["samples"][sample["label"]]["meals"] >= 1, sample["label"]
+
+    stages = report["stages"]
+    assert stages["extract_json"]["calls"] == len(samples)
+    assert stages["clean_response_text"]["calls"] == len(samples)
+    assert stages["fix_malformed_json"]["calls"] >= 1
+    assert all(stats["total_ms"] >= 0 for stats in stages.values())
+
+    print(f"✅ JSON repair benchmark test completed: {report['samples']}")
+
+if __name__ == "__main__":
+    test_safe_regex_helpers_use_compiled_patterns()
+    test_repair_pipeline_on_recorded_outputs()
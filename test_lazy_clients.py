@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Test khởi tạo lười client dịch vụ ngoài và kiểm tra import lúc khởi động
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_lazy_client_initializes_once():
+    """Test factory chỉ chạy một lần dù nhiều thread cùng gọi, lỗi được ghi lại"""
+    from lazy_client import LazyClient
+
+    print("🔧 Testing LazyClient...")
+
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    client = LazyClient("test", factory)
+    assert not client.initialized
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and len({id(result) for result in results}) == 1
+    assert client.status()["available"] and client.init_ms is not None
+
+    def broken():
+        raise RuntimeError("no credentials")
+
+    failing = LazyClient("broken", broken)
+    assert failing.get() is None and failing.failed and failing.error == "no credentials"
+    failing.set("fake")
+    assert failing.get() == "fake" and not failing.failed
+
+    print("✅ LazyClient test completed")
+
+def test_groq_client_created_on_first_use():
+    """Test GroqService không tạo client khi khởi tạo"""
+    from groq_integration import GroqService, GROQ_AVAILABLE
+
+    print("🔧 Testing deferred Groq client...")
+
+    service = GroqService(api_key="gsk_test")
+    assert not service._client.initialized
+    if GROQ_AVAILABLE:
+        assert service.client is not None and service._client.initialized
+
+    assert GroqService(api_key=None).client is None
+
+    print("✅ Deferred Groq client test completed")
+
+def test_sdks_not_imported_at_startup():
+    """Test import service nhận diện món ăn không kéo theo SDK Gemini/Groq/OpenAI"""
+    from scripts.check_import_time import measure_import_time
+
+    print("🔧 Testing startup imports...")
+
+    report = measure_import_time("food_recognition_service")
+    assert report["deferred_imported"] == [], report["deferred_imported"]
+    assert report["total_ms"] > 0
+
+    print(f"✅ Startup imports test completed ({report['total_ms']:.0f} ms)")
+
+if __name__ == "__main__":
+    test_lazy_client_initializes_once()
+    test_groq_client_created_on_first_use()
+    test_sdks_not_imported_at_startup()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Test định tuyến LLM theo độ trễ, mức chất lượng, model ngừng cung cấp và quota
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+class _APIError(Exception):
+    def __init__(self, message, status_code=None, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers or {}, "status_code": status_code})()
+
+def _make_router(clock):
+    from llm_router import LLMRouter, ModelProfile, QUALITY_HIGH, QUALITY_STANDARD
+
+    profiles = {
+        "big-a": ModelProfile("big-a", QUALITY_HIGH, 3.0),
+        "big-b": ModelProfile("big-b", QUALITY_HIGH, 4.0),
+        "small": ModelProfile("small", QUALITY_STANDARD, 1.0),
+    }
+    return LLMRouter(profiles, {"meal_json": QUALITY_HIGH, "chat": QUALITY_STANDARD},
+                     min_samples=2, cooldown=30, clock=clock)
+
+def test_routes_to_fastest_model_meeting_tier():
+    """Test chọn model nhanh nhất đạt mức chất lượng, theo độ trễ đo được của từng loại lời gọi"""
+    print("🔧 Testing latency-aware routing...")
+
+    router = _make_router(_FakeClock())
+    assert router.choose("meal_json") == "big-a"
+    assert router.choose("chat") == "small"
+
+    # big-a chậm hơn big-b khi đo thực tế cho meal_json; chat không bị ảnh hưởng
+    router.record_success("big-a", "meal_json", 6.0)
+    router.record_success("big-b", "meal_json", 2.0)
+    assert router.candidates("meal_json") == ["big-b", "big-a", "small"]
+    assert router.choose("chat") == "small"
+
+    # Chỉ còn model dưới mức chất lượng: hạ mức thay vì thất bại
+    router.set_available_models(["small", "other-model"])
+    assert router.candidates("meal_json") == ["small"]
+
+    print("✅ Latency-aware routing test completed")
+
+def test_call_falls_back_on_decommissioned_and_throttled_models():
+    """Test call() chuyển model khi model bị ngừng cung cấp hoặc bị 429, lỗi khác thì báo lỗi"""
+    print("🔧 Testing model fallback...")
+
+    clock = _FakeClock()
+    router = _make_router(clock)
+    calls = []
+
+    def request(model):
+        calls.append(model)
+        if model == "big-a":
+            raise _APIError("The model `big-a` has been decommissioned", status_code=400)
+        if model == "big-b":
+            raise _APIError("Rate limit reached", status_code=429, headers={"retry-after": "12"})
+        return f"answer from {model}"
+
+    assert router.call("meal_json", request) == "answer from small"
+    assert calls == ["big-a", "big-b", "small"]
+    status = router.status()
+    assert status["big-a"]["decommissioned"] and status["big-b"]["throttled_for_seconds"] == 12
+
+    # big-b hết throttle sau Retry-After; big-a không bao giờ được chọn lại
+    assert router.choose("meal_json") == "small"
+    clock.now += 12
+    assert router.candidates("meal_json") == ["big-b", "small"]
+
+    def broken(model):
+        raise ValueError("bad prompt")
+
+    try:
+        router.call("meal_json", broken)
+        assert False, "lỗi không liên quan tới model phải được báo lại"
+    except ValueError:
+        pass
+
+    print("✅ Model fallback test completed")
+
+def test_quota_headers_and_error_rate():
+    """Test header x-ratelimit-* và tỉ lệ lỗi cao làm model tạm thời bị bỏ qua"""
+    from llm_router import parse_reset_duration
+
+    print("🔧 Testing quota headers and error rate...")
+
+    assert parse_reset_duration("2m59.5s") == 179.5
+    assert parse_reset_duration("120ms") == 0.12
+    assert parse_reset_duration("7") == 7.0 and parse_reset_duration("") is None
+
+    clock = _FakeClock()
+    router = _make_router(clock)
+    router.record_success("small", "chat", 0.5, headers={
+        "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1m",
+        "x-ratelimit-remaining-tokens": "5000",
+    })
+    assert router.status()["small"]["remaining_requests"] == 0
+    assert router.choose("chat") == "big-a"
+    clock.now += 60
+    assert router.choose("chat") == "small"
+
+    # Phản hồi thô (with_raw_response): router đọc header quota rồi trả về kết quả đã parse
+    class RawResponse:
+        headers = {"x-ratelimit-remaining-requests": "42", "x-ratelimit-remaining-tokens": "900"}
+
+        def parse(self):
+            return "completion"
+
+    assert router.call("chat", lambda model: RawResponse()) == "completion"
+    assert router.status()["small"]["remaining_requests"] == 42
+    assert router.status()["small"]["remaining_tokens"] == 900
+
+    router.record_failure("big-a", "meal_json", RuntimeError("timeout"))
+    router.record_failure("big-a", "meal_json", RuntimeError("timeout"))
+    assert router.choose("meal_json") == "big-b"
+    clock.now += 30
+    assert router.choose("meal_json") == "big-a"
+
+    print("✅ Quota headers and error rate test completed")
+
+if __name__ == "__main__":
+    test_routes_to_fastest_model_meeting_tier()
+    test_call_falls_back_on_decommissioned_and_throttled_models()
+    test_quota_headers_and_error_rate()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Test job sinh kế hoạch ăn bất đồng bộ: tiến độ theo ngày, lưu job đã xong ra đĩa, theo dõi qua SSE
+"""
+
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DAYS = ["Thứ 2", "Thứ 3", "Thứ 4", "Thứ 5", "Thứ 6", "Thứ 7", "Chủ Nhật"]
+
+def _wait_finished(manager, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job không kết thúc kịp")
+
+def test_job_progress_and_persistence():
+    """Test job ghi sự kiện theo từng ngày, kết quả được lưu ra đĩa và đọc lại được sau khi khởi động lại"""
+    from meal_plan_jobs import MealPlanJobManager
+
+    print("🔧 Testing meal plan job progress...")
+
+    def generate(progress):
+        for index, day in enumerate(DAYS):
+            progress(index, day, {"day_of_week": day})
+        return {"days": [{"day_of_week": day} for day in DAYS]}
+
+    def broken(progress):
+        progress(0, DAYS[0], {})
+        raise RuntimeError("LLM unavailable")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = MealPlanJobManager(max_workers=1, jobs_dir=tmp)
+        job = manager.submit("user-1", generate)
+        finished = _wait_finished(manager, job.id)
+        assert finished["days_completed"] == 7 and len(finished["meal_plan"]["days"]) == 7
+
+        events = manager.events_since(job.id)
+        names = [event["event"] for event in events]
+        assert names == ["queued", "running"] + ["progress"] * 7 + ["completed"]
+        assert [event["id"] for event in events] == list(range(1, 11))
+        assert events[4]["data"]["day"] == DAYS[2] and events[4]["data"]["days_completed"] == 3
+        # Nối lại từ Last-Event-ID: chỉ nhận sự kiện còn thiếu
+        assert [event["id"] for event in manager.events_since(job.id, after=8)] == [9, 10]
+
+        failed = manager.submit("user-1", broken)
+        assert _wait_finished(manager, failed.id)["error"] == "LLM unavailable"
+
+        # Instance mới (sau restart): job đã xong vẫn tra được từ đĩa
+        restarted = MealPlanJobManager(jobs_dir=tmp)
+        stored = restarted.get(job.id)
+        assert stored["status"] == "completed" and stored["meal_plan"]["days"][0]["day_of_week"] == DAYS[0]
+        assert restarted.events_since(job.id, after=3)[0]["event"] == "completed"
+        assert restarted.get("missing") is None and restarted.events_since("../etc") is None
+
+    print("✅ Meal plan job progress test completed")
+
+def test_job_endpoints_stream_progress():
+    """Test API: tạo job trả 202 và job id, SSE gửi tiến độ từng ngày tới khi completed, người khác không xem được"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from auth_utils import get_current_user
+    from models import TokenPayload
+    from meal_plan_jobs import MealPlanJobManager
+    import importlib
+    # routers/__init__ thay tên module con bằng đối tượng APIRouter
+    api_router_module = importlib.import_module("routers.api_router")
+
+    print("🔧 Testing meal plan job endpoints...")
+
+    submitted = []
+
+    def fake_generate(calories, protein, fat, carbs, user_id, use_ai, use_tdee=True, on_day_complete=None):
+        submitted.append((user_id, calories))
+        for index, day in enumerate(DAYS):
+            plan = type("Day", (), {"day_of_week": day, "dict": lambda self: {"day_of_week": self.day_of_week}})()
+            on_day_complete(index, plan)
+            time.sleep(0.01)
+        return type("Plan", (), {"dict": lambda self: {"days": DAYS}})()
+
+    app = FastAPI()
+    app.include_router(api_router_module.router)
+    current_user = {"uid": "user-1"}
+    app.dependency_overrides[get_current_user] = lambda: TokenPayload(uid=current_user["uid"])
+    originals = (api_router_module._generate_weekly_plan, api_router_module.SSE_POLL_SECONDS,
+                 api_router_module.meal_plan_jobs)
+    api_router_module._generate_weekly_plan = fake_generate
+    api_router_module.SSE_POLL_SECONDS = 0.02
+    api_router_module.meal_plan_jobs = MealPlanJobManager(max_workers=1)
+    try:
+        client = TestClient(app)
+        response = client.post("/api/meal-plan/jobs", json={"nutrition_targets": {"calories": 1800}})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert response.json()["events_url"] == f"http://testserver/api/meal-plan/jobs/{job_id}/events"
+
+        with client.stream("GET", response.json()["events_url"]) as stream:
+            assert stream.headers["content-type"].startswith("text/event-stream")
+            body = "".join(stream.iter_text())
+        events = [line.split(": ", 1)[1] for line in body.splitlines() if line.startswith("event: ")]
+        assert events.count("progress") == 7 and events[-1] == "completed"
+
+        status_response = client.get(response.json()["status_url"])
+        assert status_response.json()["meal_plan"] == {"days": DAYS}
+        assert submitted == [("user-1", 1800)]
+
+        current_user["uid"] = "user-2"
+        assert client.get(f"/api/meal-plan/jobs/{job_id}").status_code == 403
+    finally:
+        (api_router_module._generate_weekly_plan, api_router_module.SSE_POLL_SECONDS,
+         api_router_module.meal_plan_jobs) = originals
+
+    print("✅ Meal plan job endpoints test completed")
+
+def test_job_urls_match_routes_of_main_app():
+    """Test status_url/events_url trả về từ app thật (main.app, router gắn thêm prefix) trỏ đúng endpoint"""
+    from fastapi.testclient import TestClient
+    from auth_utils import get_current_user
+    from models import TokenPayload
+    from meal_plan_jobs import MealPlanJobManager
+    import importlib
+    import main
+    api_router_module = importlib.import_module("routers.api_router")
+
+    print("🔧 Testing job URLs on the main app...")
+
+    def fake_generate(calories, protein, fat, carbs, user_id, use_ai, use_tdee=True, on_day_complete=None):
+        return type("Plan", (), {"dict": lambda self: {"days": DAYS}})()
+
+    originals = (api_router_module._generate_weekly_plan, api_router_module.meal_plan_jobs)
+    api_router_module._generate_weekly_plan = fake_generate
+    api_router_module.meal_plan_jobs = MealPlanJobManager(max_workers=1)
+    main.app.dependency_overrides[get_current_user] = lambda: TokenPayload(uid="user-1")
+    try:
+        # Không dùng "with": không chạy các hook startup (warm-up, job queue...) của app
+        client = TestClient(main.app)
+        response = client.post("/api/api/meal-plan/jobs", json={})
+        assert response.status_code == 202
+        body = response.json()
+        _wait_finished(api_router_module.meal_plan_jobs, body["job_id"])
+
+        status_response = client.get(body["status_url"])
+        assert status_response.status_code == 200
+        assert status_response.json()["meal_plan"] == {"days": DAYS}
+        with client.stream("GET", body["events_url"]) as stream:
+            assert stream.status_code == 200
+            assert "event: completed" in "".join(stream.iter_text())
+    finally:
+        main.app.dependency_overrides.pop(get_current_user, None)
+        api_router_module._generate_weekly_plan, api_router_module.meal_plan_jobs = originals
+
+    print("✅ Job URLs on the main app test completed")
+
+if __name__ == "__main__":
+    test_job_progress_and_persistence()
+    test_job_endpoints_stream_progress()
+    test_job_urls_match_routes_of_main_app()
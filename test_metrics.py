@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Test histogram độ trễ: percentile từ bucket cố định, định dạng Prometheus, nhãn route/upstream/outcome
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_histogram_percentiles_and_prometheus_text():
+    """Test percentile nội suy trong bucket và bucket tích lũy trong Prometheus text"""
+    from metrics import MetricsRegistry
+
+    print("🔧 Testing histogram percentiles...")
+
+    registry = MetricsRegistry()
+    family = registry.histogram("demo_seconds", "Demo latency", ("route", "outcome"), buckets=(0.1, 0.5, 1.0))
+    for _ in range(90):
+        family.observe(0.05, "/a", "2xx")
+    for _ in range(9):
+        family.observe(0.3, "/a", "2xx")
+    family.observe(7.0, "/a", "2xx")
+    family.observe(0.2, '/b"x', "5xx")
+
+    histogram = family.labels("/a", "2xx")
+    assert histogram.count == 100
+    assert abs(histogram.percentile(0.5) - 0.1 * 50 / 90) < 1e-9
+    assert 0.1 < histogram.percentile(0.95) <= 0.5
+    # p99 rơi vào bucket cuối có cận: không vượt cận lớn nhất
+    assert histogram.percentile(0.999) == 1.0
+    assert family.labels("/none", "2xx").percentile(0.5) is None
+
+    row = registry.summary()["demo_seconds"][0]
+    assert row["route"] == "/a" and row["count"] == 100
+    assert set(row) >= {"p50_seconds", "p95_seconds", "p99_seconds", "avg_seconds"}
+
+    text = registry.render_prometheus()
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{route="/a",outcome="2xx",le="0.1"} 90' in text
+    assert 'demo_seconds_bucket{route="/a",outcome="2xx",le="1.0"} 99' in text
+    assert 'demo_seconds_bucket{route="/a",outcome="2xx",le="+Inf"} 100' in text
+    assert 'demo_seconds_count{route="/a",outcome="2xx"} 100' in text
+    assert 'route="/b\\"x"' in text
+
+    try:
+        family.observe(1.0, "/a")
+        assert False, "thiếu nhãn phải báo lỗi"
+    except ValueError:
+        pass
+
+    print("✅ Histogram percentiles test completed")
+
+def test_middleware_labels_route_template_and_upstreams():
+    """Test middleware ghi theo route template (không theo URL thật), breaker ghi độ trễ upstream, /metrics trả text"""
+    from fastapi import FastAPI, HTTPException
+    from fastapi.responses import PlainTextResponse
+    from fastapi.testclient import TestClient
+    from metrics import MetricsMiddleware, MetricsRegistry, metrics, upstream_request_duration
+    from circuit_breaker import CircuitBreaker
+
+    print("🔧 Testing request and upstream latency metrics...")
+
+    registry = MetricsRegistry()
+    family = registry.histogram("http_seconds", "HTTP latency", ("route", "method", "outcome"))
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, histogram=family)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="not found")
+        return {"id": item_id}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def get_metrics():
+        return registry.render_prometheus()
+
+    client = TestClient(app)
+    for item_id in (1, 2, 3, 0):
+        client.get(f"/items/{item_id}")
+    client.get("/wp-login.php")
+
+    rows = {(row["route"], row["outcome"]): row["count"] for row in registry.summary()["http_seconds"]}
+    assert rows == {("/items/{item_id}", "2xx"): 3, ("/items/{item_id}", "4xx"): 1, ("unmatched", "4xx"): 1}
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'http_seconds_count{route="/items/{item_id}",method="GET",outcome="2xx"} 3' in response.text
+
+    breaker = CircuitBreaker("metrics-test", failure_threshold=10)
+    breaker.call(lambda: "ok")
+    try:
+        breaker.call(lambda: 1 / 0)
+    except ZeroDivisionError:
+        pass
+    try:
+        assert upstream_request_duration.labels("metrics-test", "success").count == 1
+        assert upstream_request_duration.labels("metrics-test", "error").count == 1
+        assert 'upstream_request_duration_seconds_count{upstream="metrics-test",outcome="error"} 1' \
+            in metrics.render_prometheus()
+    finally:
+        upstream_request_duration.clear()
+
+    print("✅ Request and upstream latency metrics test completed")
+
+def test_performance_monitor_reports_percentiles():
+    """Test PerformanceMonitor ghi vào histogram và trả p50/p95/p99 cho từng thao tác"""
+    import importlib.util
+    # utils.py che mất package utils/: nạp module theo đường dẫn file
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils", "performance_monitor.py")
+    spec = importlib.util.spec_from_file_location("performance_monitor", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    print("🔧 Testing PerformanceMonitor percentiles...")
+
+    monitor = module.PerformanceMonitor()
+    monitor.histogram.clear()
+    try:
+        for value in [0.02] * 95 + [3.0] * 5:
+            monitor._record_metric("firestore.get_user", value, value < 1)
+        metric = monitor.get_metrics()["metrics"]["firestore.get_user"]
+        assert metric["total_calls"] == 100 and metric["error_count"] == 5
+        assert metric["p50_time"] < 0.025 and metric["p99_time"] > 2.5
+        assert len(monitor.slow_queries) == 5
+    finally:
+        monitor.histogram.clear()
+
+    print("✅ PerformanceMonitor percentiles test completed")
+
+if __name__ == "__main__":
+    test_histogram_percentiles_and_prometheus_text()
+    test_middleware_labels_route_template_and_upstreams()
+    test_performance_monitor_reports_percentiles()
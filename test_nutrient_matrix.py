@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Test ma trận dinh dưỡng và API tính theo lô
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_batch_totals_match_per_ingredient_sum():
+    """Test tổng theo lô khớp với cộng từng nguyên liệu"""
+    import nutrient_matrix
+    from nutrient_matrix import get_nutrient_matrix, calculate_totals, calculate_many
+    from vietnamese_nutrition_database import get_ingredient_nutrition
+
+    print(f"🔧 Testing nutrient matrix (NumPy: {nutrient_matrix.NUMPY_AVAILABLE})...")
+
+    meal = [("thịt heo", 150), ("cơm", 200), ("rau muống", 80), ("không có", 50)]
+    totals, missing = calculate_totals(meal)
+    assert missing == ["không có"]
+
+    expected = 0.0
+    for name, grams in meal[:3]:
+        expected += get_ingredient_nutrition(name, grams)["calories"]
+    assert abs(totals["calories"] - expected) < 1e-6
+
+    # Cả tuần trong một lần tính, nguyên liệu lặp lại được cộng dồn
+    week = [meal, [], [("trứng", 60), ("trứng", 60)]]
+    results = calculate_many(week)
+    assert len(results) == 3
+    assert results[0][0] == totals
+    assert results[1][0]["calories"] == 0
+    assert abs(results[2][0]["calories"] - 2 * get_ingredient_nutrition("trứng", 60)["calories"]) < 1e-6
+
+    # Nhánh NumPy và nhánh Python cho cùng kết quả
+    matrix = get_nutrient_matrix()
+    vectors = [matrix.vectorize(batch)[:2] for batch in week]
+    original = nutrient_matrix.NUMPY_AVAILABLE
+    try:
+        nutrient_matrix.NUMPY_AVAILABLE = False
+        python_results = matrix.batch_totals_from_vectors(vectors)
+    finally:
+        nutrient_matrix.NUMPY_AVAILABLE = original
+    for (numpy_totals, _), python_totals in zip(results, python_results):
+        for field, value in python_totals.items():
+            assert abs(numpy_totals[field] - value) < 1e-6
+
+    print("✅ Nutrient matrix test completed")
+
+def test_dish_generator_uses_batch_api():
+    """Test generator tính nhiều món một lần và vẫn ước tính nguyên liệu lạ"""
+    from services.vietnamese_dish_generator import vietnamese_dish_generator
+    from vietnamese_nutrition_database import calculate_dish_nutrition_from_ingredients
+
+    print("🔧 Testing dish generator batch nutrition...")
+
+    dishes = [
+        [{"name": "cơm trắng", "amount": 200}, {"name": "thịt gà ta", "amount": 100}],
+        [{"name": "thịt lạ", "amount": 100}],
+    ]
+    first, second = vietnamese_dish_generator.calculate_many_dish_nutrition(dishes)
+    assert round(first["calories"], 1) == round(2 * 130 + 199, 1)
+    assert second == {"calories": 150, "protein": 20, "fat": 8, "carbs": 0}
+    assert vietnamese_dish_generator.calculate_dish_nutrition(dishes[0]) == first
+
+    result = calculate_dish_nutrition_from_ingredients([{"name": "thịt bò", "amount": "100g"}])
+    assert result["calories"] == 250 and result["sources"] == ["Viện Dinh dưỡng Quốc gia"]
+
+    print("✅ Dish generator batch nutrition test completed")
+
+def test_row_index_survives_concurrent_memo_clear():
+    """Test row_index vẫn trả chỉ số hàng khi thread khác xóa memo ngay sau khi vừa ghi"""
+    from nutrient_matrix import get_nutrient_matrix
+
+    print("🔧 Testing row_index memo race...")
+
+    class ClearedByOtherThread(dict):
+        def __setitem__(self, key, value):
+            super().__setitem__(key, value)
+            self.clear()  # Thread khác vượt MAX_MEMOIZED_NAMES đúng lúc này
+
+    matrix = get_nutrient_matrix()
+    original = matrix._row_of_name
+    matrix._row_of_name = ClearedByOtherThread()
+    try:
+        row = matrix.row_index("rau muống")
+        assert row is not None and matrix.rows[row][0] == 19
+        assert matrix.row_index("không có") is None
+    finally:
+        matrix._row_of_name = original
+
+    print("✅ row_index memo race test completed")
+
+if __name__ == "__main__":
+    test_batch_totals_match_per_ingredient_sum()
+    test_dish_generator_uses_batch_api()
+    test_row_index_survives_concurrent_memo_clear()
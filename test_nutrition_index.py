@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Test index tra cứu dinh dưỡng hợp nhất (không dấu, alias, tiền tố)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_lookup_normalization():
+    """Test tra cứu có dấu/không dấu, alias và tiền tố"""
+    from nutrition_index import lookup, PER_100G, PER_SERVING
+
+    print("🔧 Testing nutrition index lookup...")
+
+    pho = lookup("Phở Bò")
+    assert pho["name"] == "phở bò" and pho["basis"] == PER_SERVING
+    assert pho["calories"] == 420
+
+    # Không dấu, khoảng trắng thừa và tiền tố đều trỏ về cùng bản ghi
+    assert lookup("pho  bo") is pho
+    assert lookup("phở") is pho
+    assert lookup("bún bò")["name"] == "bún bò huế"
+
+    # Alias và lọc theo basis
+    assert lookup("thịt lợn")["name"] == "thịt heo"
+    assert lookup("fish")["name"] == "salmon"
+    assert lookup("bánh mì", basis=PER_100G)["table"] == "vn_ingredients"
+    assert lookup("bánh mì", basis=PER_SERVING)["table"] == "vn_dishes"
+
+    # Các bảng phụ cũng nằm trong index
+    assert lookup("cháo cá hồi nấu dừa")["table"] == "specialty_dishes"
+    assert lookup("thit ga ta")["table"] == "extended"
+    assert lookup("salmon")["table"] == "fallback"
+
+    # Tên bỏ dấu nhập nhằng hoặc tiền tố quá ngắn không được đoán bừa
+    assert lookup("xyz") is None
+    assert lookup("ba", allow_prefix=True) is None
+    assert lookup("phở", allow_prefix=False) is not None
+    assert lookup("phở tái", allow_prefix=False) is None
+    # Tiền tố khớp nhiều khóa (rau bí, rau muống...) không được chọn bừa một khóa
+    assert lookup("rau") is None and lookup("thịt") is None and lookup("thit") is None
+
+    print("✅ Nutrition index lookup test completed")
+
+def test_lookup_many_and_callers():
+    """Test lookup_many và các hàm cũ đi qua index"""
+    from nutrition_index import lookup_many
+    from vietnamese_nutrition_database import get_dish_nutrition, get_ingredient_nutrition
+    from nutritionix import get_nutrition_fallback
+
+    print("🔧 Testing lookup_many and legacy callers...")
+
+    results = lookup_many(["Rau muống", "rau muong", "không có"])
+    assert results["Rau muống"] is results["rau muong"]
+    assert results["không có"] is None
+
+    dish = get_dish_nutrition("com tam")
+    assert dish["reference_code"] == "VN-DISH-003"
+    assert "serving_size" in dish
+
+    ingredient = get_ingredient_nutrition("Thịt Heo", 200)
+    assert ingredient["calories"] == ingredient["per_100g"]["calories"] * 2
+
+    # Trước đây nguyên liệu Việt không có trong FALLBACK_NUTRITION_DATA trả giá trị mặc định
+    assert get_nutrition_fallback("rau muống", "100g").calories == 19
+
+    print("✅ lookup_many and legacy callers test completed")
+
+if __name__ == "__main__":
+    test_lookup_normalization()
+    test_lookup_many_and_callers()
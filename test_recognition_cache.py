@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Test cache nhận diện món ăn theo dHash: ảnh gần trùng dùng lại kết quả, ngưỡng Hamming theo người dùng/toàn cục
+"""
+
+import asyncio
+import io
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def _photo(size=(1200, 900), flip=False):
+    from PIL import Image, ImageOps
+
+    image = Image.effect_mandelbrot(size, (-2.0, -1.2, 1.0, 1.2), 60).convert("RGB")
+    return ImageOps.mirror(image) if flip else image
+
+def _jpeg(image, quality=90):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+def _foods(name="Phở bò"):
+    from models import RecognizedFood, NutritionInfo
+
+    return [RecognizedFood(food_name=name, confidence=0.9, image_url="https://example.com/a.jpg",
+                           nutrition=NutritionInfo(calories=450, protein=25, fat=12, carbs=60))]
+
+def test_dhash_matches_near_duplicates():
+    """Test dHash gần như không đổi khi ảnh bị nén lại/thu nhỏ, khác hẳn với ảnh khác"""
+    from image_preprocessing import dhash
+    from recognition_cache import hamming_distance
+    from PIL import Image
+
+    print("🔧 Testing dHash near-duplicate detection...")
+
+    original = _photo()
+    recompressed = Image.open(io.BytesIO(_jpeg(original.resize((800, 600)), quality=60)))
+    assert hamming_distance(dhash(original), dhash(recompressed)) <= 3
+    assert hamming_distance(dhash(original), dhash(_photo(flip=True))) > 10
+
+    print("✅ dHash near-duplicate detection test completed")
+
+def test_user_and_global_thresholds():
+    """Test ngưỡng theo người dùng rộng hơn ngưỡng toàn cục, kết quả cache không mang URL ảnh cũ, hết hạn theo TTL"""
+    from recognition_cache import RecognitionCache, USER_SCOPE, GLOBAL_SCOPE
+
+    print("🔧 Testing recognition cache thresholds...")
+
+    clock = _FakeClock()
+    cache = RecognitionCache(max_distance=6, global_max_distance=2, ttl_seconds=60, clock=clock)
+    image_hash = 0x0F0F_F0F0_1234_ABCD
+    cache.store("alice", image_hash, _foods(), {"model": "gemini"})
+
+    hit = cache.lookup("alice", image_hash ^ 0b11111)  # 5 bit khác
+    assert hit and hit.scope == USER_SCOPE and hit.distance == 5
+    assert hit.recognized_foods[0].food_name == "Phở bò"
+    assert hit.recognized_foods[0].image_url is None
+    assert hit.raw_analysis["cache"]["hit"] and hit.raw_analysis["model"] == "gemini"
+
+    # Người dùng khác: chỉ ảnh gần như y hệt mới dùng chung
+    assert cache.lookup("bob", image_hash ^ 0b11111) is None
+    hit = cache.lookup("bob", image_hash ^ 0b1)
+    assert hit and hit.scope == GLOBAL_SCOPE
+
+    # Ảnh đồng màu (hash 0) không được cache
+    cache.store("alice", 0, _foods(), {})
+    assert cache.lookup("alice", 0) is None
+
+    clock.now += 61
+    assert cache.lookup("alice", image_hash) is None
+    stats = cache.stats()
+    assert stats["hits_user"] == 1 and stats["hits_global"] == 1 and stats["global_entries"] == 0
+
+    print("✅ Recognition cache thresholds test completed")
+
+def test_reupload_skips_gemini():
+    """Test tải lại cùng một ảnh (đã nén lại) không gọi Gemini lần nữa"""
+    import food_recognition_service as service_module
+    from recognition_cache import recognition_cache
+
+    print("🔧 Testing re-upload served from cache...")
+
+    calls = []
+
+    class FakeGemini:
+        available = True
+
+        def recognize_food(self, image_data, mime_type="image/jpeg"):
+            calls.append(mime_type)
+            return _foods(), {"model": "fake"}
+
+    original_gemini = service_module.gemini_vision_service
+    service_module.gemini_vision_service = FakeGemini()
+    recognition_cache.clear()
+    try:
+        service = service_module.FoodRecognitionService()
+        first = asyncio.run(service.recognize_food_from_image(_jpeg(_photo()), "user-1", save_to_firebase=False))
+        second = asyncio.run(service.recognize_food_from_image(_jpeg(_photo(), quality=70), "user-1",
+                                                               save_to_firebase=False))
+    finally:
+        service_module.gemini_vision_service = original_gemini
+        recognition_cache.clear()
+
+    assert len(calls) == 1
+    assert "cache" not in first.raw_analysis
+    assert second.raw_analysis["cache"]["scope"] == "user"
+    assert second.recognized_foods[0].nutrition.calories == 450
+
+    print("✅ Re-upload served from cache test completed")
+
+if __name__ == "__main__":
+    test_dhash_matches_near_duplicates()
+    test_user_and_global_thresholds()
+    test_reupload_skips_gemini()
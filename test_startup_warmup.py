@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Test startup warm-up và cache model Groq trên đĩa
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def test_run_warmup():
+    """Test warm-up chạy đủ các bước và chuyển trạng thái sang ready"""
+    import warmup
+
+    print("🔧 Testing startup warm-up...")
+
+    warmup.warmup_state = warmup.WarmupState()
+    assert not warmup.warmup_state.ready
+
+    def failing_task():
+        raise RuntimeError("boom")
+
+    result = warmup.run_warmup(warmup.WARMUP_TASKS + [("failing_task", failing_task)])
+    for name, info in result["tasks"].items():
+        print(f"   {name}: {info['status']} ({info['duration_ms']}ms)")
+
+    assert warmup.warmup_state.ready
+    assert result["tasks"]["failing_task"]["status"] == "error"
+    for name, _ in warmup.WARMUP_TASKS:
+        assert result["tasks"][name]["status"] == "ok"
+
+    from services.vietnamese_meal_service import vietnamese_meal_service
+    assert vietnamese_meal_service.get_meal_by_name("PHỞ BÒ")["name"] == "Phở bò"
+
+    print("✅ Warm-up test completed")
+
+def test_groq_model_discovery_cache():
+    """Test models.list() chỉ được gọi một lần nhờ cache trên đĩa"""
+    from config import config
+    from groq_integration import GroqService
+
+    print("🔧 Testing Groq model discovery cache...")
+
+    class FakeModel:
+        def __init__(self, model_id):
+            self.id = model_id
+
+    class FakeModels:
+        calls = 0
+
+        def list(self):
+            FakeModels.calls += 1
+            return type("ModelList", (), {"data": [FakeModel("llama3-8b-8192"), FakeModel("mixtral-8x7b-32768")]})()
+
+    original_cache_file = config.GROQ_MODELS_CACHE_FILE
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.GROQ_MODELS_CACHE_FILE = os.path.join(tmp_dir, "groq_models.json")
+        try:
+            def make_service():
+                service = GroqService(api_key=None)
+                service.client = type("FakeClient", (), {"models": FakeModels()})()
+                service.preferred_models = ["llama3-70b-8192", "llama3-8b-8192", "mixtral-8x7b-32768"]
+                return service
+
+            first = make_service()
+            assert first.ensure_model_selected() == "llama3-8b-8192"
+            assert FakeModels.calls == 1
+
+            # Instance mới (cold start) đọc từ cache, không gọi mạng
+            second = make_service()
+            second._select_model(allow_network=False)
+            assert second.model_discovered
+            assert second.ensure_model_selected() == "llama3-8b-8192"
+            assert FakeModels.calls == 1
+        finally:
+            config.GROQ_MODELS_CACHE_FILE = original_cache_file
+
+    print("✅ Groq model discovery cache test completed")
+
+if __name__ == "__main__":
+    test_run_warmup()
+    test_groq_model_discovery_cache()
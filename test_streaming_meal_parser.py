@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Test parser JSON tăng dần cho stream món ăn từ LLM
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+MEAL_JSON = (
+    '```json\n[{"name": "Phở Gà", "description": "Phở gà thanh đạm", '
+    '"ingredients": [{"name": "Bánh phở", "amount": "200g"}], "preparation": ["Ninh xương", "Chan nước dùng"], '
+    '"nutrition": {"calories": 420, "protein": 28, "fat": 8, "carbs": 55}, '
+    '"preparation_time": "45 phút", "health_benefits": "Giàu protein"}, '
+    '{"name": "Xôi Gấc", "description": "Xôi gấc dẻo", "ingredients": [{"name": "Gạo nếp", "amount": "150g"}], '
+    '"preparation": ["Đồ xôi"], "nutrition": {"calories": 380, "protein": 7, "fat": 5, "carbs": 75}, '
+    '"preparation_time": "60 phút", "health_benefits": "Giàu beta-caroten"}]\n```'
+)
+
+def test_meals_emitted_as_soon_as_braces_close():
+    """Test mỗi món được trả về ngay khi object đóng ngoặc, kết quả không phụ thuộc cách chia chunk"""
+    from streaming_json import IncrementalMealParser, parse_meals
+
+    print("🔧 Testing incremental meal parsing...")
+
+    parser = IncrementalMealParser()
+    first_end = MEAL_JSON.index('"Giàu protein"}') + len('"Giàu protein"}')
+    assert parser.feed(MEAL_JSON[:first_end - 1]) == []
+    emitted = parser.feed(MEAL_JSON[first_end - 1:first_end])
+    assert [meal["name"] for meal in emitted] == ["Phở Gà"]
+    assert [meal["name"] for meal in parser.feed(MEAL_JSON[first_end:])] == ["Xôi Gấc"]
+    assert parser.close() == []
+
+    whole, errors = parse_meals(MEAL_JSON)
+    for size in (1, 5, 64):
+        parser = IncrementalMealParser()
+        streamed = []
+        for i in range(0, len(MEAL_JSON), size):
+            streamed += parser.feed(MEAL_JSON[i:i + size])
+        streamed += parser.close()
+        assert streamed == whole
+    assert not errors and whole[0]["nutrition"]["calories"] == 420
+
+    print("✅ Incremental meal parsing test completed")
+
+def test_inline_repairs():
+    """Test sửa lỗi LLM phổ biến trong một lần quét"""
+    from streaming_json import parse_meals
+
+    print("🔧 Testing inline JSON repairs...")
+
+    meals, _ = parse_meals('[{ "Phở Gà", "description": "Phở", [{"name": "Gà", "amount": "100g"}]}]')
+    assert meals == [{"name": "Phở Gà", "description": "Phở", "ingredients": [{"name": "Gà", "amount": "100g"}]}]
+
+    meals, _ = parse_meals("[{name: 'Bánh Mì', nutrition: {calories: 450,}, vegan: False,},]")
+    assert meals == [{"name": "Bánh Mì", "nutrition": {"calories": 450}, "vegan": False}]
+
+    meals, _ = parse_meals('[{"name": "Cháo" "description": "dòng 1\ndòng 2"} {"name": "Xôi"}]')
+    assert meals == [{"name": "Cháo", "description": "dòng 1\ndòng 2"}, {"name": "Xôi"}]
+
+    meals, _ = parse_meals('{"meals": [{"name": "Bún Chả"}]}')
+    assert meals == [{"name": "Bún Chả"}]
+
+    # Phản hồi bị cắt: bỏ key dở dang, đóng các ngoặc còn mở
+    meals, _ = parse_meals('[{"name": "Cơm Tấm", "ingredients": [{"name": "Sườn", "amount": "150g"}], "prepar')
+    assert meals == [{"name": "Cơm Tấm", "ingredients": [{"name": "Sườn", "amount": "150g"}]}]
+
+    print("✅ Inline JSON repairs test completed")
+
+def test_groq_service_streams_completion():
+    """Test GroqService parse món ăn từ stream chunk của API"""
+    from groq_integration import GroqService
+
+    print("🔧 Testing streamed Groq completion...")
+
+    def chunk(text):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    class FakeCompletions:
+        def create(self, **kwargs):
+            assert kwargs["stream"] is True
+            return iter([chunk(MEAL_JSON[i:i + 40]) for i in range(0, len(MEAL_JSON), 40)] + [chunk(None)])
+
+    service = GroqService(api_key=None)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    service.model = "test-model"
+
+    text, meals = service._stream_meal_completion(messages=[{"role": "user", "content": "?"}], max_tokens=10)
+    assert text == MEAL_JSON
+    assert [meal["name"] for meal in meals] == ["Phở Gà", "Xôi Gấc"]
+
+    # Pipeline trích xuất dùng parser một lần quét trước các chiến lược cũ
+    assert [meal["name"] for meal in service._extract_json_from_response(MEAL_JSON)] == ["Phở Gà", "Xôi Gấc"]
+
+    print("✅ Streamed Groq completion test completed")
+
+if __name__ == "__main__":
+    test_meals_emitted_as_soon_as_braces_close()
+    test_inline_repairs()
+    test_groq_service_streams_completion()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Test logging có cấu trúc: JSON một dòng, định dạng lười, lấy mẫu theo request, correlation ID qua middleware
+"""
+
+import io
+import json
+import logging
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def _records(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines() if line.strip()]
+
+def test_json_output_lazy_formatting_and_sampling():
+    """Test bản ghi JSON kèm trường extra, LazyJSON chỉ serialize khi được ghi, lấy mẫu giữ WARNING"""
+    from structured_logging import LazyJSON, SamplingFilter, setup_logging, shutdown_logging
+
+    print("🔧 Testing structured log output...")
+
+    serialized = []
+
+    class Payload:
+        def __str__(self):
+            serialized.append(1)
+            return "payload"
+
+    root = logging.getLogger()
+    original_level = root.level
+    logger = logging.getLogger("test.structured")
+    stream = io.StringIO()
+    try:
+        setup_logging(level="INFO", fmt="json", sample_rate=1.0, stream=stream)
+        logger.info("Synced user %s", "user-1", extra={"records": 3})
+        logger.info("Body: %s", LazyJSON({"name": "Phở bò", "calories": 450}, limit=20))
+        logger.debug("Skipped: %s", LazyJSON(Payload()))
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("Failed")
+        shutdown_logging()
+
+        records = _records(stream)
+        assert records[0]["msg"] == "Synced user user-1" and records[0]["records"] == 3
+        assert records[0]["level"] == "INFO" and records[0]["logger"] == "test.structured"
+        assert records[1]["msg"] == 'Body: {"name": "Phở bò", "...'
+        assert records[2]["level"] == "ERROR" and "ZeroDivisionError" in records[2]["exc"]
+        assert not serialized, "bản ghi DEBUG bị lọc không được serialize payload"
+
+        stream = io.StringIO()
+        setup_logging(level="INFO", fmt="text", sample_rate=0.0, stream=stream)
+        logger.info("dropped by sampling")
+        logger.warning("always kept")
+        shutdown_logging()
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 1 and "WARNING test.structured [None] always kept" in lines[0]
+    finally:
+        shutdown_logging()
+        root.setLevel(original_level)
+
+    # Cùng request ID thì cùng quyết định lấy mẫu
+    sampler = SamplingFilter(rate=0.5)
+    def record(request_id, level=logging.INFO):
+        item = logging.LogRecord("x", level, "", 0, "msg", (), None)
+        item.request_id = request_id
+        return item
+    decisions = {request_id: sampler.filter(record(request_id)) for request_id in (f"req-{i}" for i in range(200))}
+    assert all(sampler.filter(record(request_id)) == kept for request_id, kept in decisions.items())
+    assert 40 < sum(decisions.values()) < 160
+    assert sampler.filter(record("req-0", logging.ERROR))
+
+    print("✅ Structured log output test completed")
+
+def test_middleware_correlation_id_and_access_log():
+    """Test middleware trả X-Request-ID, log trong handler (kể cả handler đồng bộ) mang cùng request ID, access log có thời gian"""
+    from fastapi import FastAPI, HTTPException
+    from fastapi.testclient import TestClient
+    from structured_logging import RequestContextMiddleware, setup_logging, shutdown_logging
+
+    print("🔧 Testing request correlation IDs...")
+
+    logger = logging.getLogger("test.handler")
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware, slow_seconds=60)
+
+    @app.get("/async/{item_id}")
+    async def async_handler(item_id: int):
+        logger.info("async handler %s", item_id)
+        return {"id": item_id}
+
+    @app.get("/sync")
+    def sync_handler():
+        logger.info("sync handler")
+        raise HTTPException(status_code=503, detail="unavailable")
+
+    root = logging.getLogger()
+    original_level = root.level
+    stream = io.StringIO()
+    try:
+        setup_logging(level="INFO", fmt="json", sample_rate=1.0, stream=stream)
+        client = TestClient(app)
+        first = client.get("/async/7", headers={"X-Request-ID": "client-abc"})
+        second = client.get("/sync")
+        third = client.get("/async/8", headers={"X-Request-ID": "bad id\"{}"})
+        shutdown_logging()
+    finally:
+        shutdown_logging()
+        root.setLevel(original_level)
+
+    assert first.headers["x-request-id"] == "client-abc"
+    generated = second.headers["x-request-id"]
+    assert len(generated) == 32 and generated != "client-abc"
+    assert third.headers["x-request-id"] != "bad id\"{}"
+
+    records = _records(stream)
+    by_request = {}
+    for item in records:
+        by_request.setdefault(item.get("request_id"), []).append(item)
+    handler_log, access_log = by_request["client-abc"]
+    assert handler_log["msg"] == "async handler 7"
+    assert access_log["logger"] == "access" and access_log["route"] == "/async/{item_id}"
+    assert access_log["status"] == 200 and access_log["duration_ms"] >= 0
+    sync_logs = by_request[generated]
+    assert sync_logs[0]["msg"] == "sync handler"
+    assert sync_logs[1]["status"] == 503 and sync_logs[1]["level"] == "WARNING"
+
+    print("✅ Request correlation IDs test completed")
+
+if __name__ == "__main__":
+    test_json_output_lazy_formatting_and_sampling()
+    test_middleware_correlation_id_and_access_log()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Test client USDA bất đồng bộ: token bucket, tra cứu hàng loạt song song và cache dùng chung
+"""
+
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_token_bucket_reservations():
+    """Test token bucket cho gửi dồn `capacity` request rồi giãn cách theo `rate`"""
+    from rate_limiting import TokenBucket
+
+    print("🔧 Testing token bucket...")
+
+    clock = _FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Các request tiếp theo xếp hàng cách nhau 1/rate giây
+    assert [bucket.reserve() for _ in range(2)] == [0.5, 1.0]
+
+    clock.now = 10.0
+    assert bucket.available_tokens == 3
+    assert bucket.reserve() == 0.0
+
+    try:
+        TokenBucket(rate=0)
+        assert False, "rate = 0 phải báo lỗi"
+    except ValueError:
+        pass
+
+    print("✅ Token bucket test completed")
+
+class _FakeUSDA:
+    """Giả lập USDA API qua httpx.MockTransport, đếm số request đang chạy đồng thời"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []
+
+    async def handler(self, request):
+        import httpx
+
+        self.requests.append(request.url.path)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+        if request.url.path.endswith("/foods/search"):
+            query = request.url.params["query"]
+            nutrients = [] if query == "tofu" else [
+                {"nutrientName": "Energy", "value": 130},
+                {"nutrientName": "Protein", "value": 2.7},
+            ]
+            return httpx.Response(200, json={"foods": [
+                {"fdcId": 100 + len(query), "description": query.upper(), "foodNutrients": nutrients}
+            ]})
+        return httpx.Response(200, json={
+            "fdcId": int(request.url.path.rsplit("/", 1)[1]),
+            "description": "TOFU",
+            "foodNutrients": [{"nutrient": {"name": "Protein"}, "amount": 8.0}],
+        })
+
+class _FakeRegistry:
+    def __init__(self, transport):
+        import httpx
+        self.client = httpx.AsyncClient(transport=transport)
+
+    def async_client(self, name):
+        return self.client
+
+def test_get_nutrition_many_shares_cache():
+    """Test get_nutrition_many: song song có giới hạn, không gọi trùng, cache dùng chung với client đồng bộ"""
+    import httpx
+    import usda_integration
+    from config import config
+    from rate_limiting import TokenBucket
+    from usda_integration import USDAFoodDataAPI, AsyncUSDAFoodDataAPI
+
+    print("🔧 Testing async USDA batch lookups...")
+
+    fake = _FakeUSDA()
+    original_registry, original_use_cache = usda_integration.http_clients, config.USE_USDA_CACHE
+    usda_integration.http_clients = _FakeRegistry(httpx.MockTransport(fake.handler))
+    config.USE_USDA_CACHE = False
+    try:
+        api = USDAFoodDataAPI(api_key="test")
+        api.rate_limiter = TokenBucket(rate=1000, capacity=100)
+        async_api = AsyncUSDAFoodDataAPI(api, max_concurrency=2)
+        saves = []
+
+        async def count_save():
+            saves.append(1)
+        async_api._save_cache = count_save
+
+        queries = ["gạo", "thịt gà", "tofu", "gạo", "apple", "banana"]
+        amounts = ["200g", None, None, None, None, None]
+        results = asyncio.run(async_api.get_nutrition_many(queries, amounts, vietnamese=True))
+
+        assert [result["name"] for result in results] == ["RICE", "CHICKEN", "TOFU", "RICE", "APPLE", "BANANA"]
+        assert results[0]["calories"] == 260 and results[3]["calories"] == 130 and results[2]["protein"] == 8.0
+        # Hai truy vấn "gạo" dùng chung một lần tìm kiếm; tofu cần thêm một lần lấy chi tiết
+        assert fake.requests.count("/fdc/v1/foods/search") == 5
+        assert sum(path.startswith("/fdc/v1/food/") for path in fake.requests) == 1
+        assert fake.max_in_flight == 2
+        assert len(saves) == 1
+
+        # Lần gọi lại toàn cache hit: không gửi request, không ghi lại file cache
+        asyncio.run(async_api.get_nutrition_many(["gạo", "tofu"], vietnamese=True))
+        assert len(fake.requests) == 6 and len(saves) == 1
+
+        # Client đồng bộ đọc được kết quả với cùng cache key, không gửi request mới
+        assert api.search_foods("gạo", max_results=1)[0]["name"] == "RICE"
+        assert api.get_nutrition_info("thịt gà", "200g")["calories"] == 260
+        assert len(fake.requests) == 6
+    finally:
+        usda_integration.http_clients = original_registry
+        config.USE_USDA_CACHE = original_use_cache
+
+    print("✅ Async USDA batch lookups test completed")
+
+if __name__ == "__main__":
+    test_token_bucket_reservations()
+    test_get_nutrition_many_shares_cache()
@@ -1,12 +1,16 @@
+import asyncio
 import os
 import json
-import requests
 from typing import Dict, List, Optional, Union
 from datetime import datetime
 import time
 import re
+import threading
 
 from config import config
+from http_clients import http_clients
+from rate_limiting import TokenBucket
+from aho_corasick import AhoCorasickTranslator, normalize_term
 
 # Từ điển ánh xạ từ tiếng Việt sang tiếng Anh cho các loại thực phẩm phổ biến
 VI_TO_EN_FOOD_DICT = {
@@ -152,6 +156,144 @@ for key, value in list(VI_TO_EN_FOOD_DICT.items()):
     VI_TO_EN_FOOD_DICT[key + " luộc"] = "boiled " + value
     VI_TO_EN_FOOD_DICT[key + " chiên"] = "fried " + value
 
+# Automaton dịch thuật ngữ Việt -> Anh, build một lần (xem build_translation_index)
+_TRANSLATOR: Optional[AhoCorasickTranslator] = None
+
+def build_translation_index() -> AhoCorasickTranslator:
+    """
+    Build automaton Aho-Corasick từ VI_TO_EN_FOOD_DICT
+    
+    Returns:
+        Automaton dùng chung cho USDA, Gemini Vision và chatbot
+    """
+    global _TRANSLATOR
+    if _TRANSLATOR is None:
+        _TRANSLATOR = AhoCorasickTranslator(VI_TO_EN_FOOD_DICT)
+    return _TRANSLATOR
+
+def translate_food_query(vietnamese_query: str) -> Optional[str]:
+    """
+    Dịch toàn bộ thuật ngữ thực phẩm tiếng Việt trong truy vấn sang tiếng Anh
+    
+    Args:
+        vietnamese_query: Truy vấn tiếng Việt (vd: "cơm trắng và thịt gà luộc")
+        
+    Returns:
+        Truy vấn tiếng Anh hoặc None nếu không có thuật ngữ nào được nhận diện
+    """
+    translator = build_translation_index()
+    query = normalize_term(vietnamese_query).strip()
+    
+    if query in translator.mapping:
+        return translator.mapping[query]
+    
+    if not translator.find_longest(query):
+        return None
+    return translator.translate(query)
+
+def _parse_search_results(data: Dict) -> List[Dict]:
+    """Chuyển kết quả /foods/search sang định dạng đơn giản (dinh dưỡng trên 100g)"""
+    results = []
+    for food in data.get("foods", []):
+        nutrients = {}
+        for nutrient in food.get("foodNutrients", []):
+            name = nutrient.get("nutrientName", "").lower()
+            value = nutrient.get("value", 0)
+            
+            if "protein" in name:
+                nutrients["protein"] = value
+            elif "carbohydrate" in name:
+                nutrients["carbs"] = value
+            elif "fat" in name and "total" in name:
+                nutrients["fat"] = value
+            elif "energy" in name:
+                nutrients["calories"] = value
+        
+        results.append({
+            "id": food.get("fdcId"),
+            "name": food.get("description", ""),
+            "nutrition": nutrients,
+            "source": "USDA"
+        })
+    return results
+
+def _parse_food_detail(food_data: Dict) -> Dict:
+    """Trích xuất thông tin quan trọng từ kết quả /food/{id}"""
+    food_detail = {
+        "id": food_data.get("fdcId"),
+        "name": food_data.get("description", ""),
+        "ingredients": food_data.get("ingredients", ""),
+        "brand": food_data.get("brandName", ""),
+        "nutrition": {}
+    }
+    
+    for nutrient in food_data.get("foodNutrients", []):
+        nutrient_data = nutrient.get("nutrient", {})
+        name = nutrient_data.get("name", "").lower()
+        value = nutrient.get("amount", 0)
+        
+        if "protein" in name:
+            food_detail["nutrition"]["protein"] = value
+        elif "carbohydrate" in name and "total" in name:
+            food_detail["nutrition"]["carbs"] = value
+        elif "fat" in name and "total" in name:
+            food_detail["nutrition"]["fat"] = value
+        elif "energy" in name:
+            food_detail["nutrition"]["calories"] = value
+        elif "fiber" in name:
+            food_detail["nutrition"]["fiber"] = value
+        elif "sugar" in name and "total" in name:
+            food_detail["nutrition"]["sugar"] = value
+        elif "sodium" in name:
+            food_detail["nutrition"]["sodium"] = value
+    return food_detail
+
+def _base_nutrition(food: Dict) -> Dict:
+    """Thông tin dinh dưỡng cơ bản (100g) từ kết quả tìm kiếm hoặc chi tiết thực phẩm"""
+    return {
+        "name": food["name"],
+        "calories": food["nutrition"].get("calories", 0),
+        "protein": food["nutrition"].get("protein", 0),
+        "fat": food["nutrition"].get("fat", 0),
+        "carbs": food["nutrition"].get("carbs", 0)
+    }
+
+# Hệ số quy đổi đơn vị sang gram (ước lượng, khác nhau tùy loại thực phẩm)
+_UNIT_GRAMS = {
+    "kg": 1000, "kilograms": 1000,
+    "oz": 28.35, "ounce": 28.35, "ounces": 28.35,
+    "cup": 240, "cups": 240,
+    "tbsp": 15, "tablespoon": 15, "tablespoons": 15,
+    "tsp": 5, "teaspoon": 5, "teaspoons": 5,
+}
+
+def _scale_nutrition(base_nutrition: Optional[Dict], food_query: str, quantity: float, unit: str) -> Dict:
+    """
+    Tính lại dinh dưỡng (USDA cho 100g) theo số lượng
+    
+    Returns:
+        Dinh dưỡng đã điều chỉnh, hoặc đối tượng trống với tên nếu không tìm thấy
+    """
+    if not base_nutrition:
+        return {
+            "name": food_query,
+            "calories": 0,
+            "protein": 0,
+            "fat": 0,
+            "carbs": 0,
+            "amount": f"{quantity} {unit}"
+        }
+    
+    multiplier = quantity / 100 * _UNIT_GRAMS.get(unit.lower(), 1)
+    return {
+        "name": base_nutrition["name"],
+        "calories": round(base_nutrition["calories"] * multiplier, 1),
+        "protein": round(base_nutrition["protein"] * multiplier, 1),
+        "fat": round(base_nutrition["fat"] * multiplier, 1),
+        "carbs": round(base_nutrition["carbs"] * multiplier, 1),
+        "amount": f"{quantity} {unit}"
+    }
+
 class USDAFoodDataAPI:
     """Lớp tương tác với USDA FoodData Central API"""
     
@@ -167,15 +309,43 @@ class USDAFoodDataAPI:
         self.api_key = api_key
         self.available = api_key is not None
         
-        # Cache để lưu kết quả tìm kiếm
-        self.search_cache = {}
-        self.food_cache = {}
-        self.last_request_time = 0
-        self.request_delay = 0.5  # Giãn cách giữa các request (giây)
+        # Cache để lưu kết quả tìm kiếm (file cache được tải ở lần dùng đầu tiên, không phải lúc import)
+        self._search_cache = {}
+        self._food_cache = {}
+        self._cache_loaded = not config.USE_USDA_CACHE
+        self._cache_lock = threading.Lock()
+        self._cache_file_lock = threading.Lock()
         
-        # Tải cache từ file nếu có
-        if config.USE_USDA_CACHE:
-            self._load_cache_from_file()
+        # Token bucket dùng chung cho lời gọi đồng bộ và AsyncUSDAFoodDataAPI
+        self.request_delay = 1 / config.USDA_REQUESTS_PER_SECOND  # Giãn cách trung bình giữa các request (giây)
+        self.rate_limiter = TokenBucket(rate=config.USDA_REQUESTS_PER_SECOND, capacity=config.USDA_BURST)
+    
+    @property
+    def search_cache(self) -> Dict:
+        self.load_cache()
+        return self._search_cache
+    
+    @search_cache.setter
+    def search_cache(self, value: Dict) -> None:
+        self._search_cache = value
+    
+    @property
+    def food_cache(self) -> Dict:
+        self.load_cache()
+        return self._food_cache
+    
+    @food_cache.setter
+    def food_cache(self, value: Dict) -> None:
+        self._food_cache = value
+    
+    def load_cache(self) -> None:
+        """Tải cache từ file nếu chưa tải (thread-safe, idempotent)"""
+        if self._cache_loaded:
+            return
+        with self._cache_lock:
+            if not self._cache_loaded:
+                self._load_cache_from_file()
+                self._cache_loaded = True
     
     def _load_cache_from_file(self):
         """Tải cache từ file"""
@@ -190,9 +360,9 @@ class USDAFoodDataAPI:
                     
                     # Nếu cache quá cũ, không sử dụng
                     if cache_age_days <= config.USDA_CACHE_TTL_DAYS:
-                        self.search_cache = cache_data.get('search_cache', {})
-                        self.food_cache = cache_data.get('food_cache', {})
-                        print(f"Đã tải {len(self.search_cache)} kết quả tìm kiếm và {len(self.food_cache)} thông tin thực phẩm từ cache")
+                        self._search_cache = cache_data.get('search_cache', {})
+                        self._food_cache = cache_data.get('food_cache', {})
+                        print(f"Đã tải {len(self._search_cache)} kết quả tìm kiếm và {len(self._food_cache)} thông tin thực phẩm từ cache")
                     else:
                         print(f"Cache quá cũ ({cache_age_days:.1f} ngày), tạo cache mới")
         except Exception as e:
@@ -202,23 +372,28 @@ class USDAFoodDataAPI:
         """Lưu cache vào file"""
         if not config.USE_USDA_CACHE:
             return
-            
+        self._write_cache_file(self._cache_snapshot())
+    
+    def _cache_snapshot(self) -> Dict:
+        """Bản sao nông của cache để ghi file (có thể ghi trong thread khác)"""
+        return {
+            'timestamp': time.time(),
+            'search_cache': dict(self.search_cache),
+            'food_cache': dict(self.food_cache)
+        }
+    
+    def _write_cache_file(self, cache_data: Dict) -> None:
+        """Ghi cache ra file (mỗi lần một thread)"""
         try:
-            # Tạo thư mục cache nếu không tồn tại
-            os.makedirs(os.path.dirname(config.USDA_CACHE_FILE), exist_ok=True)
-            
-            # Tạo đối tượng cache
-            cache_data = {
-                'timestamp': time.time(),
-                'search_cache': self.search_cache,
-                'food_cache': self.food_cache
-            }
-            
-            # Lưu vào file
-            with open(config.USDA_CACHE_FILE, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            with self._cache_file_lock:
+                # Tạo thư mục cache nếu không tồn tại
+                os.makedirs(os.path.dirname(config.USDA_CACHE_FILE), exist_ok=True)
                 
-            print(f"Đã lưu {len(self.search_cache)} kết quả tìm kiếm và {len(self.food_cache)} thông tin thực phẩm vào cache")
+                # Lưu vào file
+                with open(config.USDA_CACHE_FILE, 'w', encoding='utf-8') as f:
+                    json.dump(cache_data, f, ensure_ascii=False, indent=2)
+                
+            print(f"Đã lưu {len(cache_data['search_cache'])} kết quả tìm kiếm và {len(cache_data['food_cache'])} thông tin thực phẩm vào cache")
         except Exception as e:
             print(f"Lỗi khi lưu cache USDA: {str(e)}")
     
@@ -232,32 +407,17 @@ class USDAFoodDataAPI:
         Returns:
             Truy vấn tiếng Anh tương ứng
         """
-        # Chuyển về chữ thường để dễ so khớp
-        query_lower = vietnamese_query.lower()
-        
-        # Thử tìm khớp chính xác
-        if query_lower in VI_TO_EN_FOOD_DICT:
-            return VI_TO_EN_FOOD_DICT[query_lower]
-        
-        # Thử tìm khớp một phần
-        for vi_term, en_term in VI_TO_EN_FOOD_DICT.items():
-            if vi_term in query_lower:
-                # Thay thế từ tiếng Việt bằng từ tiếng Anh tương ứng
-                return query_lower.replace(vi_term, en_term)
+        translated = translate_food_query(vietnamese_query)
+        if translated:
+            return translated
         
         # Nếu không tìm thấy, giữ nguyên truy vấn
         print(f"Không tìm thấy bản dịch cho: {vietnamese_query}")
         return vietnamese_query
     
     def _wait_for_rate_limit(self):
-        """Đợi để không vượt quá rate limit của API"""
-        current_time = time.time()
-        elapsed = current_time - self.last_request_time
-        
-        if elapsed < self.request_delay:
-            time.sleep(self.request_delay - elapsed)
-        
-        self.last_request_time = time.time()
+        """Đợi để không vượt quá rate limit của API (chặn thread; code async dùng AsyncUSDAFoodDataAPI)"""
+        self.rate_limiter.acquire()
     
     def search_foods(self, query: str, vietnamese: bool = True, max_results: int = 15) -> List[Dict]:
         """
@@ -302,42 +462,10 @@ class USDAFoodDataAPI:
         }
         
         try:
-            response = requests.get(url, params=params)
+            response = http_clients.session("usda").get(url, params=params)
             response.raise_for_status()  # Raise exception nếu request thất bại
             
-            data = response.json()
-            foods = data.get("foods", [])
-            
-            # Lọc và chuyển đổi kết quả sang định dạng đơn giản hơn
-            results = []
-            for food in foods:
-                food_id = food.get("fdcId")
-                description = food.get("description", "")
-                
-                # Tính toán các giá trị dinh dưỡng trên 100g
-                nutrients = {}
-                for nutrient in food.get("foodNutrients", []):
-                    name = nutrient.get("nutrientName", "").lower()
-                    value = nutrient.get("value", 0)
-                    unit = nutrient.get("unitName", "")
-                    
-                    if "protein" in name:
-                        nutrients["protein"] = value
-                    elif "carbohydrate" in name:
-                        nutrients["carbs"] = value
-                    elif "fat" in name and "total" in name:
-                        nutrients["fat"] = value
-                    elif "energy" in name:
-                        nutrients["calories"] = value
-                
-                # Tạo một đối tượng đơn giản
-                result = {
-                    "id": food_id,
-                    "name": description,
-                    "nutrition": nutrients,
-                    "source": "USDA"
-                }
-                results.append(result)
+            results = _parse_search_results(response.json())
             
             # Lưu vào cache
             self.search_cache[cache_key] = results
@@ -379,41 +507,10 @@ class USDAFoodDataAPI:
         params = {"api_key": self.api_key}
         
         try:
-            response = requests.get(url, params=params)
+            response = http_clients.session("usda").get(url, params=params)
             response.raise_for_status()
             
-            food_data = response.json()
-            
-            # Trích xuất thông tin quan trọng
-            food_detail = {
-                "id": food_data.get("fdcId"),
-                "name": food_data.get("description", ""),
-                "ingredients": food_data.get("ingredients", ""),
-                "brand": food_data.get("brandName", ""),
-                "nutrition": {}
-            }
-            
-            # Trích xuất các giá trị dinh dưỡng
-            for nutrient in food_data.get("foodNutrients", []):
-                nutrient_data = nutrient.get("nutrient", {})
-                name = nutrient_data.get("name", "").lower()
-                value = nutrient.get("amount", 0)
-                unit = nutrient_data.get("unitName", "")
-                
-                if "protein" in name:
-                    food_detail["nutrition"]["protein"] = value
-                elif "carbohydrate" in name and "total" in name:
-                    food_detail["nutrition"]["carbs"] = value
-                elif "fat" in name and "total" in name:
-                    food_detail["nutrition"]["fat"] = value
-                elif "energy" in name:
-                    food_detail["nutrition"]["calories"] = value
-                elif "fiber" in name:
-                    food_detail["nutrition"]["fiber"] = value
-                elif "sugar" in name and "total" in name:
-                    food_detail["nutrition"]["sugar"] = value
-                elif "sodium" in name:
-                    food_detail["nutrition"]["sodium"] = value
+            food_detail = _parse_food_detail(response.json())
             
             # Lưu vào cache
             self.food_cache[food_id] = food_detail
@@ -450,29 +547,16 @@ class USDAFoodDataAPI:
         
         # Nếu đã có thông tin dinh dưỡng, trả về luôn
         if "nutrition" in food and food["nutrition"]:
-            return {
-                "name": food["name"],
-                "calories": food["nutrition"].get("calories", 0),
-                "protein": food["nutrition"].get("protein", 0),
-                "fat": food["nutrition"].get("fat", 0),
-                "carbs": food["nutrition"].get("carbs", 0)
-            }
+            return _base_nutrition(food)
         
         # Nếu chưa có đủ thông tin, lấy thêm chi tiết
-        food_id = food["id"]
-        food_detail = self.get_food_detail(food_id)
+        food_detail = self.get_food_detail(food["id"])
         
         if not food_detail:
             return None
         
         # Trả về thông tin dinh dưỡng
-        return {
-            "name": food_detail["name"],
-            "calories": food_detail["nutrition"].get("calories", 0),
-            "protein": food_detail["nutrition"].get("protein", 0),
-            "fat": food_detail["nutrition"].get("fat", 0),
-            "carbs": food_detail["nutrition"].get("carbs", 0)
-        }
+        return _base_nutrition(food_detail)
     
     def extract_quantity_from_text(self, text: str) -> tuple:
         """
@@ -547,6 +631,19 @@ class USDAFoodDataAPI:
         Returns:
             Thông tin dinh dưỡng với số lượng đã điều chỉnh
         """
+        food_query, quantity, unit = self._parse_amount(food_query, amount_text)
+        
+        # Lấy thông tin dinh dưỡng cơ bản (cho 100g) rồi tính lại theo số lượng
+        base_nutrition = self.get_nutrition_from_query(food_query, vietnamese)
+        return _scale_nutrition(base_nutrition, food_query, quantity, unit)
+    
+    def _parse_amount(self, food_query: str, amount_text: str = None) -> tuple:
+        """
+        Tách số lượng khỏi truy vấn
+        
+        Returns:
+            Tuple (truy vấn thực phẩm, số lượng, đơn vị)
+        """
         # Nếu không có amount_text, sử dụng food_query để trích xuất
         if not amount_text:
             quantity, unit, ingredient = self.extract_quantity_from_text(food_query)
@@ -556,53 +653,13 @@ class USDAFoodDataAPI:
         else:
             # Nếu có amount_text riêng, trích xuất từ đó
             quantity, unit, _ = self.extract_quantity_from_text(amount_text)
-        
-        # Lấy thông tin dinh dưỡng cơ bản (cho 100g)
-        base_nutrition = self.get_nutrition_from_query(food_query, vietnamese)
-        
-        if not base_nutrition:
-            # Nếu không tìm thấy, trả về một đối tượng trống với tên
-            return {
-                "name": food_query,
-                "calories": 0,
-                "protein": 0,
-                "fat": 0,
-                "carbs": 0,
-                "amount": f"{quantity} {unit}"
-            }
-        
-        # Tính toán lại giá trị dinh dưỡng dựa trên số lượng
-        multiplier = quantity / 100  # USDA cung cấp dữ liệu cho 100g
-        
-        # Điều chỉnh theo đơn vị
-        if unit.lower() in ['kg', 'kilograms']:
-            multiplier *= 1000
-        elif unit.lower() in ['oz', 'ounce', 'ounces']:
-            multiplier *= 28.35  # 1 oz = 28.35g
-        elif unit.lower() in ['cup', 'cups']:
-            # Giả định 1 cup = khoảng 240g (khác nhau tùy loại thực phẩm)
-            multiplier *= 240
-        elif unit.lower() in ['tbsp', 'tablespoon', 'tablespoons']:
-            # Giả định 1 tbsp = khoảng 15g
-            multiplier *= 15
-        elif unit.lower() in ['tsp', 'teaspoon', 'teaspoons']:
-            # Giả định 1 tsp = khoảng 5g
-            multiplier *= 5
-        
-        # Tính toán lại giá trị dinh dưỡng
-        return {
-            "name": base_nutrition["name"],
-            "calories": round(base_nutrition["calories"] * multiplier, 1),
-            "protein": round(base_nutrition["protein"] * multiplier, 1),
-            "fat": round(base_nutrition["fat"] * multiplier, 1),
-            "carbs": round(base_nutrition["carbs"] * multiplier, 1),
-            "amount": f"{quantity} {unit}"
-        }
+        return food_query, quantity, unit
 
     def clear_cache(self):
         """Xóa cache"""
         self.search_cache = {}
         self.food_cache = {}
+        self._cache_loaded = True
         
         # Xóa file cache nếu tồn tại
         if os.path.exists(config.USDA_CACHE_FILE):
@@ -612,5 +669,194 @@ class USDAFoodDataAPI:
             except Exception as e:
                 print(f"Lỗi khi xóa file cache USDA: {str(e)}")
 
+class AsyncUSDAFoodDataAPI:
+    """
+    Client USDA bất đồng bộ cho endpoint async
+    
+    Dùng chung cache (cùng cache key), token bucket và bộ dịch với USDAFoodDataAPI, nên kết quả
+    lấy qua client async cũng phục vụ được lời gọi đồng bộ và ngược lại. Chờ rate limit bằng
+    asyncio.sleep thay vì time.sleep nên không chặn worker.
+    """
+    
+    def __init__(self, api: USDAFoodDataAPI, max_concurrency: int = None):
+        """
+        Args:
+            api: Client đồng bộ cung cấp cache, rate limiter và API key
+            max_concurrency: Số request đồng thời tối đa (mặc định theo pool kết nối USDA)
+        """
+        self.api = api
+        self.max_concurrency = max_concurrency or http_clients.hosts["usda"].max_connections
+    
+    @property
+    def available(self) -> bool:
+        return self.api.available
+    
+    async def _get_json(self, url: str, params: Dict) -> Dict:
+        await self.api.rate_limiter.acquire_async()
+        response = await http_clients.async_client("usda").get(url, params=params)
+        response.raise_for_status()
+        return response.json()
+    
+    async def _save_cache(self) -> None:
+        if config.USE_USDA_CACHE:
+            await asyncio.to_thread(self.api._write_cache_file, self.api._cache_snapshot())
+    
+    async def search_foods(self, query: str, vietnamese: bool = True, max_results: int = 15,
+                           save_cache: bool = True) -> List[Dict]:
+        """
+        Tìm kiếm thực phẩm (bản async của USDAFoodDataAPI.search_foods)
+        
+        Args:
+            query: Từ khóa tìm kiếm
+            vietnamese: Có phải truy vấn tiếng Việt không
+            max_results: Số kết quả tối đa trả về
+            save_cache: Ghi cache ra file khi có kết quả mới
+            
+        Returns:
+            Danh sách kết quả tìm kiếm
+        """
+        if not self.available:
+            print("USDA API key không khả dụng")
+            return []
+        
+        cache_key = f"{query}_{max_results}"
+        if cache_key in self.api.search_cache:
+            return self.api.search_cache[cache_key]
+        
+        search_query = self.api._translate_vi_to_en(query) if vietnamese else query
+        params = {
+            "api_key": self.api.api_key,
+            "query": search_query,
+            "pageSize": max_results,
+            "dataType": ["Survey (FNDDS)", "Foundation", "SR Legacy"]
+        }
+        
+        try:
+            results = _parse_search_results(await self._get_json(f"{self.api.BASE_URL}/foods/search", params))
+        except Exception as e:
+            print(f"Lỗi khi tìm kiếm thực phẩm: {str(e)}")
+            return []
+        
+        self.api.search_cache[cache_key] = results
+        if save_cache:
+            await self._save_cache()
+        return results
+    
+    async def get_food_detail(self, food_id: int, save_cache: bool = True) -> Optional[Dict]:
+        """
+        Lấy thông tin chi tiết về một loại thực phẩm (bản async)
+        
+        Args:
+            food_id: ID của thực phẩm trong USDA FoodData Central
+            save_cache: Ghi cache ra file khi có kết quả mới
+            
+        Returns:
+            Thông tin chi tiết về thực phẩm hoặc None nếu không tìm thấy
+        """
+        if not self.available:
+            print("USDA API key không khả dụng")
+            return None
+        
+        if food_id in self.api.food_cache:
+            return self.api.food_cache[food_id]
+        
+        try:
+            food_detail = _parse_food_detail(
+                await self._get_json(f"{self.api.BASE_URL}/food/{food_id}", {"api_key": self.api.api_key})
+            )
+        except Exception as e:
+            print(f"Lỗi khi lấy thông tin chi tiết thực phẩm: {str(e)}")
+            return None
+        
+        self.api.food_cache[food_id] = food_detail
+        if save_cache:
+            await self._save_cache()
+        return food_detail
+    
+    async def get_nutrition_from_query(self, query: str, vietnamese: bool = True,
+                                       save_cache: bool = True) -> Optional[Dict]:
+        """Tìm kiếm và lấy thông tin dinh dưỡng cơ bản (100g) cho một truy vấn"""
+        search_results = await self.search_foods(query, vietnamese=vietnamese, max_results=1, save_cache=save_cache)
+        if not search_results:
+            return None
+        
+        food = search_results[0]
+        if "nutrition" in food and food["nutrition"]:
+            return _base_nutrition(food)
+        
+        food_detail = await self.get_food_detail(food["id"], save_cache=save_cache)
+        return _base_nutrition(food_detail) if food_detail else None
+    
+    async def get_nutrition_info(self, food_query: str, amount_text: str = None, vietnamese: bool = True) -> Dict:
+        """
+        Lấy thông tin dinh dưỡng với số lượng cụ thể (bản async của get_nutrition_info)
+        
+        Returns:
+            Thông tin dinh dưỡng với số lượng đã điều chỉnh
+        """
+        food_query, quantity, unit = self.api._parse_amount(food_query, amount_text)
+        base_nutrition = await self.get_nutrition_from_query(food_query, vietnamese)
+        return _scale_nutrition(base_nutrition, food_query, quantity, unit)
+    
+    async def get_nutrition_many(self, food_queries: List[str], amounts: List[Optional[str]] = None,
+                                 vietnamese: bool = True) -> List[Dict]:
+        """
+        Lấy dinh dưỡng cho nhiều thực phẩm cùng lúc
+        
+        Các truy vấn tìm kiếm rồi các lần lấy chi tiết được gửi song song, tối đa max_concurrency
+        request cùng lúc và trong giới hạn của token bucket; truy vấn/ID trùng nhau chỉ gọi một lần.
+        Cache được ghi ra file một lần ở cuối, và chỉ khi có kết quả mới lấy từ API.
+        
+        Args:
+            food_queries: Danh sách tên thực phẩm (có thể kèm số lượng, vd "100g gạo")
+            amounts: Số lượng tương ứng từng thực phẩm (tùy chọn)
+            vietnamese: Có phải truy vấn tiếng Việt không
+            
+        Returns:
+            Danh sách dinh dưỡng theo đúng thứ tự food_queries
+        """
+        amounts = amounts or [None] * len(food_queries)
+        parsed = [self.api._parse_amount(query, amount) for query, amount in zip(food_queries, amounts)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def limited(coro):
+            async with semaphore:
+                return await coro
+        
+        # Bước 1: tìm kiếm các truy vấn khác nhau song song
+        unique_queries = list(dict.fromkeys(query for query, _, _ in parsed))
+        missed_queries = [query for query in unique_queries if f"{query}_1" not in self.api.search_cache]
+        search_results = await asyncio.gather(*(
+            limited(self.search_foods(query, vietnamese=vietnamese, max_results=1, save_cache=False))
+            for query in unique_queries
+        ))
+        first_food = {query: results[0] if results else None for query, results in zip(unique_queries, search_results)}
+        
+        # Bước 2: lấy chi tiết song song cho các kết quả chưa có dinh dưỡng
+        detail_ids = list(dict.fromkeys(
+            food["id"] for food in first_food.values() if food and not food.get("nutrition")
+        ))
+        missed_ids = [food_id for food_id in detail_ids if food_id not in self.api.food_cache]
+        details = await asyncio.gather(*(
+            limited(self.get_food_detail(food_id, save_cache=False)) for food_id in detail_ids
+        ))
+        detail_by_id = dict(zip(detail_ids, details))
+        
+        # Chỉ ghi file khi có ít nhất một kết quả mới lấy từ API (toàn cache hit thì không ghi)
+        fetched = any(f"{query}_1" in self.api.search_cache for query in missed_queries) or \
+            any(food_id in self.api.food_cache for food_id in missed_ids)
+        if fetched:
+            await self._save_cache()
+        
+        results = []
+        for query, quantity, unit in parsed:
+            food = first_food[query]
+            if food and not food.get("nutrition"):
+                food = detail_by_id.get(food["id"])
+            base_nutrition = _base_nutrition(food) if food else None
+            results.append(_scale_nutrition(base_nutrition, query, quantity, unit))
+        return results
+
 # Khởi tạo API với API key từ cấu hình
-usda_api = USDAFoodDataAPI() 
\ No newline at end of file
+usda_api = USDAFoodDataAPI()
+usda_async_api = AsyncUSDAFoodDataAPI(usda_api) 
\ No newline at end of file
@@ -667,48 +667,50 @@ def generate_random_dishes(meal_type: str, count: int = 1, used_dishes: List[str
     normalized_meal_type = meal_type_map.get(meal_type.lower(), "breakfast")
     print(f"Normalized to: '{normalized_meal_type}'")
     
-    # Lấy món ăn từ SAMPLE_RECIPES
-    available_dishes = SAMPLE_RECIPES.get(normalized_meal_type, [])
-    print(f"Available dishes: {len(available_dishes)}")
+    # Lấy món ăn từ SAMPLE_RECIPES (view chỉ đọc trong dish catalog)
+    from dish_catalog import get_dish_catalog
+    catalog = get_dish_catalog()
+    catalog_dishes = catalog.dishes("sample_recipes", normalized_meal_type)
+    print(f"Available dishes: {len(catalog_dishes)}")
     
-    if len(available_dishes) == 0:
+    if len(catalog_dishes) == 0:
         print("WARNING: No dishes available for this meal type!")
         # Fallback to breakfast if empty
-        available_dishes = SAMPLE_RECIPES.get("breakfast", [])
+        catalog_dishes = catalog.dishes("sample_recipes", "breakfast")
     
-    # Tạo bản sao của các món ăn để tránh thay đổi dữ liệu gốc
-    available_dishes = [dish.copy() for dish in available_dishes]
+    # Lọc và xáo trộn trên các record dùng chung, kèm tên hiển thị; chỉ copy những món được chọn
+    available_dishes = [(dish, dish["name"]) for dish in catalog_dishes]
     
     # Filter out previously used dishes if possible
     unused_dishes = available_dishes
     if used_dishes:
-        unused_dishes = [dish for dish in available_dishes if dish["name"] not in used_dishes]
+        unused_dishes = [(dish, name) for dish, name in available_dishes if name not in used_dishes]
         print(f"Unused dishes after filtering: {len(unused_dishes)}")
         
         # If we've used all dishes already or can't avoid repeats due to small selection
         if len(unused_dishes) < count:
             print("WARNING: Not enough unique dishes available, some dishes may repeat")
             # Use all available dishes but prioritize unused ones
-            unused_dishes = available_dishes
-            
             # Nếu buộc phải dùng lại món đã dùng, thêm biến thể vào tên
-            for dish in unused_dishes:
-                if dish["name"] in used_dishes:
-                    variation = f" (Biến thể {random.randint(1, 100)})"
-                    dish["name"] = dish["name"] + variation
+            unused_dishes = [
+                (dish, f"{name} (Biến thể {random.randint(1, 100)})" if name in used_dishes else name)
+                for dish, name in available_dishes
+            ]
     
     # Sử dụng day_index để tạo sự đa dạng
     if day_index >= 0 and day_index < 7:
         # Sử dụng day_index để xáo trộn danh sách món ăn theo một cách nhất quán cho mỗi ngày
         # nhưng khác nhau giữa các ngày
         random.seed(day_index * 100 + len(meal_type) + hash(normalized_meal_type) % 1000)
+        unused_dishes = list(unused_dishes)
         random.shuffle(unused_dishes)
         
         # Thêm biến thể vào tên món ăn dựa trên ngày để tránh trùng lặp
         day_name = DAYS_OF_WEEK[day_index] if day_index < len(DAYS_OF_WEEK) else f"Ngày {day_index+1}"
-        for dish in unused_dishes:
-            if not day_name in dish["name"]:
-                dish["name"] = f"{dish['name']} ({day_name})"
+        unused_dishes = [
+            (dish, name if day_name in name else f"{name} ({day_name})")
+            for dish, name in unused_dishes
+        ]
         
         # Đặt lại random seed sau khi sử dụng
         random.seed()
@@ -716,23 +718,22 @@ def generate_random_dishes(meal_type: str, count: int = 1, used_dishes: List[str
     # Lấy ngẫu nhiên món ăn
     if len(unused_dishes) <= count:
         # If we don't have enough, use all available and possibly add some from other meal types
-        selected_dishes = unused_dishes.copy()
-        remaining = count - len(selected_dishes)
+        selected = list(unused_dishes)
+        remaining = count - len(selected)
         
         if remaining > 0:
             # Get dishes from other meal types to avoid repeats
-            other_types = [t for t in SAMPLE_RECIPES.keys() if t != normalized_meal_type]
+            other_types = [t for t in catalog.meal_types("sample_recipes") if t != normalized_meal_type]
             other_dishes = []
             for other_type in other_types:
-                other_dishes.extend([dish.copy() for dish in SAMPLE_RECIPES[other_type]])
+                other_dishes.extend(catalog.dishes("sample_recipes", other_type))
             
             # Avoid used dishes in other types too
             if used_dishes:
                 other_dishes = [dish for dish in other_dishes if dish["name"] not in used_dishes]
             
             # Thêm biến thể vào tên món ăn từ loại bữa khác
-            for dish in other_dishes:
-                dish["name"] = f"{dish['name']} (Từ {normalized_meal_type})"
+            other_dishes = [(dish, f"{dish['name']} (Từ {normalized_meal_type})") for dish in other_dishes]
             
             # Add random dishes from other types
             if other_dishes:
@@ -742,11 +743,17 @@ def generate_random_dishes(meal_type: str, count: int = 1, used_dishes: List[str
                     random.shuffle(other_dishes)
                     random.seed()
                 
-                additional_dishes = other_dishes[:min(remaining, len(other_dishes))]
-                selected_dishes.extend(additional_dishes)
+                selected.extend(other_dishes[:min(remaining, len(other_dishes))])
     else:
         # Randomly sample if we have enough
-        selected_dishes = random.sample(unused_dishes, count)
+        selected = random.sample(unused_dishes, count)
+    
+    # Chỉ các món được chọn mới được copy thành dict có thể sửa
+    selected_dishes = []
+    for dish, name in selected:
+        dish_copy = dish.to_dict()
+        dish_copy["name"] = name
+        selected_dishes.append(dish_copy)
     
     # Thêm thông tin dinh dưỡng nếu cần
     for dish in selected_dishes:
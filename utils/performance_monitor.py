@@ -5,9 +5,12 @@ import time
 import functools
 import logging
 from typing import Dict, Any, Optional, Callable
+from collections import deque
 from datetime import datetime, timedelta
 import asyncio
 
+from metrics import metrics, PERCENTILES
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,35 +20,41 @@ class PerformanceMonitor:
     
     def __init__(self):
         self.metrics = {}
-        self.slow_queries = []
+        self.slow_queries = deque(maxlen=100)  # Keep only last 100 slow queries
         self.threshold_seconds = 2.0  # Alert if operation takes more than 2 seconds
+        # Fixed-bucket latency histogram per operation/outcome, exported at /metrics
+        self.histogram = metrics.histogram(
+            "operation_duration_seconds",
+            "Execution time of operations tracked by PerformanceMonitor",
+            ("operation", "outcome"),
+        )
     
     def track_time(self, operation_name: str):
         """Decorator to track execution time of functions"""
         def decorator(func):
             @functools.wraps(func)
             async def async_wrapper(*args, **kwargs):
-                start_time = time.time()
+                start_time = time.perf_counter()
                 try:
                     result = await func(*args, **kwargs)
-                    execution_time = time.time() - start_time
+                    execution_time = time.perf_counter() - start_time
                     self._record_metric(operation_name, execution_time, True)
                     return result
                 except Exception as e:
-                    execution_time = time.time() - start_time
+                    execution_time = time.perf_counter() - start_time
                     self._record_metric(operation_name, execution_time, False)
                     raise e
             
             @functools.wraps(func)
             def sync_wrapper(*args, **kwargs):
-                start_time = time.time()
+                start_time = time.perf_counter()
                 try:
                     result = func(*args, **kwargs)
-                    execution_time = time.time() - start_time
+                    execution_time = time.perf_counter() - start_time
                     self._record_metric(operation_name, execution_time, True)
                     return result
                 except Exception as e:
-                    execution_time = time.time() - start_time
+                    execution_time = time.perf_counter() - start_time
                     self._record_metric(operation_name, execution_time, False)
                     raise e
             
@@ -80,6 +89,7 @@ class PerformanceMonitor:
             metric['success_count'] += 1
         else:
             metric['error_count'] += 1
+        self.histogram.observe(execution_time, operation_name, 'success' if success else 'error')
         
         # Log slow operations
         if execution_time > self.threshold_seconds:
@@ -91,16 +101,30 @@ class PerformanceMonitor:
             }
             self.slow_queries.append(slow_query)
             logger.warning(f"SLOW OPERATION: {operation_name} took {execution_time:.2f}s")
-            
-            # Keep only last 100 slow queries
-            if len(self.slow_queries) > 100:
-                self.slow_queries = self.slow_queries[-100:]
     
+    def get_percentiles(self, operation_name: str) -> Dict[str, Optional[float]]:
+        """Estimated p50/p95/p99 latency of an operation across all outcomes"""
+        counts, total, count = None, 0.0, 0
+        histograms = [histogram for (name, _), histogram in self.histogram.children() if name == operation_name]
+        for histogram in histograms:
+            bucket_counts, bucket_sum, bucket_total = histogram.snapshot()
+            counts = bucket_counts if counts is None else [a + b for a, b in zip(counts, bucket_counts)]
+            total += bucket_sum
+            count += bucket_total
+        result = {}
+        for quantile in PERCENTILES:
+            value = histograms[0].percentile(quantile, (counts, total, count)) if histograms else None
+            result[f'p{round(quantile * 100)}_time'] = value
+        return result
+
     def get_metrics(self) -> Dict[str, Any]:
         """Get all performance metrics"""
         return {
-            'metrics': self.metrics,
-            'slow_queries': self.slow_queries[-10:],  # Last 10 slow queries
+            'metrics': {
+                name: {**metric, **self.get_percentiles(name)}
+                for name, metric in self.metrics.items()
+            },
+            'slow_queries': list(self.slow_queries)[-10:],  # Last 10 slow queries
             'total_operations': sum(m['total_calls'] for m in self.metrics.values()),
             'avg_response_time': sum(m['avg_time'] for m in self.metrics.values()) / len(self.metrics) if self.metrics else 0
         }
@@ -129,27 +153,27 @@ def log_execution_time(func_name: str = None):
         
         @functools.wraps(func)
         async def async_wrapper(*args, **kwargs):
-            start = time.time()
+            start = time.perf_counter()
             try:
                 result = await func(*args, **kwargs)
-                duration = time.time() - start
+                duration = time.perf_counter() - start
                 logger.info(f"⏱️  {name}: {duration:.3f}s")
                 return result
             except Exception as e:
-                duration = time.time() - start
+                duration = time.perf_counter() - start
                 logger.error(f"❌ {name}: {duration:.3f}s (ERROR: {str(e)})")
                 raise
         
         @functools.wraps(func)
         def sync_wrapper(*args, **kwargs):
-            start = time.time()
+            start = time.perf_counter()
             try:
                 result = func(*args, **kwargs)
-                duration = time.time() - start
+                duration = time.perf_counter() - start
                 logger.info(f"⏱️  {name}: {duration:.3f}s")
                 return result
             except Exception as e:
-                duration = time.time() - start
+                duration = time.perf_counter() - start
                 logger.error(f"❌ {name}: {duration:.3f}s (ERROR: {str(e)})")
                 raise
         
@@ -167,11 +191,11 @@ class TimingContext:
         self.start_time = None
     
     def __enter__(self):
-        self.start_time = time.time()
+        self.start_time = time.perf_counter()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        duration = time.time() - self.start_time
+        duration = time.perf_counter() - self.start_time
         if exc_type is None:
             logger.info(f"⏱️  {self.operation_name}: {duration:.3f}s")
         else:
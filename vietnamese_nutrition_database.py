@@ -325,11 +325,9 @@ def get_ingredient_nutrition(ingredient_name: str, amount_grams: float = 100.0):
     Returns:
         Dict chứa thông tin dinh dưỡng hoặc None nếu không tìm thấy
     """
-    # Chuẩn hóa tên nguyên liệu
-    normalized_name = ingredient_name.lower().strip()
-    
-    # Tìm trong database
-    nutrition_data = VIETNAMESE_NUTRITION_DATABASE.get(normalized_name)
+    # Tra cứu qua index hợp nhất (không dấu, alias, tiền tố)
+    from nutrition_index import lookup, PER_100G
+    nutrition_data = lookup(ingredient_name, basis=PER_100G)
     
     if not nutrition_data:
         return None
@@ -366,78 +364,8 @@ def parse_ingredient_amount(amount_str: str, ingredient_name: str) -> float:
     Returns:
         float: Khối lượng ước tính (grams)
     """
-    amount_str = amount_str.lower().strip()
-    ingredient_name = ingredient_name.lower().strip()
-
-    # Extract number from string
-    import re
-    numbers = re.findall(r'\d+\.?\d*', amount_str)
-    base_number = float(numbers[0]) if numbers else 1.0
-
-    # Conversion mappings
-    if any(unit in amount_str for unit in ['g', 'gram', 'gam']):
-        return base_number
-    elif any(unit in amount_str for unit in ['kg', 'kilo']):
-        return base_number * 1000
-    elif any(unit in amount_str for unit in ['ml', 'milliliter']):
-        return base_number  # Assume 1ml ≈ 1g for most liquids
-    elif any(unit in amount_str for unit in ['l', 'liter', 'lít']):
-        return base_number * 1000
-
-    # Vietnamese unit conversions
-    elif any(unit in amount_str for unit in ['quả', 'trái', 'củ']):
-        # Estimate weight based on ingredient type
-        if any(food in ingredient_name for food in ['trứng', 'egg']):
-            return base_number * 60  # 1 trứng ≈ 60g
-        elif any(food in ingredient_name for food in ['cà rốt', 'carrot']):
-            return base_number * 80  # 1 củ cà rốt ≈ 80g
-        elif any(food in ingredient_name for food in ['hành', 'onion']):
-            return base_number * 50  # 1 củ hành ≈ 50g
-        else:
-            return base_number * 100  # Default fruit/vegetable ≈ 100g
-
-    elif any(unit in amount_str for unit in ['ổ', 'chiếc']):
-        if any(food in ingredient_name for food in ['bánh mì', 'bread']):
-            return base_number * 150  # 1 ổ bánh mì ≈ 150g
-        else:
-            return base_number * 100  # Default
-
-    elif any(unit in amount_str for unit in ['tô', 'bát', 'bowl']):
-        return base_number * 200  # 1 tô/bát ≈ 200g
-
-    elif any(unit in amount_str for unit in ['cup', 'ly']):
-        if any(food in ingredient_name for food in ['gạo', 'rice']):
-            return base_number * 180  # 1 cup gạo ≈ 180g
-        elif any(food in ingredient_name for food in ['rau', 'vegetable']):
-            return base_number * 80   # 1 cup rau ≈ 80g
-        else:
-            return base_number * 150  # Default cup ≈ 150g
-
-    elif any(unit in amount_str for unit in ['tbsp', 'tablespoon', 'muỗng canh']):
-        return base_number * 15  # 1 tbsp ≈ 15g
-
-    elif any(unit in amount_str for unit in ['tsp', 'teaspoon', 'muỗng cà phê']):
-        return base_number * 5   # 1 tsp ≈ 5g
-
-    elif any(unit in amount_str for unit in ['lát', 'slice']):
-        if any(food in ingredient_name for food in ['thịt', 'meat']):
-            return base_number * 30  # 1 lát thịt ≈ 30g
-        elif any(food in ingredient_name for food in ['bánh mì', 'bread']):
-            return base_number * 25  # 1 lát bánh mì ≈ 25g
-        else:
-            return base_number * 20  # Default slice ≈ 20g
-
-    elif any(unit in amount_str for unit in ['miếng', 'piece']):
-        return base_number * 50  # 1 miếng ≈ 50g
-
-    # If no unit specified, assume grams if number > 10, else assume pieces
-    elif base_number > 10:
-        return base_number  # Likely grams
-    else:
-        return base_number * 100  # Likely pieces, estimate 100g each
-
-    # Fallback
-    return 100.0
+    from amount_parser import parse_amount
+    return parse_amount(amount_str, ingredient_name)
 
 def get_dish_nutrition(dish_name: str):
     """
@@ -449,8 +377,15 @@ def get_dish_nutrition(dish_name: str):
     Returns:
         Dict chứa thông tin dinh dưỡng hoặc None nếu không tìm thấy
     """
-    normalized_name = dish_name.lower().strip()
-    return VIETNAMESE_DISHES_NUTRITION.get(normalized_name)
+    from nutrition_index import lookup, PER_SERVING
+    record = lookup(dish_name, basis=PER_SERVING)
+    if not record:
+        return None
+    
+    dish = dict(record["data"])
+    for field in ("calories", "protein", "fat", "carbs", "fiber", "source", "reference_code", "serving_size"):
+        dish[field] = record[field]
+    return dish
 
 def calculate_dish_nutrition_from_ingredients(ingredients: list):
     """
@@ -472,23 +407,22 @@ def calculate_dish_nutrition_from_ingredients(ingredients: list):
         "calculated_from_ingredients": True
     }
     
-    for ingredient in ingredients:
-        name = ingredient.get("name", "")
-        amount_str = ingredient.get("amount", "100g")
-        
-        # 🔧 FIX: Improved amount parsing với realistic conversions
-        amount_grams = parse_ingredient_amount(amount_str, name)
-        
-        # Get nutrition for this ingredient
-        ingredient_nutrition = get_ingredient_nutrition(name, amount_grams)
-        
-        if ingredient_nutrition:
-            total_nutrition["calories"] += ingredient_nutrition["calories"]
-            total_nutrition["protein"] += ingredient_nutrition["protein"]
-            total_nutrition["fat"] += ingredient_nutrition["fat"]
-            total_nutrition["carbs"] += ingredient_nutrition["carbs"]
-            total_nutrition["fiber"] += ingredient_nutrition["fiber"]
-            total_nutrition["sources"].append(ingredient_nutrition["source"])
+    # 🔧 FIX: Improved amount parsing với realistic conversions
+    # Nguyên liệu đã có "grams" (vd: từ _parse_detailed_dish_components) thì không cần parse lại
+    from amount_parser import parse_many
+    names = [ingredient.get("name", "") for ingredient in ingredients]
+    grams = parse_many(
+        (ingredient.get("grams", ingredient.get("amount", "100g")), name)
+        for ingredient, name in zip(ingredients, names)
+    )
+    parsed = list(zip(names, grams))
+    
+    # Tính tổng bằng ma trận dinh dưỡng thay vì cộng từng nguyên liệu
+    from nutrient_matrix import get_nutrient_matrix
+    matrix = get_nutrient_matrix()
+    indices, grams, _ = matrix.vectorize(parsed)
+    total_nutrition.update(matrix.totals(indices, grams))
+    total_nutrition["sources"] = [matrix.sources[row] for row in indices]
     
     return total_nutrition
 
@@ -0,0 +1,148 @@
+"""
+Startup warm-up: build các bảng tra cứu tĩnh và khám phá model trước khi nhận traffic
+
+Sau cold start (vd: Render free tier), các request đầu tiên phải trả chi phí khởi tạo
+generator, index tra cứu, tạo client SDK (Groq, Gemini) và gọi Groq models.list(). Module này chạy các bước đó một lần
+trong thread nền khi ứng dụng khởi động và báo trạng thái qua endpoint /health.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+def _warm_vietnamese_dish_generator() -> None:
+    from services.vietnamese_dish_generator import vietnamese_dish_generator
+    vietnamese_dish_generator.build_lookup_tables()
+
+def _warm_vietnamese_meal_service() -> None:
+    from services.vietnamese_meal_service import vietnamese_meal_service
+    vietnamese_meal_service.build_lookup_tables()
+
+def _warm_usda_translation() -> None:
+    from usda_integration import build_translation_index
+    build_translation_index()
+
+def _warm_nutrition_index() -> None:
+    # Index chính được build khi import module, chỉ mục fuzzy build lần đầu dùng
+    from nutrition_index import build_fuzzy_index
+    from nutrient_matrix import get_nutrient_matrix
+    build_fuzzy_index()
+    get_nutrient_matrix()
+
+def _warm_groq_models() -> None:
+    # Tạo Groq client (import SDK) rồi chọn model
+    from groq_integration import groq_service
+    if groq_service.available:
+        groq_service.ensure_model_selected()
+
+def _warm_gemini_vision() -> None:
+    from gemini_vision import gemini_vision_service
+    if gemini_vision_service.configured:
+        gemini_vision_service.model  # Truy cập property để import SDK và tạo model
+
+def _warm_usda_cache() -> None:
+    from usda_integration import usda_api
+    usda_api.load_cache()
+
+# Các bước warm-up theo thứ tự chạy: (tên, hàm)
+WARMUP_TASKS: List[Tuple[str, Callable[[], None]]] = [
+    ("vietnamese_dish_generator", _warm_vietnamese_dish_generator),
+    ("vietnamese_meal_service", _warm_vietnamese_meal_service),
+    ("usda_translation_index", _warm_usda_translation),
+    ("nutrition_index", _warm_nutrition_index),
+    ("groq_model_discovery", _warm_groq_models),
+    ("gemini_vision_client", _warm_gemini_vision),
+    ("usda_cache", _warm_usda_cache),
+]
+
+def register_warmup_task(name: str, task: Callable[[], None]) -> None:
+    """
+    Thêm một bước warm-up (vd: kiểm tra kết nối cần gọi mạng) thay vì chạy lúc import
+
+    Args:
+        name: Tên bước (hiển thị trong /health)
+        task: Hàm không tham số
+    """
+    WARMUP_TASKS.append((name, task))
+
+class WarmupState:
+    """Trạng thái warm-up của instance (pending -> warming -> ready)"""
+
+    def __init__(self):
+        self.status = "pending"
+        self.started_at = None
+        self.finished_at = None
+        self.duration_ms = None
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_ms": self.duration_ms,
+            "tasks": self.tasks,
+        }
+
+warmup_state = WarmupState()
+
+def run_warmup(tasks: List[Tuple[str, Callable[[], None]]] = None) -> Dict[str, Any]:
+    """
+    Chạy tuần tự các bước warm-up và ghi lại thời gian từng bước
+
+    Một bước lỗi không chặn các bước còn lại: instance vẫn được đánh dấu ready
+    vì mọi bảng tra cứu đều được build lại khi dùng lần đầu.
+
+    Args:
+        tasks: Danh sách bước cần chạy (mặc định WARMUP_TASKS)
+
+    Returns:
+        Trạng thái warm-up dưới dạng dictionary
+    """
+    tasks = WARMUP_TASKS if tasks is None else tasks
+
+    with warmup_state._lock:
+        if warmup_state.status in ("warming", "ready"):
+            return warmup_state.to_dict()
+        warmup_state.status = "warming"
+        warmup_state.started_at = datetime.now().isoformat()
+
+    start = time.perf_counter()
+    for name, task in tasks:
+        task_start = time.perf_counter()
+        try:
+            task()
+            warmup_state.tasks[name] = {
+                "status": "ok",
+                "duration_ms": round((time.perf_counter() - task_start) * 1000, 1)
+            }
+        except Exception as e:
+            logger.warning(f"Warm-up task {name} failed: {e}")
+            warmup_state.tasks[name] = {
+                "status": "error",
+                "error": str(e),
+                "duration_ms": round((time.perf_counter() - task_start) * 1000, 1)
+            }
+
+    warmup_state.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+    warmup_state.finished_at = datetime.now().isoformat()
+    warmup_state.status = "ready"
+    logger.info(f"Warm-up completed in {warmup_state.duration_ms}ms")
+    return warmup_state.to_dict()
+
+def start_warmup_in_background() -> None:
+    """Khởi chạy warm-up trong thread nền để server vẫn trả lời /health trong lúc warm-up"""
+    if not config.WARMUP_ON_STARTUP:
+        warmup_state.status = "ready"
+        return
+    threading.Thread(target=run_warmup, name="startup-warmup", daemon=True).start()